@@ -1,11 +1,16 @@
 """Claude AI agent integration."""
 
-from anthropic import Anthropic
+from typing import TYPE_CHECKING
 
 from ..config import settings
 from ..database.models import Message
 from ..database.models import MessageRole
 from ..database.models import Project
+from .client import create_anthropic_client
+from .rate_limiter import rate_limiter
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
 
 
 class ClaudeAgent:
@@ -13,9 +18,16 @@ class ClaudeAgent:
 
     def __init__(self):
         """Initialize Claude agent."""
-        self.client = Anthropic(api_key=settings.anthropic_api_key)
+        self._client: AsyncAnthropic | None = None
+
+    @property
+    def client(self) -> "AsyncAnthropic":
+        """Anthropic client, created on first use."""
+        if self._client is None:
+            self._client = create_anthropic_client()
+        return self._client
 
-    def send_message(
+    async def send_message(
         self,
         project: Project,
         conversation_history: list[Message],
@@ -31,6 +43,7 @@ class ClaudeAgent:
         Returns:
             Claude's response text
         """
+        from .context import estimate_tokens
         from .prompts import get_system_prompt
 
         # Build messages array for Claude API
@@ -48,7 +61,9 @@ class ClaudeAgent:
         system_prompt = get_system_prompt(project.type)
 
         # Call Claude API
-        response = self.client.messages.create(
+        response = await rate_limiter.create(
+            self.client,
+            input_tokens=estimate_tokens(system_prompt) + sum(estimate_tokens(m["content"]) for m in messages),
             model=settings.claude_model,
             max_tokens=settings.claude_max_tokens,
             temperature=settings.claude_temperature,
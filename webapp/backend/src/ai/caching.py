@@ -0,0 +1,133 @@
+"""Prompt cache breakpoint placement and per-turn usage accounting."""
+
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def cached_system_prompt(system_prompt: str) -> list[dict[str, Any]]:
+    """Wrap the system prompt in a text block carrying a cache breakpoint.
+
+    Args:
+        system_prompt: System prompt text
+
+    Returns:
+        System blocks for the Messages API
+    """
+    return [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
+
+
+def cached_tools(tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Copy tool definitions with a cache breakpoint on the last tool.
+
+    Tools come first in the cached prefix, so one breakpoint covers them all.
+
+    Args:
+        tools: Tool definitions
+
+    Returns:
+        Tool definitions with cache_control on the last entry
+    """
+    if not tools:
+        return tools
+    return [*tools[:-1], {**tools[-1], "cache_control": CACHE_CONTROL}]
+
+
+def _block_to_dict(block: Any) -> Any:
+    """Convert an SDK content block (e.g. from get_final_message) to a plain dict."""
+    if isinstance(block, dict):
+        return dict(block)
+    if hasattr(block, "model_dump"):
+        return block.model_dump(exclude_none=True)
+    return block
+
+
+def _with_breakpoint(message: dict[str, Any]) -> dict[str, Any]:
+    """Return a copy of message with cache_control on its last content block."""
+    content = message["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [_block_to_dict(block) for block in content]
+
+    if not blocks or not isinstance(blocks[-1], dict):
+        return message
+
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return {**message, "content": blocks}
+
+
+def apply_history_breakpoints(messages: list[dict[str, Any]], stable_prefix_len: int) -> list[dict[str, Any]]:
+    """Place rolling cache breakpoints on the conversation.
+
+    Two breakpoints are used (the API allows four; system and tools take the
+    other two):
+
+    - the last message of the persisted history, whose prefix is identical on
+      the next turn, so it is what the next turn reads back;
+    - the final message, so tool rounds within a turn reuse each other's prefix.
+
+    The input list is not modified; only the marked messages are copied.
+
+    Args:
+        messages: Messages about to be sent
+        stable_prefix_len: Number of leading messages that come from persisted history
+
+    Returns:
+        Messages with cache breakpoints applied
+    """
+    if not messages:
+        return messages
+
+    marked = list(messages)
+    indexes = {len(marked) - 1}
+    if 0 < stable_prefix_len <= len(marked):
+        indexes.add(stable_prefix_len - 1)
+
+    for index in indexes:
+        marked[index] = _with_breakpoint(marked[index])
+    return marked
+
+
+@dataclass
+class TurnUsage:
+    """Token usage accumulated over all model calls of one turn."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    requests: int = 0
+
+    def add(self, usage: Any) -> None:
+        """Add the usage block of one API response.
+
+        Args:
+            usage: ``Message.usage`` from the Anthropic SDK
+        """
+        if usage is None:
+            return
+        self.requests += 1
+        self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+        self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+        self.cache_creation_input_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+        self.cache_read_input_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+
+    @property
+    def total_input_tokens(self) -> int:
+        """All prompt tokens, whether processed, written to or read from cache."""
+        return self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+
+    def as_dict(self) -> dict[str, int]:
+        """Serialize for SSE events and logs."""
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "requests": self.requests,
+        }
@@ -0,0 +1,346 @@
+"""Stop a running turn when the user cancels it or the client goes away.
+
+A streaming turn runs inside its SSE response. When the client disconnects,
+the response task is cancelled and ``asyncio.CancelledError`` surfaces
+wherever the turn is waiting. ``turn_registry.cancel`` does the same for a
+client that is still connected (the stop button): while the turn is
+waiting (an upstream read, a tool call, verification) its task is
+cancelled, and between events the error is thrown into the turn generator
+at its next step.
+
+Either way the turn stops where it is: ``async with`` blocks close the
+upstream HTTP stream and the Agent SDK turn is interrupted. The turn then
+calls ``finish_cancelled_turn`` to save its partial reply as cancelled and
+report the seconds and output tokens the cancel saved, estimated from the
+average completed turn.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import update
+
+from ..database.connection import AsyncSessionLocal
+from ..database.models import Message
+from ..database.models import MessageStatus
+from ..observability.metrics import LLM_CANCEL_SAVED_SECONDS
+from ..observability.metrics import LLM_CANCEL_SAVED_TOKENS
+from ..observability.metrics import LLM_TURNS_CANCELLED
+from ..services.status_service import StatusService
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest completed turn in the running averages
+AVERAGE_WEIGHT = 0.2
+# Stored as the reply of a turn cancelled before any output, so history stays valid
+EMPTY_CANCELLED_REPLY = "(cancelled)"
+
+# Saves of cancelled turns still running after their request was torn down
+_background_tasks: set[asyncio.Task] = set()
+
+
+@dataclass
+class TurnCost:
+    """Running average cost of a completed turn."""
+
+    seconds: float
+    output_tokens: float
+
+
+_typical_turns: dict[str, TurnCost] = {}
+
+
+def record_completed_turn(backend: str, seconds: float, output_tokens: int) -> None:
+    """Fold a completed turn into the backend's average (the baseline for savings).
+
+    Args:
+        backend: "api" or "sdk"
+        seconds: Wall time of the turn
+        output_tokens: Output tokens the turn generated
+    """
+    typical = _typical_turns.get(backend)
+    if typical is None:
+        _typical_turns[backend] = TurnCost(seconds, output_tokens)
+        return
+    typical.seconds += AVERAGE_WEIGHT * (seconds - typical.seconds)
+    typical.output_tokens += AVERAGE_WEIGHT * (output_tokens - typical.output_tokens)
+
+
+def estimate_savings(backend: str, elapsed: float, output_tokens: int) -> tuple[float | None, int | None]:
+    """Seconds and output tokens a turn cancelled now would still have cost.
+
+    Args:
+        backend: "api" or "sdk"
+        elapsed: Seconds the turn ran
+        output_tokens: Output tokens generated before the cancel
+
+    Returns:
+        Tuple of (seconds, tokens), both None until a turn has completed
+    """
+    typical = _typical_turns.get(backend)
+    if typical is None:
+        return None, None
+    return max(0.0, typical.seconds - elapsed), max(0, round(typical.output_tokens) - output_tokens)
+
+
+class ActiveTurn:
+    """A turn being streamed for a session, and how to deliver a cancel to it."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        # Why the turn was cancelled ("user"), or None
+        self.reason: str | None = None
+        self._task: asyncio.Task | None = None
+        # Whether the streaming task is currently inside the turn (not sending an event)
+        self._inside = False
+        # Whether the cancel was delivered with Task.cancel() (and must be taken back)
+        self._delivered = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str = "user") -> bool:
+        """Ask the turn to stop.
+
+        Args:
+            reason: Reason recorded in metrics and the cancelled event
+
+        Returns:
+            False if the turn was already cancelled
+        """
+        if self.reason is not None:
+            return False
+        self.reason = reason
+        if self._inside and self._task is not None:
+            self._delivered = True
+            self._task.cancel()
+        return True
+
+    def absorb(self) -> bool:
+        """Take back a delivered cancel, on ``CancelledError`` inside the turn.
+
+        Returns:
+            True if the error came from ``cancel``: the turn should end its
+            stream normally. False if the task itself is being cancelled
+            (client disconnect, shutdown): the error must propagate.
+        """
+        if self.reason is None or self._task is None:
+            return False
+        if self._delivered:
+            self._delivered = False
+            self._task.uncancel()
+        return self._task.cancelling() == 0
+
+    async def stream(self, events: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+        """Iterate a turn's events, delivering a cancel wherever the turn is.
+
+        The events generator is closed when iteration stops, so its cleanup
+        (closing the upstream stream) runs now rather than when it is
+        garbage collected.
+
+        Args:
+            events: Turn event generator
+
+        Yields:
+            The turn's events
+        """
+        self._task = asyncio.current_task()
+        thrown = False
+        async with aclosing(events):
+            while True:
+                self._inside = True
+                try:
+                    if self.reason is not None and not thrown:
+                        # Cancelled while the last event was being sent
+                        thrown = True
+                        event = await events.athrow(asyncio.CancelledError())
+                    else:
+                        event = await anext(events)
+                except StopAsyncIteration:
+                    return
+                except asyncio.CancelledError:
+                    # The turn didn't handle it (e.g. cancelled before it started)
+                    if self.absorb():
+                        return
+                    raise
+                finally:
+                    self._inside = False
+                yield event
+
+
+class TurnRegistry:
+    """Turns by session ID: the one running, and those queued for a generation slot.
+
+    A session runs one turn at a time, so a second message waits behind the
+    running turn; a cancel for the session must still reach the running one.
+    """
+
+    def __init__(self):
+        self._turns: dict[str, ActiveTurn] = {}
+        self._queued: dict[str, list[ActiveTurn]] = {}
+
+    def get(self, session_id: str) -> ActiveTurn | None:
+        """Get the session's running turn, if any."""
+        return self._turns.get(session_id)
+
+    def start(self, session_id: str) -> ActiveTurn:
+        """Register a running turn; call ``finish`` when its stream ends.
+
+        Args:
+            session_id: Session the turn runs in
+
+        Returns:
+            The registered turn
+        """
+        turn = ActiveTurn(session_id)
+        self._turns[session_id] = turn
+        return turn
+
+    def queue(self, session_id: str) -> ActiveTurn:
+        """Register a turn waiting for a generation slot; ``admit`` it once it has one.
+
+        Args:
+            session_id: Session the turn will run in
+
+        Returns:
+            The queued turn
+        """
+        turn = ActiveTurn(session_id)
+        self._queued.setdefault(session_id, []).append(turn)
+        return turn
+
+    def admit(self, turn: ActiveTurn) -> None:
+        """Make a queued turn the session's running turn."""
+        self._unqueue(turn)
+        turn.started = time.perf_counter()
+        self._turns[turn.session_id] = turn
+
+    def finish(self, turn: ActiveTurn) -> None:
+        """Unregister a turn (a newer turn of the session stays registered)."""
+        if self._turns.get(turn.session_id) is turn:
+            del self._turns[turn.session_id]
+        self._unqueue(turn)
+
+    def _unqueue(self, turn: ActiveTurn) -> None:
+        queued = self._queued.get(turn.session_id)
+        if queued is None or turn not in queued:
+            return
+        queued.remove(turn)
+        if not queued:
+            del self._queued[turn.session_id]
+
+    def cancel(self, session_id: str, reason: str = "user") -> ActiveTurn | None:
+        """Cancel the session's running turn, or its next queued turn if none is running.
+
+        Args:
+            session_id: Session ID
+            reason: Reason recorded in metrics and the cancelled event
+
+        Returns:
+            The cancelled turn, or None if there is none (or it was already cancelled)
+        """
+        turn = self._turns.get(session_id)
+        if turn is None:
+            waiting = [queued for queued in self._queued.get(session_id, ()) if not queued.cancelled]
+            turn = waiting[0] if waiting else None
+        if turn is None or not turn.cancel(reason):
+            return None
+        return turn
+
+
+async def _save_cancelled_reply(
+    session_id: str, project_id: str, content: str, message_id: str | None
+) -> str:
+    async with AsyncSessionLocal() as save_db:
+        if message_id is not None:
+            # The reply was saved before the cancel (e.g. during verification)
+            await save_db.execute(
+                update(Message).where(Message.id == message_id).values(status=MessageStatus.CANCELLED)
+            )
+        else:
+            message = Message(
+                session_id=session_id,
+                role="assistant",
+                content=content or EMPTY_CANCELLED_REPLY,
+                status=MessageStatus.CANCELLED,
+                created_at=datetime.utcnow(),
+            )
+            save_db.add(message)
+        await save_db.commit()
+        if message_id is None:
+            message_id = message.id
+        await StatusService.set_idle(save_db, project_id, "Cancelled")
+    return message_id
+
+
+async def finish_cancelled_turn(
+    backend: str,
+    turn: ActiveTurn | None,
+    started: float,
+    output_tokens: int,
+    session_id: str,
+    project_id: str | None,
+    content: str,
+    message_id: str | None = None,
+) -> dict[str, Any]:
+    """Save a cancelled turn's partial reply and report what the cancel saved.
+
+    The save runs on its own task: a disconnected client's request may be
+    cancelled again while it is written.
+
+    Args:
+        backend: "api" or "sdk"
+        turn: The registered turn (None when not tracked)
+        started: ``time.perf_counter()`` at the start of the turn
+        output_tokens: Output tokens generated before the cancel
+        session_id: Session ID
+        project_id: Project ID, or None if the user message wasn't saved yet
+        content: Partial assistant reply
+        message_id: ID of the reply if it was already saved
+
+    Returns:
+        Payload of the cancelled event
+    """
+    reason = turn.reason if turn is not None and turn.cancelled else "disconnect"
+    elapsed = time.perf_counter() - started
+    saved_seconds, saved_tokens = estimate_savings(backend, elapsed, output_tokens)
+    LLM_TURNS_CANCELLED.labels(backend, reason).inc()
+    if saved_seconds is not None:
+        LLM_CANCEL_SAVED_SECONDS.labels(backend).inc(saved_seconds)
+        LLM_CANCEL_SAVED_TOKENS.labels(backend).inc(saved_tokens)
+    logger.info(
+        f"Turn for session {session_id} cancelled ({reason}) after {elapsed:.1f}s and "
+        f"{output_tokens} output tokens; saved ~{saved_seconds}s, ~{saved_tokens} tokens"
+    )
+
+    if project_id is not None:
+        save = asyncio.create_task(_save_cancelled_reply(session_id, project_id, content, message_id))
+        _background_tasks.add(save)
+        save.add_done_callback(_background_tasks.discard)
+        try:
+            message_id = await asyncio.shield(save)
+        except Exception as e:
+            logger.error(f"Failed to save cancelled turn for session {session_id}: {e}")
+
+    return {
+        "message_id": message_id,
+        "content": content,
+        "reason": reason,
+        "elapsed_seconds": round(elapsed, 2),
+        "output_tokens": output_tokens,
+        "saved_seconds": round(saved_seconds, 2) if saved_seconds is not None else None,
+        "saved_tokens": saved_tokens,
+    }
+
+
+# Global registry of running turns
+turn_registry = TurnRegistry()
@@ -0,0 +1,33 @@
+"""Anthropic API client construction.
+
+``anthropic`` takes about a second to import, so it is imported when the
+first client is created rather than when the app starts.
+"""
+
+from typing import TYPE_CHECKING
+
+from ..config import get_settings
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+
+
+def create_anthropic_client(api_key: str | None = None) -> "AsyncAnthropic":
+    """Create an Anthropic client for the configured endpoint.
+
+    The client's own retries are disabled; the shared rate limiter retries.
+
+    Args:
+        api_key: API key (defaults to the configured key)
+
+    Returns:
+        AsyncAnthropic client
+    """
+    from anthropic import AsyncAnthropic
+
+    settings = get_settings()
+    return AsyncAnthropic(
+        api_key=api_key or settings.anthropic_api_key,
+        base_url=settings.anthropic_base_url,
+        max_retries=0,
+    )
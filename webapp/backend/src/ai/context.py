@@ -0,0 +1,406 @@
+"""Context budget management for long sessions.
+
+Keeps the prompt sent on every turn bounded:
+
+- recent turns are sent verbatim;
+- ``create_file`` payloads the model already wrote are replaced with short
+  references to the stored file (the ``files`` table has the content);
+- older turns are replaced by a rolling summary that is produced in the
+  background with a small model. Until it is ready, a condensed digest of
+  the dropped messages is used instead.
+
+The summary boundary only moves when the history outgrows the budget, and
+then it moves far enough (down to ``target_ratio`` of the budget) that the
+prefix stays stable, and cacheable, for many turns.
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from dataclasses import field
+from typing import TYPE_CHECKING
+from typing import Any
+
+from ..database.connection import AsyncSessionLocal
+from ..database.models import SessionSummary
+from ..services.summary_service import SummaryService
+from .client import create_anthropic_client
+from .rate_limiter import rate_limiter
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+# Upper bound of image cost (~1.15 megapixels at 750 pixels per token)
+IMAGE_TOKENS = 1600
+# Tool payloads shorter than this are not worth replacing with a reference
+MIN_COMPACT_CHARS = 1024
+# Per-message cap when rendering transcripts for the summarizer
+SUMMARY_MESSAGE_CHARS = 2000
+
+SUMMARY_HEADER = "Summary of the earlier conversation in this session:"
+
+SUMMARY_SYSTEM_PROMPT = """You condense conversations between a user and an AI assistant that builds \
+deliverables (games, trip plans, content, presentations) as project files.
+
+Write a compact summary (at most 300 words) that preserves:
+- what the user asked for, including requirements and preferences
+- decisions made and changes requested over time
+- files that were created or changed, by name
+- open issues or anything the user is still waiting for
+
+Do not include file contents. Write plain prose or short bullets."""
+
+
+def _block_to_dict(block: Any) -> Any:
+    if hasattr(block, "model_dump"):
+        return block.model_dump(exclude_none=True)
+    return block
+
+
+def _estimate_block_tokens(block: Any) -> int:
+    block = _block_to_dict(block)
+    if isinstance(block, str):
+        return len(block) // CHARS_PER_TOKEN + 1
+    if not isinstance(block, dict):
+        return 1
+
+    block_type = block.get("type")
+    if block_type == "image":
+        return IMAGE_TOKENS
+    if block_type == "text":
+        return len(block.get("text", "")) // CHARS_PER_TOKEN + 1
+    if block_type == "tool_use":
+        return len(json.dumps(block.get("input", {}), ensure_ascii=False)) // CHARS_PER_TOKEN + 10
+    if block_type == "tool_result":
+        return estimate_tokens(block.get("content", "")) + 10
+    return len(json.dumps(block, ensure_ascii=False, default=str)) // CHARS_PER_TOKEN + 1
+
+
+def estimate_tokens(content: Any) -> int:
+    """Estimate the prompt tokens of message content.
+
+    Uses ~4 characters per token for text and JSON, and a fixed upper bound
+    for images. Good enough for budgeting; not an exact count.
+
+    Args:
+        content: Message content (string, block, or list of blocks)
+
+    Returns:
+        Estimated token count
+    """
+    if content is None:
+        return 0
+    if isinstance(content, list):
+        return sum(_estimate_block_tokens(block) for block in content)
+    return _estimate_block_tokens(content)
+
+
+@dataclass
+class HistoryEntry:
+    """A persisted message prepared for the prompt."""
+
+    message_id: str
+    role: str
+    content: Any
+    tokens: int
+
+
+@dataclass
+class FileRef:
+    """Reference to a stored project file written by a tool call."""
+
+    file_id: str
+    name: str
+    size: int
+
+
+@dataclass
+class ContextPlan:
+    """Messages to send plus any summarization work the plan depends on."""
+
+    messages: list[dict[str, Any]]
+    estimated_tokens: int
+    # Entries dropped from the prompt that are not yet covered by a stored summary
+    pending_summary: list[HistoryEntry] = field(default_factory=list)
+    previous_summary: str | None = None
+
+
+def _render_text(content: Any, limit: int) -> str:
+    """Plain-text rendering of message content for digests and transcripts."""
+    if isinstance(content, str):
+        text = content
+    else:
+        parts = []
+        for block in content if isinstance(content, list) else [content]:
+            block = _block_to_dict(block)
+            if isinstance(block, str):
+                parts.append(block)
+            elif isinstance(block, dict) and block.get("type") == "text":
+                parts.append(block.get("text", ""))
+            elif isinstance(block, dict) and block.get("type") == "image":
+                parts.append("[image]")
+        text = " ".join(parts)
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def condensed_digest(entries: list[HistoryEntry], max_entries: int = 20) -> str:
+    """Cheap extractive stand-in for a summary while the real one is generated.
+
+    Args:
+        entries: Dropped history entries
+        max_entries: Maximum number of (most recent) entries to list
+
+    Returns:
+        Digest text
+    """
+    lines = [f"- {entry.role}: {_render_text(entry.content, 160)}" for entry in entries[-max_entries:]]
+    omitted = len(entries) - len(lines)
+    if omitted > 0:
+        lines.insert(0, f"- ({omitted} earlier messages omitted)")
+    return "\n".join(lines)
+
+
+def _prepend_text(message: dict[str, Any], text: str) -> dict[str, Any]:
+    """Put a text block in front of a message's content."""
+    content = message["content"]
+    blocks = [{"type": "text", "text": content}] if isinstance(content, str) else list(content)
+    return {**message, "content": [{"type": "text", "text": text}, *blocks]}
+
+
+class ContextBudget:
+    """Decides which part of a session's history is sent verbatim."""
+
+    def __init__(self, max_tokens: int, recent_turns: int, target_ratio: float = 0.6):
+        """Initialize budget.
+
+        Args:
+            max_tokens: Budget for the history part of the prompt
+            recent_turns: Number of most recent turns that are never summarized
+            target_ratio: When over budget, drop old turns until history fits
+                in this fraction of the budget
+        """
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.target_tokens = int(max_tokens * target_ratio)
+
+    def plan(self, entries: list[HistoryEntry], summary: SessionSummary | None) -> ContextPlan:
+        """Fit history into the budget.
+
+        Args:
+            entries: Persisted history in chronological order
+            summary: Latest stored summary for the session, if any
+
+        Returns:
+            Plan with the messages to send
+        """
+        start = 0
+        summary_text = None
+        if summary is not None:
+            for index, entry in enumerate(entries):
+                if entry.message_id == summary.through_message_id:
+                    start = index + 1
+                    summary_text = summary.content
+                    break
+
+        tail = entries[start:]
+        summary_tokens = estimate_tokens(summary_text) if summary_text else 0
+        total = summary_tokens + sum(entry.tokens for entry in tail)
+
+        if total <= self.max_tokens:
+            return ContextPlan(
+                messages=self._build(tail, summary_text),
+                estimated_tokens=total,
+            )
+
+        # Over budget: cut at a turn boundary, keeping the most recent turns
+        turn_starts = [i for i, entry in enumerate(tail) if entry.role == "user"]
+        protected_from = turn_starts[-self.recent_turns] if len(turn_starts) >= self.recent_turns else 0
+
+        cut = 0
+        dropped_tokens = 0
+        for boundary in turn_starts:
+            if boundary == 0:
+                continue
+            if boundary > protected_from:
+                break
+            cut = boundary
+            dropped_tokens = sum(entry.tokens for entry in tail[:cut])
+            if total - dropped_tokens <= self.target_tokens:
+                break
+
+        if cut == 0:
+            logger.warning(f"History of {total} tokens exceeds budget but only recent turns remain")
+            return ContextPlan(messages=self._build(tail, summary_text), estimated_tokens=total)
+
+        dropped, kept = tail[:cut], tail[cut:]
+        interim = condensed_digest(dropped)
+        if summary_text:
+            interim = f"{summary_text}\n\nMore recent (condensed):\n{interim}"
+
+        logger.info(
+            f"Context budget: dropping {len(dropped)} messages (~{dropped_tokens} tokens), "
+            f"keeping {len(kept)} verbatim"
+        )
+        return ContextPlan(
+            messages=self._build(kept, interim),
+            estimated_tokens=total - dropped_tokens + estimate_tokens(interim),
+            pending_summary=dropped,
+            previous_summary=summary_text,
+        )
+
+    @staticmethod
+    def _build(entries: list[HistoryEntry], summary_text: str | None) -> list[dict[str, Any]]:
+        messages = [{"role": entry.role, "content": entry.content} for entry in entries]
+        if summary_text:
+            header = f"{SUMMARY_HEADER}\n{summary_text}"
+            if messages and messages[0]["role"] == "user":
+                messages[0] = _prepend_text(messages[0], header)
+            else:
+                messages.insert(0, {"role": "user", "content": header})
+        return messages
+
+
+def compact_tool_payloads(
+    messages: list[dict[str, Any]],
+    start: int,
+    file_refs: dict[str, FileRef],
+) -> list[dict[str, Any]]:
+    """Replace already-written create_file payloads with file references.
+
+    The most recent assistant message is left untouched so the model still
+    sees exactly what it just produced; earlier ones only need to know that
+    the file exists.
+
+    Args:
+        messages: Messages about to be sent (not modified)
+        start: Index of the first in-turn message; earlier ones are history
+        file_refs: Stored files by tool_use ID
+
+    Returns:
+        Messages with compacted tool payloads
+    """
+    last_assistant = max(
+        (i for i in range(start, len(messages)) if messages[i]["role"] == "assistant"),
+        default=-1,
+    )
+    compacted = list(messages)
+
+    for index in range(start, last_assistant):
+        message = messages[index]
+        if message["role"] != "assistant" or isinstance(message["content"], str):
+            continue
+
+        blocks = []
+        changed = False
+        for block in message["content"]:
+            block = _block_to_dict(block)
+            if (
+                isinstance(block, dict)
+                and block.get("type") == "tool_use"
+                and block.get("name") == "create_file"
+                and isinstance(block.get("input"), dict)
+                and len(block["input"].get("content") or "") >= MIN_COMPACT_CHARS
+            ):
+                tool_input = block["input"]
+                ref = file_refs.get(block.get("id"))
+                name = ref.name if ref else tool_input.get("filename", "file")
+                reference = f"[{len(tool_input['content'])} characters omitted; stored as project file '{name}'"
+                reference += f" (files.id={ref.file_id})]" if ref else "]"
+                block = {**block, "input": {**tool_input, "content": reference}}
+                changed = True
+            blocks.append(block)
+
+        if changed:
+            compacted[index] = {**message, "content": blocks}
+
+    return compacted
+
+
+# Sessions with a summary currently being generated, and the tasks doing it
+_summaries_in_flight: set[str] = set()
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def summarize_entries(
+    client: "AsyncAnthropic",
+    model: str,
+    previous_summary: str | None,
+    entries: list[HistoryEntry],
+) -> str:
+    """Summarize history entries (rolling over a previous summary).
+
+    Args:
+        client: Anthropic client
+        model: Model to use for summarization
+        previous_summary: Summary of everything before ``entries``
+        entries: Entries to fold into the summary
+
+    Returns:
+        Summary text
+    """
+    transcript = "\n\n".join(
+        f"{entry.role.upper()}: {_render_text(entry.content, SUMMARY_MESSAGE_CHARS)}" for entry in entries
+    )
+    prompt = ""
+    if previous_summary:
+        prompt += f"Existing summary of the conversation so far:\n{previous_summary}\n\n"
+    prompt += f"Conversation to fold into the summary:\n{transcript}"
+
+    response = await rate_limiter.create(
+        client,
+        input_tokens=estimate_tokens(SUMMARY_SYSTEM_PROMPT) + estimate_tokens(prompt),
+        model=model,
+        max_tokens=800,
+        system=SUMMARY_SYSTEM_PROMPT,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return "".join(block.text for block in response.content if block.type == "text").strip()
+
+
+async def _summarize_and_store(
+    session_id: str,
+    api_key: str,
+    model: str,
+    previous_summary: str | None,
+    entries: list[HistoryEntry],
+) -> None:
+    try:
+        client = create_anthropic_client(api_key)
+        text = await summarize_entries(client, model, previous_summary, entries)
+        if not text:
+            return
+        async with AsyncSessionLocal() as db:
+            await SummaryService.save_summary(db, session_id, entries[-1].message_id, text)
+        logger.info(f"Stored summary for session {session_id} covering {len(entries)} more messages")
+    except Exception as e:
+        logger.warning(f"Background summarization failed for session {session_id}: {e}")
+    finally:
+        _summaries_in_flight.discard(session_id)
+
+
+def schedule_summary(session_id: str, plan: ContextPlan, api_key: str, model: str) -> None:
+    """Summarize the plan's dropped entries in the background.
+
+    At most one summarization runs per session; the next turn picks up the
+    stored result.
+
+    Args:
+        session_id: Session ID
+        plan: Context plan with pending entries
+        api_key: Anthropic API key
+        model: Model to use for summarization
+    """
+    if not plan.pending_summary or session_id in _summaries_in_flight:
+        return
+
+    _summaries_in_flight.add(session_id)
+    task = asyncio.create_task(
+        _summarize_and_store(session_id, api_key, model, plan.previous_summary, plan.pending_summary)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
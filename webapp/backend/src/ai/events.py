@@ -12,6 +12,15 @@ class SSEEventType(str, Enum):
     MESSAGE_DELTA = "message_delta"
     MESSAGE_COMPLETE = "message_complete"
     STATUS_UPDATE = "status_update"
+    FILE_PROGRESS = "file_progress"
+    QUEUE_POSITION = "queue_position"
+    PROJECT_RENAMED = "project_renamed"
+    CANCELLED = "cancelled"
+    # Project event stream (dashboards)
+    SUBSCRIBED = "subscribed"
+    FILE_CREATED = "file_created"
+    VERIFICATION = "verification"
+    RESYNC = "resync"
     ERROR = "error"
 
 
@@ -29,6 +38,32 @@ def format_sse_event(event_type: SSEEventType, data: dict[str, Any]) -> str:
     return f"data: {json.dumps(event_data, ensure_ascii=False)}\n\n"
 
 
+def format_broadcast_event(event: dict[str, Any]) -> str:
+    """Format an event received through ``ConnectionManager.broadcast`` (it already carries its type).
+
+    Args:
+        event: Event dictionary with a ``type`` key
+
+    Returns:
+        SSE-formatted string with data: prefix and double newline
+    """
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def sse_data(event: str) -> str | None:
+    """Take the JSON payload back out of a formatted SSE event.
+
+    Args:
+        event: String returned by ``format_sse_event`` or ``format_broadcast_event``
+
+    Returns:
+        The JSON text, or None for comments such as heartbeats
+    """
+    if not event.startswith("data: "):
+        return None
+    return event[6:].rstrip("\n")
+
+
 def format_heartbeat() -> str:
     """Format SSE heartbeat (comment to keep connection alive)."""
     return ": heartbeat\n\n"
@@ -0,0 +1,84 @@
+"""Server-side execution of the read_file, edit_file and apply_patch tools."""
+
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import File
+from ..services.file_service import FileService
+from ..utils.patching import PatchConflictError
+from ..utils.patching import apply_replacements
+from ..utils.patching import apply_unified_diff
+
+logger = logging.getLogger(__name__)
+
+FILE_EDIT_TOOLS = ("read_file", "edit_file", "apply_patch")
+
+
+@dataclass
+class ToolOutcome:
+    """Result of a file tool call, sent back to the model as a tool_result."""
+
+    content: str
+    is_error: bool = False
+    file: File | None = None
+
+    def as_tool_result(self, tool_use_id: str) -> dict[str, Any]:
+        result: dict[str, Any] = {"type": "tool_result", "tool_use_id": tool_use_id, "content": self.content}
+        if self.is_error:
+            result["is_error"] = True
+        return result
+
+
+async def execute_file_tool(
+    db: AsyncSession,
+    project_id: str,
+    session_id: str,
+    tool_name: str,
+    tool_input: dict[str, Any],
+) -> ToolOutcome:
+    """Run a read_file, edit_file or apply_patch call against a project file.
+
+    Edits are applied to the file's current content; if they no longer match
+    (the file changed, or the model misremembered it) nothing is written and
+    the error tells the model to re-read the file.
+
+    Args:
+        db: Database session
+        project_id: Project ID
+        session_id: Session making the call
+        tool_name: One of FILE_EDIT_TOOLS
+        tool_input: Tool input from the model
+
+    Returns:
+        Outcome to report back to the model
+    """
+    filename = tool_input.get("filename") or ""
+    file = await FileService.get_file_by_name(db, project_id, filename) if filename else None
+    if file is None:
+        return ToolOutcome(f"File '{filename}' does not exist. Use create_file to create it.", is_error=True)
+
+    content = await FileService.get_file_content(db, file.id)
+    if content is None:
+        return ToolOutcome(f"File '{filename}' is not a readable text file.", is_error=True)
+
+    if tool_name == "read_file":
+        return ToolOutcome(content, file=file)
+
+    try:
+        if tool_name == "edit_file":
+            new_content = apply_replacements(content, tool_input.get("edits") or [])
+        else:
+            new_content = apply_unified_diff(content, tool_input.get("patch") or "")
+    except PatchConflictError as e:
+        logger.info(f"{tool_name} on {filename} did not apply: {e}")
+        return ToolOutcome(f"No changes made to '{filename}'. {e}", is_error=True, file=file)
+
+    if new_content == content:
+        return ToolOutcome(f"File '{filename}' is unchanged.", file=file)
+
+    file = await FileService.update_file_content(db, file, new_content, session_id)
+    line_count = new_content.count("\n") + 1
+    return ToolOutcome(f"File '{filename}' updated ({line_count} lines).", file=file)
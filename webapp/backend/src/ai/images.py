@@ -0,0 +1,189 @@
+"""Prepare images before they are sent to the model.
+
+Pasted screenshots are stored at full resolution, and the whole history
+is resent every turn. Each base64 image block is prepared once: its MIME
+type is checked, it is downscaled to ``max_edge`` / ``max_pixels`` and
+re-encoded (JPEG when opaque, PNG otherwise). Prepared variants are
+cached by content hash, so later turns resending the same history reuse
+them without touching Pillow.
+
+Every use of a prepared image is counted against the session: request
+bytes saved and image tokens saved, estimated the way the API bills
+images (``width * height / 750`` after its own downscaling).
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+
+from ..observability.metrics import LLM_IMAGE_BYTES_SAVED
+from ..observability.metrics import LLM_IMAGE_TOKENS_SAVED
+from ..utils.image_utils import downscale_image
+from ..utils.image_utils import fit_within
+from ..utils.image_utils import validate_and_fix_image_mime
+
+logger = logging.getLogger(__name__)
+
+# The API downscales anything larger than this itself (and bills the result)
+API_MAX_EDGE = 1568
+API_MAX_PIXELS = 1_150_000
+PIXELS_PER_TOKEN = 750
+# Sessions whose image savings are kept; the least recently active are dropped
+MAX_TRACKED_SESSIONS = 10000
+
+
+def image_tokens(width: int, height: int) -> int:
+    """Estimated input tokens the API bills for an image of this size."""
+    width, height = fit_within(width, height, API_MAX_EDGE, API_MAX_PIXELS)
+    return max(1, round(width * height / PIXELS_PER_TOKEN))
+
+
+@dataclass
+class PreparedImage:
+    """An image block's data as sent to the model."""
+
+    data: str
+    media_type: str
+    # Base64 characters before and after preparation
+    original_bytes: int
+    prepared_bytes: int
+    original_tokens: int
+    prepared_tokens: int
+
+
+@dataclass
+class ImageSavings:
+    """Image preparation savings of one session, over all its turns."""
+
+    images: int = 0
+    original_bytes: int = 0
+    prepared_bytes: int = 0
+    tokens_saved: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.prepared_bytes
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "images": self.images,
+            "original_bytes": self.original_bytes,
+            "prepared_bytes": self.prepared_bytes,
+            "bytes_saved": self.bytes_saved,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def _prepare(data: str, media_type: str, max_edge: int, max_pixels: int, jpeg_quality: int) -> PreparedImage:
+    from PIL import Image
+
+    raw = base64.b64decode(data)
+    # Fixes a declared type that doesn't match the data
+    raw, media_type = validate_and_fix_image_mime(raw, media_type)
+    with Image.open(BytesIO(raw)) as img:
+        original_size = img.size
+    prepared_size = original_size
+    downscaled = downscale_image(raw, max_edge, max_pixels, jpeg_quality)
+    if downscaled is not None:
+        raw, media_type, _original, prepared_size = downscaled
+    prepared = base64.b64encode(raw).decode("ascii")
+    return PreparedImage(
+        data=prepared,
+        media_type=media_type,
+        original_bytes=len(data),
+        prepared_bytes=len(prepared),
+        original_tokens=image_tokens(*original_size),
+        prepared_tokens=image_tokens(*prepared_size),
+    )
+
+
+class ImagePreparer:
+    """Downscales images for the model and caches the results by content hash."""
+
+    def __init__(
+        self,
+        max_edge: int = API_MAX_EDGE,
+        max_pixels: int = API_MAX_PIXELS,
+        jpeg_quality: int = 85,
+        max_entries: int = 64,
+    ):
+        """Initialize preparer.
+
+        Args:
+            max_edge: Longest edge of a prepared image in pixels (0 = no limit)
+            max_pixels: Pixel count of a prepared image (0 = no limit)
+            jpeg_quality: Quality of re-encoded opaque images
+            max_entries: Prepared images kept before the least recently used are dropped
+        """
+        self.max_edge = max_edge
+        self.max_pixels = max_pixels
+        self.jpeg_quality = jpeg_quality
+        self.max_entries = max_entries
+        self._cache: OrderedDict[str, PreparedImage] = OrderedDict()
+        self._savings: OrderedDict[str, ImageSavings] = OrderedDict()
+
+    async def prepare(self, data: str, media_type: str, session_id: str | None = None) -> PreparedImage | None:
+        """Prepare a base64 image block for the model.
+
+        Args:
+            data: Base64 image data
+            media_type: Declared media type
+            session_id: Session the image is sent for (savings are counted against it)
+
+        Returns:
+            The prepared image, or None if the data is not a valid image
+        """
+        key = hashlib.sha256(
+            f"{media_type}:{self.max_edge}:{self.max_pixels}:{self.jpeg_quality}:{data}".encode("ascii", "replace")
+        ).hexdigest()
+        prepared = self._cache.get(key)
+        if prepared is not None:
+            self._cache.move_to_end(key)
+        else:
+            try:
+                # Pillow is imported and run off the event loop
+                prepared = await asyncio.to_thread(
+                    _prepare, data, media_type, self.max_edge, self.max_pixels, self.jpeg_quality
+                )
+            except Exception as e:
+                logger.error(f"Failed to prepare image ({media_type}): {e}")
+                return None
+            if prepared.prepared_bytes < prepared.original_bytes:
+                logger.info(
+                    f"Prepared image: {prepared.original_bytes} -> {prepared.prepared_bytes} bytes, "
+                    f"~{prepared.original_tokens} -> ~{prepared.prepared_tokens} tokens"
+                )
+            self._cache[key] = prepared
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        self._record(session_id, prepared)
+        return prepared
+
+    def _record(self, session_id: str | None, prepared: PreparedImage) -> None:
+        bytes_saved = prepared.original_bytes - prepared.prepared_bytes
+        tokens_saved = prepared.original_tokens - prepared.prepared_tokens
+        LLM_IMAGE_BYTES_SAVED.inc(max(0, bytes_saved))
+        LLM_IMAGE_TOKENS_SAVED.inc(max(0, tokens_saved))
+        if session_id is None:
+            return
+        savings = self._savings.setdefault(session_id, ImageSavings())
+        self._savings.move_to_end(session_id)
+        while len(self._savings) > MAX_TRACKED_SESSIONS:
+            self._savings.popitem(last=False)
+        savings.images += 1
+        savings.original_bytes += prepared.original_bytes
+        savings.prepared_bytes += prepared.prepared_bytes
+        savings.tokens_saved += tokens_saved
+
+    def savings(self, session_id: str) -> ImageSavings:
+        """Savings of a session since the server started (zero once it has been dropped as inactive)."""
+        return self._savings.get(session_id) or ImageSavings()
+
+
+# Global preparer, configured in the app lifespan
+image_preparer = ImagePreparer()
@@ -0,0 +1,198 @@
+"""Background project naming.
+
+The first message of a project is named off the critical path: a small
+model suggests a short name while the main generation runs, and the result
+is written to ``Project.name`` and pushed to the session's SSE subscribers.
+If the model call fails, a name is derived locally from the message.
+
+The rename only applies while the project still has the name it had when
+the first message arrived, so a rename by the user or by the
+``update_project_name`` tool is never overwritten.
+"""
+
+import asyncio
+import logging
+import re
+from typing import TYPE_CHECKING
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import update
+
+from ..config import get_settings
+from ..database.connection import AsyncSessionLocal
+from ..database.models import Project
+from ..services.connection_manager import connection_manager
+from ..services.project_events import project_events
+from .client import create_anthropic_client
+from .context import estimate_tokens
+from .events import SSEEventType
+from .rate_limiter import rate_limiter
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+
+logger = logging.getLogger(__name__)
+
+MAX_NAME_CHARS = 60
+# Words kept by the local fallback
+HEURISTIC_WORDS = 5
+# Message characters sent to the naming model
+NAMING_MESSAGE_CHARS = 1000
+
+NAMING_SYSTEM_PROMPT = """You name projects in a workspace where an AI assistant builds games, trip plans, \
+content and presentations. Reply with a short, descriptive project name of 2 to 5 words in title case \
+(e.g. "Tic Tac Toe Game", "Vegas Trip Planner"). Reply with the name only."""
+
+# Leading request phrasing dropped by the local fallback
+_REQUEST_PREFIX = re.compile(
+    r"^(?:(?:hi|hello|hey|please|can you|could you|would you|i want(?: you)? to|i'd like(?: you)? to|"
+    r"i would like(?: you)? to|help me|let's|lets)\b[\s,!.]*)*"
+    r"(?:(?:make|create|build|write|plan|design|generate|draft|give)(?: me| us)?\b\s*)?"
+    r"(?:(?:a|an|the|some|my)\b\s*)?",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9'&-]*")
+_SMALL_WORDS = {"a", "an", "and", "at", "for", "in", "of", "on", "or", "the", "to", "with"}
+
+# Projects with a naming call in flight, and the tasks doing it
+_naming_in_flight: set[str] = set()
+_background_tasks: set[asyncio.Task] = set()
+
+
+def message_text(content: Any) -> str:
+    """Plain text of a message (text blocks only for block lists)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(
+            block.get("text", "") for block in content if isinstance(block, dict) and block.get("type") == "text"
+        )
+    return ""
+
+
+def heuristic_name(text: str) -> str:
+    """Derive a project name from the first message without a model call.
+
+    Args:
+        text: First user message
+
+    Returns:
+        Up to ``HEURISTIC_WORDS`` words of the request in title case, or an
+        empty string if the message has no usable words
+    """
+    request = _REQUEST_PREFIX.sub("", text.strip())
+    first_sentence = re.split(r"[.!?\n]", request, maxsplit=1)[0]
+    words = _WORD.findall(first_sentence)[:HEURISTIC_WORDS]
+    while words and words[-1].lower() in _SMALL_WORDS:
+        words.pop()
+    titled = [
+        word if word.isupper() or (i and word.lower() in _SMALL_WORDS) else word[:1].upper() + word[1:]
+        for i, word in enumerate(words)
+    ]
+    return " ".join(titled)[:MAX_NAME_CHARS].strip()
+
+
+def _clean_name(raw: str) -> str:
+    line = raw.strip().splitlines()[0] if raw.strip() else ""
+    line = re.sub(r"^(?:project name|name)\s*:\s*", "", line, flags=re.IGNORECASE)
+    return line.strip().strip("\"'`*").rstrip(".").strip()[:MAX_NAME_CHARS].strip()
+
+
+async def generate_project_name(client: "AsyncAnthropic", model: str, text: str) -> str:
+    """Ask a small model for a project name.
+
+    Args:
+        client: Anthropic client
+        model: Model to use for naming
+        text: First user message
+
+    Returns:
+        Suggested name, or an empty string if the reply had none
+    """
+    prompt = text[:NAMING_MESSAGE_CHARS]
+    response = await rate_limiter.create(
+        client,
+        input_tokens=estimate_tokens(NAMING_SYSTEM_PROMPT) + estimate_tokens(prompt),
+        model=model,
+        max_tokens=20,
+        system=NAMING_SYSTEM_PROMPT,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return _clean_name("".join(block.text for block in response.content if block.type == "text"))
+
+
+async def _name_and_store(
+    project_id: str,
+    session_id: str,
+    original_name: str,
+    text: str,
+    api_key: str | None,
+    model: str,
+) -> str | None:
+    try:
+        name = ""
+        try:
+            name = await generate_project_name(create_anthropic_client(api_key), model, text)
+        except Exception as e:
+            logger.warning(f"Project naming call failed for project {project_id}, using heuristic: {e}")
+        name = name or heuristic_name(text)
+        if not name or name == original_name:
+            return None
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Project).where(Project.id == project_id, Project.name == original_name).values(name=name)
+            )
+            await db.commit()
+        if not result.rowcount:
+            # Renamed some other way in the meantime
+            return None
+
+        logger.info(f"Named project {project_id}: '{original_name}' → '{name}'")
+        await connection_manager.broadcast(
+            UUID(session_id),
+            {"type": SSEEventType.PROJECT_RENAMED.value, "project_id": project_id, "name": name},
+        )
+        project_events.publish(project_id, "name", SSEEventType.PROJECT_RENAMED, {"name": name})
+        return name
+    except Exception as e:
+        logger.warning(f"Background naming failed for project {project_id}: {e}")
+        return None
+    finally:
+        _naming_in_flight.discard(project_id)
+
+
+def schedule_project_naming(
+    project: Project,
+    session_id: str,
+    user_message: Any,
+    api_key: str | None,
+) -> asyncio.Task | None:
+    """Name the project in the background.
+
+    Call for a project's first message (see ``ProjectService.has_messages``).
+
+    Args:
+        project: Project the message belongs to
+        session_id: Session whose subscribers are told about the rename
+        user_message: The incoming user message (string or content blocks)
+        api_key: Anthropic API key
+
+    Returns:
+        The naming task, or None if there is nothing to name from or naming is off
+    """
+    settings = get_settings()
+    if not settings.project_naming_enabled or project.id in _naming_in_flight:
+        return None
+    text = message_text(user_message).strip()
+    if not text:
+        return None
+
+    _naming_in_flight.add(project.id)
+    task = asyncio.create_task(
+        _name_and_store(project.id, session_id, project.name, text, api_key, settings.project_naming_model)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
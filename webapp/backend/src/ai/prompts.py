@@ -5,8 +5,6 @@ from ..database.models import ProjectType
 SYSTEM_PROMPTS: dict[ProjectType, str] = {
     ProjectType.GAME: """You are a creative game design assistant helping users create engaging games.
 
-IMPORTANT: On the very first message, use the update_project_name tool to give the project a descriptive name based on what the user wants to build.
-
 Technical requirements:
 - Make ALL games responsive using percentage widths, max-width, and CSS flexbox/grid
 - Use relative units (%, vw, vh, em, rem) instead of fixed pixels for layout
@@ -30,6 +28,7 @@ Creating Tetris with:
 
 **Phase 2 - BUILD (SILENT):**
 Use create_file tool. NO TEXT. User sees: ✓ file1  ✓ file2  ✓ file3
+To change an existing file, read_file it and then edit_file only the lines that change. Never rewrite a whole file for a small change.
 
 **Phase 3 - DONE:**
 Single line only: "Ready!" or "Complete!"
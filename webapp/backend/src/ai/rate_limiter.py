@@ -0,0 +1,424 @@
+"""Shared rate limiter for upstream Anthropic API calls.
+
+Every model request goes through one process-wide ``RateLimiter`` that keeps
+a token bucket per upstream quota (requests, input tokens and output tokens
+per minute). A request reserves one request plus its estimated input tokens
+and ``max_tokens`` output tokens before it is sent, which mirrors how the API
+accounts for output tokens, and the reservation is corrected with the real
+usage when the response completes.
+
+The buckets start from configured limits and follow the
+``anthropic-ratelimit-*`` response headers, so the limiter converges on the
+account's actual quota. Retryable failures (429, 529, 5xx, connection
+errors) are retried here instead of in the SDK: a 429 or 529 pauses all
+callers until ``retry-after`` has passed, and the backoff grows with
+consecutive failures and shrinks with successes, with jitter so waiters do
+not retry in lockstep.
+
+    message = await rate_limiter.create(client, input_tokens=estimate, model=..., ...)
+
+    async with rate_limiter.stream(client, input_tokens=estimate, model=..., ...) as stream:
+        async for event in stream:
+            ...
+
+Clients used with the limiter should be created with ``max_retries=0``.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Mapping
+from contextlib import AsyncExitStack
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from ..config import settings
+from ..observability.metrics import LLM_RATE_LIMIT_REMAINING
+from ..observability.metrics import LLM_RATE_LIMIT_WAIT
+from ..observability.metrics import LLM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Header name part -> bucket
+HEADER_KINDS = {
+    "requests": "requests",
+    "input-tokens": "input_tokens",
+    "output-tokens": "output_tokens",
+}
+
+# Longest single sleep while waiting for capacity, so limits learned from
+# concurrent responses take effect promptly
+MAX_WAIT_STEP = 1.0
+
+
+class TokenBucket:
+    """Continuously refilling bucket of ``limit`` units per ``period`` seconds."""
+
+    def __init__(self, limit: float, period: float = 60.0):
+        """Initialize bucket (full).
+
+        Args:
+            limit: Units per period (0 or less means unlimited)
+            period: Refill period in seconds
+        """
+        self.limit = limit
+        self.period = period
+        self.tokens = float(max(limit, 0))
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.limit <= 0
+
+    def _refill(self, now: float) -> None:
+        if not self.unlimited and now > self.updated:
+            self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / self.period)
+        self.updated = max(self.updated, now)
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available.
+
+        Requests larger than the whole bucket go through once it is full.
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.limit)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) * self.period / self.limit
+
+    def take(self, amount: float, now: float) -> None:
+        """Remove units (the balance may go negative)."""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.tokens -= amount
+
+    def give_back(self, amount: float, now: float) -> None:
+        """Return unused units."""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.tokens = min(self.limit, self.tokens + amount)
+
+    def sync(self, limit: int, remaining: int | None, now: float) -> None:
+        """Adopt the quota reported by the API.
+
+        Args:
+            limit: Reported limit per period
+            remaining: Reported remaining capacity, if any
+            now: Current monotonic time
+        """
+        self._refill(now)
+        if limit != self.limit:
+            self.limit = limit
+            self.tokens = float(remaining if remaining is not None else limit)
+        elif remaining is not None:
+            # Only ever lower: requests sent since the API computed this are not in it
+            self.tokens = min(self.tokens, float(remaining))
+
+
+@dataclass
+class Reservation:
+    """Capacity taken for one request, corrected by ``RateLimiter.settle``."""
+
+    input_tokens: int
+    output_tokens: int
+    settled: bool = False
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> float | None:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _retry_after_seconds(headers: Mapping[str, str]) -> float | None:
+    retry_after_ms = _header_number(headers, "retry-after-ms")
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    return _header_number(headers, "retry-after")
+
+
+def _billed_tokens(usage: Any) -> tuple[int, int]:
+    """Input and output tokens that count against the per-minute quotas."""
+    input_tokens = (usage.input_tokens or 0) + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+    return input_tokens, usage.output_tokens or 0
+
+
+class RateLimiter:
+    """Token-bucket limiter with shared, adaptive retry for upstream API calls."""
+
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        input_tokens_per_minute: int = 0,
+        output_tokens_per_minute: int = 0,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        period: float = 60.0,
+    ):
+        """Initialize limiter.
+
+        Args:
+            requests_per_minute: Starting request quota (0 = unlimited until learned)
+            input_tokens_per_minute: Starting input token quota
+            output_tokens_per_minute: Starting output token quota
+            max_retries: Retries per request after the first attempt
+            base_delay: Backoff after the first failure, in seconds
+            max_delay: Upper bound for a single backoff, in seconds
+            period: Quota period in seconds (60 for per-minute quotas)
+        """
+        self.buckets = {
+            "requests": TokenBucket(requests_per_minute, period),
+            "input_tokens": TokenBucket(input_tokens_per_minute, period),
+            "output_tokens": TokenBucket(output_tokens_per_minute, period),
+        }
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+        # Shared pause after a 429/529, as a monotonic deadline
+        self._blocked_until = 0.0
+        # Consecutive-failure level driving the backoff
+        self._strikes = 0
+        self._update_gauges()
+
+    def _wait_time(self, input_tokens: int, output_tokens: int, now: float) -> float:
+        return max(
+            0.0,
+            self._blocked_until - now,
+            self.buckets["requests"].wait_time(1, now),
+            self.buckets["input_tokens"].wait_time(input_tokens, now),
+            self.buckets["output_tokens"].wait_time(output_tokens, now),
+        )
+
+    def expected_wait(self, input_tokens: int, output_tokens: int) -> float:
+        """Estimate how long a request would wait for capacity right now.
+
+        Args:
+            input_tokens: Estimated input tokens
+            output_tokens: Output tokens to reserve (max_tokens)
+
+        Returns:
+            Seconds (0 if capacity is available)
+        """
+        return self._wait_time(input_tokens, output_tokens, time.monotonic())
+
+    async def acquire(self, input_tokens: int, output_tokens: int) -> Reservation:
+        """Wait for capacity and reserve it for one request.
+
+        Args:
+            input_tokens: Estimated input tokens
+            output_tokens: Output tokens to reserve (max_tokens)
+
+        Returns:
+            Reservation to settle with the actual usage
+        """
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(input_tokens, output_tokens, now)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, MAX_WAIT_STEP))
+
+            self.buckets["requests"].take(1, now)
+            self.buckets["input_tokens"].take(input_tokens, now)
+            self.buckets["output_tokens"].take(output_tokens, now)
+
+        LLM_RATE_LIMIT_WAIT.observe(now - started)
+        self._update_gauges()
+        return Reservation(input_tokens, output_tokens)
+
+    def settle(self, reservation: Reservation, input_tokens: int, output_tokens: int) -> None:
+        """Correct a reservation with the tokens actually used.
+
+        Args:
+            reservation: Reservation from ``acquire``
+            input_tokens: Billed input tokens (0 if the request failed)
+            output_tokens: Billed output tokens (0 if the request failed)
+        """
+        if reservation.settled:
+            return
+        reservation.settled = True
+        now = time.monotonic()
+        for kind, reserved, used in (
+            ("input_tokens", reservation.input_tokens, input_tokens),
+            ("output_tokens", reservation.output_tokens, output_tokens),
+        ):
+            if used < reserved:
+                self.buckets[kind].give_back(reserved - used, now)
+            elif used > reserved:
+                self.buckets[kind].take(used - reserved, now)
+        self._update_gauges()
+
+    def update_from_headers(self, headers: Mapping[str, str] | None) -> None:
+        """Adopt the limits and remaining capacity reported by the API.
+
+        Args:
+            headers: Response headers (``anthropic-ratelimit-*``)
+        """
+        if not headers:
+            return
+        now = time.monotonic()
+        for prefix, kind in HEADER_KINDS.items():
+            limit = _header_number(headers, f"anthropic-ratelimit-{prefix}-limit")
+            if limit is None:
+                continue
+            remaining = _header_number(headers, f"anthropic-ratelimit-{prefix}-remaining")
+            self.buckets[kind].sync(int(limit), int(remaining) if remaining is not None else None, now)
+        self._update_gauges()
+
+    def _on_success(self, headers: Mapping[str, str] | None) -> None:
+        self._strikes = max(0, self._strikes - 1)
+        self.update_from_headers(headers)
+
+    async def _backoff(self, error: Exception, attempt: int) -> bool:
+        """Wait before retrying a failed request.
+
+        Args:
+            error: Exception raised by the request
+            attempt: Zero-based attempt number that failed
+
+        Returns:
+            True if the request should be retried
+        """
+        # Loaded by now: the request that failed came from an Anthropic client
+        from anthropic import APIConnectionError
+        from anthropic import APIStatusError
+
+        retry_after = None
+        if isinstance(error, APIStatusError):
+            headers = error.response.headers
+            should_retry = headers.get("x-should-retry")
+            status = error.status_code
+            if should_retry == "false":
+                return False
+            if status == 429:
+                reason = "rate_limited"
+            elif status == 529:
+                reason = "overloaded"
+            elif status in (408, 409) or status >= 500 or should_retry == "true":
+                reason = "server_error"
+            else:
+                return False
+            self.update_from_headers(headers)
+            retry_after = _retry_after_seconds(headers)
+        elif isinstance(error, APIConnectionError):
+            reason = "connection"
+        else:
+            return False
+
+        if attempt >= self.max_retries:
+            return False
+
+        self._strikes += 1
+        backoff = min(self.max_delay, self.base_delay * 2 ** (self._strikes - 1))
+        if retry_after is not None:
+            delay = min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        else:
+            delay = random.uniform(backoff / 2, backoff)
+
+        LLM_RETRIES.labels(reason).inc()
+        if reason in ("rate_limited", "overloaded"):
+            logger.info(f"Anthropic request {reason}; retry {attempt + 1} in {delay:.1f}s")
+            # Everyone waits: the quota is shared
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        else:
+            logger.warning(f"Anthropic request failed ({reason}: {error}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return True
+
+    async def create(self, client: Any, *, input_tokens: int, **request: Any) -> Any:
+        """Send a non-streaming Messages API request through the limiter.
+
+        Args:
+            client: AsyncAnthropic client (created with max_retries=0)
+            input_tokens: Estimated input tokens
+            request: ``messages.create`` arguments
+
+        Returns:
+            Message
+        """
+        for attempt in itertools.count():
+            reservation = await self.acquire(input_tokens, request.get("max_tokens", 0))
+            try:
+                raw = await client.messages.with_raw_response.create(**request)
+            except Exception as e:
+                self.settle(reservation, 0, 0)
+                if not await self._backoff(e, attempt):
+                    raise
+                continue
+
+            self._on_success(raw.headers)
+            message = await raw.parse()
+            self.settle(reservation, *_billed_tokens(message.usage))
+            return message
+
+    @asynccontextmanager
+    async def stream(self, client: Any, *, input_tokens: int, **request: Any) -> AsyncIterator[Any]:
+        """Open a streaming Messages API request through the limiter.
+
+        Failures while opening the stream are retried; errors after streaming
+        has started propagate to the caller.
+
+        Args:
+            client: AsyncAnthropic client (created with max_retries=0)
+            input_tokens: Estimated input tokens
+            request: ``messages.stream`` arguments
+
+        Yields:
+            Message stream
+        """
+        for attempt in itertools.count():
+            reservation = await self.acquire(input_tokens, request.get("max_tokens", 0))
+            stack = AsyncExitStack()
+            try:
+                stream = await stack.enter_async_context(client.messages.stream(**request))
+            except Exception as e:
+                await stack.aclose()
+                self.settle(reservation, 0, 0)
+                if not await self._backoff(e, attempt):
+                    raise
+                continue
+            break
+
+        async with stack:
+            response = getattr(stream, "response", None)
+            self._on_success(response.headers if response is not None else None)
+            try:
+                yield stream
+            finally:
+                try:
+                    usage = stream.current_message_snapshot.usage
+                except Exception:
+                    usage = None
+                # Always settled, so a failed stream doesn't keep its reservation
+                self.settle(reservation, *(_billed_tokens(usage) if usage is not None else (0, 0)))
+
+    def _update_gauges(self) -> None:
+        for kind, bucket in self.buckets.items():
+            if not bucket.unlimited:
+                LLM_RATE_LIMIT_REMAINING.labels(kind).set(max(0.0, bucket.tokens))
+
+
+# Global limiter shared by every upstream call
+rate_limiter = RateLimiter(
+    requests_per_minute=settings.anthropic_requests_per_minute,
+    input_tokens_per_minute=settings.anthropic_input_tokens_per_minute,
+    output_tokens_per_minute=settings.anthropic_output_tokens_per_minute,
+    max_retries=settings.anthropic_max_retries,
+)
@@ -0,0 +1,461 @@
+"""Session-affine pool of live Agent SDK clients.
+
+``ClaudeSDKClient`` runs the Claude CLI as a subprocess. Spawning one per
+turn pays the process start and handshake every message and loses the
+CLI's in-memory conversation. The pool keeps one connected client per
+session instead:
+
+- clients are reused for the session's next turn, evicted after
+  ``idle_timeout`` seconds without use, and capped at ``max_clients`` with
+  least-recently-used eviction of idle clients;
+- a client must be used from the task that connected it, so each pooled
+  client is owned by a worker task and turns are handed to it through a
+  queue;
+- a client whose process dies is discarded; a turn that fails before
+  producing any message is retried once on a fresh client, which resumes
+  the session's CLI conversation;
+- a turn whose reader goes away (cancelled, or the client disconnected) is
+  interrupted at once and drained, so the client stays usable.
+"""
+
+import asyncio
+import contextvars
+import dataclasses
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+from typing import Any
+
+from ..config import settings
+from ..observability.metrics import SDK_CLIENT_STARTUP
+from ..observability.metrics import SDK_POOL_CLIENTS
+from ..observability.metrics import SDK_POOL_EVENTS
+from ..observability.tracing import span
+
+if TYPE_CHECKING:
+    from claude_agent_sdk import ClaudeAgentOptions
+
+logger = logging.getLogger(__name__)
+
+# Creates an unconnected client, like ``ClaudeSDKClient(options=...)``
+ClientFactory = Callable[..., Any]
+
+# Seconds to wait for a client to disconnect before cancelling its worker
+CLOSE_TIMEOUT = 10.0
+# CLI session IDs remembered for resuming evicted sessions
+MAX_REMEMBERED_SESSIONS = 10000
+
+_TURN_DONE = object()
+
+
+def create_sdk_client(**kwargs: Any) -> Any:
+    """Create a ``ClaudeSDKClient``, importing the SDK on first use (it is slow to import)."""
+    from claude_agent_sdk import ClaudeSDKClient
+
+    return ClaudeSDKClient(**kwargs)
+
+
+class SDKClientCrashed(Exception):
+    """The SDK client failed or its process exited during a turn."""
+
+
+def options_fingerprint(options: "ClaudeAgentOptions") -> tuple:
+    """Fields that require a new client when they change (``resume`` excluded)."""
+    return (
+        str(options.cwd),
+        repr(options.system_prompt),
+        tuple(options.allowed_tools),
+        options.permission_mode,
+        options.model,
+        tuple(sorted((options.env or {}).items())),
+    )
+
+
+class _Turn:
+    """A prompt handed to a worker, and the queue its messages come back on."""
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.output: asyncio.Queue = asyncio.Queue()
+        self.abandoned = False
+        self._abandoned_event = asyncio.Event()
+
+    def abandon(self) -> None:
+        """Mark the turn as no longer read."""
+        self.abandoned = True
+        self._abandoned_event.set()
+
+    async def wait_abandoned(self) -> None:
+        await self._abandoned_event.wait()
+
+
+class PooledClient:
+    """A connected SDK client owned by its own worker task."""
+
+    def __init__(self, session_id: str, options: "ClaudeAgentOptions", client_factory: ClientFactory):
+        """Initialize (not yet connected).
+
+        Args:
+            session_id: Session the client serves
+            options: Client options
+            client_factory: Creates the SDK client
+        """
+        self.session_id = session_id
+        self.options = options
+        self.fingerprint = options_fingerprint(options)
+        self.client_factory = client_factory
+        self.cli_session_id: str | None = options.resume
+        self.last_used = time.monotonic()
+        self.turns = 0
+        # Held by whoever is running a turn (or starting the client)
+        self.lock = asyncio.Lock()
+        self._inbox: asyncio.Queue[_Turn | None] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    async def start(self) -> None:
+        """Spawn and connect the client on a worker task.
+
+        Raises:
+            Exception: If the client fails to connect
+        """
+        ready = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        # Fresh context: the worker outlives the request that created it
+        self._task = asyncio.create_task(
+            self._run(ready), name=f"sdk-client-{self.session_id}", context=contextvars.Context()
+        )
+        await ready
+        SDK_CLIENT_STARTUP.observe(time.perf_counter() - started)
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        client = self.client_factory(options=self.options)
+        try:
+            await client.connect()
+        except BaseException as e:
+            self._stopping = True
+            if not ready.done():
+                ready.set_exception(e if isinstance(e, Exception) else SDKClientCrashed("Client start cancelled"))
+            return
+
+        ready.set_result(None)
+        current: _Turn | None = None
+        try:
+            while True:
+                current = await self._inbox.get()
+                if current is None:
+                    break
+                usable = await self._serve(client, current)
+                current = None
+                if not usable:
+                    break
+        finally:
+            self._stopping = True
+            # Fail the turn in progress and any queued behind it
+            pending = [current] if current is not None else []
+            while not self._inbox.empty():
+                queued = self._inbox.get_nowait()
+                if queued is not None:
+                    pending.append(queued)
+            for turn in pending:
+                turn.output.put_nowait(SDKClientCrashed("SDK client stopped"))
+            try:
+                await client.disconnect()
+            except Exception as e:
+                logger.debug(f"SDK client for session {self.session_id} failed to disconnect: {e}")
+
+    async def _serve(self, client: Any, turn: _Turn) -> bool:
+        """Run one turn on the client.
+
+        Returns:
+            False if the client is no longer usable
+        """
+        from claude_agent_sdk import ResultMessage
+
+        finished = False
+        # Nobody is listening: stop generating, but drain to the result
+        interrupter = asyncio.create_task(self._interrupt_when_abandoned(client, turn))
+        try:
+            await client.query(turn.prompt)
+            async for message in client.receive_response():
+                if isinstance(message, ResultMessage):
+                    finished = True
+                    self.cli_session_id = message.session_id
+                if not turn.abandoned:
+                    turn.output.put_nowait(message)
+        except Exception as e:
+            logger.warning(f"SDK client for session {self.session_id} failed: {e}")
+            turn.output.put_nowait(SDKClientCrashed(str(e)))
+            return False
+        finally:
+            interrupter.cancel()
+
+        if not finished:
+            turn.output.put_nowait(SDKClientCrashed("SDK client stream ended without a result"))
+            return False
+        turn.output.put_nowait(_TURN_DONE)
+        return True
+
+    async def _interrupt_when_abandoned(self, client: Any, turn: _Turn) -> None:
+        await turn.wait_abandoned()
+        try:
+            await client.interrupt()
+        except Exception as e:
+            logger.debug(f"SDK client for session {self.session_id} failed to interrupt: {e}")
+
+    async def stream_turn(self, prompt: str) -> AsyncIterator[Any]:
+        """Send a prompt and yield the SDK messages of the response.
+
+        Args:
+            prompt: User message
+
+        Yields:
+            SDK messages, ending with the ResultMessage
+
+        Raises:
+            SDKClientCrashed: If the client fails during the turn
+        """
+        turn = _Turn(prompt)
+        self._inbox.put_nowait(turn)
+        self.turns += 1
+        completed = False
+        try:
+            while True:
+                item = await turn.output.get()
+                if item is _TURN_DONE:
+                    completed = True
+                    return
+                if isinstance(item, Exception):
+                    completed = True
+                    raise item
+                yield item
+        finally:
+            if not completed:
+                turn.abandon()
+
+    async def close(self) -> None:
+        """Disconnect the client and stop its worker."""
+        if self._task is None:
+            return
+        self._inbox.put_nowait(None)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        except Exception:
+            pass
+
+
+class SDKClientPool:
+    """Live SDK clients keyed by session ID, with idle timeout and LRU cap."""
+
+    def __init__(
+        self,
+        max_clients: int = 16,
+        idle_timeout: float = 600.0,
+        client_factory: ClientFactory | None = None,
+    ):
+        """Initialize pool.
+
+        Args:
+            max_clients: Maximum live clients; idle ones are evicted LRU-first
+            idle_timeout: Seconds a client may sit unused before it is closed
+            client_factory: Creates SDK clients (defaults to ClaudeSDKClient)
+        """
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self.client_factory = client_factory or create_sdk_client
+        self._clients: OrderedDict[str, PooledClient] = OrderedDict()
+        # Our session ID -> CLI session ID, to resume after eviction or a crash
+        self._cli_sessions: OrderedDict[str, str] = OrderedDict()
+        self._capacity_freed: asyncio.Event | None = None
+        self._reaper: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get(self, session_id: str) -> PooledClient | None:
+        """Get the session's pooled client, if any."""
+        return self._clients.get(session_id)
+
+    async def stream_turn(self, session_id: str, options: "ClaudeAgentOptions", prompt: str) -> AsyncIterator[Any]:
+        """Run a turn on the session's client, spawning or respawning it as needed.
+
+        Args:
+            session_id: Session ID
+            options: Client options for the session
+            prompt: User message
+
+        Yields:
+            SDK messages, ending with the ResultMessage
+
+        Raises:
+            SDKClientCrashed: If the client fails after producing output, or twice in a row
+        """
+        for attempt in range(2):
+            with span("sdk_pool.checkout", session_id=session_id) as checkout_span:
+                pooled, spawned = await self._checkout(session_id, options)
+                checkout_span.set(spawned=spawned, respawn=attempt > 0)
+
+            delivered = False
+            try:
+                async for message in pooled.stream_turn(prompt):
+                    delivered = True
+                    yield message
+                return
+            except SDKClientCrashed:
+                SDK_POOL_EVENTS.labels("crash").inc()
+                if delivered or attempt > 0:
+                    raise
+                logger.warning(f"SDK client for session {session_id} crashed before responding; respawning")
+                SDK_POOL_EVENTS.labels("respawn").inc()
+            finally:
+                self._checkin(session_id, pooled)
+
+    async def _checkout(self, session_id: str, options: "ClaudeAgentOptions") -> tuple[PooledClient, bool]:
+        """Lock the session's client for a turn, starting one if needed.
+
+        Returns:
+            Tuple of (client, whether it was spawned for this turn)
+        """
+        self._ensure_reaper()
+        fingerprint = options_fingerprint(options)
+
+        while True:
+            pooled = self._clients.get(session_id)
+            if pooled is None:
+                await self._make_room()
+                if session_id in self._clients:
+                    continue
+
+                resume = options.resume or self._cli_sessions.get(session_id)
+                pooled = PooledClient(session_id, dataclasses.replace(options, resume=resume), self.client_factory)
+                self._clients[session_id] = pooled
+                await pooled.lock.acquire()
+                try:
+                    await pooled.start()
+                except BaseException:
+                    pooled.lock.release()
+                    if self._clients.get(session_id) is pooled:
+                        del self._clients[session_id]
+                    self._notify_capacity()
+                    raise
+                SDK_POOL_EVENTS.labels("spawn").inc()
+                return pooled, True
+
+            await pooled.lock.acquire()
+            if pooled.alive and pooled.fingerprint == fingerprint and self._clients.get(session_id) is pooled:
+                self._clients.move_to_end(session_id)
+                SDK_POOL_EVENTS.labels("reuse").inc()
+                return pooled, False
+
+            # Dead, or the session's options changed: replace it
+            pooled.lock.release()
+            await self._discard(session_id, pooled)
+
+    def _checkin(self, session_id: str, pooled: PooledClient) -> None:
+        pooled.last_used = time.monotonic()
+        if pooled.cli_session_id:
+            self._cli_sessions[session_id] = pooled.cli_session_id
+            self._cli_sessions.move_to_end(session_id)
+            while len(self._cli_sessions) > MAX_REMEMBERED_SESSIONS:
+                self._cli_sessions.popitem(last=False)
+        if pooled.lock.locked():
+            pooled.lock.release()
+        if not pooled.alive and self._clients.get(session_id) is pooled:
+            # The worker is already shutting the client down
+            del self._clients[session_id]
+        self._notify_capacity()
+
+    async def _make_room(self) -> None:
+        """Evict idle clients (least recently used first) until below the cap."""
+        while len(self._clients) >= self.max_clients:
+            idle = next(((key, c) for key, c in self._clients.items() if not c.lock.locked()), None)
+            if idle is not None:
+                SDK_POOL_EVENTS.labels("evict_lru").inc()
+                await self._discard(*idle)
+                continue
+
+            # Every client is mid-turn: wait for one to finish
+            if self._capacity_freed is None:
+                self._capacity_freed = asyncio.Event()
+            self._capacity_freed.clear()
+            await self._capacity_freed.wait()
+
+    async def _discard(self, session_id: str, pooled: PooledClient) -> None:
+        if self._clients.get(session_id) is pooled:
+            del self._clients[session_id]
+        self._notify_capacity()
+        await pooled.close()
+
+    def _notify_capacity(self) -> None:
+        if self._capacity_freed is not None:
+            self._capacity_freed.set()
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_loop(), context=contextvars.Context())
+
+    async def _reap_loop(self) -> None:
+        interval = max(1.0, min(60.0, self.idle_timeout / 4))
+        while True:
+            await asyncio.sleep(interval)
+            await self.reap()
+
+    async def reap(self) -> None:
+        """Close clients that are idle past the timeout or whose process died."""
+        now = time.monotonic()
+        for session_id, pooled in list(self._clients.items()):
+            if pooled.lock.locked():
+                continue
+            if not pooled.alive:
+                SDK_POOL_EVENTS.labels("crash").inc()
+                await self._discard(session_id, pooled)
+            elif now - pooled.last_used > self.idle_timeout:
+                SDK_POOL_EVENTS.labels("evict_idle").inc()
+                await self._discard(session_id, pooled)
+
+    async def close(self) -> None:
+        """Close every client (application shutdown)."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        clients = list(self._clients.items())
+        self._clients.clear()
+        await asyncio.gather(*(pooled.close() for _session_id, pooled in clients), return_exceptions=True)
+
+
+async def stream_single_turn(
+    options: "ClaudeAgentOptions",
+    prompt: str,
+    client_factory: ClientFactory | None = None,
+) -> AsyncIterator[Any]:
+    """Run a turn on a client spawned for it and closed afterwards (no pooling).
+
+    Args:
+        options: Client options
+        prompt: User message
+        client_factory: Creates the SDK client (defaults to ClaudeSDKClient)
+
+    Yields:
+        SDK messages, ending with the ResultMessage
+    """
+    async with (client_factory or create_sdk_client)(options=options) as client:
+        await client.query(prompt)
+        async for message in client.receive_response():
+            yield message
+
+
+# Global pool
+sdk_pool = SDKClientPool(
+    max_clients=settings.sdk_pool_max_clients,
+    idle_timeout=settings.sdk_pool_idle_timeout,
+)
+SDK_POOL_CLIENTS.set_function(lambda: len(sdk_pool))
@@ -0,0 +1,104 @@
+"""Serve and record first turns through the starter cache.
+
+``stream_cached_starter`` answers a project's first message from a cached
+starter: the files are copied in and the cached reply is streamed with the
+same events a generated turn produces, so clients need no special case.
+``remember_starter`` stores a finished first turn for later projects.
+"""
+
+import asyncio
+import logging
+import shutil
+from collections.abc import AsyncGenerator
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import Message
+from ..database.models import Project
+from ..observability.tracing import span
+from ..services.file_service import FileService
+from ..services.starter_cache import ReplayedStarter
+from ..services.starter_cache import StarterMatch
+from ..services.starter_cache import starter_cache
+from ..services.status_service import StatusService
+from .events import SSEEventType
+from .events import format_sse_event
+from .status import WorkPhase
+from .status import emit_status_event
+
+logger = logging.getLogger(__name__)
+
+
+async def stream_cached_starter(
+    db: AsyncSession,
+    project_id: str,
+    session_id: str,
+    match: StarterMatch,
+    replayed: ReplayedStarter,
+    workspace: Path | None = None,
+) -> AsyncGenerator[str, None]:
+    """Stream a replayed starter as a complete turn.
+
+    Args:
+        db: Database session
+        project_id: Project the starter was copied into
+        session_id: Session receiving the turn
+        match: Cache match that was replayed
+        replayed: Result of ``starter_cache.replay``
+        workspace: Agent SDK working directory to copy the files into, so
+            the next turn's agent sees them
+
+    Yields:
+        SSE-formatted event strings
+    """
+    await StatusService.set_working(db, project_id, "Reusing a matching starter...")
+    yield emit_status_event(WorkPhase.TOOL_USE, "Reusing a matching starter...", 0.5)
+    if workspace is not None:
+        for file in replayed.files:
+            await asyncio.to_thread(shutil.copyfile, file.path, workspace / file.name)
+    for file in replayed.files:
+        yield format_sse_event(
+            SSEEventType.FILE_PROGRESS,
+            {"tool_use_id": None, "filename": file.name, "bytes_written": file.size, "done": True},
+        )
+    yield format_sse_event(SSEEventType.MESSAGE_DELTA, {"content": replayed.content})
+
+    with span("db.save_assistant_message"):
+        assistant_msg = Message(
+            session_id=session_id,
+            role="assistant",
+            content=replayed.content,
+            created_at=datetime.utcnow(),
+        )
+        db.add(assistant_msg)
+        await db.commit()
+
+    await StatusService.set_complete(db, project_id, "Ready for review")
+    yield emit_status_event(WorkPhase.COMPLETE, "Done", 1.0)
+    yield format_sse_event(
+        SSEEventType.MESSAGE_COMPLETE,
+        {
+            "message_id": assistant_msg.id,
+            "content": replayed.content,
+            "starter_cache": {"prompt": match.prompt, "similarity": round(match.similarity, 3)},
+        },
+    )
+
+
+async def remember_starter(db: AsyncSession, project: Project, prompt: str, content: str) -> None:
+    """Store a finished first turn in the starter cache; failures are only logged.
+
+    Args:
+        db: Database session
+        project: Project whose files the turn produced
+        prompt: First user message
+        content: Assistant reply
+    """
+    try:
+        files = await FileService.get_project_files(db, project.id)
+        await starter_cache.store(db, project.type, prompt, content, files)
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Could not cache starter for project {project.id}: {e}")
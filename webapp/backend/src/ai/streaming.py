@@ -3,40 +3,81 @@
 import asyncio
 import json
 import logging
+import time
 from collections.abc import AsyncGenerator
 from datetime import datetime
 from uuid import UUID
 
-from anthropic import AsyncAnthropic
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from ..config import get_settings
 from ..database.connection import AsyncSessionLocal
+from ..database.models import File
 from ..database.models import Message
 from ..database.models import ProjectStatus
 from ..database.models import ProjectType
 from ..database.models import Session
+from ..observability.metrics import LLM_OUTPUT_TOKENS_PER_SECOND
+from ..observability.metrics import LLM_TIME_TO_FIRST_TOKEN
+from ..observability.metrics import LLM_TOKENS
+from ..observability.metrics import LLM_TOOL_ROUNDS
+from ..observability.metrics import LLM_TURN_DURATION
+from ..observability.tracing import current_trace
+from ..observability.tracing import current_trace_id
+from ..observability.tracing import span
 from ..services.file_service import FileService
+from ..services.project_service import ProjectService
+from ..services.starter_cache import starter_cache
 from ..services.status_service import StatusService
+from ..services.summary_service import SummaryService
+from ..services.upload_service import expand_upload_blocks
 from ..services.verify_service import GameVerificationService
-from ..utils.image_utils import validate_base64_image
+from .cancellation import ActiveTurn
+from .cancellation import finish_cancelled_turn
+from .cancellation import record_completed_turn
+from .caching import TurnUsage
+from .caching import apply_history_breakpoints
+from .caching import cached_system_prompt
+from .caching import cached_tools
+from .client import create_anthropic_client
+from .context import CHARS_PER_TOKEN
+from .context import ContextBudget
+from .context import FileRef
+from .context import HistoryEntry
+from .context import compact_tool_payloads
+from .context import estimate_tokens
+from .context import schedule_summary
 from .events import SSEEventType
 from .events import format_sse_event
+from .file_tools import FILE_EDIT_TOOLS
+from .file_tools import execute_file_tool
+from .images import image_preparer
+from .naming import schedule_project_naming
 from .prompts import get_system_prompt
+from .rate_limiter import rate_limiter
+from .starter import remember_starter
+from .starter import stream_cached_starter
 from .status import WorkPhase
 from .status import emit_status_event
+from .tool_stream import ToolInputStream
 from .tools import TOOLS
 
 logger = logging.getLogger(__name__)
 
 
-async def _validate_message_content(content: str | list | dict) -> str | list | dict | None:
+async def _validate_message_content(
+    content: str | list | dict, session_id: str | None = None
+) -> str | list | dict | None:
     """Validate and fix message content, especially images with MIME type issues.
 
+    Base64 images are prepared for the model (MIME type fixed, downscaled and
+    re-encoded); prepared variants are cached, so resent history is cheap.
+
     Args:
         content: Message content (string, list of content blocks, or dict)
+        session_id: Session the content is sent for (image savings are counted against it)
 
     Returns:
         Validated content, or None if content is completely invalid
@@ -83,22 +124,20 @@ async def _validate_message_content(content: str | list | dict) -> str | list |
                     b64_data = source.get("data")
                     media_type = source.get("media_type", "image/jpeg")
 
-                    # Validate and fix the image
-                    result = validate_base64_image(b64_data, media_type)
+                    # Validate, downscale and re-encode the image
+                    prepared = await image_preparer.prepare(b64_data, media_type, session_id)
 
-                    if result is not None:
-                        fixed_b64, correct_mime = result
-                        # Update the block with fixed data
+                    if prepared is not None:
+                        # Update the block with prepared data
                         validated_block = {
                             "type": "image",
                             "source": {
                                 "type": "base64",
-                                "media_type": correct_mime,
-                                "data": fixed_b64,
+                                "media_type": prepared.media_type,
+                                "data": prepared.data,
                             },
                         }
                         validated_blocks.append(validated_block)
-                        logger.info(f"Validated and fixed image block: {media_type} -> {correct_mime}")
                     else:
                         # Skip invalid images
                         logger.warning(f"Skipping invalid image block with MIME type {media_type}")
@@ -117,42 +156,112 @@ async def _validate_message_content(content: str | list | dict) -> str | list |
     return content
 
 
+def _file_progress_event(tool_stream: ToolInputStream, done: bool) -> str:
+    """Format a file_progress event for a streamed create_file block."""
+    return format_sse_event(
+        SSEEventType.FILE_PROGRESS,
+        {
+            "tool_use_id": tool_stream.block_id,
+            "filename": tool_stream.filename,
+            "bytes_written": tool_stream.bytes_written,
+            "done": done,
+        },
+    )
+
+
+async def _commit_tool_stream(db: AsyncSession, session: Session, tool_stream: ToolInputStream) -> File | None:
+    """Commit a completed create_file block through FileService.
+
+    Args:
+        db: Database session
+        session: Session the file belongs to
+        tool_stream: Completed tool input stream
+
+    Returns:
+        The committed file, or None if it has to fall back to the final tool
+        input (missing filename or empty content)
+    """
+    tool_stream.close()
+    filename = tool_stream.filename
+    if not filename or not tool_stream.has_content:
+        tool_stream.discard()
+        return None
+
+    try:
+        file = await FileService.commit_partial_file(
+            db=db,
+            project_id=str(session.project_id),
+            session_id=str(session.id),
+            filename=filename,
+            partial_path=tool_stream.partial_path,
+            mime_type=tool_stream.mime_type,
+        )
+    except (ValueError, OSError) as e:
+        logger.error(f"Failed to commit streamed file {filename}: {e}")
+        tool_stream.discard()
+        return None
+
+    logger.info(f"Committed streamed file {filename} ({tool_stream.bytes_written} bytes)")
+    return file
+
+
 async def stream_claude_response(
     session_id: UUID,
     user_message: str,
     db: AsyncSession,
     api_key: str,
+    turn: ActiveTurn | None = None,
 ) -> AsyncGenerator[str, None]:
     """Stream AI response using Claude's streaming API.
 
     Yields SSE-formatted events:
     - message_start: When streaming begins
     - message_delta: Content chunks as they arrive
+    - file_progress: Bytes written so far for files streamed from create_file
     - message_complete: When streaming finishes (with complete message)
+    - cancelled: When the turn is cancelled through ``turn`` (partial reply and savings)
     - error: If any error occurs
 
+    If the client goes away instead, the partial reply is saved and the
+    cancellation propagates.
+
     Args:
         session_id: ID of the session
         user_message: User's message text
         db: Database session
         api_key: Anthropic API key
+        turn: Registered turn, when the user can cancel it
 
     Yields:
         SSE-formatted event strings
     """
     accumulated_content = ""
     message_id: UUID | None = None
+    turn_start = time.perf_counter()
+    # Stays "cancelled" if the client goes away mid-stream
+    outcome = "cancelled"
+    session_id_str = str(session_id)
+    # Set once the user message is saved (a cancelled turn is saved from then on)
+    project_id: str | None = None
+    turn_usage = TurnUsage()
+    # Characters streamed in the current request (its usage arrives at the end)
+    round_chars = 0
 
     try:
         # Load session and project (eagerly load project to avoid lazy-loading error)
         # Convert UUID to string for query since Session.id is String type
-        session_id_str = str(session_id)
-        result = await db.execute(
-            select(Session).where(Session.id == session_id_str).options(selectinload(Session.project))
-        )
-        session = result.scalar_one_or_none()
+        trace = current_trace()
+        if trace is not None:
+            trace.attributes["session_id"] = session_id_str
+
+        with span("db.load_session"):
+            result = await db.execute(
+                select(Session).where(Session.id == session_id_str).options(selectinload(Session.project))
+            )
+            session = result.scalar_one_or_none()
 
         if not session:
+            outcome = "error"
             yield format_sse_event(
                 SSEEventType.ERROR,
                 {"error": f"Session {session_id} not found"},
@@ -163,45 +272,89 @@ async def stream_claude_response(
         system_prompt = get_system_prompt(session.project.type)
 
         # Load conversation history
-        result = await db.execute(select(Message).where(Message.session_id == session_id_str).order_by(Message.created_at))
-        history = result.scalars().all()
-
-        # Build messages array for Claude with image validation
-        messages = []
-        for idx, msg in enumerate(history):
-            logger.debug(f"Processing history message {idx}: role={msg.role}, content_type={type(msg.content)}")
-            content = await _validate_message_content(msg.content)
-            if content is not None:  # Skip messages with invalid content
-                messages.append({"role": msg.role, "content": content})
-            else:
-                logger.warning(f"Skipped invalid message {idx} from history")
+        with span("db.load_history") as load_span:
+            result = await db.execute(
+                select(Message).where(Message.session_id == session_id_str).order_by(Message.created_at)
+            )
+            history = result.scalars().all()
+            load_span.set(messages=len(history))
+
+        settings = get_settings()
+
+        # A project's first message: name the project alongside the turn (instead
+        # of in a tool round) and look for a cached starter
+        first_message = not history and not await ProjectService.has_messages(db, str(session.project_id))
+        if first_message:
+            schedule_project_naming(session.project, session_id_str, user_message, api_key)
+        cache_starter = first_message and settings.starter_cache_enabled and isinstance(user_message, str)
+
+        # Build history entries for Claude with image validation
+        with span("context.validate_history"):
+            entries: list[HistoryEntry] = []
+            for idx, msg in enumerate(history):
+                logger.debug(f"Processing history message {idx}: role={msg.role}, content_type={type(msg.content)}")
+                content = await expand_upload_blocks(db, msg.content, str(session.project_id))
+                content = await _validate_message_content(content, session_id_str)
+                if content is not None:  # Skip messages with invalid content
+                    entries.append(HistoryEntry(msg.id, msg.role.value, content, estimate_tokens(content)))
+                else:
+                    logger.warning(f"Skipped invalid message {idx} from history")
+
+        # Fit history into the context budget (older turns replaced by a rolling summary)
+        with span("context.plan") as plan_span:
+            summary = await SummaryService.get_latest_summary(db, session_id_str)
+            budget = ContextBudget(settings.context_max_tokens, settings.context_recent_turns)
+            plan = budget.plan(entries, summary)
+            messages = plan.messages
+            schedule_summary(session_id_str, plan, api_key, settings.context_summary_model)
+            plan_span.set(estimated_tokens=plan.estimated_tokens, summarizing=len(plan.pending_summary))
 
         # Add current user message (also validate if it contains images)
         logger.debug(f"Processing user message: type={type(user_message)}, preview={str(user_message)[:100]}")
-        validated_user_message = await _validate_message_content(user_message)
+        with span("context.validate_user_message"):
+            validated_user_message = await _validate_message_content(
+                await expand_upload_blocks(db, user_message, str(session.project_id)), session_id_str
+            )
         messages.append({"role": "user", "content": validated_user_message})
 
-        logger.info(f"Built {len(messages)} messages for Claude API (history: {len(history)}, current: 1)")
+        logger.info(
+            f"Built {len(messages)} messages for Claude API "
+            f"(history: {len(history)}, ~{plan.estimated_tokens} tokens, current: 1)"
+        )
 
         # Save user message to database
-        user_msg = Message(
-            session_id=session_id_str,
-            role="user",
-            content=user_message,
-            created_at=datetime.utcnow(),
-        )
-        db.add(user_msg)
-        await db.commit()
+        with span("db.save_user_message"):
+            user_msg = Message(
+                session_id=session_id_str,
+                role="user",
+                content=user_message,
+                created_at=datetime.utcnow(),
+            )
+            db.add(user_msg)
+            await db.commit()
+        project_id = str(session.project_id)
 
         # Yield message start event (MUST yield first to start generator iteration)
         yield format_sse_event(
             SSEEventType.MESSAGE_START,
-            {"session_id": str(session_id)},
+            {"session_id": str(session_id), "trace_id": current_trace_id()},
         )
 
         # Transition to PLANNING status (after first yield so generator executes)
         await StatusService.set_planning(db, str(session.project_id), "Analyzing your request...")
 
+        # Replay a matching starter instead of generating
+        if cache_starter:
+            with span("starter_cache.lookup") as cache_span:
+                match = await starter_cache.lookup(db, session.project.type, user_message)
+                replayed = match and await starter_cache.replay(db, match, str(session.project_id), session_id_str)
+                cache_span.set(hit=bool(replayed))
+            if replayed:
+                outcome = "starter_cache"
+                async for event in stream_cached_starter(db, str(session.project_id), session_id_str, match, replayed):
+                    yield event
+                return
+
         # Emit understanding status
         yield emit_status_event(
             WorkPhase.UNDERSTANDING,
@@ -210,8 +363,22 @@ async def stream_claude_response(
         )
 
         # Stream from Claude with tool support
-        client = AsyncAnthropic(api_key=api_key)
-        settings = get_settings()
+        client = create_anthropic_client(api_key)
+
+        # Cache breakpoints: tools, system prompt and the rolling history prefix.
+        # Everything up to and including the current user message is persisted,
+        # so the next turn sends exactly this prefix again.
+        stable_prefix_len = len(messages)
+        if settings.claude_prompt_caching:
+            request_system = cached_system_prompt(system_prompt)
+            request_tools = cached_tools(TOOLS)
+        else:
+            request_system = system_prompt
+            request_tools = TOOLS
+        prompt_overhead_tokens = estimate_tokens(system_prompt) + estimate_tokens(TOOLS)
+
+        # Files written by this turn's tool calls, by tool_use ID
+        file_refs: dict[str, FileRef] = {}
 
         # Allow multiple tool use rounds
         max_tool_rounds = 5
@@ -229,82 +396,176 @@ async def stream_claude_response(
                     0.5,
                 )
 
-            try:
-                async with client.messages.stream(
-                    model=settings.claude_model,
-                    max_tokens=settings.claude_max_tokens,
-                    system=system_prompt,
-                    messages=messages,
-                    tools=TOOLS,
-                ) as stream:
-                    async for text in stream.text_stream:
-                        accumulated_content += text
-                        yield format_sse_event(
-                            SSEEventType.MESSAGE_DELTA,
-                            {"content": text},
-                        )
+            # Return the pooled connection while waiting on the model: refresh() after a
+            # commit (status transitions, file records) leaves a transaction open
+            await db.commit()
+
+            request_tokens = prompt_overhead_tokens + sum(estimate_tokens(m["content"]) for m in messages)
+            if rate_limiter.expected_wait(request_tokens, settings.claude_max_tokens) > 1.0:
+                yield emit_status_event(
+                    WorkPhase.GENERATING,
+                    "Waiting for API capacity...",
+                    0.5,
+                )
 
-                    # Get final message to check for tool use
-                    final_message = await stream.get_final_message()
-
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"Claude API error: {error_msg}")
-
-                # If it's an image MIME type error, log the messages being sent
-                if "Image does not match" in error_msg or "media type" in error_msg:
-                    logger.error(f"Image MIME type error detected. Total messages: {len(messages)}")
-                    for idx, msg in enumerate(messages):
-                        msg_content = msg.get("content", "")
-                        if isinstance(msg_content, list):
-                            for block_idx, block in enumerate(msg_content):
-                                if isinstance(block, dict) and block.get("type") == "image":
-                                    source = block.get("source", {})
-                                    media_type = source.get("media_type", "unknown")
-                                    logger.error(
-                                        f"Message {idx}, block {block_idx}: image with media_type={media_type}"
+            # create_file blocks whose content is streamed straight to disk, by block index
+            tool_streams: dict[int, ToolInputStream] = {}
+            committed_blocks: set[str] = set()
+
+            request_start = time.perf_counter()
+            first_token_at: float | None = None
+
+            with span("llm.request", round=tool_round) as request_span:
+                try:
+                    # Earlier rounds' file payloads are already stored; send references instead
+                    request_messages = compact_tool_payloads(messages, stable_prefix_len, file_refs)
+                    if settings.claude_prompt_caching:
+                        request_messages = apply_history_breakpoints(request_messages, stable_prefix_len)
+
+                    async with rate_limiter.stream(
+                        client,
+                        input_tokens=request_tokens,
+                        model=settings.claude_model,
+                        max_tokens=settings.claude_max_tokens,
+                        system=request_system,
+                        messages=request_messages,
+                        tools=request_tools,
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "content_block_start":
+                                block = event.content_block
+                                if block.type == "tool_use" and block.name == "create_file":
+                                    tool_streams[event.index] = ToolInputStream(
+                                        block.id,
+                                        FileService.get_partial_path(str(session.project_id), block.id),
                                     )
 
-                # Re-raise the error
-                raise
+                            elif event.type == "content_block_delta":
+                                if first_token_at is None:
+                                    first_token_at = time.perf_counter()
+                                    LLM_TIME_TO_FIRST_TOKEN.labels("api").observe(first_token_at - request_start)
+                                    request_span.set(ttft_ms=round((first_token_at - request_start) * 1000, 1))
+
+                                if event.delta.type == "text_delta":
+                                    round_chars += len(event.delta.text)
+                                    accumulated_content += event.delta.text
+                                    yield format_sse_event(
+                                        SSEEventType.MESSAGE_DELTA,
+                                        {"content": event.delta.text},
+                                    )
 
-            # Check if Claude used any tools
-            tool_used = False
+                                elif event.delta.type == "input_json_delta":
+                                    round_chars += len(event.delta.partial_json)
+                                    if event.index not in tool_streams:
+                                        continue
+                                    tool_stream = tool_streams[event.index]
+                                    tool_stream.feed(event.delta.partial_json)
+
+                                    if tool_stream.filename and not tool_stream.announced:
+                                        tool_stream.announced = True
+                                        yield emit_status_event(
+                                            WorkPhase.TOOL_USE,
+                                            f"Creating {tool_stream.filename}...",
+                                            0.7,
+                                        )
+
+                                    if tool_stream.should_report_progress():
+                                        yield _file_progress_event(tool_stream, done=False)
+
+                            elif event.type == "content_block_stop" and event.index in tool_streams:
+                                # Tool input complete: commit the file now instead of after the whole message
+                                tool_stream = tool_streams.pop(event.index)
+                                committed_file = await _commit_tool_stream(db, session, tool_stream)
+                                if committed_file is not None:
+                                    committed_blocks.add(tool_stream.block_id)
+                                    file_refs[tool_stream.block_id] = FileRef(
+                                        committed_file.id, committed_file.name, committed_file.size
+                                    )
+                                    yield _file_progress_event(tool_stream, done=True)
+
+                        # Get final message to check for tool use
+                        final_message = await stream.get_final_message()
+                        turn_usage.add(final_message.usage)
+                        round_chars = 0
+                        request_span.set(
+                            stop_reason=final_message.stop_reason,
+                            input_tokens=final_message.usage.input_tokens,
+                            output_tokens=final_message.usage.output_tokens,
+                        )
+
+                        if first_token_at is not None:
+                            generation_seconds = time.perf_counter() - first_token_at
+                            if generation_seconds > 0 and final_message.usage.output_tokens:
+                                LLM_OUTPUT_TOKENS_PER_SECOND.labels("api").observe(
+                                    final_message.usage.output_tokens / generation_seconds
+                                )
+
+                except Exception as e:
+                    error_msg = str(e)
+                    logger.error(f"Claude API error: {error_msg}")
+
+                    # If it's an image MIME type error, log the messages being sent
+                    if "Image does not match" in error_msg or "media type" in error_msg:
+                        logger.error(f"Image MIME type error detected. Total messages: {len(messages)}")
+                        for idx, msg in enumerate(messages):
+                            msg_content = msg.get("content", "")
+                            if isinstance(msg_content, list):
+                                for block_idx, block in enumerate(msg_content):
+                                    if isinstance(block, dict) and block.get("type") == "image":
+                                        source = block.get("source", {})
+                                        media_type = source.get("media_type", "unknown")
+                                        logger.error(
+                                            f"Message {idx}, block {block_idx}: image with media_type={media_type}"
+                                        )
+
+                    # Re-raise the error
+                    raise
+
+                finally:
+                    # Drop temp files of blocks that never completed
+                    for tool_stream in tool_streams.values():
+                        tool_stream.discard()
+
+            # Run the tools Claude called; all results go back in one user message
+            tool_results: list[dict] = []
             for block in final_message.content:
                 if block.type == "tool_use":
-                    tool_used = True
                     tool_name = block.name
                     tool_input = block.input
 
                     # Handle create_file tool
                     if tool_name == "create_file":
                         filename = tool_input.get("filename", "file")
-
-                        # Emit tool use status
-                        yield emit_status_event(
-                            WorkPhase.TOOL_USE,
-                            f"Creating {filename}...",
-                            0.7,
-                        )
                         content = tool_input.get("content")
                         mime_type = tool_input.get("mime_type", "text/plain")
 
-                        # Only create file if content is provided and not None/empty
-                        if content is not None and content != "":
-                            try:
-                                await FileService.create_file(
-                                    db=db,
-                                    project_id=str(session.project_id),
-                                    session_id=str(session_id),
-                                    filename=filename,
-                                    content=content,
-                                    mime_type=mime_type,
-                                )
-                            except ValueError as e:
-                                logger.error(f"Failed to create file {filename}: {e}")
-                                # Continue without crashing - just log the error
-                        else:
-                            logger.warning(f"Skipping file creation for {filename}: content is None or empty")
+                        # Blocks committed at content_block_stop are already on disk;
+                        # anything else is written from the final tool input
+                        if block.id not in committed_blocks:
+                            # Emit tool use status
+                            yield emit_status_event(
+                                WorkPhase.TOOL_USE,
+                                f"Creating {filename}...",
+                                0.7,
+                            )
+
+                            # Only create file if content is provided and not None/empty
+                            if content is not None and content != "":
+                                try:
+                                    created_file = await FileService.create_file(
+                                        db=db,
+                                        project_id=str(session.project_id),
+                                        session_id=str(session_id),
+                                        filename=filename,
+                                        content=content,
+                                        mime_type=mime_type,
+                                    )
+                                    file_refs[block.id] = FileRef(created_file.id, created_file.name, created_file.size)
+                                except ValueError as e:
+                                    logger.error(f"Failed to create file {filename}: {e}")
+                                    # Continue without crashing - just log the error
+                            else:
+                                logger.warning(f"Skipping file creation for {filename}: content is None or empty")
 
                         # Send compact file creation event
                         yield format_sse_event(
@@ -313,26 +574,39 @@ async def stream_claude_response(
                         )
                         accumulated_content += f"✓ {filename}  "
 
-                        # Add tool result to conversation
-                        messages.append(
+                        tool_results.append(
                             {
-                                "role": "assistant",
-                                "content": final_message.content,
+                                "type": "tool_result",
+                                "tool_use_id": block.id,
+                                "content": f"File '{filename}' created successfully",
                             }
                         )
-                        messages.append(
-                            {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "tool_result",
-                                        "tool_use_id": block.id,
-                                        "content": f"File '{filename}' created successfully",
-                                    }
-                                ],
-                            }
+
+                    # Handle read_file, edit_file and apply_patch tools
+                    elif tool_name in FILE_EDIT_TOOLS:
+                        filename = tool_input.get("filename", "file")
+                        action = "Reading" if tool_name == "read_file" else "Editing"
+                        yield emit_status_event(
+                            WorkPhase.TOOL_USE,
+                            f"{action} {filename}...",
+                            0.7,
                         )
 
+                        with span(f"tool.{tool_name}", filename=filename) as tool_span:
+                            tool_outcome = await execute_file_tool(
+                                db, str(session.project_id), session_id_str, tool_name, tool_input
+                            )
+                            tool_span.set(is_error=tool_outcome.is_error)
+
+                        if tool_name != "read_file" and not tool_outcome.is_error:
+                            yield format_sse_event(
+                                SSEEventType.MESSAGE_DELTA,
+                                {"content": f"✓ {filename}  "},
+                            )
+                            accumulated_content += f"✓ {filename}  "
+
+                        tool_results.append(tool_outcome.as_tool_result(block.id))
+
                     # Handle update_project_name tool
                     elif tool_name == "update_project_name":
                         new_name = tool_input.get("name", "project")
@@ -345,49 +619,79 @@ async def stream_claude_response(
                         )
 
                         # Update project name in database
-                        session.project.name = new_name
-                        await db.commit()
+                        with span("tool.update_project_name"):
+                            session.project.name = new_name
+                            await db.commit()
 
-                        # Add tool result to conversation
-                        messages.append(
+                        tool_results.append(
                             {
-                                "role": "assistant",
-                                "content": final_message.content,
+                                "type": "tool_result",
+                                "tool_use_id": block.id,
+                                "content": f"Project renamed to '{new_name}'",
                             }
                         )
-                        messages.append(
+
+                    else:
+                        # Every tool_use needs a result, or the next request is rejected
+                        tool_results.append(
                             {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "tool_result",
-                                        "tool_use_id": block.id,
-                                        "content": f"Project renamed to '{new_name}'",
-                                    }
-                                ],
+                                "type": "tool_result",
+                                "tool_use_id": block.id,
+                                "content": f"Unknown tool '{tool_name}'",
+                                "is_error": True,
                             }
                         )
 
             # If no tool was used, we're done
-            if not tool_used:
+            if not tool_results:
                 break
 
+            # Add the tool calls and their results to the conversation
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": final_message.content,
+                }
+            )
+            messages.append(
+                {
+                    "role": "user",
+                    "content": tool_results,
+                }
+            )
+
             tool_round += 1
 
+        LLM_TOOL_ROUNDS.labels("api").observe(tool_round)
+        for kind, tokens in (
+            ("input", turn_usage.input_tokens),
+            ("output", turn_usage.output_tokens),
+            ("cache_read", turn_usage.cache_read_input_tokens),
+            ("cache_creation", turn_usage.cache_creation_input_tokens),
+        ):
+            LLM_TOKENS.labels("api", kind).inc(tokens)
+
+        logger.info(
+            f"Turn usage for session {session_id_str}: input={turn_usage.input_tokens}, "
+            f"cache_write={turn_usage.cache_creation_input_tokens}, "
+            f"cache_read={turn_usage.cache_read_input_tokens}, output={turn_usage.output_tokens}"
+        )
+
         # Save complete assistant message to database using a fresh session
         # (the original db session may be closed by FastAPI after returning EventSourceResponse)
         logger.info(f"🔍 [DEBUG] Saving assistant message and checking for verification (session: {session_id_str})")
         async with AsyncSessionLocal() as save_db:
-            assistant_msg = Message(
-                session_id=session_id_str,
-                role="assistant",
-                content=accumulated_content,
-                created_at=datetime.utcnow(),
-            )
-            save_db.add(assistant_msg)
-            await save_db.commit()
-            await save_db.refresh(assistant_msg)
-            message_id = assistant_msg.id
+            with span("db.save_assistant_message"):
+                assistant_msg = Message(
+                    session_id=session_id_str,
+                    role="assistant",
+                    content=accumulated_content,
+                    created_at=datetime.utcnow(),
+                )
+                save_db.add(assistant_msg)
+                await save_db.commit()
+                await save_db.refresh(assistant_msg)
+                message_id = assistant_msg.id
 
             # Get project to check type (CAREFUL: use fresh query in this session)
             logger.info(f"🔍 [DEBUG] Fetching session {session_id_str} to check project type")
@@ -437,6 +741,7 @@ async def stream_claude_response(
                         # Don't mark complete - stay in working status
                         await StatusService.set_working(save_db, str(session_with_project.project_id), "Needs fixes")
                         await save_db.commit()
+                        outcome = "verification_failed"
                         return
                     else:
                         logger.info(f"✅ Verification PASSED - game is functional")
@@ -445,12 +750,17 @@ async def stream_claude_response(
                     logger.error(f"❌ Verification EXCEPTION: {type(e).__name__}: {str(e)}", exc_info=True)
                     # Continue to mark complete even if verification fails - don't block user
                     logger.warning("⚠️ Continuing despite verification failure")
+                    cache_starter = False
             else:
                 logger.info(f"ℹ️ Project type is {session_with_project.project.type if session_with_project else 'UNKNOWN'} - skipping verification")
 
             # Transition to COMPLETE status (only if verification passed or not a game)
             await StatusService.set_complete(save_db, str(session.project_id), "Ready for review")
 
+            # Later projects with the same first request get this turn from the cache
+            if cache_starter:
+                await remember_starter(save_db, session.project, user_message, accumulated_content)
+
         # Emit complete status
         yield emit_status_event(
             WorkPhase.COMPLETE,
@@ -459,21 +769,48 @@ async def stream_claude_response(
         )
 
         # Yield completion event
+        outcome = "success"
         yield format_sse_event(
             SSEEventType.MESSAGE_COMPLETE,
             {
                 "message_id": str(message_id),
                 "content": accumulated_content,
+                "usage": turn_usage.as_dict(),
             },
         )
 
+    except asyncio.CancelledError:
+        # Cancelled by the user, or the client went away; the upstream stream is already closed
+        outcome = "cancelled"
+        absorbed = turn is not None and turn.absorb()
+        report = await finish_cancelled_turn(
+            "api",
+            turn,
+            turn_start,
+            turn_usage.output_tokens + round_chars // CHARS_PER_TOKEN,
+            session_id_str,
+            project_id,
+            accumulated_content,
+            message_id,
+        )
+        if not absorbed:
+            raise
+        yield format_sse_event(SSEEventType.CANCELLED, report)
+
     except Exception as e:
+        outcome = "error"
         logger.error(f"❌ EXCEPTION in stream_claude_response: {e}", exc_info=True)
         yield format_sse_event(
             SSEEventType.ERROR,
             {"error": str(e)},
         )
 
+    finally:
+        duration = time.perf_counter() - turn_start
+        LLM_TURN_DURATION.labels("api", outcome).observe(duration)
+        if outcome in ("success", "verification_failed"):
+            record_completed_turn("api", duration, turn_usage.output_tokens)
+
 
 async def heartbeat_generator(interval: int = 15) -> AsyncGenerator[str, None]:
     """Generate periodic heartbeat comments to keep SSE connection alive.
@@ -3,12 +3,13 @@
 import asyncio
 import json
 import logging
+import time
 from collections.abc import AsyncGenerator
+from contextlib import aclosing
 from datetime import datetime
 from pathlib import Path
 from uuid import UUID
 
-from claude_agent_sdk import ClaudeSDKClient, ClaudeAgentOptions
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -16,11 +17,26 @@ from sqlalchemy.orm import selectinload
 from ..config import get_settings
 from ..database.connection import AsyncSessionLocal
 from ..database.models import Message, ProjectType, Session
-from ..services.file_service import FileService
+from ..observability.metrics import (
+    LLM_TIME_TO_FIRST_TOKEN,
+    LLM_TOKENS,
+    LLM_TOOL_ROUNDS,
+    LLM_TURN_DURATION,
+)
+from ..observability.tracing import current_trace, current_trace_id, span
+from ..services.project_service import ProjectService
+from ..services.starter_cache import starter_cache
 from ..services.status_service import StatusService
 from ..services.verify_service import GameVerificationService
+from ..services.workspace_sync import get_workspace_sync
+from .cancellation import ActiveTurn, finish_cancelled_turn, record_completed_turn
+from .context import CHARS_PER_TOKEN, estimate_tokens
 from .events import SSEEventType, format_sse_event
+from .naming import schedule_project_naming
 from .prompts import get_system_prompt
+from .rate_limiter import rate_limiter
+from .sdk_pool import sdk_pool, stream_single_turn
+from .starter import remember_starter, stream_cached_starter
 from .status import WorkPhase, emit_status_event
 
 logger = logging.getLogger(__name__)
@@ -31,24 +47,42 @@ async def stream_claude_response_sdk(
     user_message: str,
     db: AsyncSession,
     api_key: str,
+    turn: ActiveTurn | None = None,
 ) -> AsyncGenerator[str, None]:
     """Stream AI response using Claude Agent SDK.
 
     This replaces the Anthropic Messages API with the Agent SDK,
     which provides better tool integration and context management.
+    A cancel through ``turn`` interrupts the agent and ends the stream with
+    a ``cancelled`` event; a client disconnect does the same and propagates.
     """
+    from claude_agent_sdk import AssistantMessage, ClaudeAgentOptions, ResultMessage, TextBlock, ToolUseBlock
+
     accumulated_content = ""
     message_id: UUID | None = None
+    turn_start = time.perf_counter()
+    outcome = "cancelled"
+    tool_calls = 0
+    session_id_str = str(session_id)
+    # Set once the user message is saved (a cancelled turn is saved from then on)
+    project_id: str | None = None
+    reservation = None
+    output_tokens = 0
 
     try:
         # Load session and project
-        session_id_str = str(session_id)
-        result = await db.execute(
-            select(Session).where(Session.id == session_id_str).options(selectinload(Session.project))
-        )
-        session = result.scalar_one_or_none()
+        trace = current_trace()
+        if trace is not None:
+            trace.attributes["session_id"] = session_id_str
+
+        with span("db.load_session"):
+            result = await db.execute(
+                select(Session).where(Session.id == session_id_str).options(selectinload(Session.project))
+            )
+            session = result.scalar_one_or_none()
 
         if not session:
+            outcome = "error"
             yield format_sse_event(
                 SSEEventType.ERROR,
                 {"error": f"Session {session_id} not found"},
@@ -58,20 +92,31 @@ async def stream_claude_response_sdk(
         # Get system prompt
         system_prompt = get_system_prompt(session.project.type)
 
+        settings = get_settings()
+
+        # A project's first message: name the project alongside the turn and
+        # look for a cached starter
+        first_message = not await ProjectService.has_messages(db, str(session.project_id))
+        if first_message:
+            schedule_project_naming(session.project, session_id_str, user_message, api_key)
+        cache_starter = first_message and settings.starter_cache_enabled
+
         # Save user message
-        user_msg = Message(
-            session_id=session_id_str,
-            role="user",
-            content=user_message,
-            created_at=datetime.utcnow(),
-        )
-        db.add(user_msg)
-        await db.commit()
+        with span("db.save_user_message"):
+            user_msg = Message(
+                session_id=session_id_str,
+                role="user",
+                content=user_message,
+                created_at=datetime.utcnow(),
+            )
+            db.add(user_msg)
+            await db.commit()
+        project_id = str(session.project_id)
 
         # Yield start event
         yield format_sse_event(
             SSEEventType.MESSAGE_START,
-            {"session_id": str(session_id)},
+            {"session_id": str(session_id), "trace_id": current_trace_id()},
         )
 
         # Transition to planning
@@ -81,94 +126,132 @@ async def stream_claude_response_sdk(
         # Setup Agent SDK options
         project_path = Path("/tmp") / f"project_{session.project_id}"
         project_path.mkdir(parents=True, exist_ok=True)
+        workspace = get_workspace_sync(str(session.project_id), project_path)
+
+        # Replay a matching starter instead of running the agent
+        if cache_starter:
+            with span("starter_cache.lookup") as cache_span:
+                match = await starter_cache.lookup(db, session.project.type, user_message)
+                replayed = match and await starter_cache.replay(db, match, str(session.project_id), session_id_str)
+                cache_span.set(hit=bool(replayed))
+            if replayed:
+                outcome = "starter_cache"
+                async for event in stream_cached_starter(
+                    db, str(session.project_id), session_id_str, match, replayed, project_path
+                ):
+                    yield event
+                return
 
         options = ClaudeAgentOptions(
-            working_directory=str(project_path),
+            cwd=str(project_path),
             system_prompt=system_prompt,
             allowed_tools=["Write", "Edit", "Read"],  # File operations only
             permission_mode="acceptEdits",  # Auto-accept file operations
+            env={"ANTHROPIC_BASE_URL": settings.anthropic_base_url} if settings.anthropic_base_url else {},
         )
 
-        # Use Agent SDK client
-        async with ClaudeSDKClient(options=options) as client:
-            # Send query
-            await client.query(user_message)
-
-            # Transition to working
-            await StatusService.set_working(db, str(session.project_id), "Creating deliverables...")
-            yield emit_status_event(WorkPhase.GENERATING, "Creating deliverables...", 0.5)
-
-            # Stream responses
-            async for msg in client.receive_response():
-                # Agent SDK returns message objects
-                msg_type = getattr(msg, 'type', None)
-
-                if msg_type == 'assistant':
-                    # Text content from assistant
-                    content = getattr(msg, 'content', '')
-                    if content:
-                        accumulated_content += content
-                        yield format_sse_event(
-                            SSEEventType.MESSAGE_DELTA,
-                            {"content": content},
-                        )
+        # The CLI makes its own API calls; reserve capacity for the turn so it
+        # shares the upstream quota with direct API calls
+        reservation = await rate_limiter.acquire(
+            estimate_tokens(system_prompt) + estimate_tokens(user_message),
+            settings.claude_max_tokens,
+        )
 
-                elif msg_type == 'tool_use':
-                    # Agent is using a tool
-                    tool_name = getattr(msg, 'name', 'unknown')
-                    logger.info(f"Agent using tool: {tool_name}")
-
-                    # Extract filename if it's a file operation
-                    if tool_name in ['Write', 'Edit']:
-                        try:
-                            # Get the file path from tool input
-                            tool_input = getattr(msg, 'input', {})
-                            file_path = tool_input.get('file_path', tool_input.get('path', 'unknown'))
-                            filename = Path(file_path).name if file_path != 'unknown' else 'file'
-
-                            # Show compact file creation message
-                            yield format_sse_event(
-                                SSEEventType.MESSAGE_DELTA,
-                                {"content": f"✓ {filename}  "},
-                            )
-                            accumulated_content += f"✓ {filename}  "
-
-                            # Copy file from temp to actual project location
-                            # (Agent SDK writes to working_directory, we need files in our project storage)
-                            temp_file_path = project_path / filename
-                            if temp_file_path.exists():
-                                content = temp_file_path.read_text()
-                                await FileService.create_file(
-                                    db=db,
-                                    project_id=str(session.project_id),
-                                    session_id=str(session_id),
-                                    filename=filename,
-                                    content=content,
-                                    mime_type=_guess_mime_type(filename),
+        # Transition to working
+        await StatusService.set_working(db, str(session.project_id), "Creating deliverables...")
+        # Don't hold a pooled connection for the whole agent run
+        await db.commit()
+        yield emit_status_event(WorkPhase.GENERATING, "Creating deliverables...", 0.5)
+
+        # Sessions keep a live client between turns; spawning one per turn is the fallback
+        if settings.sdk_pool_enabled:
+            responses = sdk_pool.stream_turn(session_id_str, options, user_message)
+        else:
+            responses = stream_single_turn(options, user_message)
+        query_sent = time.perf_counter()
+        first_token_at: float | None = None
+
+        # Stream responses, noting which workspace files change
+        # aclosing: a cancelled turn stops the agent now, not when the generator is collected
+        async with workspace.watch(), aclosing(responses):
+            with span("llm.sdk_response") as response_span:
+                async for msg in responses:
+                    if isinstance(msg, AssistantMessage):
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            LLM_TIME_TO_FIRST_TOKEN.labels("sdk").observe(first_token_at - query_sent)
+
+                        for block in msg.content:
+                            if isinstance(block, TextBlock) and block.text:
+                                accumulated_content += block.text
+                                yield format_sse_event(
+                                    SSEEventType.MESSAGE_DELTA,
+                                    {"content": block.text},
                                 )
-                        except Exception as e:
-                            logger.error(f"Failed to save file from agent: {e}")
 
-                elif msg_type == 'tool_result':
-                    # Tool execution result
-                    pass  # Agent SDK handles this internally
-
-            # Mark message as complete
-            yield format_sse_event(
-                SSEEventType.MESSAGE_COMPLETE,
-                {"session_id": str(session_id)},
-            )
+                            elif isinstance(block, ToolUseBlock):
+                                # Agent is using a tool
+                                tool_calls += 1
+                                logger.info(f"Agent using tool: {block.name}")
+
+                                if block.name in ['Write', 'Edit']:
+                                    file_path = block.input.get('file_path', block.input.get('path', 'unknown'))
+                                    filename = Path(file_path).name if file_path != 'unknown' else 'file'
+
+                                    # Show compact file creation message
+                                    yield format_sse_event(
+                                        SSEEventType.MESSAGE_DELTA,
+                                        {"content": f"✓ {filename}  "},
+                                    )
+                                    accumulated_content += f"✓ {filename}  "
+                                    workspace.mark(file_path)
+
+                    elif isinstance(msg, ResultMessage) and msg.usage:
+                        # Result messages carry the usage of the whole turn
+                        usage = msg.usage
+                        output_tokens = usage.get('output_tokens') or 0
+                        rate_limiter.settle(
+                            reservation,
+                            (usage.get('input_tokens') or 0) + (usage.get('cache_creation_input_tokens') or 0),
+                            usage.get('output_tokens') or 0,
+                        )
+                        for kind, key in (
+                            ('input', 'input_tokens'),
+                            ('output', 'output_tokens'),
+                            ('cache_read', 'cache_read_input_tokens'),
+                            ('cache_creation', 'cache_creation_input_tokens'),
+                        ):
+                            if usage.get(key):
+                                LLM_TOKENS.labels("sdk", kind).inc(usage[key])
+                response_span.set(tool_calls=tool_calls)
+
+        # Copy changed files from the agent's working directory to project storage
+        try:
+            synced = await workspace.sync(db, session_id_str)
+            if synced:
+                logger.info(f"Synced {len(synced)} workspace files: {', '.join(f.name for f in synced)}")
+        except Exception as e:
+            logger.error(f"Failed to sync agent workspace: {e}")
+
+        # Mark message as complete
+        LLM_TOOL_ROUNDS.labels("sdk").observe(tool_calls)
+        yield format_sse_event(
+            SSEEventType.MESSAGE_COMPLETE,
+            {"session_id": str(session_id)},
+        )
 
         # Save complete assistant message
         async with AsyncSessionLocal() as save_db:
-            assistant_msg = Message(
-                session_id=session_id_str,
-                role="assistant",
-                content=accumulated_content,
-                created_at=datetime.utcnow(),
-            )
-            save_db.add(assistant_msg)
-            await save_db.commit()
+            with span("db.save_assistant_message"):
+                assistant_msg = Message(
+                    session_id=session_id_str,
+                    role="assistant",
+                    content=accumulated_content,
+                    created_at=datetime.utcnow(),
+                )
+                save_db.add(assistant_msg)
+                await save_db.commit()
+                message_id = assistant_msg.id
 
             # Verify game projects
             project_result = await save_db.execute(
@@ -200,37 +283,55 @@ async def stream_claude_response_sdk(
                             save_db, str(session_with_project.project_id), "Needs fixes"
                         )
                         await save_db.commit()
+                        outcome = "verification_failed"
                         return
                     else:
                         logger.info(f"✅ Verification PASSED")
 
                 except Exception as e:
                     logger.error(f"❌ Verification exception: {e}", exc_info=True)
+                    cache_starter = False
 
             # Mark complete
             await StatusService.set_complete(save_db, str(session.project_id), "Ready for review")
 
+            # Later projects with the same first request get this turn from the cache
+            if cache_starter:
+                await remember_starter(save_db, session.project, user_message, accumulated_content)
+
         # Emit complete status
+        outcome = "success"
         yield emit_status_event(WorkPhase.COMPLETE, "Done", 1.0)
 
+    except asyncio.CancelledError:
+        # Cancelled by the user, or the client went away; the agent turn is already interrupted
+        outcome = "cancelled"
+        absorbed = turn is not None and turn.absorb()
+        # Usage only arrives with the result; estimate from the streamed text until then
+        output_tokens = output_tokens or len(accumulated_content) // CHARS_PER_TOKEN
+        if reservation is not None:
+            rate_limiter.settle(reservation, reservation.input_tokens, output_tokens)
+        report = await finish_cancelled_turn(
+            "sdk", turn, turn_start, output_tokens, session_id_str, project_id, accumulated_content, message_id
+        )
+        if not absorbed:
+            raise
+        yield format_sse_event(SSEEventType.CANCELLED, report)
+
     except Exception as e:
+        outcome = "error"
         logger.error(f"Error in SDK streaming: {e}", exc_info=True)
         yield format_sse_event(
             SSEEventType.ERROR,
             {"error": str(e)},
         )
 
+    finally:
+        if reservation is not None:
+            # No usage was reported (the turn failed): release what was reserved
+            rate_limiter.settle(reservation, 0, 0)
+        duration = time.perf_counter() - turn_start
+        LLM_TURN_DURATION.labels("sdk", outcome).observe(duration)
+        if outcome in ("success", "verification_failed"):
+            record_completed_turn("sdk", duration, output_tokens)
 
-def _guess_mime_type(filename: str) -> str:
-    """Guess MIME type from filename extension"""
-    ext = Path(filename).suffix.lower()
-    mime_types = {
-        '.html': 'text/html',
-        '.css': 'text/css',
-        '.js': 'application/javascript',
-        '.json': 'application/json',
-        '.txt': 'text/plain',
-        '.md': 'text/markdown',
-        '.py': 'text/x-python',
-    }
-    return mime_types.get(ext, 'text/plain')
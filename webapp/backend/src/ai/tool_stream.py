@@ -0,0 +1,324 @@
+"""Incremental parsing of streamed tool input for live file writes."""
+
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Minimum growth (in bytes) between two file_progress events for the same file
+PROGRESS_INTERVAL_BYTES = 4096
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+# Parser states
+_EXPECT_OBJECT = 0
+_EXPECT_KEY = 1
+_IN_KEY = 2
+_EXPECT_COLON = 3
+_EXPECT_VALUE = 4
+_IN_STRING_VALUE = 5
+_IN_OTHER_VALUE = 6
+_EXPECT_COMMA = 7
+_DONE = 8
+
+
+class IncrementalJSONObjectParser:
+    """Incrementally extract top-level string fields from a streamed JSON object.
+
+    Tool input arrives as ``input_json`` deltas: arbitrary fragments of a JSON
+    object such as ``{"filename": "ga`` followed by ``me.html", "content": "<ht``.
+    Fields listed in ``stream_fields`` are reported chunk by chunk as they are
+    decoded; all other string fields are buffered into ``values``. Non-string
+    values are skipped.
+    """
+
+    def __init__(self, stream_fields: set[str]):
+        """Initialize parser.
+
+        Args:
+            stream_fields: Names of top-level string fields to emit incrementally
+        """
+        self.stream_fields = stream_fields
+        self.values: dict[str, str] = {}
+        self.completed: set[str] = set()
+        self._state = _EXPECT_OBJECT
+        self._key = ""
+        self._current_key = ""
+        self._escape: str | None = None
+        self._high_surrogate: int | None = None
+        self._depth = 0
+        self._in_nested_string = False
+        self._nested_escape = False
+
+    @property
+    def done(self) -> bool:
+        """Whether the closing brace of the object has been seen."""
+        return self._state == _DONE
+
+    def feed(self, fragment: str) -> list[tuple[str, str]]:
+        """Consume a JSON fragment.
+
+        Args:
+            fragment: Next piece of the JSON document
+
+        Returns:
+            List of (field, decoded_text) chunks for streamed fields
+        """
+        chunks: list[tuple[str, str]] = []
+        pending: list[str] = []
+        i = 0
+        length = len(fragment)
+
+        while i < length:
+            state = self._state
+
+            if state == _IN_STRING_VALUE:
+                if self._escape is None:
+                    # Fast path: copy the run of plain characters in one slice
+                    j = i
+                    while j < length and fragment[j] not in '"\\':
+                        j += 1
+                    if j > i:
+                        self._flush_surrogate(pending)
+                        pending.append(fragment[i:j])
+                        i = j
+                        continue
+                    char = fragment[i]
+                    i += 1
+                    if char == '"':
+                        self._flush_surrogate(pending)
+                        self._end_value(pending, chunks)
+                    else:
+                        self._escape = ""
+                    continue
+
+                self._escape += fragment[i]
+                i += 1
+                self._decode_escape(pending)
+                continue
+
+            char = fragment[i]
+            i += 1
+
+            if state == _EXPECT_OBJECT:
+                if char == "{":
+                    self._state = _EXPECT_KEY
+            elif state == _EXPECT_KEY:
+                if char == '"':
+                    self._key = ""
+                    self._state = _IN_KEY
+                elif char == "}":
+                    self._state = _DONE
+            elif state == _IN_KEY:
+                # Keys in tool schemas are plain identifiers; escapes are kept verbatim
+                if char == '"' and not self._key.endswith("\\"):
+                    self._current_key = self._key
+                    self._state = _EXPECT_COLON
+                else:
+                    self._key += char
+            elif state == _EXPECT_COLON:
+                if char == ":":
+                    self._state = _EXPECT_VALUE
+            elif state == _EXPECT_VALUE:
+                if char == '"':
+                    self._state = _IN_STRING_VALUE
+                    self._escape = None
+                    pending.clear()
+                elif not char.isspace():
+                    self._depth = 1 if char in "[{" else 0
+                    self._in_nested_string = False
+                    self._state = _IN_OTHER_VALUE
+                    if self._depth == 0:
+                        i -= 1  # Re-examine scalar start (e.g. digits) in skip state
+            elif state == _IN_OTHER_VALUE:
+                i = self._skip_other_value(fragment, i - 1)
+            elif state == _EXPECT_COMMA:
+                if char == ",":
+                    self._state = _EXPECT_KEY
+                elif char == "}":
+                    self._state = _DONE
+
+        if self._state == _IN_STRING_VALUE and pending:
+            self._emit(pending, chunks)
+
+        return chunks
+
+    def _skip_other_value(self, fragment: str, i: int) -> int:
+        """Skip over a non-string value (number, literal, array or object)."""
+        length = len(fragment)
+        while i < length:
+            char = fragment[i]
+            if self._in_nested_string:
+                if self._nested_escape:
+                    self._nested_escape = False
+                elif char == "\\":
+                    self._nested_escape = True
+                elif char == '"':
+                    self._in_nested_string = False
+            elif char == '"':
+                self._in_nested_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                if self._depth == 0:
+                    # End of enclosing object right after a scalar
+                    self._state = _DONE
+                    return i + 1
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = _EXPECT_COMMA
+                    return i + 1
+            elif char == "," and self._depth == 0:
+                self._state = _EXPECT_KEY
+                return i + 1
+            i += 1
+        return i
+
+    def _decode_escape(self, pending: list[str]) -> None:
+        """Decode the buffered escape sequence once it is complete."""
+        escape = self._escape
+        if escape[0] != "u":
+            self._flush_surrogate(pending)
+            pending.append(_SIMPLE_ESCAPES.get(escape, escape))
+            self._escape = None
+            return
+
+        if len(escape) < 5:
+            return  # Wait for all four hex digits
+
+        self._escape = None
+        try:
+            code = int(escape[1:], 16)
+        except ValueError:
+            self._flush_surrogate(pending)
+            pending.append("\ufffd")
+            return
+
+        if 0xD800 <= code <= 0xDBFF:
+            self._flush_surrogate(pending)
+            self._high_surrogate = code
+        elif 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            combined = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            pending.append(chr(combined))
+        else:
+            self._flush_surrogate(pending)
+            pending.append(chr(code) if not 0xDC00 <= code <= 0xDFFF else "\ufffd")
+
+    def _flush_surrogate(self, pending: list[str]) -> None:
+        """Replace an unpaired high surrogate with U+FFFD."""
+        if self._high_surrogate is not None:
+            self._high_surrogate = None
+            pending.append("\ufffd")
+
+    def _emit(self, pending: list[str], chunks: list[tuple[str, str]]) -> None:
+        """Hand decoded text to the caller or buffer it into values."""
+        text = "".join(pending)
+        pending.clear()
+        if not text:
+            return
+        if self._current_key in self.stream_fields:
+            chunks.append((self._current_key, text))
+        else:
+            self.values[self._current_key] = self.values.get(self._current_key, "") + text
+
+    def _end_value(self, pending: list[str], chunks: list[tuple[str, str]]) -> None:
+        """Finish the current string value."""
+        self._emit(pending, chunks)
+        self.values.setdefault(self._current_key, "")
+        self.completed.add(self._current_key)
+        self._state = _EXPECT_COMMA
+
+
+class ToolInputStream:
+    """Streams the ``content`` of a ``create_file`` tool call into a temp file.
+
+    The temp file lives next to its final destination so that committing it
+    is a single atomic rename (see ``FileService.commit_partial_file``).
+    """
+
+    def __init__(self, block_id: str, partial_path: Path):
+        """Initialize the stream.
+
+        Args:
+            block_id: ID of the tool_use content block
+            partial_path: Temp file to append content to
+        """
+        self.block_id = block_id
+        self.partial_path = partial_path
+        self.bytes_written = 0
+        self.announced = False
+        self._parser = IncrementalJSONObjectParser(stream_fields={"content"})
+        self._reported_bytes = 0
+        self._handle = None
+
+    @property
+    def filename(self) -> str | None:
+        """File name, once the ``filename`` field has been fully received."""
+        if "filename" in self._parser.completed:
+            return self._parser.values["filename"]
+        return None
+
+    @property
+    def mime_type(self) -> str:
+        """MIME type from tool input, defaulting to text/plain."""
+        return self._parser.values.get("mime_type") or "text/plain"
+
+    @property
+    def has_content(self) -> bool:
+        """Whether any file content has been written."""
+        return self.bytes_written > 0
+
+    def feed(self, partial_json: str) -> int:
+        """Consume an ``input_json`` delta and append decoded content.
+
+        Args:
+            partial_json: JSON fragment from the stream
+
+        Returns:
+            Number of bytes appended to the temp file
+        """
+        written = 0
+        for _field, text in self._parser.feed(partial_json):
+            data = text.encode("utf-8")
+            if self._handle is None:
+                self.partial_path.parent.mkdir(parents=True, exist_ok=True)
+                self._handle = self.partial_path.open("wb")
+            self._handle.write(data)
+            written += len(data)
+
+        if written:
+            # Flush so readers polling the temp file see it grow
+            self._handle.flush()
+            self.bytes_written += written
+        return written
+
+    def should_report_progress(self) -> bool:
+        """Whether enough new bytes arrived to emit a progress event."""
+        if self.bytes_written - self._reported_bytes >= PROGRESS_INTERVAL_BYTES:
+            self._reported_bytes = self.bytes_written
+            return True
+        return False
+
+    def close(self) -> None:
+        """Close the temp file handle."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def discard(self) -> None:
+        """Close and remove the temp file (e.g. when the stream fails)."""
+        self.close()
+        try:
+            self.partial_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to remove partial file {self.partial_path}: {e}")
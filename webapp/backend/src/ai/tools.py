@@ -2,7 +2,7 @@
 
 FILE_TOOL = {
     "name": "create_file",
-    "description": "Create or update a file in the project. Use this to generate code, HTML, CSS, JavaScript, or any other file content.",
+    "description": "Create a new file in the project, or rewrite one completely. Use this to generate code, HTML, CSS, JavaScript, or any other file content. To change part of an existing file, use edit_file or apply_patch instead.",
     "input_schema": {
         "type": "object",
         "properties": {
@@ -23,9 +23,76 @@ FILE_TOOL = {
     },
 }
 
+READ_FILE_TOOL = {
+    "name": "read_file",
+    "description": "Read the current content of a project file. Use this before edit_file or apply_patch so your edits match the file exactly.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "filename": {
+                "type": "string",
+                "description": "Name of the file to read (e.g., 'game.html')",
+            },
+        },
+        "required": ["filename"],
+    },
+}
+
+EDIT_FILE_TOOL = {
+    "name": "edit_file",
+    "description": "Change part of an existing project file by exact search and replace. Each old_text must appear exactly once in the file; include a few surrounding lines to make it unique. Edits are applied in order, and none are applied if any of them does not match. Much faster than rewriting the file with create_file.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "filename": {
+                "type": "string",
+                "description": "Name of the file to edit",
+            },
+            "edits": {
+                "type": "array",
+                "description": "Replacements to make",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "old_text": {
+                            "type": "string",
+                            "description": "Exact text currently in the file, including whitespace",
+                        },
+                        "new_text": {
+                            "type": "string",
+                            "description": "Text to put in its place",
+                        },
+                    },
+                    "required": ["old_text", "new_text"],
+                },
+            },
+        },
+        "required": ["filename", "edits"],
+    },
+}
+
+APPLY_PATCH_TOOL = {
+    "name": "apply_patch",
+    "description": "Change an existing project file with a unified diff (@@ hunks with context, - and + lines). Hunks apply where their context matches; none are applied if any hunk does not match.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "filename": {
+                "type": "string",
+                "description": "Name of the file to patch",
+            },
+            "patch": {
+                "type": "string",
+                "description": "Unified diff for this one file",
+            },
+        },
+        "required": ["filename", "patch"],
+    },
+}
+
 UPDATE_PROJECT_NAME_TOOL = {
     "name": "update_project_name",
-    "description": "Update the project name to reflect what is being built. Call this on the first message to give the project a descriptive name based on the user's request.",
+    "description": "Rename the project. New projects are named automatically from the first message; only call this when the user asks for a different name or the project's focus has clearly changed.",
     "input_schema": {
         "type": "object",
         "properties": {
@@ -38,4 +105,4 @@ UPDATE_PROJECT_NAME_TOOL = {
     },
 }
 
-TOOLS = [FILE_TOOL, UPDATE_PROJECT_NAME_TOOL]
+TOOLS = [FILE_TOOL, READ_FILE_TOOL, EDIT_FILE_TOOL, APPLY_PATCH_TOOL, UPDATE_PROJECT_NAME_TOOL]
@@ -0,0 +1,41 @@
+"""Debug endpoints for diagnosing slow requests and a blocked event loop."""
+
+from fastapi import APIRouter
+from fastapi import Query
+
+from ..observability.loop import loop_watchdog
+from ..observability.tracing import trace_store
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/traces")
+async def get_slowest_traces(
+    limit: int = Query(10, ge=1, le=100, description="Number of traces to return"),
+):
+    """Get the slowest recent traces with their span waterfall.
+
+    Args:
+        limit: Number of traces to return
+
+    Returns:
+        Traces, slowest first. Spans are in start order with ``offset_ms``
+        from the trace start and ``depth`` for indentation.
+    """
+    return {"traces": trace_store.slowest(limit)}
+
+
+@router.get("/loop-stalls")
+async def get_loop_stalls(
+    limit: int = Query(20, ge=1, le=200, description="Number of stacks to return"),
+):
+    """Get the stacks sampled while the event loop was blocked.
+
+    Args:
+        limit: Number of stacks to return
+
+    Returns:
+        Stall count, the most-sampled stacks (each with the innermost
+        application frame as ``site``) and the most recent stalls
+    """
+    return loop_watchdog.report(limit)
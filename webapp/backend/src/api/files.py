@@ -3,11 +3,19 @@
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Request
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..config import settings
 from ..database.connection import get_db
+from ..services import ProjectService
+from ..services import SessionService
 from ..services.file_service import FileService
+from ..services.file_version_service import FileVersionService
+from ..services.upload_service import InvalidUpload
+from ..services.upload_service import UploadService
+from ..services.upload_service import UploadTooLarge
 
 router = APIRouter(prefix="/api", tags=["files"])
 
@@ -41,6 +49,65 @@ async def get_project_files(
     ]
 
 
+@router.post("/projects/{project_id}/uploads", status_code=201)
+async def upload_files(
+    project_id: str,
+    request: Request,
+    session_id: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Upload user assets as a streamed multipart/form-data body.
+
+    Each file part becomes a project file; refer to it in a message with an
+    ``{"type": "upload", "file_id": ...}`` content block.
+
+    Args:
+        project_id: Project ID
+        request: Request whose body is streamed to disk
+        session_id: Session the upload belongs to
+        db: Database session
+
+    Returns:
+        The uploaded files
+    """
+    project = await ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if session_id is not None:
+        session = await SessionService.get_session(db, session_id)
+        if not session or session.project_id != project_id:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+    try:
+        files = await UploadService.receive(
+            db,
+            project_id,
+            session_id,
+            request.headers.get("content-type", ""),
+            request.stream(),
+            settings.upload_max_bytes,
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return [
+        {
+            "id": str(file.id),
+            "project_id": str(file.project_id),
+            "session_id": str(file.session_id) if file.session_id else None,
+            "name": file.name,
+            "mime_type": file.mime_type,
+            "size": file.size,
+            "created_at": file.created_at.isoformat(),
+            # Image normalization still running in the background
+            "normalizing": UploadService.normalizing(file.id) is not None,
+        }
+        for file in files
+    ]
+
+
 @router.get("/files/{file_id}")
 async def get_file(
     file_id: str,
@@ -116,6 +183,103 @@ async def download_file(
     )
 
 
+@router.get("/files/{file_id}/versions")
+async def get_file_versions(
+    file_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get a file's version history.
+
+    Args:
+        file_id: File ID
+        db: Database session
+
+    Returns:
+        List of versions, newest first
+    """
+    file = await FileService.get_file(db, file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    versions = await FileVersionService.list_versions(db, file_id)
+    return [
+        {
+            "version": version.version,
+            "session_id": str(version.session_id) if version.session_id else None,
+            "size": version.size,
+            "sha256": version.sha256,
+            "created_at": version.created_at.isoformat(),
+        }
+        for version in versions
+    ]
+
+
+@router.get("/files/{file_id}/diff")
+async def diff_file_versions(
+    file_id: str,
+    from_version: int,
+    to_version: int | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get a unified diff between two versions of a text file.
+
+    Args:
+        file_id: File ID
+        from_version: Older version
+        to_version: Newer version (defaults to the latest)
+        db: Database session
+
+    Returns:
+        Unified diff
+    """
+    file = await FileService.get_file(db, file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if to_version is None:
+        to_version = await FileVersionService.latest_version(db, file_id)
+    try:
+        diff = await FileVersionService.diff(db, file, from_version, to_version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+
+    return {"from_version": from_version, "to_version": to_version, "diff": diff}
+
+
+@router.post("/files/{file_id}/versions/{version}/restore")
+async def restore_file_version(
+    file_id: str,
+    version: int,
+    db: AsyncSession = Depends(get_db),
+):
+    """Restore an earlier version of a file as its newest version.
+
+    Args:
+        file_id: File ID
+        version: Version to restore
+        db: Database session
+
+    Returns:
+        Updated file details
+    """
+    file = await FileService.get_file(db, file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    restored = await FileService.restore_version(db, file, version)
+    if restored is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+
+    return {
+        "id": str(restored.id),
+        "name": restored.name,
+        "size": restored.size,
+        "version": await FileVersionService.latest_version(db, file_id),
+    }
+
+
 @router.delete("/files/{file_id}")
 async def delete_file(
     file_id: str,
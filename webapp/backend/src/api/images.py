@@ -0,0 +1,56 @@
+"""Image API endpoints (images referenced by compact message listings)."""
+
+from fastapi import APIRouter
+from fastapi import HTTPException
+from fastapi import Path
+from fastapi import Query
+from fastapi.responses import FileResponse
+
+from ..services.message_images import DEFAULT_THUMBNAIL_SIZE
+from ..services.message_images import image_store
+
+router = APIRouter(prefix="/api", tags=["images"])
+
+DIGEST_PATTERN = "^[0-9a-f]{64}$"
+# Content-addressed: a URL always serves the same bytes
+IMMUTABLE = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+@router.get("/images/{digest}")
+async def get_image(digest: str = Path(..., pattern=DIGEST_PATTERN)):
+    """Get an image taken out of message content.
+
+    Args:
+        digest: Image digest
+
+    Returns:
+        Image file
+    """
+    found = image_store.path(digest)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, media_type = found
+    return FileResponse(path, media_type=media_type, headers=IMMUTABLE)
+
+
+@router.get("/images/{digest}/thumbnail")
+async def get_image_thumbnail(
+    digest: str = Path(..., pattern=DIGEST_PATTERN),
+    size: int = Query(DEFAULT_THUMBNAIL_SIZE, ge=16, le=1024),
+):
+    """Get a JPEG thumbnail of an image, made on first request and cached.
+
+    Args:
+        digest: Image digest
+        size: Maximum width and height in pixels
+
+    Returns:
+        Thumbnail file
+    """
+    try:
+        path = await image_store.thumbnail(digest, size)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path, media_type="image/jpeg", headers=IMMUTABLE)
@@ -1,7 +1,12 @@
 """Message API endpoints."""
 
+import logging
+from typing import Literal
+from uuid import UUID
+
 from fastapi import APIRouter
 from fastapi import Depends
+from fastapi import Header
 from fastapi import HTTPException
 from fastapi import Query
 from fastapi import status
@@ -11,13 +16,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sse_starlette.sse import EventSourceResponse
 
 from ..ai.streaming import stream_claude_response
-from ..config import settings
 from ..database import MessageRole
 from ..database import MessageStatus
 from ..database import get_db
 from ..services import MessageService
 from ..services import SessionService
-
+from ..services.generation_scheduler import SchedulerOverloaded
+from ..services.generation_scheduler import generation_scheduler
+from ..services.idempotency import MAX_KEY_LENGTH
+from ..services.idempotency import IdempotencyConflict
+from ..services.idempotency import IdempotentRequestFailed
+from ..services.idempotency import idempotency_service
+from ..services.idempotency import request_fingerprint
+from ..services.message_images import compact_content
+from .streaming import open_turn_stream
+
+logger = logging.getLogger(__name__)
 router = APIRouter(tags=["messages"])
 
 
@@ -28,6 +42,21 @@ class MessageCreate(BaseModel):
     content: str = Field(..., min_length=1)
 
 
+class ContentBlockInfo(BaseModel):
+    """Summary of one content block of a structured message."""
+
+    type: str
+    # Text blocks
+    chars: int | None = None
+    # Upload references
+    file_id: str | None = None
+    # Image blocks
+    media_type: str | None = None
+    bytes: int | None = None
+    url: str | None = None
+    thumbnail_url: str | None = None
+
+
 class MessageResponse(BaseModel):
     """Message response."""
 
@@ -37,6 +66,8 @@ class MessageResponse(BaseModel):
     content: str
     status: MessageStatus
     created_at: str
+    # Set in compact listings (images=ref) for messages made of content blocks
+    blocks: list[ContentBlockInfo] | None = None
 
     class Config:
         from_attributes = True
@@ -66,18 +97,29 @@ async def send_message(
     session_id: str,
     message: MessageCreate,
     stream: bool = Query(False, description="Enable SSE streaming"),
+    idempotency_key: str | None = Header(None, max_length=MAX_KEY_LENGTH),
     db: AsyncSession = Depends(get_db),
 ):
     """Send a message and get AI response.
 
+    A request repeating an ``Idempotency-Key`` of this session gets the
+    first request's result (followed live if it is still running) instead
+    of a new generation.
+
     Args:
         session_id: Session ID
         message: Message content
         stream: If True, return SSE stream; if False, return complete response
+        idempotency_key: Optional ``Idempotency-Key`` header
         db: Database session
 
     Returns:
         SSE stream (if stream=True) or MessagePairResponse (if stream=False)
+
+    Raises:
+        HTTPException: 404 if session not found, 422 if the idempotency key was
+            used for a different request, 409 if the keyed request it repeats
+            failed, 503 if the generation queue is full
     """
     # Verify session exists
     session = await SessionService.get_session(db, session_id)
@@ -89,57 +131,88 @@ async def send_message(
 
     # If streaming requested, return SSE response
     if stream:
-
-        async def event_generator():
-            """Generate SSE events from Claude streaming response."""
+        sse_headers = {
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+        try:
+            events = await open_turn_stream(
+                db, UUID(session_id), session.project_id, message.content, idempotency_key, stream_claude_response
+            )
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except SchedulerOverloaded as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        return EventSourceResponse(events, headers=sse_headers)
+
+    recording = None
+    if idempotency_key:
+        try:
+            recording, owner = await idempotency_service.claim(
+                db, session_id, idempotency_key, request_fingerprint("message", message.content)
+            )
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if not owner:
             try:
-                from uuid import UUID
-                async for event in stream_claude_response(
-                    session_id=UUID(session_id),
-                    user_message=message.content,
-                    db=db,
-                    api_key=settings.anthropic_api_key,
-                ):
-                    yield event
-            except Exception as e:
-                logger.error(f"Stream error: {e}", exc_info=True)
-                yield f'data: {{"type": "error", "error": "{str(e)}"}}\n\n'
-
-        return EventSourceResponse(
-            event_generator(),
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",
-            },
-        )
+                return await recording.wait()
+            except IdempotentRequestFailed as e:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
     # Otherwise, use synchronous response (Phase 1 behavior)
     try:
-        user_msg, ai_msg = await MessageService.send_user_message(
-            db,
-            session_id=session_id,
-            content=message.content,
-        )
-
-        return MessagePairResponse(
+        async with generation_scheduler.admit(session_id, session.project_id):
+            user_msg, ai_msg = await MessageService.send_user_message(
+                db,
+                session_id=session_id,
+                content=message.content,
+            )
+
+        response = MessagePairResponse(
             user_message=MessageResponse.model_validate(user_msg),
             ai_message=MessageResponse.model_validate(ai_msg),
         )
+        if recording is not None:
+            await recording.finish(response.model_dump(mode="json"))
+        return response
 
+    except SchedulerOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to send message: {str(e)}",
         )
+    finally:
+        if recording is not None and not recording.done:
+            # Forgotten, so a retry runs the request again
+            await recording.fail()
 
 
 @router.get("/api/sessions/{session_id}/messages", response_model=list[MessageResponse])
 async def get_session_messages(
     session_id: str,
+    images: Literal["inline", "ref"] = Query(
+        "inline", description="'ref' replaces inline image data with cacheable image URLs"
+    ),
     db: AsyncSession = Depends(get_db),
 ) -> list[MessageResponse]:
-    """Get all messages for a session."""
+    """Get all messages for a session.
+
+    With ``images=ref`` the base64 data of pasted images is replaced by
+    content-hashed ``/api/images/{digest}`` URLs, and messages made of
+    content blocks get a ``blocks`` summary (text lengths, image sizes,
+    thumbnail URLs).
+    """
     # Verify session exists
     session = await SessionService.get_session(db, session_id)
     if not session:
@@ -149,4 +222,10 @@ async def get_session_messages(
         )
 
     messages = await MessageService.get_session_messages(db, session_id)
-    return [MessageResponse.model_validate(m) for m in messages]
+    responses = [MessageResponse.model_validate(m) for m in messages]
+    if images == "ref":
+        for response in responses:
+            response.content, blocks = await compact_content(response.content)
+            if blocks is not None:
+                response.blocks = [ContentBlockInfo(**block) for block in blocks]
+    return responses
@@ -1,20 +1,45 @@
 """Project API endpoints."""
 
+import re
+import tempfile
+
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Request
 from fastapi import status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pydantic import Field
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sse_starlette.sse import EventSourceResponse
 
+from ..ai.events import SSEEventType
+from ..ai.events import format_broadcast_event
+from ..ai.events import format_sse_event
+from ..config import settings
 from ..database import ProjectStatus
 from ..database import ProjectType
 from ..database import get_db
+from ..database.models import Project
 from ..services import ProjectService
+from ..services.project_archive import ArchiveTooLarge
+from ..services.project_archive import InvalidArchiveError
+from ..services.project_archive import export_project
+from ..services.project_archive import import_project
+from ..services.project_events import Subscription
+from ..services.project_events import project_events
+from ..services.status_service import status_store
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
+# Uploaded archives are kept in memory up to this size, then spill to disk
+IMPORT_SPOOL_BYTES = 16 * 1024 * 1024
+# Projects one event stream can follow
+MAX_SUBSCRIBED_PROJECTS = 500
+
 
 # Request/Response Models
 class ProjectCreate(BaseModel):
@@ -33,6 +58,12 @@ class ProjectUpdate(BaseModel):
     status: ProjectStatus | None = None
 
 
+class ProjectEventsUpdate(BaseModel):
+    """Projects an event stream follows from now on."""
+
+    project_ids: list[str] = Field(..., max_length=MAX_SUBSCRIBED_PROJECTS)
+
+
 class ProjectResponse(BaseModel):
     """Project response."""
 
@@ -49,12 +80,14 @@ class ProjectResponse(BaseModel):
     @classmethod
     def from_model(cls, project) -> "ProjectResponse":
         """Convert from database model."""
+        # The row may not have caught up with the write-behind status yet
+        cached = status_store.peek(project.id)
         return cls(
             id=project.id,
             name=project.name,
             description=project.description,
             type=project.type,
-            status=project.status,
+            status=cached.status if cached else project.status,
             created_at=project.created_at.isoformat() + "Z",
             updated_at=project.updated_at.isoformat() + "Z",
         )
@@ -85,6 +118,149 @@ async def get_all_projects(
     return [ProjectResponse.from_model(p) for p in projects]
 
 
+async def _subscribe_snapshot(db: AsyncSession, subscription: Subscription, project_ids: set[str]) -> list[str]:
+    """Queue the current status of newly followed projects.
+
+    Returns:
+        Requested projects that don't exist (they are not followed)
+    """
+    if not project_ids:
+        return []
+    result = await db.execute(select(Project.id, Project.name, Project.status).where(Project.id.in_(project_ids)))
+    found = set()
+    for project_id, name, project_status in result.all():
+        found.add(project_id)
+        # The row may not have caught up with the write-behind status yet
+        cached = status_store.peek(project_id)
+        subscription.offer(
+            project_id,
+            "status",
+            {
+                "type": SSEEventType.STATUS_UPDATE.value,
+                "project_id": project_id,
+                "name": name,
+                "status": (cached.status if cached else project_status).value,
+                "status_message": cached.message if cached else None,
+                "status_context": cached.context if cached else None,
+                "snapshot": True,
+            },
+        )
+    missing = sorted(project_ids - found)
+    if missing:
+        project_events.update(subscription, subscription.project_ids - set(missing))
+    return missing
+
+
+@router.get("/events")
+async def stream_project_events(
+    project_id: list[str] = Query(..., max_length=MAX_SUBSCRIBED_PROJECTS, description="Projects to follow"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Follow many projects over one SSE connection.
+
+    The stream opens with a ``subscribed`` event carrying the subscription
+    ID (to change the followed projects with ``PUT /api/projects/events/{id}``),
+    then the current status of each project, then ``status_update``,
+    ``file_created``, ``verification`` and ``project_renamed`` events tagged
+    with their ``project_id``. Events are coalesced per project; a
+    ``resync`` event means some were dropped and the client should refetch.
+    """
+    subscription = project_events.subscribe(project_id)
+    try:
+        # Subscribed first: changes made while the snapshot is read arrive after it
+        missing = await _subscribe_snapshot(db, subscription, set(project_id))
+    except BaseException:
+        project_events.unsubscribe(subscription)
+        raise
+
+    async def event_generator():
+        try:
+            yield format_sse_event(
+                SSEEventType.SUBSCRIBED,
+                {
+                    "subscription_id": subscription.id,
+                    "project_ids": sorted(subscription.project_ids),
+                    "missing": missing,
+                },
+            )
+            async for event in subscription.events():
+                yield format_broadcast_event(event)
+        finally:
+            project_events.unsubscribe(subscription)
+
+    return EventSourceResponse(
+        event_generator(),
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.put("/events/{subscription_id}")
+async def update_project_events(
+    subscription_id: str,
+    update: ProjectEventsUpdate,
+    db: AsyncSession = Depends(get_db),
+):
+    """Change the projects an open event stream follows.
+
+    Newly followed projects get their current status on the stream.
+    """
+    subscription = project_events.get(subscription_id)
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event stream {subscription_id} not found",
+        )
+    added = project_events.update(subscription, update.project_ids)
+    missing = await _subscribe_snapshot(db, subscription, added)
+    return {"subscription_id": subscription.id, "project_ids": sorted(subscription.project_ids), "missing": missing}
+
+
+@router.post("/import", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
+async def import_project_archive(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+) -> ProjectResponse:
+    """Create a project from a ZIP archive sent as the request body."""
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as archive:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            # Checked as the body arrives, so an oversized upload never reaches the disk whole
+            if received > settings.import_max_bytes:
+                raise HTTPException(
+                    status_code=413, detail=f"Project archives are limited to {settings.import_max_bytes} bytes"
+                )
+            archive.write(chunk)
+        archive.seek(0)
+        try:
+            project = await import_project(db, archive, settings.import_max_unpacked_bytes)
+        except ArchiveTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except InvalidArchiveError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ProjectResponse.from_model(project)
+
+
+@router.get("/{project_id}/export")
+async def export_project_archive(
+    project_id: str,
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Download a project (files, sessions and messages) as a streamed ZIP archive."""
+    project = await ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project {project_id} not found",
+        )
+    filename = re.sub(r"[^A-Za-z0-9._-]+", "-", project.name).strip("-") or "project"
+    return StreamingResponse(
+        export_project(db, project),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'},
+    )
+
+
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: str,
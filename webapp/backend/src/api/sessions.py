@@ -8,6 +8,7 @@ from pydantic import BaseModel
 from pydantic import Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..ai.images import image_preparer
 from ..database import SessionStatus
 from ..database import get_db
 from ..services import ProjectService
@@ -23,6 +24,16 @@ class SessionCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
 
 
+class ImageSavingsResponse(BaseModel):
+    """Image preparation savings of a session."""
+
+    images: int
+    original_bytes: int
+    prepared_bytes: int
+    bytes_saved: int
+    tokens_saved: int
+
+
 class SessionResponse(BaseModel):
     """Session response."""
 
@@ -105,3 +116,22 @@ async def get_session(
             detail=f"Session {session_id} not found",
         )
     return SessionResponse.model_validate(session)
+
+
+@router.get("/api/sessions/{session_id}/image-savings", response_model=ImageSavingsResponse)
+async def get_session_image_savings(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+) -> ImageSavingsResponse:
+    """Get the request bytes and image tokens saved by downscaling the session's images.
+
+    Counted per image sent, over every turn since the server started
+    (history is resent each turn).
+    """
+    session = await SessionService.get_session(db, session_id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session {session_id} not found",
+        )
+    return ImageSavingsResponse(**image_preparer.savings(session_id).to_dict())
@@ -1,63 +1,251 @@
 """SSE streaming endpoints for real-time AI responses."""
 
 import logging
+import time
+from collections.abc import AsyncGenerator
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from contextlib import aclosing
 from uuid import UUID
 
 from fastapi import APIRouter
 from fastapi import Depends
+from fastapi import Header
+from fastapi import HTTPException
 from fastapi import Query
+from fastapi import status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sse_starlette.sse import EventSourceResponse
 
+from ..ai.cancellation import turn_registry
+from ..ai.events import SSEEventType
+from ..ai.events import format_broadcast_event
+from ..ai.events import format_sse_event
 from ..ai.streaming_sdk import stream_claude_response_sdk
 from ..config import settings
 from ..database import get_db
+from ..database.connection import AsyncSessionLocal
+from ..observability import span
+from ..services import SessionService
+from ..services.connection_manager import connection_manager
+from ..services.generation_scheduler import GenerationTicket
+from ..services.generation_scheduler import SchedulerOverloaded
+from ..services.generation_scheduler import generation_scheduler
+from ..services.idempotency import MAX_KEY_LENGTH
+from ..services.idempotency import IdempotencyConflict
+from ..services.idempotency import idempotency_service
+from ..services.idempotency import request_fingerprint
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Turn generator: stream_claude_response_sdk (Agent SDK) or stream_claude_response (Messages API)
+TurnStreamer = Callable[..., AsyncGenerator[str, None]]
+
 
 @router.get("/sessions/{session_id}/stream")
 async def stream_session(
     session_id: UUID,
     message: str = Query(..., description="User message to send"),
+    idempotency_key: str | None = Query(
+        None,
+        max_length=MAX_KEY_LENGTH,
+        description="Idempotency key (EventSource can't send the Idempotency-Key header)",
+    ),
+    idempotency_key_header: str | None = Header(None, alias="Idempotency-Key", max_length=MAX_KEY_LENGTH),
     db: AsyncSession = Depends(get_db),
 ):
     """SSE endpoint for real-time session updates.
 
+    A request repeating an idempotency key of this session follows the
+    first request's stream (live, or replayed once finished) instead of
+    starting a new generation.
+
     Args:
         session_id: ID of the session to stream
         message: User message to send to Claude
+        idempotency_key: Optional idempotency key
+        idempotency_key_header: Optional ``Idempotency-Key`` header (takes precedence)
         db: Database session
 
     Returns:
         EventSourceResponse with SSE stream
 
     Raises:
-        HTTPException: If session not found
+        HTTPException: 404 if session not found, 422 if the idempotency key was
+            used for a different request, 503 if the generation queue is full
     """
+    session = await SessionService.get_session(db, str(session_id))
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session {session_id} not found",
+        )
+
+    sse_headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no",  # Disable nginx buffering
+    }
+
+    try:
+        events = await open_turn_stream(
+            db, session_id, session.project_id, message, idempotency_key_header or idempotency_key
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SchedulerOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return EventSourceResponse(events, headers=sse_headers)
+
+
+async def open_turn_stream(
+    db: AsyncSession,
+    session_id: UUID,
+    project_id: str,
+    message: str,
+    idempotency_key: str | None = None,
+    streamer: TurnStreamer | None = None,
+) -> AsyncIterator[str]:
+    """Queue a turn and get its events, formatted as SSE ``data:`` lines.
+
+    Shared by the SSE endpoints and the WebSocket transport. A repeated
+    idempotency key follows the first request's stream instead.
+
+    Args:
+        db: Database session, used by the turn until its events end (a keyed
+            turn, which may outlive the request, opens its own)
+        session_id: Session ID
+        project_id: Project the session belongs to
+        message: User message
+        idempotency_key: Optional idempotency key
+        streamer: Turn generator (defaults to the Agent SDK)
 
-    async def event_generator():
-        """Generate SSE events from Claude streaming response."""
-        try:
-            async for event in stream_claude_response_sdk(
+    Returns:
+        The turn's events
+
+    Raises:
+        IdempotencyConflict: If the key was used for a different message
+        SchedulerOverloaded: If the generation queue is full
+    """
+    recording = None
+    if idempotency_key:
+        recording, owner = await idempotency_service.claim(
+            db, str(session_id), idempotency_key, request_fingerprint("stream", message)
+        )
+        if not owner:
+            return recording.follow()
+
+    try:
+        ticket = generation_scheduler.submit(str(session_id), project_id)
+    except SchedulerOverloaded:
+        if recording is not None:
+            await recording.fail()
+        raise
+
+    streamer = streamer or stream_claude_response_sdk
+    if recording is not None:
+        # Runs on its own task so a retry after a dropped connection can attach to it
+        recording.start(_detached_turn_events(session_id, message, ticket, streamer))
+        return recording.follow()
+    return _turn_events(db, session_id, message, ticket, streamer)
+
+
+async def _detached_turn_events(
+    session_id: UUID, message: str, ticket: GenerationTicket, streamer: TurnStreamer
+) -> AsyncGenerator[str, None]:
+    """Turn events on a database session of their own (the request's closes when its client drops)."""
+    async with AsyncSessionLocal() as db:
+        async with aclosing(_turn_events(db, session_id, message, ticket, streamer)) as events:
+            async for event in events:
+                yield event
+
+
+async def _turn_events(
+    db: AsyncSession, session_id: UUID, message: str, ticket: GenerationTicket, streamer: TurnStreamer
+) -> AsyncGenerator[str, None]:
+    """Generate SSE events from Claude streaming response."""
+    queue = await connection_manager.connect(session_id)
+    # Lets POST /api/sessions/{id}/cancel stop this turn (a queued turn only while none is running)
+    turn = turn_registry.queue(str(session_id))
+    try:
+        if not ticket.admitted:
+            # Don't hold a pooled connection while queued
+            await db.commit()
+        with span("scheduler.wait"):
+            async for position in turn.stream(ticket.wait()):
+                yield format_sse_event(
+                    SSEEventType.QUEUE_POSITION,
+                    {"position": position, "queue_depth": generation_scheduler.queue_depth},
+                )
+        if turn.cancelled:
+            # Cancelled while queued: nothing was generated
+            yield format_sse_event(SSEEventType.CANCELLED, {"reason": turn.reason, "queued": True})
+            return
+        turn_registry.admit(turn)
+        async for event in turn.stream(
+            streamer(
                 session_id=session_id,
                 user_message=message,
                 db=db,
                 api_key=settings.anthropic_api_key,
-            ):
-                yield event
+                turn=turn,
+            )
+        ):
+            yield event
+            # Events pushed to this session meanwhile (e.g. the project was named)
+            for pushed in connection_manager.pending(queue):
+                yield format_broadcast_event(pushed)
+        for pushed in connection_manager.pending(queue):
+            yield format_broadcast_event(pushed)
+
+    except Exception as e:
+        logger.error(f"Error in SSE stream: {e}", exc_info=True)
+        # Send error event before closing
+        yield f'data: {{"type": "error", "error": "{str(e)}"}}\n\n'
+
+    finally:
+        ticket.release()
+        turn_registry.finish(turn)
+        await connection_manager.disconnect(session_id, queue)
+
+
+@router.post("/sessions/{session_id}/cancel", status_code=status.HTTP_202_ACCEPTED)
+async def cancel_session_turn(
+    session_id: UUID,
+    db: AsyncSession = Depends(get_db),
+) -> dict:
+    """Cancel the turn currently streaming in a session.
+
+    The turn stops where it is (the upstream stream is closed, the agent is
+    interrupted), saves its partial reply as cancelled, and its stream ends
+    with a ``cancelled`` event reporting the seconds and tokens saved.
+
+    Args:
+        session_id: ID of the session
+        db: Database session
+
+    Returns:
+        Session ID and the seconds the turn had been running
+
+    Raises:
+        HTTPException: 404 if session not found, 409 if no turn is running
+    """
+    session = await SessionService.get_session(db, str(session_id))
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session {session_id} not found",
+        )
 
-        except Exception as e:
-            logger.error(f"Error in SSE stream: {e}", exc_info=True)
-            # Send error event before closing
-            yield f'data: {{"type": "error", "error": "{str(e)}"}}\n\n'
-
-    return EventSourceResponse(
-        event_generator(),
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",  # Disable nginx buffering
-        },
-    )
+    turn = turn_registry.cancel(str(session_id))
+    if turn is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"No turn is running in session {session_id}",
+        )
+    return {"session_id": str(session_id), "elapsed_seconds": round(time.perf_counter() - turn.started, 2)}
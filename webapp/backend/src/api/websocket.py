@@ -0,0 +1,268 @@
+"""WebSocket transport for streaming turns.
+
+Carries the same events as ``GET /api/sessions/{id}/stream``, but one
+socket can stream turns of several sessions at once and the client can
+talk back on it (cancel, acknowledge) instead of making separate requests.
+
+Server to client, one binary message per event::
+
+    channel (uint16) | seq (uint32) | event JSON (UTF-8)
+
+Both header fields are big endian. Each turn started on the socket gets its
+own channel; channel 0 carries socket events (``hello``, ``started``,
+``ended``, ``error``). ``seq`` numbers every frame sent on the socket. The
+first frame is ``{"type": "hello", "window": ...}``, announcing the window
+described below.
+
+Client to server, JSON text messages::
+
+    {"op": "start", "ref": 1, "session_id": "...", "message": "...", "idempotency_key": "..."}
+    {"op": "cancel", "channel": 3}
+    {"op": "ack", "seq": 120}
+
+The server sends at most ``window`` frames past the last acknowledged
+``seq``. Beyond that it stops reading from the turns, which wait as they
+would on a slow SSE connection, until the client acks. Clients should ack
+at least every ``window // 2`` frames. A disconnect
+cancels the socket's turns, like a dropped SSE stream.
+"""
+
+import asyncio
+import json
+import logging
+import struct
+from contextlib import aclosing
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter
+from fastapi import WebSocket
+
+from ..ai.cancellation import turn_registry
+from ..ai.events import sse_data
+from ..config import settings
+from ..database.connection import AsyncSessionLocal
+from ..observability.metrics import WS_ACTIVE_CONNECTIONS
+from ..observability.metrics import WS_BACKPRESSURE_WAITS
+from ..observability.metrics import WS_BYTES_SENT
+from ..services import SessionService
+from ..services.generation_scheduler import SchedulerOverloaded
+from ..services.idempotency import MAX_KEY_LENGTH
+from ..services.idempotency import IdempotencyConflict
+from .streaming import open_turn_stream
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+HEADER = struct.Struct(">HI")
+CONTROL_CHANNEL = 0
+MAX_CHANNEL = 0xFFFF
+
+# Open sockets, for the connection gauge
+_sockets: set["StreamSocket"] = set()
+WS_ACTIVE_CONNECTIONS.set_function(_sockets.__len__)
+
+
+def encode_frame(channel: int, seq: int, payload: str) -> bytes:
+    """Frame an event's JSON for the socket.
+
+    Args:
+        channel: Channel of the turn (0 for socket events)
+        seq: Frame sequence number on the socket
+        payload: Event JSON
+
+    Returns:
+        Binary message
+    """
+    return HEADER.pack(channel, seq) + payload.encode()
+
+
+def decode_frame(frame: bytes) -> tuple[int, int, dict[str, Any]]:
+    """Split a binary message into (channel, seq, event)."""
+    channel, seq = HEADER.unpack_from(frame)
+    return channel, seq, json.loads(frame[HEADER.size :])
+
+
+class StreamSocket:
+    """One client's WebSocket and the turns streamed on it."""
+
+    def __init__(self, websocket: WebSocket, window: int, max_channels: int):
+        """Initialize socket.
+
+        Args:
+            websocket: Accepted WebSocket
+            window: Frames sent ahead of the client's acks
+            max_channels: Turns streamed at once
+        """
+        self.websocket = websocket
+        self.window = window
+        self.max_channels = max_channels
+        # Turn events waiting to be sent; full when the client is behind, which pauses the turns
+        self._outbox: asyncio.Queue[tuple[int, str]] = asyncio.Queue(maxsize=window)
+        self._sent = 0
+        self._acked = 0
+        self._credit = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        # Channel -> (session ID, streaming task)
+        self._channels: dict[int, tuple[str, asyncio.Task]] = {}
+        self._next_channel = CONTROL_CHANNEL
+
+    async def run(self) -> None:
+        """Serve the socket until the client disconnects."""
+        await self._reply({"type": "hello", "window": self.window})
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                text = message.get("text")
+                if text is None:
+                    text = (message.get("bytes") or b"").decode("utf-8", "replace")
+                try:
+                    op = json.loads(text)
+                except json.JSONDecodeError:
+                    op = None
+                await self._handle(op)
+        finally:
+            tasks = [task for _session_id, task in self._channels.values()]
+            for task in (writer, *tasks):
+                task.cancel()
+            await asyncio.gather(writer, *tasks, return_exceptions=True)
+
+    async def _handle(self, op: Any) -> None:
+        if not isinstance(op, dict):
+            await self._reply({"type": "error", "status": 400, "error": "Expected a JSON object"})
+            return
+        kind = op.get("op")
+        if kind == "ack":
+            seq = op.get("seq")
+            if isinstance(seq, int):
+                self._acked = max(self._acked, min(seq, self._sent))
+                self._credit.set()
+        elif kind == "cancel":
+            await self._cancel(op.get("channel"))
+        elif kind == "start":
+            await self._start(op)
+        else:
+            await self._reply({"type": "error", "status": 400, "error": f"Unknown op: {kind!r}"})
+
+    async def _start(self, op: dict[str, Any]) -> None:
+        ref = op.get("ref")
+        session_id = op.get("session_id")
+        message = op.get("message")
+        key = op.get("idempotency_key")
+        try:
+            session_id = str(UUID(str(session_id)))
+        except ValueError:
+            await self._reply({"type": "error", "ref": ref, "status": 422, "error": "Invalid session_id"})
+            return
+        if not isinstance(message, str) or not message:
+            await self._reply({"type": "error", "ref": ref, "status": 422, "error": "A message is required"})
+            return
+        if key is not None and (not isinstance(key, str) or len(key) > MAX_KEY_LENGTH):
+            await self._reply({"type": "error", "ref": ref, "status": 422, "error": "Invalid idempotency_key"})
+            return
+        if len(self._channels) >= self.max_channels:
+            error = f"At most {self.max_channels} turns can stream on one socket"
+            await self._reply({"type": "error", "ref": ref, "status": 429, "error": error})
+            return
+
+        channel = self._allocate_channel()
+        task = asyncio.create_task(self._stream(channel, ref, session_id, message, key))
+        self._channels[channel] = (session_id, task)
+
+    def _allocate_channel(self) -> int:
+        while True:
+            self._next_channel = self._next_channel % MAX_CHANNEL + 1
+            if self._next_channel not in self._channels:
+                return self._next_channel
+
+    async def _cancel(self, channel: Any) -> None:
+        entry = self._channels.get(channel) if isinstance(channel, int) else None
+        if entry is None:
+            await self._reply({"type": "error", "channel": channel, "status": 404, "error": "No such channel"})
+            return
+        session_id, _task = entry
+        if turn_registry.cancel(session_id) is None:
+            # Already finishing; its stream ends on its own
+            await self._reply({"type": "error", "channel": channel, "status": 409, "error": "No turn is running"})
+
+    async def _stream(self, channel: int, ref: Any, session_id: str, message: str, key: str | None) -> None:
+        """Stream one turn's events on its channel."""
+        try:
+            async with AsyncSessionLocal() as db:
+                session = await SessionService.get_session(db, session_id)
+                if session is None:
+                    error = {"status": 404, "error": f"Session {session_id} not found"}
+                    await self._queue(CONTROL_CHANNEL, {"type": "error", "ref": ref, **error})
+                    return
+                try:
+                    events = await open_turn_stream(db, UUID(session_id), session.project_id, message, key)
+                except IdempotencyConflict as e:
+                    await self._queue(CONTROL_CHANNEL, {"type": "error", "ref": ref, "status": 422, "error": str(e)})
+                    return
+                except SchedulerOverloaded as e:
+                    error = {"status": 503, "error": str(e), "retry_after": e.retry_after}
+                    await self._queue(CONTROL_CHANNEL, {"type": "error", "ref": ref, **error})
+                    return
+
+                started = {"type": "started", "ref": ref, "channel": channel, "session_id": session_id}
+                await self._queue(CONTROL_CHANNEL, started)
+                async with aclosing(events):
+                    async for event in events:
+                        data = sse_data(event)
+                        if data is not None:
+                            await self._outbox.put((channel, data))
+                await self._queue(CONTROL_CHANNEL, {"type": "ended", "channel": channel})
+        except Exception as e:
+            logger.error(f"Error streaming session {session_id} on a WebSocket: {e}", exc_info=True)
+            await self._queue(CONTROL_CHANNEL, {"type": "ended", "channel": channel, "error": str(e)})
+        finally:
+            self._channels.pop(channel, None)
+
+    async def _queue(self, channel: int, event: dict[str, Any]) -> None:
+        """Send an event in order with the turns' events (subject to the window)."""
+        await self._outbox.put((channel, json.dumps(event, ensure_ascii=False)))
+
+    async def _reply(self, event: dict[str, Any]) -> None:
+        """Answer a client op right away.
+
+        Replies skip the window: the reader must not wait for acks it is the one to read.
+        """
+        await self._send(CONTROL_CHANNEL, json.dumps(event, ensure_ascii=False))
+
+    async def _write(self) -> None:
+        while True:
+            channel, payload = await self._outbox.get()
+            if self._sent - self._acked >= self.window:
+                WS_BACKPRESSURE_WAITS.inc()
+                while self._sent - self._acked >= self.window:
+                    self._credit.clear()
+                    await self._credit.wait()
+            await self._send(channel, payload)
+
+    async def _send(self, channel: int, payload: str) -> None:
+        async with self._send_lock:
+            self._sent += 1
+            frame = encode_frame(channel, self._sent, payload)
+            await self.websocket.send_bytes(frame)
+        WS_BYTES_SENT.inc(len(frame))
+
+
+@router.websocket("/ws")
+async def stream_socket(websocket: WebSocket):
+    """WebSocket carrying the turn streams of several sessions.
+
+    See the module docstring for the framing and the client ops.
+
+    Args:
+        websocket: Incoming WebSocket
+    """
+    await websocket.accept()
+    socket = StreamSocket(websocket, max(1, settings.ws_window_frames), max(1, settings.ws_max_channels))
+    _sockets.add(socket)
+    try:
+        await socket.run()
+    finally:
+        _sockets.discard(socket)
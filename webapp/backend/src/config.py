@@ -31,9 +31,85 @@ class Settings(BaseSettings):
     cors_allow_headers: list[str] = ["*"]
 
     # Claude API
+    # Override to point at a proxy or the local mock (python -m tools.mock_anthropic)
+    anthropic_base_url: str | None = None
     claude_model: str = "claude-3-7-sonnet-20250219"
     claude_max_tokens: int = 4096
     claude_temperature: float = 1.0
+    claude_prompt_caching: bool = True
+
+    # Upstream rate limits: starting values, replaced by the limits reported
+    # in response headers (0 = unlimited until learned). Agent SDK turns never
+    # see those headers, so a non-zero value here is never corrected for them.
+    anthropic_requests_per_minute: int = 0
+    anthropic_input_tokens_per_minute: int = 0
+    anthropic_output_tokens_per_minute: int = 0
+    anthropic_max_retries: int = 4
+
+    # Agent SDK client pool (one live CLI client per session)
+    sdk_pool_enabled: bool = True
+    sdk_pool_max_clients: int = 16
+    sdk_pool_idle_timeout: float = 600.0
+
+    # Context budget for long sessions
+    context_max_tokens: int = 100000
+    context_recent_turns: int = 6
+    context_summary_model: str = "claude-3-5-haiku-20241022"
+
+    # Size limit per file of the streaming upload endpoint
+    upload_max_bytes: int = 50 * 1024 * 1024
+
+    # Project import: size of the uploaded archive, and of its content once unpacked
+    import_max_bytes: int = 500 * 1024 * 1024
+    import_max_unpacked_bytes: int = 2 * 1024 * 1024 * 1024
+
+    # Images sent to the model are downscaled to fit (0 = no limit)
+    image_max_edge: int = 1568
+    image_max_pixels: int = 1_150_000
+    image_jpeg_quality: int = 85
+    image_cache_entries: int = 64
+
+    # Background naming of new projects from their first message
+    project_naming_enabled: bool = True
+    project_naming_model: str = "claude-3-5-haiku-20241022"
+
+    # Starter cache: replay a stored first turn for near-identical first requests (opt-in)
+    starter_cache_enabled: bool = False
+    starter_cache_threshold: float = 0.8
+    starter_cache_max_entries: int = 200
+
+    # Idempotency-Key: retries within the TTL attach to the first request's result
+    idempotency_ttl_seconds: int = 3600
+    # A keyed generation keeps running this long after its last client disconnects
+    idempotency_detach_grace_seconds: float = 30.0
+
+    # Generation scheduling
+    generation_max_concurrent: int = 8
+    generation_max_queue_depth: int = 32
+    # Relative share of generation slots per project ID (default 1.0)
+    generation_project_weights: dict[str, float] = {}
+
+    # Tracing
+    trace_enabled: bool = True
+    trace_file: Path = Path("./data/traces/traces.jsonl")
+    trace_file_max_bytes: int = 10 * 1024 * 1024
+    trace_file_backup_count: int = 3
+    trace_retain: int = 200
+
+    # Event-loop watchdog: sample the loop thread's stack while it is blocked
+    loop_watchdog_enabled: bool = True
+    loop_watchdog_threshold: float = 0.1
+    loop_watchdog_sample_interval: float = 0.01
+
+    # Streaming WebSocket: frames sent ahead of the client's acks, and turns streamed at once per socket
+    ws_window_frames: int = 256
+    ws_max_channels: int = 8
+
+    # Seconds a dashboard event stream waits for more events before sending (bursts are coalesced)
+    project_events_coalesce_seconds: float = 0.1
+
+    # Seconds a project status change waits in memory before it is written
+    status_flush_delay: float = 0.25
 
     def __init__(self, **kwargs):
         """Initialize settings and ensure data directory exists."""
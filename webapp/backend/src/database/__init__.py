@@ -11,6 +11,7 @@ from .models import Project
 from .models import ProjectStatus
 from .models import ProjectType
 from .models import Session
+from .models import SessionSummary
 from .models import SessionStatus
 
 __all__ = [
@@ -23,6 +24,7 @@ __all__ = [
     "ProjectStatus",
     "ProjectType",
     "Session",
+    "SessionSummary",
     "SessionStatus",
     "get_db",
     "init_db",
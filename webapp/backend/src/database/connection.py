@@ -1,12 +1,15 @@
 """Database connection management."""
 
+import time
 from collections.abc import AsyncGenerator
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from ..config import settings
+from ..observability.metrics import DB_QUERY_DURATION
 from .models import Base
 
 # Create async engine
@@ -16,6 +19,24 @@ engine = create_async_engine(
     future=True,
 )
 
+_QUERY_OPERATIONS = ("select", "insert", "update", "delete")
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Record statement start time for the query latency histogram."""
+    context._query_start_time = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Observe statement latency, labelled by SQL operation."""
+    operation = statement.lstrip()[:6].lower()
+    if operation not in _QUERY_OPERATIONS:
+        operation = "other"
+    DB_QUERY_DURATION.labels(operation).observe(time.perf_counter() - context._query_start_time)
+
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
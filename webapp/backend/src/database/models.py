@@ -9,8 +9,10 @@ from sqlalchemy import DateTime
 from sqlalchemy import Enum
 from sqlalchemy import ForeignKey
 from sqlalchemy import Integer
+from sqlalchemy import LargeBinary
 from sqlalchemy import String
 from sqlalchemy import Text
+from sqlalchemy import UniqueConstraint
 from sqlalchemy import func
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
@@ -65,6 +67,7 @@ class MessageStatus(str, enum.Enum):
     PENDING = "pending"
     SENT = "sent"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class Project(Base):
@@ -125,6 +128,19 @@ class Message(Base):
     session: Mapped["Session"] = relationship("Session", back_populates="messages")
 
 
+class SessionSummary(Base):
+    """Rolling summary of the older part of a session's conversation."""
+
+    __tablename__ = "session_summaries"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    session_id: Mapped[str] = mapped_column(String(36), ForeignKey("sessions.id"), nullable=False, index=True)
+    # Last message covered by the summary; later messages are sent verbatim
+    through_message_id: Mapped[str] = mapped_column(String(36), ForeignKey("messages.id"), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+
 class File(Base):
     """File model."""
 
@@ -142,3 +158,94 @@ class File(Base):
     # Relationships
     project: Mapped["Project"] = relationship("Project", back_populates="files")
     session: Mapped[Optional["Session"]] = relationship("Session", back_populates="files")
+    versions: Mapped[list["FileVersion"]] = relationship(
+        "FileVersion", back_populates="file", cascade="all, delete-orphan"
+    )
+
+
+class FileVersion(Base):
+    """A revision of a file.
+
+    The newest version's content is the file on disk. Each older version
+    stores a compressed payload that rebuilds it from the next newer version
+    (see ``utils.deltas``), so history costs about the size of the changes.
+    """
+
+    __tablename__ = "file_versions"
+    __table_args__ = (UniqueConstraint("file_id", "version"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    file_id: Mapped[str] = mapped_column(String(36), ForeignKey("files.id"), nullable=False, index=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    session_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("sessions.id"), nullable=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    # None for the newest version
+    payload: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+    # Relationships
+    file: Mapped["File"] = relationship("File", back_populates="versions")
+
+
+class StarterCacheEntry(Base):
+    """A first turn whose deliverables can be replayed into new projects.
+
+    Keyed by project type and normalized prompt; ``signature`` is the
+    prompt's MinHash signature (see ``utils.minhash``) for near matches.
+    """
+
+    __tablename__ = "starter_cache_entries"
+    __table_args__ = (UniqueConstraint("project_type", "prompt_key"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    project_type: Mapped[ProjectType] = mapped_column(Enum(ProjectType), nullable=False)
+    prompt_key: Mapped[str] = mapped_column(Text, nullable=False)
+    prompt: Mapped[str] = mapped_column(Text, nullable=False)
+    signature: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # Assistant reply of the cached turn
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    hits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+    # Relationships
+    files: Mapped[list["StarterCacheFile"]] = relationship(
+        "StarterCacheFile", back_populates="entry", cascade="all, delete-orphan"
+    )
+
+
+class StarterCacheFile(Base):
+    """A deliverable file of a cached starter turn."""
+
+    __tablename__ = "starter_cache_files"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    entry_id: Mapped[str] = mapped_column(String(36), ForeignKey("starter_cache_entries.id"), nullable=False, index=True)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    mime_type: Mapped[str] = mapped_column(String(128), nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    # Relationships
+    entry: Mapped["StarterCacheEntry"] = relationship("StarterCacheEntry", back_populates="files")
+
+
+class IdempotencyRecord(Base):
+    """Result of a message submission, replayed to retries with the same ``Idempotency-Key``.
+
+    Rows are purged after ``expires_at`` (see ``services.idempotency``), so
+    the session is not a foreign key.
+    """
+
+    __tablename__ = "idempotency_records"
+    __table_args__ = (UniqueConstraint("session_id", "key"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    session_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Hash of the request (endpoint kind and message), to reject a key reused for another request
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    # JSON: the recorded SSE events of a stream, or the response body
+    response: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
@@ -1,26 +1,70 @@
 """FastAPI application entry point."""
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from .ai.images import image_preparer
+from .ai.sdk_pool import sdk_pool
 from .api import messages_router
 from .api import projects_router
 from .api import sessions_router
 from .api import streaming
+from .api.debug import router as debug_router
 from .api.files import router as files_router
+from .api.images import router as images_router
+from .api.websocket import router as websocket_router
 from .config import settings
 from .database import init_db
+from .database.connection import AsyncSessionLocal
+from .observability import REGISTRY
+from .observability.loop import loop_watchdog
+from .observability.loop import monitor_event_loop_lag
+from .observability.tracing import TracingMiddleware
+from .observability.tracing import trace_store
+from .services.idempotency import idempotency_service
+from .services.project_events import project_events
+from .services.starter_cache import starter_cache
+from .services.status_service import status_store
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
-    # Startup: Initialize database
+    # Startup: Initialize database and trace export
     await init_db()
+    status_store.flush_delay = settings.status_flush_delay
+    project_events.coalesce_window = settings.project_events_coalesce_seconds
+    starter_cache.threshold = settings.starter_cache_threshold
+    starter_cache.max_entries = settings.starter_cache_max_entries
+    image_preparer.max_edge = settings.image_max_edge
+    image_preparer.max_pixels = settings.image_max_pixels
+    image_preparer.jpeg_quality = settings.image_jpeg_quality
+    image_preparer.max_entries = settings.image_cache_entries
+    idempotency_service.ttl = settings.idempotency_ttl_seconds
+    idempotency_service.detach_grace = settings.idempotency_detach_grace_seconds
+    async with AsyncSessionLocal() as db:
+        await status_store.recover(db)
+    if settings.trace_enabled:
+        trace_store.retain = settings.trace_retain
+        trace_store.open_file(settings.trace_file, settings.trace_file_max_bytes, settings.trace_file_backup_count)
+    watchdog = None
+    if settings.loop_watchdog_enabled:
+        loop_watchdog.threshold = settings.loop_watchdog_threshold
+        loop_watchdog.sample_interval = settings.loop_watchdog_sample_interval
+        loop_watchdog.start()
+        watchdog = loop_watchdog
+    loop_lag_monitor = asyncio.create_task(monitor_event_loop_lag(watchdog=watchdog))
     yield
-    # Shutdown: Nothing to clean up for now
+    # Shutdown: Stop monitors, write pending statuses, close Agent SDK clients and flush traces
+    loop_lag_monitor.cancel()
+    loop_watchdog.stop()
+    await status_store.close()
+    await sdk_pool.close()
+    trace_store.close()
 
 
 # Create FastAPI app
@@ -40,12 +84,19 @@ app.add_middleware(
     allow_headers=settings.cors_allow_headers,
 )
 
+# Trace every request (added last so it wraps CORS as well)
+if settings.trace_enabled:
+    app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(projects_router)
 app.include_router(sessions_router)
 app.include_router(messages_router)
 app.include_router(files_router)
+app.include_router(images_router)
 app.include_router(streaming.router, prefix="/api", tags=["streaming"])
+app.include_router(websocket_router, prefix="/api", tags=["streaming"])
+app.include_router(debug_router)
 
 
 @app.get("/")
@@ -71,3 +122,9 @@ async def health() -> dict[str, str | bool]:
         "database": "connected",
         "api_key_configured": bool(settings.anthropic_api_key),
     }
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
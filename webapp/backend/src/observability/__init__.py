@@ -0,0 +1,21 @@
+"""Observability package: metrics, tracing and diagnostics."""
+
+from .metrics import REGISTRY
+from .metrics import MetricsRegistry
+from .metrics import timed
+from .tracing import TracingMiddleware
+from .tracing import span
+from .tracing import start_trace
+from .tracing import trace_store
+from .tracing import traced
+
+__all__ = [
+    "REGISTRY",
+    "MetricsRegistry",
+    "TracingMiddleware",
+    "span",
+    "start_trace",
+    "timed",
+    "trace_store",
+    "traced",
+]
@@ -0,0 +1,247 @@
+"""Event-loop health monitoring.
+
+``monitor_event_loop_lag`` is a probe task that sleeps for a fixed interval
+and records how late it woke up. ``LoopWatchdog`` adds a helper thread that
+watches the probe's deadline: while the loop is past it by more than the
+threshold, the thread samples the loop thread's stack every
+``sample_interval`` seconds and counts the stacks it sees, so a stall can be
+traced to the call that blocked the loop.
+
+The thread only collects samples. Stalls are counted and metrics recorded
+on the loop thread when the probe wakes up, keeping metric recording on the
+event-loop thread (see ``metrics``).
+
+Samples are taken when the thread gets the GIL, which the blocking code
+releases for I/O and every few milliseconds of Python bytecode; a C call
+that holds the GIL throughout shows up as the frame that called it.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .metrics import EVENT_LOOP_LAG
+from .metrics import EVENT_LOOP_STALL_SAMPLES
+from .metrics import EVENT_LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+# Frames under this directory are application code
+_APP_ROOT = Path(__file__).resolve().parent.parent
+_BACKEND_ROOT = _APP_ROOT.parent
+# Innermost frames kept per sampled stack
+MAX_STACK_DEPTH = 24
+# Distinct stacks kept; the least seen are dropped first
+MAX_STACKS = 200
+# Stalls kept for the debug endpoint
+RECENT_STALLS = 50
+
+
+@dataclass
+class StallStack:
+    """A distinct stack seen while the loop was blocked."""
+
+    site: str
+    frames: tuple[str, ...]
+    count: int = 0
+    last_seen: float = 0.0
+
+
+def _relative(filename: str) -> str:
+    try:
+        return str(Path(filename).relative_to(_BACKEND_ROOT))
+    except ValueError:
+        return filename
+
+
+def _is_app_frame(filename: str) -> bool:
+    return filename.startswith(str(_APP_ROOT)) and not filename.startswith(str(Path(__file__).parent))
+
+
+def capture_stack(thread_id: int) -> tuple[str, tuple[str, ...]] | None:
+    """Capture a thread's current stack.
+
+    Args:
+        thread_id: ``threading.get_ident()`` of the thread
+
+    Returns:
+        Site (``file:function`` of the innermost application frame, or of
+        the innermost frame if none is ours) and frames, outermost first;
+        None if the thread is gone
+    """
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return None
+
+    frames: list[str] = []
+    innermost: str | None = None
+    site: str | None = None
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        filename = _relative(code.co_filename)
+        frames.append(f"{filename}:{frame.f_lineno} in {code.co_name}")
+        innermost = innermost or f"{filename}:{code.co_name}"
+        if site is None and _is_app_frame(code.co_filename):
+            site = f"{filename}:{code.co_name}"
+        frame = frame.f_back
+    frames.reverse()
+    return site or innermost, tuple(frames)
+
+
+class LoopWatchdog:
+    """Samples the event-loop thread's stack while the loop is blocked."""
+
+    def __init__(self, threshold: float = 0.1, sample_interval: float = 0.01, log_after: float = 1.0):
+        """Initialize watchdog.
+
+        Args:
+            threshold: Lag in seconds past the probe deadline that counts as a stall
+            sample_interval: Seconds between stack samples during a stall
+            log_after: Log a warning with the stack once a stall lasts this long
+        """
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.log_after = log_after
+        self.stalls = 0
+        self._lock = threading.Lock()
+        self._stacks: dict[tuple[str, ...], StallStack] = {}
+        self._recent: deque[dict[str, Any]] = deque(maxlen=RECENT_STALLS)
+        # Samples since the probe last woke, by site
+        self._pending_sites: Counter[str] = Counter()
+        self._deadline: float | None = None
+        self._loop_thread_id: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start the sampling thread for the current thread's event loop."""
+        if self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the sampling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._deadline = None
+
+    def expect_wake(self, deadline: float | None) -> None:
+        """Record when the probe should next wake (``time.monotonic()`` clock), None when it stops."""
+        self._deadline = deadline
+
+    def record_wake(self, lag: float) -> None:
+        """Called on the loop thread when the probe wakes; counts a stall and records metrics.
+
+        Args:
+            lag: How late the probe woke, in seconds
+        """
+        with self._lock:
+            sites, self._pending_sites = self._pending_sites, Counter()
+        for site, count in sites.items():
+            EVENT_LOOP_STALL_SAMPLES.labels(site).inc(count)
+        if lag <= self.threshold:
+            return
+
+        self.stalls += 1
+        EVENT_LOOP_STALLS.inc()
+        site = sites.most_common(1)[0][0] if sites else None
+        self._recent.append(
+            {"at": time.time(), "lag_ms": round(lag * 1000, 1), "site": site, "samples": sum(sites.values())}
+        )
+
+    def _run(self) -> None:
+        logged_deadline: float | None = None
+        while not self._stop.wait(self.sample_interval):
+            deadline = self._deadline
+            if deadline is None:
+                continue
+            lag = time.monotonic() - deadline
+            if lag <= self.threshold:
+                continue
+
+            captured = capture_stack(self._loop_thread_id)
+            if captured is None:
+                continue
+            site, frames = captured
+            with self._lock:
+                self._add_sample(site, frames)
+            if lag >= self.log_after and logged_deadline != deadline:
+                logged_deadline = deadline
+                logger.warning(f"Event loop blocked for {lag:.2f}s at {site}:\n  " + "\n  ".join(frames))
+
+    def _add_sample(self, site: str, frames: tuple[str, ...]) -> None:
+        self._pending_sites[site] += 1
+        stack = self._stacks.get(frames)
+        if stack is None:
+            if len(self._stacks) >= MAX_STACKS:
+                least_seen = min(self._stacks.values(), key=lambda s: (s.count, s.last_seen))
+                del self._stacks[least_seen.frames]
+            stack = self._stacks[frames] = StallStack(site=site, frames=frames)
+        stack.count += 1
+        stack.last_seen = time.time()
+
+    def report(self, limit: int = 20) -> dict[str, Any]:
+        """Most-sampled blocking stacks and recent stalls.
+
+        Args:
+            limit: Number of stacks to return
+
+        Returns:
+            Stall count, threshold, stacks (most samples first) and recent stalls (newest first)
+        """
+        with self._lock:
+            stacks = sorted(self._stacks.values(), key=lambda s: s.count, reverse=True)[:limit]
+            stacks = [
+                {"site": s.site, "samples": s.count, "last_seen": s.last_seen, "frames": list(s.frames)}
+                for s in stacks
+            ]
+        return {
+            "stalls": self.stalls,
+            "threshold_ms": self.threshold * 1000,
+            "sample_interval_ms": self.sample_interval * 1000,
+            "stacks": stacks,
+            "recent": list(reversed(self._recent)),
+        }
+
+
+async def monitor_event_loop_lag(interval: float = 0.1, watchdog: LoopWatchdog | None = None) -> None:
+    """Observe event-loop scheduling lag until cancelled.
+
+    Sleeps for ``interval`` and records how much later than requested the
+    loop resumed; anything blocking the loop (sync IO, CPU-heavy work in a
+    coroutine) shows up as lag.
+
+    Args:
+        interval: Probe interval in seconds
+        watchdog: Watchdog to tell about each probe deadline and wake-up
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            start = loop.time()
+            if watchdog is not None:
+                watchdog.expect_wake(time.monotonic() + interval)
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - start - interval)
+            EVENT_LOOP_LAG.observe(lag)
+            if watchdog is not None:
+                watchdog.record_wake(lag)
+    finally:
+        if watchdog is not None:
+            watchdog.expect_wake(None)
+
+
+# Global watchdog, started in the app lifespan
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,562 @@
+"""In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms with optional labels, rendered in the
+Prometheus text format (version 0.0.4) by ``REGISTRY.render()``.
+
+Recording is lock-free: all observations happen on the event-loop thread
+(SQLAlchemy cursor events included, since the async engine runs them in a
+greenlet on that thread), so an observation is a dict lookup plus a couple
+of in-place additions. Rendering copies the current values; a scrape racing
+an observation can be off by that one observation, which Prometheus tolerates.
+"""
+
+import functools
+import math
+import os
+import resource
+import sys
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+# Default buckets (seconds) for request-scale latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """Base class: a named metric family with label children."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        """Initialize metric.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Label names; children are created with ``labels()``
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        """Get the child for a set of label values (created on first use).
+
+        Args:
+            values: One value per label name, in order
+
+        Returns:
+            Child metric to record on
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+        return child
+
+    def _default(self) -> Any:
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use labels() first")
+        return self.labels()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[tuple[str, str, float]]:
+        """Yield (sample name, label string, value) for every child."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    metric_type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment an unlabelled counter."""
+        self._default().inc(amount)
+
+    def _samples(self) -> Iterator[tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            yield f"{self.name}_total", _format_labels(self.labelnames, values), child.value
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from ``function`` at scrape time."""
+        self.function = function
+
+    def get(self) -> float:
+        return float(self.function()) if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time."""
+
+    metric_type = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+    def _samples(self) -> Iterator[tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, values), child.get()
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # Per-bucket (non-cumulative) counts; the last slot is +Inf
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the ``with`` block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """Initialize histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Label names
+            buckets: Sorted bucket upper bounds (+Inf is implicit)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(b for b in buckets if b != math.inf))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _samples(self) -> Iterator[tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            counts = list(child.counts)
+            total = child.sum
+            cumulative = 0
+            for bound, count in zip((*self.upper_bounds, math.inf), counts):
+                cumulative += count
+                labels = _format_labels((*self.labelnames, "le"), (*values, _format_value(bound)))
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        """Initialize empty registry."""
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric to the registry.
+
+        Args:
+            metric: Metric to add
+
+        Returns:
+            The same metric, for assignment at module level
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format.
+
+        Returns:
+            Exposition text
+        """
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+def timed(histogram: Histogram, *label_values: str) -> Callable:
+    """Decorator observing the duration of an async function.
+
+    Args:
+        histogram: Histogram to observe on
+        label_values: Label values for the histogram child
+
+    Returns:
+        Decorator
+    """
+    child = histogram.labels(*label_values)
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def _resident_memory_bytes() -> float:
+    """Current RSS (falls back to peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+REGISTRY = MetricsRegistry()
+
+# Process
+_start_time = time.time()
+REGISTRY.gauge("process_start_time_seconds", "Start time of the process since unix epoch in seconds.").set(
+    _start_time
+)
+REGISTRY.gauge("process_resident_memory_bytes", "Resident memory size in bytes.").set_function(
+    _resident_memory_bytes
+)
+
+# LLM generation
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "outcomist_llm_time_to_first_token_seconds",
+    "Time from sending a model request to the first streamed content.",
+    ("backend",),
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0),
+)
+LLM_OUTPUT_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "outcomist_llm_output_tokens_per_second",
+    "Output tokens per second after the first token, per model request.",
+    ("backend",),
+    buckets=(5, 10, 20, 30, 40, 50, 60, 80, 100, 150, 200),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "outcomist_llm_tokens",
+    "Tokens processed by the model, by kind (input, output, cache_read, cache_creation).",
+    ("backend", "kind"),
+)
+LLM_TOOL_ROUNDS = REGISTRY.histogram(
+    "outcomist_llm_tool_rounds_per_turn",
+    "Tool-use rounds needed to complete a user turn.",
+    ("backend",),
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13),
+)
+LLM_TURN_DURATION = REGISTRY.histogram(
+    "outcomist_llm_turn_duration_seconds",
+    "Wall time of a user turn from request to completion.",
+    ("backend", "outcome"),
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+LLM_TURNS_CANCELLED = REGISTRY.counter(
+    "outcomist_llm_turns_cancelled",
+    "User turns stopped before completion, by reason (user, disconnect).",
+    ("backend", "reason"),
+)
+LLM_CANCEL_SAVED_SECONDS = REGISTRY.counter(
+    "outcomist_llm_cancel_saved_seconds",
+    "Estimated generation seconds not spent because turns were cancelled.",
+    ("backend",),
+)
+LLM_CANCEL_SAVED_TOKENS = REGISTRY.counter(
+    "outcomist_llm_cancel_saved_tokens",
+    "Estimated output tokens not generated because turns were cancelled.",
+    ("backend",),
+)
+LLM_IMAGE_BYTES_SAVED = REGISTRY.counter(
+    "outcomist_llm_image_bytes_saved",
+    "Request bytes saved by downscaling and re-encoding images sent to the model.",
+)
+LLM_IMAGE_TOKENS_SAVED = REGISTRY.counter(
+    "outcomist_llm_image_tokens_saved",
+    "Estimated image input tokens saved by downscaling images sent to the model.",
+)
+LLM_RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "outcomist_llm_rate_limit_wait_seconds",
+    "Time a model request waited for upstream rate limit capacity.",
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+LLM_RETRIES = REGISTRY.counter(
+    "outcomist_llm_retries",
+    "Model requests retried, by reason (rate_limited, overloaded, server_error, connection).",
+    ("reason",),
+)
+LLM_RATE_LIMIT_REMAINING = REGISTRY.gauge(
+    "outcomist_llm_rate_limit_remaining",
+    "Locally tracked upstream capacity left, by kind (requests, input_tokens, output_tokens).",
+    ("kind",),
+)
+
+# Agent SDK client pool
+SDK_POOL_CLIENTS = REGISTRY.gauge("outcomist_sdk_pool_clients", "Live Agent SDK clients in the pool.")
+SDK_POOL_EVENTS = REGISTRY.counter(
+    "outcomist_sdk_pool_events",
+    "Agent SDK pool events (spawn, reuse, evict_idle, evict_lru, crash, respawn).",
+    ("event",),
+)
+SDK_CLIENT_STARTUP = REGISTRY.histogram(
+    "outcomist_sdk_client_startup_seconds",
+    "Time to spawn and connect an Agent SDK client.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+
+# Generation scheduling
+GENERATIONS_ACTIVE = REGISTRY.gauge("outcomist_generations_active", "Generation turns currently running.")
+GENERATIONS_QUEUED = REGISTRY.gauge("outcomist_generations_queued", "Generation turns waiting for a slot.")
+GENERATIONS_SHED = REGISTRY.counter("outcomist_generations_shed", "Turns rejected because the queue was full.")
+GENERATION_QUEUE_WAIT = REGISTRY.histogram(
+    "outcomist_generation_queue_wait_seconds",
+    "Time a turn waited for admission.",
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+# Verification
+VERIFICATION_DURATION = REGISTRY.histogram(
+    "outcomist_verification_duration_seconds",
+    "Duration of headless-browser game verification.",
+    ("result",),
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 20, 30),
+)
+
+# Database
+DB_QUERY_DURATION = REGISTRY.histogram(
+    "outcomist_db_query_duration_seconds",
+    "Database statement execution time.",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# Project status
+STATUS_TRANSITIONS = REGISTRY.counter(
+    "outcomist_status_transitions",
+    "Project status transitions, by new status.",
+    ("status",),
+)
+STATUS_TRANSITION_DURATION = REGISTRY.histogram(
+    "outcomist_status_transition_duration_seconds",
+    "Time to write a batch of coalesced project status changes.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+STATUS_WRITES = REGISTRY.counter(
+    "outcomist_status_writes",
+    "Project status rows written by the write-behind flusher.",
+)
+
+# Files
+FILE_OPERATION_DURATION = REGISTRY.histogram(
+    "outcomist_file_operation_duration_seconds",
+    "Duration of FileService operations (disk and database).",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+FILE_BYTES_WRITTEN = REGISTRY.counter(
+    "outcomist_file_bytes_written",
+    "Bytes written to project files.",
+)
+UPLOAD_BYTES = REGISTRY.counter(
+    "outcomist_upload_bytes",
+    "Bytes of user assets received through the streaming upload endpoint.",
+)
+FILE_VERSION_BYTES = REGISTRY.counter(
+    "outcomist_file_version_bytes",
+    "Bytes of compressed history stored for superseded file versions.",
+)
+PROJECT_ARCHIVE_BYTES = REGISTRY.counter(
+    "outcomist_project_archive_bytes",
+    "Bytes of project ZIP archives exported or imported.",
+    ("direction",),
+)
+IDEMPOTENT_REQUESTS = REGISTRY.counter(
+    "outcomist_idempotent_requests",
+    "Message submissions carrying an Idempotency-Key, by result (new, attached, replayed, conflict).",
+    ("result",),
+)
+STARTER_CACHE_LOOKUPS = REGISTRY.counter(
+    "outcomist_starter_cache_lookups",
+    "First-message lookups in the starter cache, by project type and result (hit, miss).",
+    ("project_type", "result"),
+)
+STARTER_CACHE_SIMILARITY = REGISTRY.histogram(
+    "outcomist_starter_cache_similarity",
+    "Estimated prompt similarity of the best starter cache candidate per lookup.",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+)
+STARTER_CACHE_EVICTIONS = REGISTRY.counter(
+    "outcomist_starter_cache_evictions",
+    "Starter cache entries evicted to stay within the size limit.",
+)
+STARTER_CACHE_ENTRIES = REGISTRY.gauge(
+    "outcomist_starter_cache_entries",
+    "Entries in the starter cache index.",
+)
+WORKSPACE_SYNC_FILES = REGISTRY.counter(
+    "outcomist_workspace_sync_files",
+    "Agent workspace files checked on sync (synced, unchanged, rejected).",
+    ("result",),
+)
+
+# Event loop
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "outcomist_event_loop_lag_seconds",
+    "How late the event loop resumed a sleeping probe task.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+EVENT_LOOP_STALLS = REGISTRY.counter(
+    "outcomist_event_loop_stalls",
+    "Times the event loop was blocked for longer than the watchdog threshold.",
+)
+EVENT_LOOP_STALL_SAMPLES = REGISTRY.counter(
+    "outcomist_event_loop_stall_samples",
+    "Stack samples taken while the event loop was blocked, by innermost application frame.",
+    ("site",),
+)
+
+# SSE
+SSE_ACTIVE_CONNECTIONS = REGISTRY.gauge(
+    "outcomist_sse_active_connections",
+    "Open SSE connections across all sessions.",
+)
+WS_ACTIVE_CONNECTIONS = REGISTRY.gauge(
+    "outcomist_ws_active_connections",
+    "Open streaming WebSockets (each may carry several sessions).",
+)
+WS_BYTES_SENT = REGISTRY.counter(
+    "outcomist_ws_bytes_sent",
+    "Event frame bytes sent over streaming WebSockets (payload and frame header).",
+)
+WS_BACKPRESSURE_WAITS = REGISTRY.counter(
+    "outcomist_ws_backpressure_waits",
+    "Times a streaming WebSocket stopped sending until the client acknowledged earlier frames.",
+)
+PROJECT_EVENT_SUBSCRIPTIONS = REGISTRY.gauge(
+    "outcomist_project_event_subscriptions",
+    "Open multiplexed project event streams (one per dashboard, whatever the number of projects).",
+)
+PROJECT_EVENTS = REGISTRY.counter(
+    "outcomist_project_events",
+    "Project events per subscription, by result (sent, coalesced into a newer one, dropped on overflow).",
+    ("result",),
+)
@@ -0,0 +1,381 @@
+"""Lightweight per-request tracing.
+
+Every HTTP request (SSE turns included, since the trace stays open until the
+response body is fully sent) gets a trace. Code marks its major stages with
+``span()``:
+
+    with span("db.load_history", session_id=session_id) as s:
+        ...
+        s.set(messages=len(history))
+
+The current trace lives in a ContextVar; spans are kept on a per-trace stack
+rather than in ContextVars, so a span may safely stay open across ``yield``
+in an async generator. Outside a trace ``span()`` is a no-op.
+
+Finished traces are appended to a rotating JSONL file (written by a
+background thread) and the slowest ones are kept in memory for
+``/debug/traces``.
+"""
+
+import functools
+import heapq
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on spans recorded per trace (long tool loops, many file writes)
+MAX_SPANS_PER_TRACE = 1000
+
+
+class Span:
+    """A timed stage within a trace."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "status", "attributes")
+
+    def __init__(self, trace: "Trace", span_id: int, parent_id: int | None, name: str, attributes: dict):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.status = "ok"
+        self.attributes = attributes
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class _NullSpan:
+    """Stand-in returned by ``span()`` outside a trace."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """A request or turn, with the spans recorded while it ran."""
+
+    def __init__(self, name: str, trace_id: str | None = None, **attributes: Any):
+        """Start a trace.
+
+        Args:
+            name: Trace name (e.g. "POST /api/sessions/{session_id}/messages")
+            trace_id: Trace ID (generated if not given)
+            attributes: Trace attributes
+        """
+        self.trace_id = trace_id or uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.status = "ok"
+        self.spans: list[Span] = []
+        self.dropped_spans = 0
+        self._stack: list[Span] = []
+        self._ids = itertools.count(1)
+
+    @property
+    def finished(self) -> bool:
+        return self.end is not None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def open_span(self, name: str, attributes: dict) -> Span | None:
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped_spans += 1
+            return None
+        parent_id = self._stack[-1].span_id if self._stack else None
+        new_span = Span(self, next(self._ids), parent_id, name, attributes)
+        self.spans.append(new_span)
+        self._stack.append(new_span)
+        return new_span
+
+    def close_span(self, closing: Span) -> None:
+        closing.end = time.perf_counter()
+        # Normally the top of the stack; tolerate out-of-order closes
+        if self._stack and self._stack[-1] is closing:
+            self._stack.pop()
+        elif closing in self._stack:
+            self._stack.remove(closing)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the trace with its span waterfall.
+
+        Returns:
+            Trace dict; spans are in start order with offsets from trace start
+        """
+        depths: dict[int, int] = {}
+        spans = []
+        for s in self.spans:
+            depth = depths[s.parent_id] + 1 if s.parent_id in depths else 0
+            depths[s.span_id] = depth
+            spans.append(
+                {
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "name": s.name,
+                    "depth": depth,
+                    "offset_ms": round((s.start - self.start) * 1000, 3),
+                    "duration_ms": round(s.duration * 1000, 3),
+                    "status": s.status,
+                    "attributes": s.attributes,
+                }
+            )
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start_time": datetime.fromtimestamp(self.started_at, tz=timezone.utc).isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "dropped_spans": self.dropped_spans,
+            "spans": spans,
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("outcomist_trace", default=None)
+
+
+def current_trace() -> Trace | None:
+    """Get the trace of the current request, if any."""
+    return _current_trace.get()
+
+
+def current_trace_id() -> str | None:
+    """Get the ID of the current trace, if any."""
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NullSpan]:
+    """Record a span in the current trace.
+
+    Args:
+        name: Span name, dotted by subsystem (e.g. "llm.request")
+        attributes: Span attributes
+
+    Yields:
+        The span (or a no-op stand-in outside a trace)
+    """
+    trace = _current_trace.get()
+    current = trace.open_span(name, attributes) if trace is not None and not trace.finished else None
+    if current is None:
+        yield _NULL_SPAN
+        return
+
+    try:
+        yield current
+    except GeneratorExit:
+        current.status = "cancelled"
+        raise
+    except BaseException as e:
+        current.status = "error"
+        current.attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.close_span(current)
+
+
+def traced(name: str) -> Callable:
+    """Decorator wrapping an async function in a span.
+
+    Args:
+        name: Span name
+
+    Returns:
+        Decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TraceStore:
+    """Destination of finished traces: JSONL file plus the slowest in memory."""
+
+    def __init__(self, retain: int = 200):
+        """Initialize store.
+
+        Args:
+            retain: Number of slowest traces kept in memory
+        """
+        self.retain = retain
+        self._slowest: list[tuple[float, int, dict[str, Any]]] = []
+        self._seq = itertools.count()
+        self._file_logger: logging.Logger | None = None
+        self._listener: logging.handlers.QueueListener | None = None
+
+    def open_file(self, path: Path, max_bytes: int, backup_count: int) -> None:
+        """Start appending finished traces to a rotating JSONL file.
+
+        File IO happens on a background thread; ``add()`` only enqueues.
+
+        Args:
+            path: JSONL file path
+            max_bytes: Rotate after this size
+            backup_count: Rotated files to keep
+        """
+        self.close()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(records, file_handler)
+        self._listener.start()
+
+        self._file_logger = logging.getLogger(f"{__name__}.export")
+        self._file_logger.handlers = [logging.handlers.QueueHandler(records)]
+        self._file_logger.setLevel(logging.INFO)
+        self._file_logger.propagate = False
+
+    def close(self) -> None:
+        """Flush and stop the file writer."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+        if self._file_logger is not None:
+            self._file_logger.handlers = []
+            self._file_logger = None
+
+    def add(self, trace: Trace) -> None:
+        """Record a finished trace.
+
+        Args:
+            trace: Finished trace
+        """
+        data = trace.to_dict()
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(data, default=str))
+
+        entry = (trace.duration, next(self._seq), data)
+        if len(self._slowest) < self.retain:
+            heapq.heappush(self._slowest, entry)
+        elif entry[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self, limit: int) -> list[dict[str, Any]]:
+        """Get the slowest retained traces.
+
+        Args:
+            limit: Maximum number of traces
+
+        Returns:
+            Trace dicts, slowest first
+        """
+        return [data for _duration, _seq, data in heapq.nlargest(limit, self._slowest)]
+
+    def clear(self) -> None:
+        self._slowest.clear()
+
+
+trace_store = TraceStore()
+
+
+@contextmanager
+def start_trace(name: str, trace_id: str | None = None, **attributes: Any) -> Iterator[Trace]:
+    """Run a block as a new trace and export it when done.
+
+    Args:
+        name: Trace name
+        trace_id: Trace ID (generated if not given)
+        attributes: Trace attributes
+
+    Yields:
+        The trace
+    """
+    trace = Trace(name, trace_id, **attributes)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.status = "error"
+        trace.attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.end = time.perf_counter()
+        _current_trace.reset(token)
+        try:
+            trace_store.add(trace)
+        except Exception as e:
+            logger.warning(f"Failed to export trace {trace.trace_id}: {e}")
+
+
+class TracingMiddleware:
+    """ASGI middleware starting a trace per HTTP request.
+
+    Pure ASGI (not BaseHTTPMiddleware) so the trace stays current while a
+    streaming response body is produced, and SSE turns are traced end to end.
+    """
+
+    def __init__(self, app, exclude_paths: tuple[str, ...] = ("/metrics", "/debug/traces", "/health")):
+        """Initialize middleware.
+
+        Args:
+            app: ASGI application
+            exclude_paths: Paths that are not traced
+        """
+        self.app = app
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        with start_trace(f"{scope['method']} {scope['path']}") as trace:
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    trace.attributes["status_code"] = message["status"]
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-trace-id", trace.trace_id.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
+
+            # Name by route template once routing has happened
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                trace.name = f"{scope['method']} {route.path}"
@@ -5,6 +5,8 @@ import logging
 from collections import defaultdict
 from uuid import UUID
 
+from ..observability.metrics import SSE_ACTIVE_CONNECTIONS
+
 logger = logging.getLogger(__name__)
 
 
@@ -71,6 +73,20 @@ class ConnectionManager:
             except Exception as e:
                 logger.error(f"Error broadcasting to connection: {e}")
 
+    def pending(self, queue: asyncio.Queue) -> list[dict]:
+        """Take the events already queued for a connection, without waiting.
+
+        Args:
+            queue: Queue returned by ``connect``
+
+        Returns:
+            Queued events, oldest first
+        """
+        events = []
+        while not queue.empty():
+            events.append(queue.get_nowait())
+        return events
+
     def get_connection_count(self, session_id: UUID) -> int:
         """Get number of active connections for a session.
 
@@ -93,3 +109,4 @@ class ConnectionManager:
 
 # Global connection manager instance
 connection_manager = ConnectionManager()
+SSE_ACTIVE_CONNECTIONS.set_function(connection_manager.get_total_connections)
@@ -1,14 +1,22 @@
 """File service."""
 
 import logging
+import os
 from pathlib import Path
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..ai.events import SSEEventType
 from ..config import settings
 from ..database.models import File
+from ..observability.metrics import FILE_BYTES_WRITTEN
+from ..observability.metrics import FILE_OPERATION_DURATION
+from ..observability.metrics import timed
+from ..observability.tracing import traced
 from ..utils.image_utils import validate_and_fix_image_mime
+from .file_version_service import FileVersionService
+from .project_events import project_events
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +37,90 @@ class FileService:
         return settings.data_dir / "projects" / project_id / "files"
 
     @staticmethod
+    async def _read_previous(db: AsyncSession, project_id: str, filename: str) -> tuple[File | None, bytes | None]:
+        """Get the existing record for a file name and its content before a write.
+
+        Args:
+            db: Database session
+            project_id: Project ID
+            filename: File name
+
+        Returns:
+            Existing file (None if there is none) and its current content
+        """
+        file = await FileService.get_file_by_name(db, project_id, filename)
+        if file is None:
+            return None, None
+        try:
+            return file, Path(file.path).read_bytes()
+        except OSError:
+            return file, None
+
+    @staticmethod
+    async def _save_write(
+        db: AsyncSession,
+        file: File | None,
+        project_id: str,
+        session_id: str,
+        filename: str,
+        file_path: Path,
+        mime_type: str,
+        previous: bytes | None,
+        current: bytes,
+    ) -> File:
+        """Record a write to a file name as a new version of its record.
+
+        Args:
+            db: Database session
+            file: Existing record for the name, None to create one
+            project_id: Project ID
+            session_id: Session ID
+            filename: File name
+            file_path: Path the content was written to
+            mime_type: MIME type
+            previous: Content before the write
+            current: Content after the write
+
+        Returns:
+            Created or updated file
+        """
+        created = file is None
+        if file is None:
+            file = File(project_id=project_id, name=filename)
+            db.add(file)
+        file.session_id = session_id
+        file.path = str(file_path)
+        file.mime_type = mime_type
+        file.size = len(current)
+        await db.flush()
+
+        await FileVersionService.record(db, file, previous, current, session_id)
+        await db.commit()
+        await db.refresh(file)
+        FileService.publish_written(file, created)
+        return file
+
+    @staticmethod
+    def publish_written(file: File, created: bool) -> None:
+        """Tell dashboards following the project that a file was written.
+
+        Args:
+            file: Written file
+            created: True for a new file, False for a new version of an existing one
+        """
+        project_events.publish(
+            file.project_id,
+            f"file:{file.id}",
+            SSEEventType.FILE_CREATED,
+            {
+                "file": {"id": file.id, "name": file.name, "mime_type": file.mime_type, "size": file.size},
+                "created": created,
+            },
+        )
+
+    @staticmethod
+    @timed(FILE_OPERATION_DURATION, "create")
+    @traced("file.create")
     async def create_file(
         db: AsyncSession,
         project_id: str,
@@ -37,7 +129,10 @@ class FileService:
         content: str | bytes,
         mime_type: str = "text/plain",
     ) -> File:
-        """Create a new file with automatic MIME type validation for images.
+        """Create a file, or write a new version of an existing one.
+
+        MIME types of images are validated. Writing a name that already
+        exists in the project updates that file and records a version.
 
         Args:
             db: Database session
@@ -48,7 +143,7 @@ class FileService:
             mime_type: MIME type (will be validated for images)
 
         Returns:
-            Created file
+            Created or updated file
         """
         # Create project directory if it doesn't exist
         project_dir = FileService._get_project_dir(project_id)
@@ -72,32 +167,83 @@ class FileService:
                     logger.error(f"Failed to validate image {filename}: {e}")
                     # Continue with original content but log the error
 
-            # Write binary file
-            file_path.write_bytes(content)
-            size = len(content)
+            data = content
         else:
             # Handle text content - ensure it's a string
             if not isinstance(content, str):
                 raise ValueError(f"Cannot create file {filename}: content must be str or bytes, got {type(content)}")
+            data = content.encode("utf-8")
+
+        file, previous = await FileService._read_previous(db, project_id, filename)
+        file_path.write_bytes(data)
+        FILE_BYTES_WRITTEN.inc(len(data))
 
-            file_path.write_text(content, encoding="utf-8")
-            size = len(content.encode("utf-8"))
-
-        # Create database record
-        file = File(
-            project_id=project_id,
-            session_id=session_id,
-            name=filename,
-            path=str(file_path),
-            mime_type=mime_type,
-            size=size,
+        return await FileService._save_write(
+            db, file, project_id, session_id, filename, file_path, mime_type, previous, data
+        )
+
+    @staticmethod
+    def get_partial_path(project_id: str, block_id: str) -> Path:
+        """Get temp path for a file whose content is still streaming in.
+
+        The temp file sits in the project directory so that committing it
+        is an atomic rename on the same filesystem.
+
+        Args:
+            project_id: Project ID
+            block_id: ID of the tool_use block producing the file
+
+        Returns:
+            Path to the partial file
+        """
+        return FileService._get_project_dir(project_id) / f".{block_id}.partial"
+
+    @staticmethod
+    @timed(FILE_OPERATION_DURATION, "commit_partial")
+    @traced("file.commit_partial")
+    async def commit_partial_file(
+        db: AsyncSession,
+        project_id: str,
+        session_id: str,
+        filename: str,
+        partial_path: Path,
+        mime_type: str = "text/plain",
+    ) -> File:
+        """Atomically move a fully streamed temp file into place and record it.
+
+        Args:
+            db: Database session
+            project_id: Project ID
+            session_id: Session ID
+            filename: Final file name
+            partial_path: Temp file written while streaming
+            mime_type: MIME type
+
+        Returns:
+            Created or updated file
+
+        Raises:
+            ValueError: If the temp file does not exist
+        """
+        if not partial_path.exists():
+            raise ValueError(f"Cannot commit file {filename}: partial file {partial_path} is missing")
+
+        project_dir = FileService._get_project_dir(project_id)
+        project_dir.mkdir(parents=True, exist_ok=True)
+        file_path = project_dir / filename
+
+        file, previous = await FileService._read_previous(db, project_id, filename)
+        data = partial_path.read_bytes()
+        os.replace(partial_path, file_path)
+        FILE_BYTES_WRITTEN.inc(len(data))
+
+        return await FileService._save_write(
+            db, file, project_id, session_id, filename, file_path, mime_type, previous, data
         )
-        db.add(file)
-        await db.commit()
-        await db.refresh(file)
-        return file
 
     @staticmethod
+    @timed(FILE_OPERATION_DURATION, "list")
+    @traced("file.list")
     async def get_project_files(db: AsyncSession, project_id: str) -> list[File]:
         """Get all files for a project.
 
@@ -126,6 +272,116 @@ class FileService:
         return result.scalar_one_or_none()
 
     @staticmethod
+    async def get_file_by_name(db: AsyncSession, project_id: str, filename: str) -> File | None:
+        """Get the latest file with a given name in a project.
+
+        Args:
+            db: Database session
+            project_id: Project ID
+            filename: File name
+
+        Returns:
+            Most recently created file with that name, None if there is none
+        """
+        result = await db.execute(
+            select(File)
+            .where(File.project_id == project_id, File.name == filename)
+            .order_by(File.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    @timed(FILE_OPERATION_DURATION, "update")
+    @traced("file.update")
+    async def update_file_content(
+        db: AsyncSession,
+        file: File,
+        content: str,
+        session_id: str | None = None,
+    ) -> File:
+        """Replace a file's text content in place.
+
+        The new content is written to a temp file and renamed over the old
+        one, so readers never see a half-written file. The existing record
+        is updated instead of adding a new one, and a version is recorded.
+
+        Args:
+            db: Database session
+            file: File to update
+            content: New text content
+            session_id: Session making the change
+
+        Returns:
+            Updated file
+        """
+        file_path = Path(file.path)
+        data = content.encode("utf-8")
+        try:
+            previous = file_path.read_bytes()
+        except OSError:
+            previous = None
+        temp_path = file_path.with_name(f".{file_path.name}.{file.id}.partial")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, file_path)
+        FILE_BYTES_WRITTEN.inc(len(data))
+
+        file.size = len(data)
+        if session_id is not None:
+            file.session_id = session_id
+        await FileVersionService.record(db, file, previous, data, session_id or file.session_id)
+        await db.commit()
+        await db.refresh(file)
+        return file
+
+    @staticmethod
+    @timed(FILE_OPERATION_DURATION, "restore")
+    @traced("file.restore")
+    async def restore_version(
+        db: AsyncSession,
+        file: File,
+        version: int,
+        session_id: str | None = None,
+    ) -> File | None:
+        """Make an earlier version's content current again.
+
+        The restored content is written as a new version, so history is
+        never rewritten.
+
+        Args:
+            db: Database session
+            file: File to restore
+            version: Version to restore
+            session_id: Session making the change
+
+        Returns:
+            Updated file, None if the version does not exist
+        """
+        content = await FileVersionService.get_version_content(db, file, version)
+        if content is None:
+            return None
+
+        file_path = Path(file.path)
+        try:
+            previous = file_path.read_bytes()
+        except OSError:
+            previous = None
+        temp_path = file_path.with_name(f".{file_path.name}.{file.id}.partial")
+        temp_path.write_bytes(content)
+        os.replace(temp_path, file_path)
+        FILE_BYTES_WRITTEN.inc(len(content))
+
+        file.size = len(content)
+        if session_id is not None:
+            file.session_id = session_id
+        await FileVersionService.record(db, file, previous, content, session_id)
+        await db.commit()
+        await db.refresh(file)
+        return file
+
+    @staticmethod
+    @timed(FILE_OPERATION_DURATION, "read")
+    @traced("file.read")
     async def get_file_content(db: AsyncSession, file_id: str) -> str | None:
         """Get file content.
 
@@ -146,6 +402,8 @@ class FileService:
             return None
 
     @staticmethod
+    @timed(FILE_OPERATION_DURATION, "delete")
+    @traced("file.delete")
     async def delete_file(db: AsyncSession, file_id: str) -> bool:
         """Delete file.
 
@@ -166,7 +424,7 @@ class FileService:
         except Exception:
             pass
 
-        # Delete database record
+        # Delete database record (and its version history)
         await db.delete(file)
         await db.commit()
         return True
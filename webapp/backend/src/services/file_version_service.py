@@ -0,0 +1,210 @@
+"""File version history service."""
+
+import difflib
+import hashlib
+from pathlib import Path
+
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import File
+from ..database.models import FileVersion
+from ..observability.metrics import FILE_VERSION_BYTES
+from ..utils.deltas import decode_version
+from ..utils.deltas import encode_version
+from ..utils.deltas import is_full_copy
+
+
+class FileVersionService:
+    """Service for recording and reading file revisions."""
+
+    @staticmethod
+    async def record(
+        db: AsyncSession,
+        file: File,
+        previous: bytes | None,
+        current: bytes,
+        session_id: str | None = None,
+    ) -> FileVersion | None:
+        """Record a write to a file as a new version.
+
+        The previous newest version is re-encoded against ``current`` so only
+        the newest version needs a full copy (the file on disk). Does not
+        commit.
+
+        Args:
+            db: Database session
+            file: File that was written (must be flushed)
+            previous: Content before the write, None if the file is new
+            current: Content after the write
+            session_id: Session that made the write
+
+        Returns:
+            The new version, or None if the content did not change
+        """
+        if previous == current:
+            return None
+
+        result = await db.execute(
+            select(FileVersion)
+            .where(FileVersion.file_id == file.id, FileVersion.payload.is_(None))
+            .order_by(FileVersion.version.desc())
+            .limit(1)
+        )
+        newest = result.scalar_one_or_none()
+
+        if newest is None and previous is not None:
+            # Written before versioning existed: keep what was there as version 1
+            newest = FileVersion(
+                file_id=file.id,
+                version=1,
+                session_id=file.session_id,
+                size=len(previous),
+                sha256=hashlib.sha256(previous).hexdigest(),
+            )
+            db.add(newest)
+
+        if newest is not None:
+            base = previous if previous is not None else b""
+            newest.payload = encode_version(current, base)
+            FILE_VERSION_BYTES.inc(len(newest.payload))
+
+        version = FileVersion(
+            file_id=file.id,
+            version=newest.version + 1 if newest is not None else 1,
+            session_id=session_id,
+            size=len(current),
+            sha256=hashlib.sha256(current).hexdigest(),
+        )
+        db.add(version)
+        await db.flush()
+        return version
+
+    @staticmethod
+    async def record_initial(
+        db: AsyncSession,
+        file: File,
+        size: int,
+        sha256: str,
+        session_id: str | None = None,
+    ) -> FileVersion:
+        """Record the first version of a new file without reading its content.
+
+        For content hashed as it was streamed to disk. Does not commit.
+
+        Args:
+            db: Database session
+            file: New file (must be flushed)
+            size: Content size in bytes
+            sha256: Hex SHA-256 of the content
+            session_id: Session that wrote the file
+
+        Returns:
+            The new version
+        """
+        version = FileVersion(file_id=file.id, version=1, session_id=session_id, size=size, sha256=sha256)
+        db.add(version)
+        await db.flush()
+        return version
+
+    @staticmethod
+    async def list_versions(db: AsyncSession, file_id: str) -> list[FileVersion]:
+        """Get all versions of a file, newest first.
+
+        Args:
+            db: Database session
+            file_id: File ID
+
+        Returns:
+            List of versions
+        """
+        result = await db.execute(
+            select(FileVersion).where(FileVersion.file_id == file_id).order_by(FileVersion.version.desc())
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_version_content(db: AsyncSession, file: File, version: int) -> bytes | None:
+        """Rebuild the content of one version.
+
+        Starts from the file on disk (the newest version) and applies the
+        stored payloads backwards, or from the nearest full copy.
+
+        Args:
+            db: Database session
+            file: File
+            version: Version number
+
+        Returns:
+            Content of that version, None if the version does not exist
+        """
+        result = await db.execute(
+            select(FileVersion)
+            .where(FileVersion.file_id == file.id, FileVersion.version >= version)
+            .order_by(FileVersion.version.desc())
+        )
+        chain = list(result.scalars().all())
+        if not chain or chain[-1].version != version:
+            return None
+
+        # Payloads from the oldest full copy in the chain don't need anything newer
+        start = 0
+        for index, entry in enumerate(chain):
+            if entry.payload is not None and is_full_copy(entry.payload):
+                start = index
+
+        content = b"" if start else Path(file.path).read_bytes()
+        for entry in chain[start:]:
+            if entry.payload is not None:
+                content = decode_version(content, entry.payload)
+        return content
+
+    @staticmethod
+    async def diff(db: AsyncSession, file: File, from_version: int, to_version: int) -> str | None:
+        """Unified diff between two versions of a text file.
+
+        Args:
+            db: Database session
+            file: File
+            from_version: Older side of the diff
+            to_version: Newer side of the diff
+
+        Returns:
+            Unified diff, None if either version does not exist
+
+        Raises:
+            ValueError: If the file is not UTF-8 text
+        """
+        before = await FileVersionService.get_version_content(db, file, from_version)
+        after = await FileVersionService.get_version_content(db, file, to_version)
+        if before is None or after is None:
+            return None
+
+        try:
+            before_text, after_text = before.decode("utf-8"), after.decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Cannot diff {file.name}: not a text file") from e
+
+        return "".join(
+            difflib.unified_diff(
+                before_text.splitlines(keepends=True),
+                after_text.splitlines(keepends=True),
+                fromfile=f"{file.name}@{from_version}",
+                tofile=f"{file.name}@{to_version}",
+            )
+        )
+
+    @staticmethod
+    async def latest_version(db: AsyncSession, file_id: str) -> int:
+        """Get a file's newest version number (0 if it has none).
+
+        Args:
+            db: Database session
+            file_id: File ID
+
+        Returns:
+            Version number
+        """
+        result = await db.execute(select(func.max(FileVersion.version)).where(FileVersion.file_id == file_id))
+        return result.scalar_one() or 0
@@ -0,0 +1,264 @@
+"""Admission control and fair scheduling for AI generation turns."""
+
+import asyncio
+import itertools
+import logging
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from ..config import settings
+from ..observability.metrics import GENERATION_QUEUE_WAIT
+from ..observability.metrics import GENERATIONS_ACTIVE
+from ..observability.metrics import GENERATIONS_QUEUED
+from ..observability.metrics import GENERATIONS_SHED
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when a turn is rejected because the queue is full."""
+
+    def __init__(self, retry_after: int):
+        """Initialize error.
+
+        Args:
+            retry_after: Suggested seconds before retrying
+        """
+        super().__init__(f"Generation queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class GenerationTicket:
+    """A turn's place in the scheduler, from submission to release."""
+
+    def __init__(
+        self,
+        scheduler: "GenerationScheduler",
+        session_id: str,
+        project_id: str,
+        start_tag: float,
+        finish_tag: float,
+        seq: int,
+    ):
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.project_id = project_id
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.submitted_at = time.monotonic()
+        self.admitted_at: float | None = None
+        self.released = False
+        self._changed = asyncio.Event()
+
+    @property
+    def admitted(self) -> bool:
+        return self.admitted_at is not None
+
+    def _notify(self) -> None:
+        self._changed.set()
+
+    async def wait(self) -> AsyncIterator[int]:
+        """Wait for admission, yielding the queue position whenever it changes.
+
+        Yields nothing if the turn is admitted immediately.
+
+        Yields:
+            1-based position among waiting turns
+        """
+        last_position = None
+        while not self.admitted:
+            position = self.scheduler.position(self)
+            if position != last_position:
+                last_position = position
+                yield position
+            self._changed.clear()
+            if self.admitted:
+                break
+            await self._changed.wait()
+
+    def release(self) -> None:
+        """Leave the scheduler (finish an active turn or abandon a queued one)."""
+        self.scheduler._release(self)
+
+
+class GenerationScheduler:
+    """Admits generation turns with per-session exclusivity and a global cap.
+
+    - At most one turn per session runs at a time; later turns for the same
+      session wait behind it.
+    - At most ``max_concurrent`` turns run in total. Waiting turns are
+      admitted by weighted fair queuing over projects: a turn's finish tag
+      is ``1 / weight`` past the later of its project's previous finish tag
+      and the virtual time, and the waiting turn with the smallest finish tag
+      runs next, so a project submitting a burst cannot starve the others.
+    - Once ``max_queue_depth`` turns are waiting, new turns are rejected with
+      ``SchedulerOverloaded`` carrying a Retry-After estimate.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue_depth: int, weights: dict[str, float] | None = None):
+        """Initialize scheduler.
+
+        Args:
+            max_concurrent: Maximum turns running at once
+            max_queue_depth: Maximum turns waiting before load shedding
+            weights: Scheduling weight per project ID (default 1.0)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.weights = weights or {}
+        self._waiting: list[GenerationTicket] = []
+        self._active: dict[str, GenerationTicket] = {}
+        self._project_finish: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        # Smoothed turn duration, for Retry-After estimates
+        self._avg_turn_seconds = 20.0
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    def submit(self, session_id: str, project_id: str) -> GenerationTicket:
+        """Enqueue a turn.
+
+        Args:
+            session_id: Session the turn belongs to
+            project_id: Project the session belongs to
+
+        Returns:
+            Ticket; admitted immediately when a slot is free
+
+        Raises:
+            SchedulerOverloaded: If the queue is full
+        """
+        if len(self._waiting) >= self.max_queue_depth:
+            GENERATIONS_SHED.inc()
+            retry_after = self.retry_after()
+            logger.warning(f"Shedding turn for session {session_id}: {len(self._waiting)} queued")
+            raise SchedulerOverloaded(retry_after)
+
+        weight = max(self.weights.get(project_id, 1.0), 1e-6)
+        start_tag = max(self._virtual_time, self._project_finish.get(project_id, 0.0))
+        finish_tag = start_tag + 1.0 / weight
+        self._project_finish[project_id] = finish_tag
+
+        ticket = GenerationTicket(self, session_id, project_id, start_tag, finish_tag, next(self._seq))
+        self._waiting.append(ticket)
+        self._dispatch()
+        return ticket
+
+    def position(self, ticket: GenerationTicket) -> int:
+        """Get a waiting ticket's 1-based position in dispatch order.
+
+        Args:
+            ticket: Waiting ticket
+
+        Returns:
+            Position, or 0 if the ticket is no longer waiting
+        """
+        if ticket not in self._waiting:
+            return 0
+        return sorted(self._waiting, key=self._order).index(ticket) + 1
+
+    def retry_after(self) -> int:
+        """Estimate seconds until the queue has room again."""
+        excess = len(self._waiting) - self.max_queue_depth + 1
+        return max(1, math.ceil(self._avg_turn_seconds * max(1, excess) / max(1, self.max_concurrent)))
+
+    @asynccontextmanager
+    async def admit(self, session_id: str, project_id: str) -> AsyncIterator[GenerationTicket]:
+        """Run a block as an admitted turn (for callers that do not report queue position).
+
+        Args:
+            session_id: Session ID
+            project_id: Project ID
+
+        Yields:
+            Admitted ticket
+
+        Raises:
+            SchedulerOverloaded: If the queue is full
+        """
+        ticket = self.submit(session_id, project_id)
+        try:
+            async for _position in ticket.wait():
+                pass
+            yield ticket
+        finally:
+            ticket.release()
+
+    @staticmethod
+    def _order(ticket: GenerationTicket) -> tuple[float, int]:
+        return ticket.finish_tag, ticket.seq
+
+    def _dispatch(self) -> None:
+        """Admit waiting turns while slots are free."""
+        admitted = False
+        while len(self._active) < self.max_concurrent:
+            eligible = [t for t in self._waiting if t.session_id not in self._active]
+            if not eligible:
+                break
+            ticket = min(eligible, key=self._order)
+            self._waiting.remove(ticket)
+            self._active[ticket.session_id] = ticket
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            ticket.admitted_at = time.monotonic()
+            GENERATION_QUEUE_WAIT.observe(ticket.admitted_at - ticket.submitted_at)
+            admitted = True
+
+        if not self._active and not self._waiting:
+            # Idle: no project is behind any other any more
+            self._project_finish.clear()
+        elif admitted:
+            self._prune_finish_tags()
+        if admitted:
+            # Positions shifted for everyone still waiting
+            for ticket in list(self._waiting) + list(self._active.values()):
+                ticket._notify()
+        self._update_gauges()
+
+    def _prune_finish_tags(self) -> None:
+        """Forget projects the virtual time has caught up with.
+
+        Their next turn would start at the virtual time anyway.
+        """
+        queued = {ticket.project_id for ticket in self._waiting}
+        for project_id, finish_tag in list(self._project_finish.items()):
+            if finish_tag <= self._virtual_time and project_id not in queued:
+                del self._project_finish[project_id]
+
+    def _release(self, ticket: GenerationTicket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+
+        if ticket.admitted:
+            if self._active.get(ticket.session_id) is ticket:
+                del self._active[ticket.session_id]
+            duration = time.monotonic() - ticket.admitted_at
+            self._avg_turn_seconds = 0.8 * self._avg_turn_seconds + 0.2 * duration
+        elif ticket in self._waiting:
+            self._waiting.remove(ticket)
+            for waiting in self._waiting:
+                waiting._notify()
+
+        self._dispatch()
+
+    def _update_gauges(self) -> None:
+        GENERATIONS_ACTIVE.set(len(self._active))
+        GENERATIONS_QUEUED.set(len(self._waiting))
+
+
+# Global scheduler instance
+generation_scheduler = GenerationScheduler(
+    max_concurrent=settings.generation_max_concurrent,
+    max_queue_depth=settings.generation_max_queue_depth,
+    weights=settings.generation_project_weights,
+)
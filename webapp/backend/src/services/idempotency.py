@@ -0,0 +1,310 @@
+"""Idempotency keys for message submission.
+
+A client that sends ``Idempotency-Key`` with a message can retry after a
+network error without starting a second generation. The first request
+with a key owns a ``Recording``; requests repeating the key within the
+TTL attach to it:
+
+- while the generation runs, they replay the events so far and follow the
+  rest live;
+- once it has finished, they get the stored events (or response body) from
+  the ``idempotency_records`` table.
+
+A keyed stream runs on its own task rather than inside its response, so a
+dropped connection doesn't end the generation its retry is about to
+attach to. If no client follows it for ``detach_grace`` seconds it is
+cancelled like a disconnected stream.
+
+Failed generations (an error event, or cancelled by a disconnect) are not
+stored, so the next retry starts over. Reusing a key for a different
+message is rejected.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import time
+from collections.abc import AsyncGenerator
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import delete
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.connection import AsyncSessionLocal
+from ..database.models import IdempotencyRecord
+from ..observability.metrics import IDEMPOTENT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+# Seconds between purges of expired records
+PURGE_INTERVAL = 60.0
+
+# Events that only describe the moment they were sent; not replayed later
+_TRANSIENT_PREFIX = 'data: {"type": "queue_position"'
+_ERROR_PREFIX = 'data: {"type": "error"'
+
+
+class IdempotencyConflict(ValueError):
+    """Raised when an idempotency key is reused for a different request."""
+
+
+class IdempotentRequestFailed(Exception):
+    """Raised to a retry whose original request failed; retrying again starts over."""
+
+
+def request_fingerprint(kind: str, content: Any) -> str:
+    """Hash identifying a request, compared when a key is repeated.
+
+    Args:
+        kind: Endpoint kind ("stream" or "message")
+        content: Message content
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps([kind, content], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Recording:
+    """Events (or the response body) of one keyed request, followed by its retries."""
+
+    def __init__(self, service: "IdempotencyService", session_id: str, key: str, fingerprint: str):
+        self.service = service
+        self.session_id = session_id
+        self.key = key
+        self.fingerprint = fingerprint
+        self.events: list[str] = []
+        self.result: Any = None
+        self.done = False
+        self.failed = False
+        self._more = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._followers = 0
+        self._detach_timer: asyncio.TimerHandle | None = None
+
+    def _notify(self) -> None:
+        self._more.set()
+        self._more = asyncio.Event()
+
+    def load(self, response: str) -> None:
+        """Finish with a stored response."""
+        stored = json.loads(response)
+        if isinstance(stored, dict) and "events" in stored:
+            self.events = stored["events"]
+        else:
+            self.result = stored
+        self.done = True
+        self._notify()
+
+    def start(self, events: AsyncIterator[str]) -> None:
+        """Run a stream on its own task, recording its events.
+
+        Args:
+            events: SSE event generator of the request
+        """
+        # Own task: the stream outlives a dropped connection (the context keeps its trace)
+        self._task = asyncio.get_running_loop().create_task(
+            self._record(events), name=f"idempotent-stream-{self.session_id}", context=contextvars.copy_context()
+        )
+        self._schedule_detach()
+
+    async def _record(self, events: AsyncIterator[str]) -> None:
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    if event.startswith(_ERROR_PREFIX):
+                        self.failed = True
+                    self.events.append(event)
+                    self._notify()
+        except asyncio.CancelledError:
+            self.failed = True
+        except Exception as e:
+            logger.error(f"Idempotent stream for session {self.session_id} failed: {e}", exc_info=True)
+            self.failed = True
+        await self.finish()
+
+    async def finish(self, result: Any = None) -> None:
+        """Mark the request finished and store its outcome for later retries.
+
+        Args:
+            result: JSON-serializable response body (non-streaming requests)
+        """
+        if result is not None:
+            self.result = result
+        self.done = True
+        self._notify()
+        if self._detach_timer is not None:
+            self._detach_timer.cancel()
+        await self.service._store(self)
+
+    async def fail(self) -> None:
+        """Mark the request failed; it is forgotten so the next retry starts over."""
+        self.failed = True
+        await self.finish()
+
+    async def follow(self) -> AsyncGenerator[str, None]:
+        """Yield the recorded events, then new ones as they arrive, until the stream ends."""
+        self._followers += 1
+        if self._detach_timer is not None:
+            self._detach_timer.cancel()
+            self._detach_timer = None
+        try:
+            sent = 0
+            while True:
+                while sent < len(self.events):
+                    event = self.events[sent]
+                    sent += 1
+                    yield event
+                if self.done:
+                    return
+                await self._more.wait()
+        finally:
+            self._followers -= 1
+            self._schedule_detach()
+
+    async def wait(self) -> Any:
+        """Wait for a non-streaming request and return its response body.
+
+        Raises:
+            IdempotentRequestFailed: If the original request failed
+        """
+        while not self.done:
+            await self._more.wait()
+        if self.failed:
+            raise IdempotentRequestFailed("The original request failed; retry to run it again")
+        return self.result
+
+    def _schedule_detach(self) -> None:
+        if self._task is None or self.done or self._followers:
+            return
+        self._detach_timer = asyncio.get_running_loop().call_later(self.service.detach_grace, self._detach)
+
+    def _detach(self) -> None:
+        self._detach_timer = None
+        if self._task is not None and not self.done and not self._followers:
+            logger.info(f"No client is following the keyed stream of session {self.session_id}; cancelling it")
+            self._task.cancel()
+
+    def stored_response(self) -> str:
+        if self._task is not None:
+            return json.dumps(
+                {"events": [e for e in self.events if not e.startswith(_TRANSIENT_PREFIX)]}, ensure_ascii=False
+            )
+        return json.dumps(self.result, ensure_ascii=False)
+
+
+class IdempotencyService:
+    """In-flight recordings in memory, finished ones in a TTL table."""
+
+    def __init__(self, ttl: float = 3600.0, detach_grace: float = 30.0, session_factory=None):
+        """Initialize service.
+
+        Args:
+            ttl: Seconds a finished request is replayed to retries
+            detach_grace: Seconds a keyed stream runs without any client following it
+            session_factory: Creates database sessions for storing results
+                (defaults to ``AsyncSessionLocal``)
+        """
+        self.ttl = ttl
+        self.detach_grace = detach_grace
+        self.session_factory = session_factory or AsyncSessionLocal
+        self._recordings: dict[tuple[str, str], Recording] = {}
+        self._last_purge = 0.0
+
+    async def claim(self, db: AsyncSession, session_id: str, key: str, fingerprint: str) -> tuple[Recording, bool]:
+        """Look up a key, registering a new recording if the request is new.
+
+        Args:
+            db: Database session
+            session_id: Session the message is sent to
+            key: Idempotency-Key header value
+            fingerprint: ``request_fingerprint`` of the request
+
+        Returns:
+            Tuple of (recording, whether the caller owns it and must run the request)
+
+        Raises:
+            IdempotencyConflict: If the key was used for a different request
+        """
+        scope = (session_id, key)
+        recording = self._recordings.get(scope)
+        if recording is None:
+            # Registered before the lookup: concurrent repeats attach to this one
+            recording = Recording(self, session_id, key, fingerprint)
+            self._recordings[scope] = recording
+            try:
+                stored = await self._lookup(db, session_id, key)
+            except BaseException:
+                await recording.fail()
+                raise
+            if stored is None:
+                IDEMPOTENT_REQUESTS.labels("new").inc()
+                return recording, True
+            recording.fingerprint = stored.fingerprint
+            recording.load(stored.response)
+            del self._recordings[scope]
+            result = "replayed"
+        else:
+            result = "replayed" if recording.done else "attached"
+
+        if recording.fingerprint != fingerprint:
+            IDEMPOTENT_REQUESTS.labels("conflict").inc()
+            raise IdempotencyConflict(f"Idempotency-Key '{key}' was already used for a different request")
+        IDEMPOTENT_REQUESTS.labels(result).inc()
+        return recording, False
+
+    async def _lookup(self, db: AsyncSession, session_id: str, key: str) -> IdempotencyRecord | None:
+        now = datetime.utcnow()
+        if time.monotonic() - self._last_purge > PURGE_INTERVAL:
+            self._last_purge = time.monotonic()
+            await db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at < now))
+            await db.commit()
+        result = await db.execute(
+            select(IdempotencyRecord).where(
+                IdempotencyRecord.session_id == session_id,
+                IdempotencyRecord.key == key,
+                IdempotencyRecord.expires_at >= now,
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def _store(self, recording: Recording) -> None:
+        scope = (recording.session_id, recording.key)
+        try:
+            if not recording.failed:
+                async with self.session_factory() as db:
+                    # An expired record with the same key may still be there
+                    await db.execute(
+                        delete(IdempotencyRecord).where(
+                            IdempotencyRecord.session_id == recording.session_id,
+                            IdempotencyRecord.key == recording.key,
+                        )
+                    )
+                    db.add(
+                        IdempotencyRecord(
+                            session_id=recording.session_id,
+                            key=recording.key,
+                            fingerprint=recording.fingerprint,
+                            response=recording.stored_response(),
+                            expires_at=datetime.utcnow() + timedelta(seconds=self.ttl),
+                        )
+                    )
+                    await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store idempotent result for session {recording.session_id}: {e}")
+        finally:
+            if self._recordings.get(scope) is recording:
+                del self._recordings[scope]
+
+
+# Global service, configured in the app lifespan
+idempotency_service = IdempotencyService()
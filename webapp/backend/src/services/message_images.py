@@ -0,0 +1,213 @@
+"""Image references for compact message listings.
+
+User messages with pasted screenshots are stored as JSON content blocks
+carrying the full base64 data. The compact projection replaces each image
+with a content-hashed URL: the image is written once to a content-addressed
+store and served by ``GET /api/images/{digest}``, which clients may cache
+forever. Thumbnails are made on demand and cached next to the images.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+from ..config import settings
+from ..utils.image_utils import make_thumbnail
+
+logger = logging.getLogger(__name__)
+
+IMAGE_URL = "/api/images/{digest}"
+THUMBNAIL_URL = "/api/images/{digest}/thumbnail"
+DEFAULT_THUMBNAIL_SIZE = 256
+
+# Stored file extension by media type (and back, when serving)
+EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/bmp": "bmp",
+    "image/tiff": "tiff",
+}
+MEDIA_TYPES = {ext: media_type for media_type, ext in EXTENSIONS.items()}
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class ImageStore:
+    """Content-addressed images taken out of message content."""
+
+    def __init__(self, directory: Path | None = None):
+        """Initialize store.
+
+        Args:
+            directory: Where images are kept (defaults to ``<DATA_DIR>/images``)
+        """
+        self._directory = directory
+        # Paths known to exist, so listings don't stat every image again
+        self._stored: set[Path] = set()
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or settings.data_dir / "images"
+
+    def path(self, digest: str) -> tuple[Path, str] | None:
+        """Find a stored image.
+
+        Args:
+            digest: Image digest from its URL
+
+        Returns:
+            Tuple of (path, media type), or None if no such image is stored
+        """
+        for ext, media_type in MEDIA_TYPES.items():
+            path = self.directory / f"{digest}.{ext}"
+            if path in self._stored or path.exists():
+                return path, media_type
+        return None
+
+    async def store(self, data: str, media_type: str) -> str:
+        """Store a base64 image unless it is already there.
+
+        Args:
+            data: Base64 image data from a content block
+            media_type: Declared media type
+
+        Returns:
+            Digest of the image (SHA-256 of its encoded data)
+
+        Raises:
+            ValueError: If the data is not valid base64
+        """
+        digest = hashlib.sha256(data.encode("ascii", "replace")).hexdigest()
+        path = self.directory / f"{digest}.{EXTENSIONS.get(media_type, 'png')}"
+        if path in self._stored:
+            return digest
+        if not await asyncio.to_thread(path.exists):
+            try:
+                raw = base64.b64decode(data, validate=True)
+            except binascii.Error as e:
+                raise ValueError(f"Invalid base64 image data: {e}") from e
+            await asyncio.to_thread(_write_atomic, path, raw)
+        self._stored.add(path)
+        return digest
+
+    async def thumbnail(self, digest: str, size: int = DEFAULT_THUMBNAIL_SIZE) -> Path | None:
+        """Get a JPEG thumbnail of a stored image, making it on first use.
+
+        Args:
+            digest: Image digest
+            size: Maximum width and height in pixels
+
+        Returns:
+            Path of the thumbnail, or None if no such image is stored
+
+        Raises:
+            ValueError: If the image cannot be decoded
+        """
+        found = self.path(digest)
+        if found is None:
+            return None
+        path = self.directory / "thumbnails" / f"{digest}-{size}.jpg"
+        if not await asyncio.to_thread(path.exists):
+            data = await asyncio.to_thread(found[0].read_bytes)
+            # Pillow is imported and run off the event loop
+            thumbnail = await asyncio.to_thread(make_thumbnail, data, size)
+            await asyncio.to_thread(_write_atomic, path, thumbnail)
+        return path
+
+
+def _parse_blocks(content: str) -> list | None:
+    # Plain text is by far the common case; only JSON arrays/objects can hold images
+    if not content.startswith(("[", "{")):
+        return None
+    try:
+        parsed = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if isinstance(parsed, dict):
+        parsed = [parsed]
+    if not isinstance(parsed, list) or not all(isinstance(b, (dict, str)) for b in parsed):
+        return None
+    return parsed
+
+
+async def compact_content(content: str, store: ImageStore | None = None) -> tuple[str, list[dict[str, Any]] | None]:
+    """Replace inline image data in message content with image URLs.
+
+    Args:
+        content: Stored message content (plain text or JSON content blocks)
+        store: Image store (defaults to the global one)
+
+    Returns:
+        Tuple of (content, block metadata). Plain text is returned as is with
+        no metadata; content blocks are re-serialized with each base64 image
+        replaced by a ``url`` source.
+    """
+    blocks = _parse_blocks(content)
+    if blocks is None:
+        return content, None
+    store = store or image_store
+
+    compacted: list[Any] = []
+    metadata: list[dict[str, Any]] = []
+    changed = False
+    for block in blocks:
+        if isinstance(block, str):
+            compacted.append(block)
+            metadata.append({"type": "text", "chars": len(block)})
+            continue
+        block_type = block.get("type")
+        source = block.get("source") or {}
+        if block_type == "image" and source.get("type") == "base64" and isinstance(source.get("data"), str):
+            data = source["data"]
+            media_type = source.get("media_type", "image/png")
+            try:
+                digest = await store.store(data, media_type)
+            except ValueError as e:
+                logger.warning(f"Leaving an image inline that could not be stored: {e}")
+                compacted.append(block)
+                metadata.append({"type": "image", "media_type": media_type, "bytes": len(data) * 3 // 4})
+                continue
+            url = IMAGE_URL.format(digest=digest)
+            compacted.append({"type": "image", "source": {"type": "url", "media_type": media_type, "url": url}})
+            metadata.append(
+                {
+                    "type": "image",
+                    "media_type": media_type,
+                    "bytes": len(data) * 3 // 4,
+                    "url": url,
+                    "thumbnail_url": THUMBNAIL_URL.format(digest=digest),
+                }
+            )
+            changed = True
+        elif block_type == "upload":
+            # Reference to an uploaded project file (see upload_service)
+            compacted.append(block)
+            file_id = str(block.get("file_id"))
+            metadata.append({"type": "upload", "file_id": file_id, "url": f"/api/files/{file_id}/download"})
+        elif block_type == "text":
+            compacted.append(block)
+            metadata.append({"type": "text", "chars": len(block.get("text", ""))})
+        else:
+            compacted.append(block)
+            metadata.append({"type": block_type or "unknown"})
+
+    if changed:
+        content = json.dumps(compacted, ensure_ascii=False)
+    return content, metadata
+
+
+# Global store under the data directory
+image_store = ImageStore()
@@ -97,7 +97,7 @@ class MessageService:
 
         try:
             # Get AI response
-            ai_response = agent.send_message(
+            ai_response = await agent.send_message(
                 project=session.project,
                 conversation_history=conversation_history,
                 user_message=content,
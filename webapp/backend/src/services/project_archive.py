@@ -0,0 +1,439 @@
+"""Export and import whole projects as ZIP archives.
+
+Archive layout:
+
+- ``manifest.json``: format marker and the project row
+- ``files/<name>``: current content of every project file
+- ``data.ndjson``: one JSON object per line for each session, message,
+  session summary and file record, parents before children
+
+Export is an async generator of ZIP bytes. Rows are streamed from the
+database and file content is compressed a chunk at a time, so memory stays
+flat however large the project is and nothing is written to disk. Import
+reads the archive from a seekable file, checks its unpacked size against a
+limit, inserts rows in batches under new IDs and writes file content from a
+small pool of worker threads.
+"""
+
+import asyncio
+import enum
+import hashlib
+import io
+import json
+import logging
+import os
+import zipfile
+from collections.abc import AsyncIterator
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+from uuid import uuid4
+
+from sqlalchemy import DateTime
+from sqlalchemy import Enum
+from sqlalchemy import insert
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import Base
+from ..database.models import File
+from ..database.models import FileVersion
+from ..database.models import Message
+from ..database.models import Project
+from ..database.models import ProjectStatus
+from ..database.models import Session
+from ..database.models import SessionSummary
+from ..observability.metrics import PROJECT_ARCHIVE_BYTES
+from ..observability.tracing import span
+from .file_service import FileService
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = "outcomist-project"
+ARCHIVE_VERSION = 1
+
+# File content is read and compressed this much at a time
+CHUNK_SIZE = 256 * 1024
+# Rows per database fetch on export and per bulk insert on import
+BATCH_SIZE = 500
+# File content writes in flight on import
+IMPORT_WRITE_CONCURRENCY = 8
+
+# NDJSON record type -> model, in insert order
+_RECORD_MODELS: dict[str, type[Base]] = {
+    "session": Session,
+    "message": Message,
+    "session_summary": SessionSummary,
+    "file": File,
+}
+# Columns that only make sense on the exporting server
+_EXCLUDED_COLUMNS = {"path"}
+
+
+class InvalidArchiveError(ValueError):
+    """Raised when an uploaded archive is not a valid project export."""
+
+
+class ArchiveTooLarge(InvalidArchiveError):
+    """Raised when an archive's content unpacks to more than the size limit."""
+
+
+class _ZipSink:
+    """Write-only stream that collects ZIP output until it is drained.
+
+    Has no ``tell``/``seek``, so ``zipfile`` writes sizes in data
+    descriptors after each entry instead of seeking back.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _encode_row(row: Base) -> dict[str, Any]:
+    """Serialize a model row's columns to JSON-compatible values."""
+    data: dict[str, Any] = {}
+    for column in row.__table__.columns:
+        if column.key in _EXCLUDED_COLUMNS:
+            continue
+        value = getattr(row, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        data[column.key] = value
+    return data
+
+
+def _decode_row(model: type[Base], data: dict[str, Any]) -> dict[str, Any]:
+    """Turn an exported record back into column values for ``model``."""
+    values: dict[str, Any] = {}
+    for column in model.__table__.columns:
+        if column.key not in data or data[column.key] is None:
+            continue
+        value = data[column.key]
+        if isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif isinstance(column.type, Enum) and column.type.enum_class is not None:
+            value = column.type.enum_class(value)
+        values[column.key] = value
+    return values
+
+
+def _file_chunks(zf: zipfile.ZipFile, sink: _ZipSink, name: str, path: Path) -> Iterator[bytes]:
+    """Compress one file into the archive, yielding output as it is produced."""
+    size = path.stat().st_size
+    with open(path, "rb") as source, zf.open(f"files/{name}", "w", force_zip64=size > zipfile.ZIP64_LIMIT) as entry:
+        while chunk := source.read(CHUNK_SIZE):
+            entry.write(chunk)
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+async def export_project(db: AsyncSession, project: Project) -> AsyncIterator[bytes]:
+    """Stream a project as a ZIP archive.
+
+    Args:
+        db: Database session
+        project: Project to export
+
+    Yields:
+        Chunks of the ZIP file
+    """
+    sink = _ZipSink()
+    zf = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+    total = 0
+
+    def _next(chunks: Iterator[bytes]) -> bytes | None:
+        return next(chunks, None)
+
+    with span("project.export", project_id=project.id) as export_span:
+        manifest = {"format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION, "project": _encode_row(project)}
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+
+        # Newest record per name; older duplicates predate in-place updates
+        exported: dict[str, str] = {}
+        files = await db.stream_scalars(
+            select(File)
+            .where(File.project_id == project.id)
+            .order_by(File.created_at.desc())
+            .execution_options(yield_per=BATCH_SIZE)
+        )
+        async for file in files:
+            path = Path(file.path)
+            if file.name in exported:
+                continue
+            if not path.is_file():
+                logger.warning(f"Skipping missing file {file.name} in export of project {project.id}")
+                continue
+            exported[file.name] = file.id
+            chunks = _file_chunks(zf, sink, file.name, path)
+            while (data := await asyncio.to_thread(_next, chunks)) is not None:
+                if data:
+                    total += len(data)
+                    yield data
+
+        with zf.open("data.ndjson", "w") as ndjson:
+            session_ids = select(Session.id).where(Session.project_id == project.id)
+            queries = {
+                "session": select(Session).where(Session.project_id == project.id).order_by(Session.created_at),
+                "message": select(Message).where(Message.session_id.in_(session_ids)).order_by(Message.created_at),
+                "session_summary": select(SessionSummary)
+                .where(SessionSummary.session_id.in_(session_ids))
+                .order_by(SessionSummary.created_at),
+                "file": select(File).where(File.project_id == project.id),
+            }
+            exported_ids = set(exported.values())
+            for record_type, query in queries.items():
+                rows = await db.stream_scalars(query.execution_options(yield_per=BATCH_SIZE))
+                async for batch in rows.partitions(BATCH_SIZE):
+                    lines = "".join(
+                        json.dumps({"type": record_type, **_encode_row(row)}, separators=(",", ":")) + "\n"
+                        for row in batch
+                        if record_type != "file" or row.id in exported_ids
+                    )
+                    await asyncio.to_thread(ndjson.write, lines.encode("utf-8"))
+                    data = sink.drain()
+                    if data:
+                        total += len(data)
+                        yield data
+
+        zf.close()
+        data = sink.drain()
+        total += len(data)
+        yield data
+
+        export_span.set(bytes=total)
+        PROJECT_ARCHIVE_BYTES.labels("export").inc(total)
+
+
+def _safe_target(project_dir: Path, name: str) -> Path:
+    """Storage path for an archived file name, rejecting paths that escape the project."""
+    target = (project_dir / name).resolve()
+    if not name or Path(name).is_absolute() or not target.is_relative_to(project_dir.resolve()):
+        raise InvalidArchiveError(f"Archive contains an unsafe file name: {name!r}")
+    return target
+
+
+def _extract(zf: zipfile.ZipFile, member: str, target: Path) -> tuple[int, str]:
+    """Copy one archived file to disk. Runs in a worker thread.
+
+    Returns:
+        Size and SHA-256 of the content
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with zf.open(member) as source, open(target, "wb") as out:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+            out.write(chunk)
+    return size, digest.hexdigest()
+
+
+async def import_project(db: AsyncSession, archive: BinaryIO, max_unpacked_bytes: int | None = None) -> Project:
+    """Create a new project from an exported archive.
+
+    Every row gets a new ID, so an archive can be imported more than once
+    and next to the project it came from. Nothing is kept if the import
+    fails part way.
+
+    Args:
+        db: Database session
+        archive: Seekable binary file holding the ZIP archive
+        max_unpacked_bytes: Limit on the total uncompressed size of the archive's members
+
+    Returns:
+        The imported project
+
+    Raises:
+        ArchiveTooLarge: If the members add up to more than ``max_unpacked_bytes``
+        InvalidArchiveError: If the archive is not a valid project export
+    """
+    try:
+        zf = zipfile.ZipFile(archive)
+        manifest = json.loads(zf.read("manifest.json"))
+    except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as e:
+        raise InvalidArchiveError(f"Not a project archive: {e}") from e
+    if manifest.get("format") != ARCHIVE_FORMAT or manifest.get("version") != ARCHIVE_VERSION:
+        raise InvalidArchiveError("Unsupported project archive format")
+    # Declared sizes: reads of a member stop at its declared size, so they also bound what is written
+    unpacked = sum(info.file_size for info in zf.infolist())
+    if max_unpacked_bytes is not None and unpacked > max_unpacked_bytes:
+        raise ArchiveTooLarge(f"Archive unpacks to {unpacked} bytes, more than the {max_unpacked_bytes} byte limit")
+
+    project_values = _decode_row(Project, manifest["project"])
+    project = Project(
+        name=project_values["name"],
+        description=project_values.get("description"),
+        type=project_values["type"],
+        status=ProjectStatus.IDLE,
+    )
+    db.add(project)
+    await db.flush()
+
+    project_dir = FileService._get_project_dir(project.id)
+    importer = _Importer(db, zf, project.id, project_dir)
+    try:
+        with span("project.import", project_id=project.id) as import_span:
+            file_count = await importer.run()
+            import_span.set(files=file_count)
+        await db.commit()
+    except BaseException:
+        await importer.cancel()
+        await db.rollback()
+        await asyncio.to_thread(_remove_tree, project_dir.parent)
+        raise
+
+    await db.refresh(project)
+    PROJECT_ARCHIVE_BYTES.labels("import").inc(sum(info.compress_size for info in zf.infolist()))
+    logger.info(f"Imported project {project.id} with {file_count} files")
+    return project
+
+
+class _Importer:
+    """Inserts one archive's records and writes its files."""
+
+    def __init__(self, db: AsyncSession, zf: zipfile.ZipFile, project_id: str, project_dir: Path):
+        self.db = db
+        self.zf = zf
+        self.project_id = project_id
+        self.project_dir = project_dir
+        self.members = set(zf.namelist())
+        self.new_ids: dict[str, str] = {}
+        self.pending: list[dict[str, Any]] = []
+        self.pending_model: type[Base] | None = None
+        self.files: list[dict[str, Any]] = []
+        self.uploads: list[dict[str, Any]] = []
+        self.writes: list[asyncio.Task] = []
+        self.semaphore = asyncio.Semaphore(IMPORT_WRITE_CONCURRENCY)
+
+    async def run(self) -> int:
+        """Import all records. Returns the number of files."""
+        self.project_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            raw = self.zf.open("data.ndjson")
+        except KeyError as e:
+            raise InvalidArchiveError("Archive has no data.ndjson") from e
+
+        with raw, io.TextIOWrapper(raw, encoding="utf-8") as ndjson:
+            while lines := await asyncio.to_thread(ndjson.readlines, CHUNK_SIZE):
+                for line in lines:
+                    await self._add(json.loads(line))
+        await self._flush()
+
+        await asyncio.gather(*self.writes)
+        for start in range(0, len(self.files), BATCH_SIZE):
+            batch = self.files[start : start + BATCH_SIZE]
+            await self.db.execute(insert(File), [{k: v for k, v in f.items() if k != "sha256"} for f in batch])
+            await self.db.execute(
+                insert(FileVersion),
+                [
+                    {"id": str(uuid4()), "file_id": f["id"], "version": 1, "size": f["size"], "sha256": f["sha256"]}
+                    for f in batch
+                ],
+            )
+
+        patched = [
+            {"id": values["id"], "content": content}
+            for values in self.uploads
+            if (content := _remap_upload_blocks(values["content"], self.new_ids)) != values["content"]
+        ]
+        for start in range(0, len(patched), BATCH_SIZE):
+            await self.db.execute(update(Message), patched[start : start + BATCH_SIZE])
+        return len(self.files)
+
+    async def cancel(self) -> None:
+        """Stop file writes still in flight."""
+        for task in self.writes:
+            task.cancel()
+        await asyncio.gather(*self.writes, return_exceptions=True)
+
+    def _remap(self, old_id: str | None) -> str | None:
+        return self.new_ids.get(old_id) if old_id is not None else None
+
+    async def _flush(self) -> None:
+        if self.pending:
+            await self.db.execute(insert(self.pending_model), self.pending)
+            self.pending = []
+
+    async def _add(self, record: dict[str, Any]) -> None:
+        model = _RECORD_MODELS.get(record.get("type"))
+        if model is None:
+            raise InvalidArchiveError(f"Unknown record type {record.get('type')!r}")
+        if model is not self.pending_model or len(self.pending) >= BATCH_SIZE:
+            # Parents are inserted before the records that point at them
+            await self._flush()
+            self.pending_model = model
+
+        values = _decode_row(model, record)
+        self.new_ids[values["id"]] = values["id"] = str(uuid4())
+        if model is Session:
+            values["project_id"] = self.project_id
+        elif model is Message:
+            values["session_id"] = self._remap(values["session_id"])
+            if '"upload"' in values["content"]:
+                # Refers to files by ID; patched once the files have their new IDs
+                self.uploads.append(values)
+        elif model is SessionSummary:
+            values["session_id"] = self._remap(values["session_id"])
+            values["through_message_id"] = self._remap(values["through_message_id"])
+        else:
+            member = f"files/{values['name']}"
+            if member not in self.members:
+                raise InvalidArchiveError(f"Archive is missing content for {values['name']}")
+            target = _safe_target(self.project_dir, values["name"])
+            values["project_id"] = self.project_id
+            values["session_id"] = self._remap(values.get("session_id"))
+            values["path"] = str(target)
+            self.files.append(values)
+            # Inserted after the content is on disk and its size is known
+            self.writes.append(asyncio.create_task(self._write_file(values, member, target)))
+            return
+        self.pending.append(values)
+
+    async def _write_file(self, values: dict[str, Any], member: str, target: Path) -> None:
+        async with self.semaphore:
+            values["size"], values["sha256"] = await asyncio.to_thread(_extract, self.zf, member, target)
+
+
+def _remap_upload_blocks(content: str, new_ids: dict[str, str]) -> str:
+    """Point the ``upload`` blocks of a message's content at the imported files."""
+    try:
+        blocks = json.loads(content)
+    except json.JSONDecodeError:
+        return content
+    changed = False
+    for block in blocks if isinstance(blocks, list) else [blocks]:
+        if not isinstance(block, dict) or block.get("type") != "upload":
+            continue
+        new_id = new_ids.get(str(block.get("file_id")))
+        if new_id is not None:
+            block["file_id"] = new_id
+            changed = True
+    return json.dumps(blocks, ensure_ascii=False) if changed else content
+
+
+def _remove_tree(directory: Path) -> None:
+    """Delete a directory and everything below it, if it exists."""
+    for root, _dirs, names in os.walk(directory, topdown=False):
+        for name in names:
+            Path(root, name).unlink(missing_ok=True)
+        Path(root).rmdir()
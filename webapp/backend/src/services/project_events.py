@@ -0,0 +1,174 @@
+"""Project events multiplexed onto one stream per dashboard.
+
+The per-session stream carries one turn of one session. A dashboard
+showing many projects instead opens a single subscription to a set of
+project IDs and receives their status changes, created files and
+verification results, each tagged with its ``project_id``.
+
+Events are coalesced per subscription: a pending event is replaced by a
+newer one with the same key (a project's status, one file, a project's
+verification), so a client that falls behind gets the latest state rather
+than a backlog, and a burst like planning → working → complete inside
+``coalesce_window`` is sent once. Memory is bounded by the subscribed
+projects, not by how many events they produce; past ``max_pending`` the
+oldest are dropped and the client is told to refetch.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections import defaultdict
+from collections.abc import AsyncGenerator
+from collections.abc import Iterable
+from typing import Any
+from uuid import uuid4
+
+from ..ai.events import SSEEventType
+from ..observability.metrics import PROJECT_EVENT_SUBSCRIPTIONS
+from ..observability.metrics import PROJECT_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Pending events kept per subscription before the oldest are dropped
+MAX_PENDING = 256
+
+
+class Subscription:
+    """One client's subscription to a set of projects."""
+
+    def __init__(self, hub: "ProjectEventHub", project_ids: set[str]):
+        self.id = uuid4().hex
+        self.hub = hub
+        self.project_ids = project_ids
+        self._pending: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+        self._ready = asyncio.Event()
+        self._overflowed = False
+        self._closed = False
+
+    def offer(self, project_id: str, key: str, event: dict[str, Any]) -> None:
+        """Queue an event, replacing a pending one with the same key."""
+        slot = (project_id, key)
+        if self._pending.pop(slot, None) is not None:
+            PROJECT_EVENTS.labels("coalesced").inc()
+        self._pending[slot] = event
+        if len(self._pending) > self.hub.max_pending:
+            self._pending.popitem(last=False)
+            self._overflowed = True
+            PROJECT_EVENTS.labels("dropped").inc()
+        self._ready.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    async def events(self) -> AsyncGenerator[dict[str, Any], None]:
+        """Yield queued events as they arrive, until the subscription is closed."""
+        while not self._closed:
+            await self._ready.wait()
+            if self.hub.coalesce_window > 0 and not self._closed:
+                # Let a burst land before sending
+                await asyncio.sleep(self.hub.coalesce_window)
+            self._ready.clear()
+            if self._overflowed:
+                self._overflowed = False
+                yield {"type": SSEEventType.RESYNC.value}
+            pending, self._pending = self._pending, OrderedDict()
+            for event in pending.values():
+                PROJECT_EVENTS.labels("sent").inc()
+                yield event
+
+
+class ProjectEventHub:
+    """Routes project events to the subscriptions that follow each project."""
+
+    def __init__(self, coalesce_window: float = 0.1, max_pending: int = MAX_PENDING):
+        """Initialize hub.
+
+        Args:
+            coalesce_window: Seconds a woken subscription waits for more events before sending
+            max_pending: Pending events per subscription before the oldest are dropped
+        """
+        self.coalesce_window = coalesce_window
+        self.max_pending = max_pending
+        self._subscriptions: dict[str, Subscription] = {}
+        self._by_project: dict[str, set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, project_ids: Iterable[str]) -> Subscription:
+        """Start a subscription; ``unsubscribe`` it when the client goes away.
+
+        Args:
+            project_ids: Projects to follow
+
+        Returns:
+            The subscription
+        """
+        subscription = Subscription(self, set())
+        self._subscriptions[subscription.id] = subscription
+        self.update(subscription, project_ids)
+        return subscription
+
+    def get(self, subscription_id: str) -> Subscription | None:
+        """Get a live subscription by ID."""
+        return self._subscriptions.get(subscription_id)
+
+    def update(self, subscription: Subscription, project_ids: Iterable[str]) -> set[str]:
+        """Replace the projects a subscription follows.
+
+        Args:
+            subscription: Subscription to change
+            project_ids: Projects to follow from now on
+
+        Returns:
+            Projects that were added (their current state should be sent)
+        """
+        wanted = set(project_ids)
+        for project_id in subscription.project_ids - wanted:
+            self._remove(subscription, project_id)
+        added = wanted - subscription.project_ids
+        for project_id in added:
+            self._by_project[project_id].add(subscription)
+        subscription.project_ids = wanted
+        return added
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """End a subscription."""
+        subscription.close()
+        for project_id in subscription.project_ids:
+            self._remove(subscription, project_id)
+        subscription.project_ids = set()
+        self._subscriptions.pop(subscription.id, None)
+
+    def _remove(self, subscription: Subscription, project_id: str) -> None:
+        subscribers = self._by_project.get(project_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._by_project[project_id]
+
+    def publish(self, project_id: str, key: str, event_type: SSEEventType, data: dict[str, Any]) -> None:
+        """Send an event to every subscription following the project.
+
+        Never waits, so it can be called from any code path that changes a project.
+
+        Args:
+            project_id: Project the event is about
+            key: Coalescing key; a pending event with the same key is replaced
+            event_type: Event type
+            data: Event payload
+        """
+        subscribers = self._by_project.get(project_id)
+        if not subscribers:
+            return
+        event = {"type": event_type.value, "project_id": project_id, **data, "at": time.time()}
+        for subscription in subscribers:
+            subscription.offer(project_id, key, event)
+
+    def subscription_count(self) -> int:
+        return len(self._subscriptions)
+
+
+# Global hub, configured in the app lifespan
+project_events = ProjectEventHub()
+PROJECT_EVENT_SUBSCRIPTIONS.set_function(project_events.subscription_count)
@@ -8,9 +8,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from ..database.models import File
+from ..database.models import Message
 from ..database.models import Project
 from ..database.models import ProjectStatus
 from ..database.models import ProjectType
+from ..database.models import Session
+from .status_service import status_store
 
 
 class ProjectService:
@@ -76,6 +79,22 @@ class ProjectService:
         result = await db.execute(select(Project).where(Project.id == project_id))
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def has_messages(db: AsyncSession, project_id: str) -> bool:
+        """Check whether any session of a project has a message.
+
+        Args:
+            db: Database session
+            project_id: Project ID
+
+        Returns:
+            True once the project has had its first message
+        """
+        result = await db.execute(
+            select(Message.id).join(Session, Message.session_id == Session.id).where(Session.project_id == project_id).limit(1)
+        )
+        return result.first() is not None
+
     @staticmethod
     async def update_project(
         db: AsyncSession,
@@ -109,6 +128,8 @@ class ProjectService:
 
         await db.commit()
         await db.refresh(project)
+        if status is not None:
+            status_store.reset(project_id, status)
         return project
 
     @staticmethod
@@ -142,4 +163,5 @@ class ProjectService:
         # Soft delete: set deleted_at timestamp
         project.deleted_at = datetime.utcnow()
         await db.commit()
+        status_store.forget(project_id)
         return True
@@ -0,0 +1,259 @@
+"""Starter cache: replay the deliverables of a near-identical first request.
+
+Many projects open with almost the same request ("make a snake game",
+"plan a 3 day Vegas trip"). When a project's first turn finishes (and, for
+games, passes verification), its reply and files are stored under the
+project type and the normalized prompt. A later project of the same type
+whose first prompt normalizes to the same key, or whose MinHash signature is
+at least ``threshold`` similar and asks for the same thing word for word
+(``same_request``: equal numbers, no swapped content words), gets those
+files copied in instead of a new generation.
+
+Matching runs against an in-memory index of signatures loaded from the
+database on first use. Entries are evicted least recently used once there
+are more than ``max_entries``.
+"""
+
+import asyncio
+import logging
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import delete
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import File
+from ..database.models import ProjectType
+from ..database.models import StarterCacheEntry
+from ..database.models import StarterCacheFile
+from ..observability.metrics import STARTER_CACHE_ENTRIES
+from ..observability.metrics import STARTER_CACHE_EVICTIONS
+from ..observability.metrics import STARTER_CACHE_LOOKUPS
+from ..observability.metrics import STARTER_CACHE_SIMILARITY
+from ..utils.minhash import from_bytes
+from ..utils.minhash import normalize_prompt
+from ..utils.minhash import same_request
+from ..utils.minhash import signature
+from ..utils.minhash import similarity
+from ..utils.minhash import to_bytes
+from .file_service import FileService
+
+logger = logging.getLogger(__name__)
+
+# Deliverable sets larger than this are not cached
+MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+
+@dataclass
+class StarterMatch:
+    """A cached starter that matches a new project's first prompt."""
+
+    entry_id: str
+    prompt: str
+    similarity: float
+
+
+@dataclass
+class ReplayedStarter:
+    """Result of copying a cached starter into a project."""
+
+    content: str
+    files: list[File]
+
+
+@dataclass
+class _IndexEntry:
+    entry_id: str
+    project_type: ProjectType
+    prompt_key: str
+    prompt: str
+    signature: array
+    last_used_at: datetime
+
+
+class StarterCache:
+    """Index of cached first turns, matched by normalized prompt and MinHash similarity."""
+
+    def __init__(self, threshold: float = 0.8, max_entries: int = 200):
+        """Initialize cache.
+
+        Args:
+            threshold: Minimum estimated similarity for a near match
+            max_entries: Entries kept before the least recently used are evicted
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._index: dict[str, _IndexEntry] | None = None
+        self._load_lock = asyncio.Lock()
+
+    def size(self) -> int:
+        """Number of indexed entries (0 until first use)."""
+        return len(self._index) if self._index is not None else 0
+
+    async def _ensure_index(self, db: AsyncSession) -> dict[str, _IndexEntry]:
+        if self._index is not None:
+            return self._index
+        async with self._load_lock:
+            if self._index is None:
+                result = await db.execute(
+                    select(
+                        StarterCacheEntry.id,
+                        StarterCacheEntry.project_type,
+                        StarterCacheEntry.prompt_key,
+                        StarterCacheEntry.prompt,
+                        StarterCacheEntry.signature,
+                        StarterCacheEntry.last_used_at,
+                    )
+                )
+                self._index = {
+                    row.id: _IndexEntry(
+                        row.id, row.project_type, row.prompt_key, row.prompt, from_bytes(row.signature), row.last_used_at
+                    )
+                    for row in result
+                }
+                logger.info(f"Loaded {len(self._index)} starter cache entries")
+        return self._index
+
+    async def lookup(self, db: AsyncSession, project_type: ProjectType, prompt: str) -> StarterMatch | None:
+        """Find a cached starter for a first prompt.
+
+        Args:
+            db: Database session
+            project_type: Type of the new project
+            prompt: First user message
+
+        Returns:
+            Best match at or above the threshold that asks for the same thing, or None
+        """
+        index = await self._ensure_index(db)
+        key = normalize_prompt(prompt)
+        best: StarterMatch | None = None
+        if key:
+            sig = None
+            for indexed in index.values():
+                if indexed.project_type != project_type:
+                    continue
+                if indexed.prompt_key == key:
+                    best = StarterMatch(indexed.entry_id, indexed.prompt, 1.0)
+                    break
+                sig = sig if sig is not None else signature(key)
+                score = similarity(sig, indexed.signature)
+                if score >= self.threshold and not same_request(key, indexed.prompt_key):
+                    # Worded alike but asks for something else ("3 day" vs "7 day", "red" vs "blue")
+                    continue
+                if best is None or score > best.similarity:
+                    best = StarterMatch(indexed.entry_id, indexed.prompt, score)
+
+        if best is not None:
+            STARTER_CACHE_SIMILARITY.observe(best.similarity)
+        hit = best is not None and best.similarity >= self.threshold
+        STARTER_CACHE_LOOKUPS.labels(project_type.value, "hit" if hit else "miss").inc()
+        return best if hit else None
+
+    async def store(
+        self,
+        db: AsyncSession,
+        project_type: ProjectType,
+        prompt: str,
+        content: str,
+        files: list[File],
+    ) -> StarterCacheEntry | None:
+        """Cache a finished first turn, replacing any entry with the same key.
+
+        Args:
+            db: Database session
+            project_type: Project type
+            prompt: First user message
+            content: Assistant reply
+            files: Project files the turn produced
+
+        Returns:
+            Stored entry, or None if the turn is not cacheable (no files,
+            prompt without content words, or too large)
+        """
+        key = normalize_prompt(prompt)
+        if not key or not files:
+            return None
+        blobs = await asyncio.gather(*(asyncio.to_thread(Path(f.path).read_bytes) for f in files))
+        if sum(len(b) for b in blobs) > MAX_ENTRY_BYTES:
+            logger.info(f"Not caching starter '{key}': deliverables exceed {MAX_ENTRY_BYTES} bytes")
+            return None
+
+        index = await self._ensure_index(db)
+        replaced = [e.entry_id for e in index.values() if e.project_type == project_type and e.prompt_key == key]
+        if replaced:
+            await self._delete(db, replaced)
+
+        sig = signature(key)
+        entry = StarterCacheEntry(
+            project_type=project_type,
+            prompt_key=key,
+            prompt=prompt,
+            signature=to_bytes(sig),
+            content=content,
+            last_used_at=datetime.utcnow(),
+            files=[StarterCacheFile(name=f.name, mime_type=f.mime_type, data=b) for f, b in zip(files, blobs)],
+        )
+        db.add(entry)
+        await db.flush()
+        index[entry.id] = _IndexEntry(entry.id, project_type, key, prompt, sig, entry.last_used_at)
+
+        overflow = len(index) - self.max_entries
+        if overflow > 0:
+            evicted = sorted(index.values(), key=lambda e: e.last_used_at)[:overflow]
+            await self._delete(db, [e.entry_id for e in evicted])
+            STARTER_CACHE_EVICTIONS.inc(len(evicted))
+        await db.commit()
+        logger.info(f"Cached starter for {project_type.value} '{key}' ({len(files)} files)")
+        return entry
+
+    async def _delete(self, db: AsyncSession, entry_ids: list[str]) -> None:
+        await db.execute(delete(StarterCacheFile).where(StarterCacheFile.entry_id.in_(entry_ids)))
+        await db.execute(delete(StarterCacheEntry).where(StarterCacheEntry.id.in_(entry_ids)))
+        for entry_id in entry_ids:
+            self._index.pop(entry_id, None)
+
+    async def replay(
+        self, db: AsyncSession, match: StarterMatch, project_id: str, session_id: str
+    ) -> ReplayedStarter | None:
+        """Copy a cached starter's files into a project.
+
+        Args:
+            db: Database session
+            match: Match returned by ``lookup``
+            project_id: Target project
+            session_id: Session the files are attributed to
+
+        Returns:
+            Cached reply and the created files, or None if the entry is gone
+        """
+        entry = await db.get(StarterCacheEntry, match.entry_id)
+        if entry is None:
+            if self._index is not None:
+                self._index.pop(match.entry_id, None)
+            return None
+        result = await db.execute(select(StarterCacheFile).where(StarterCacheFile.entry_id == entry.id))
+        files = [
+            await FileService.create_file(db, project_id, session_id, cached.name, cached.data, cached.mime_type)
+            for cached in result.scalars()
+        ]
+
+        now = datetime.utcnow()
+        await db.execute(
+            update(StarterCacheEntry)
+            .where(StarterCacheEntry.id == entry.id)
+            .values(hits=StarterCacheEntry.hits + 1, last_used_at=now)
+        )
+        await db.commit()
+        if self._index is not None and entry.id in self._index:
+            self._index[entry.id].last_used_at = now
+        return ReplayedStarter(content=entry.content, files=files)
+
+
+# Global starter cache, configured in the app lifespan
+starter_cache = StarterCache()
+STARTER_CACHE_ENTRIES.set_function(starter_cache.size)
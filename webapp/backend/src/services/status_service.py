@@ -1,81 +1,347 @@
-"""Status management service for project status transitions and broadcasting."""
+"""Status management service for project status transitions and broadcasting.
 
+Project status lives in memory (``status_store``): transitions are validated
+against ``TRANSITIONS`` and applied to the cached entry, reads are served
+from the cache, and a write-behind flusher persists changes after
+``flush_delay`` seconds. Transitions that land inside the same window
+collapse into one UPDATE of the latest status, so a turn's
+planning → working → complete usually costs a single write.
+
+The database stays the source of truth across restarts: entries are loaded
+on first use, and ``recover`` resets projects left mid-turn by a crash.
+"""
+
+import asyncio
+import contextvars
 import logging
+import time
+from dataclasses import dataclass
+
 from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from ..ai.events import SSEEventType
+from ..database.connection import AsyncSessionLocal
 from ..database.models import Project
 from ..database.models import ProjectStatus
-from .connection_manager import connection_manager
+from ..observability.metrics import STATUS_TRANSITION_DURATION
+from ..observability.metrics import STATUS_TRANSITIONS
+from ..observability.metrics import STATUS_WRITES
+from ..observability.tracing import traced
+from .project_events import project_events
 
 logger = logging.getLogger(__name__)
 
+# Allowed moves between statuses; re-entering the current status only updates its message.
+# A turn can end (COMPLETE or IDLE) from any status: another session of the project
+# may have moved it in the meantime, e.g. set it IDLE by cancelling its own turn.
+TRANSITIONS: dict[ProjectStatus, frozenset[ProjectStatus]] = {
+    ProjectStatus.IDLE: frozenset(
+        {ProjectStatus.PLANNING, ProjectStatus.WORKING, ProjectStatus.NEEDS_INPUT, ProjectStatus.COMPLETE}
+    ),
+    ProjectStatus.PLANNING: frozenset(
+        {ProjectStatus.WORKING, ProjectStatus.NEEDS_INPUT, ProjectStatus.COMPLETE, ProjectStatus.IDLE}
+    ),
+    ProjectStatus.WORKING: frozenset(
+        {
+            ProjectStatus.PLANNING,
+            ProjectStatus.VERIFYING,
+            ProjectStatus.NEEDS_INPUT,
+            ProjectStatus.COMPLETE,
+            ProjectStatus.IDLE,
+        }
+    ),
+    ProjectStatus.NEEDS_INPUT: frozenset(
+        {ProjectStatus.PLANNING, ProjectStatus.WORKING, ProjectStatus.COMPLETE, ProjectStatus.IDLE}
+    ),
+    ProjectStatus.VERIFYING: frozenset(
+        {ProjectStatus.WORKING, ProjectStatus.NEEDS_INPUT, ProjectStatus.COMPLETE, ProjectStatus.IDLE}
+    ),
+    ProjectStatus.COMPLETE: frozenset({ProjectStatus.PLANNING, ProjectStatus.WORKING, ProjectStatus.IDLE}),
+}
+
+# Statuses that only hold while a turn is running
+ACTIVE_STATUSES = frozenset({ProjectStatus.PLANNING, ProjectStatus.WORKING, ProjectStatus.VERIFYING})
+
+
+class InvalidStatusTransition(ValueError):
+    """Raised when a project cannot move from its current status to the requested one."""
+
+    def __init__(self, project_id: str, current: ProjectStatus, requested: ProjectStatus):
+        super().__init__(f"Project {project_id} cannot go from {current.value} to {requested.value}")
+        self.project_id = project_id
+        self.current = current
+        self.requested = requested
+
+
+@dataclass
+class StatusEntry:
+    """Cached status of one project."""
+
+    status: ProjectStatus
+    # Last status known to be in the database
+    persisted: ProjectStatus
+    message: str | None = None
+    context: dict | None = None
+    updated_at: float = 0.0
+
+
+class StatusStore:
+    """In-memory project statuses with coalesced write-behind persistence."""
+
+    def __init__(self, flush_delay: float = 0.25, session_factory: async_sessionmaker | None = None):
+        """Initialize store.
+
+        Args:
+            flush_delay: Seconds a changed status waits before it is written;
+                later transitions in the window replace it
+            session_factory: Sessions for the flusher (default: the app's)
+        """
+        self.flush_delay = flush_delay
+        self.session_factory = session_factory or AsyncSessionLocal
+        self._entries: dict[str, StatusEntry] = {}
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        self._write_lock = asyncio.Lock()
+
+    def peek(self, project_id: str) -> StatusEntry | None:
+        """Cached entry for a project, without touching the database."""
+        return self._entries.get(project_id)
+
+    async def get(self, db: AsyncSession, project_id: str) -> StatusEntry | None:
+        """Cached entry for a project, loaded from the database on first use.
+
+        Args:
+            db: Database session used on a cache miss
+            project_id: Project ID
+
+        Returns:
+            Entry, or None if the project does not exist
+        """
+        entry = self._entries.get(project_id)
+        if entry is not None:
+            return entry
+        result = await db.execute(select(Project.status).where(Project.id == project_id))
+        status = result.scalar_one_or_none()
+        if status is None:
+            return None
+        # Another coroutine may have loaded it while we waited
+        return self._entries.setdefault(project_id, StatusEntry(status=status, persisted=status))
+
+    async def transition(
+        self,
+        db: AsyncSession,
+        project_id: str,
+        new_status: ProjectStatus,
+        message: str | None = None,
+        context: dict | None = None,
+    ) -> tuple[ProjectStatus, StatusEntry] | None:
+        """Move a project to a new status and schedule the write.
+
+        Args:
+            db: Database session used on a cache miss
+            project_id: Project ID
+            new_status: Requested status
+            message: Status message
+            context: Context data (agent, step, etc.)
+
+        Returns:
+            Previous status and the updated entry, or None if the project does not exist
+
+        Raises:
+            InvalidStatusTransition: If ``TRANSITIONS`` does not allow the move
+        """
+        entry = await self.get(db, project_id)
+        if entry is None:
+            return None
+        old_status = entry.status
+        if new_status != old_status and new_status not in TRANSITIONS[old_status]:
+            raise InvalidStatusTransition(project_id, old_status, new_status)
+
+        entry.status = new_status
+        entry.message = message
+        entry.context = context
+        entry.updated_at = time.time()
+        if new_status == entry.persisted:
+            # Back where the database already is: nothing left to write
+            self._dirty.discard(project_id)
+        else:
+            self._dirty.add(project_id)
+            self._schedule_flush()
+        return old_status, entry
+
+    def reset(self, project_id: str, status: ProjectStatus) -> None:
+        """Replace a project's entry after its status was written directly to the database."""
+        self._dirty.discard(project_id)
+        self._entries[project_id] = StatusEntry(status=status, persisted=status, updated_at=time.time())
+
+    def forget(self, project_id: str) -> None:
+        """Drop a project's entry and any pending write."""
+        self._dirty.discard(project_id)
+        self._entries.pop(project_id, None)
+
+    def _schedule_flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            # Fresh context so the flusher doesn't inherit the caller's trace
+            self._flush_task = loop.create_task(
+                self._flush_later(), context=contextvars.Context()
+            )
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        # Changes from here on schedule another flush
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write every pending status now.
+
+        Returns:
+            Number of project rows written
+        """
+        async with self._write_lock:
+            if not self._dirty:
+                return 0
+            pending: dict[ProjectStatus, list[str]] = {}
+            for project_id in self._dirty:
+                pending.setdefault(self._entries[project_id].status, []).append(project_id)
+            self._dirty.clear()
+
+            start = time.perf_counter()
+            try:
+                async with self.session_factory() as db:
+                    for status, project_ids in pending.items():
+                        await db.execute(update(Project).where(Project.id.in_(project_ids)).values(status=status))
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Failed to persist project statuses, will retry: {e}")
+                for project_ids in pending.values():
+                    self._dirty.update(p for p in project_ids if p in self._entries)
+                self._schedule_flush()
+                return 0
+            STATUS_TRANSITION_DURATION.observe(time.perf_counter() - start)
+
+            written = 0
+            for status, project_ids in pending.items():
+                for project_id in project_ids:
+                    written += 1
+                    entry = self._entries.get(project_id)
+                    if entry is None:
+                        continue
+                    entry.persisted = status
+                    # Changed again while we were writing
+                    if entry.status != status:
+                        self._dirty.add(project_id)
+            STATUS_WRITES.inc(written)
+            if self._dirty:
+                self._schedule_flush()
+            return written
+
+    async def close(self) -> None:
+        """Cancel the pending delayed flush and write everything now."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    async def recover(self, db: AsyncSession) -> int:
+        """Reconcile with the database at startup.
+
+        No turn survives a restart, so projects still marked as mid-turn are
+        reset to IDLE. The cache is cleared and refills from the database.
+
+        Args:
+            db: Database session
+
+        Returns:
+            Number of projects reset
+        """
+        self._entries.clear()
+        self._dirty.clear()
+        result = await db.execute(
+            update(Project).where(Project.status.in_(ACTIVE_STATUSES)).values(status=ProjectStatus.IDLE)
+        )
+        await db.commit()
+        if result.rowcount:
+            logger.warning(f"Reset {result.rowcount} project(s) left mid-turn to idle")
+        return result.rowcount
+
+
+# Global status store, flushed on shutdown
+status_store = StatusStore()
+
 
 class StatusService:
     """Service for managing project status transitions and SSE broadcasting."""
 
     @staticmethod
+    @traced("status.transition")
     async def transition_to(
         db: AsyncSession,
         project_id: str,
         new_status: ProjectStatus,
         message: str | None = None,
         context: dict | None = None,
-    ) -> Project | None:
+    ) -> ProjectStatus | None:
         """Transition project to new status and broadcast update.
 
+        The status is changed in memory right away and written to the
+        database by the write-behind flusher.
+
         Args:
-            db: Database session
+            db: Database session (only read when the project is not cached)
             project_id: Project ID to update
             new_status: New status state
             message: Optional status message (e.g., "Need clarification: X or Y?")
             context: Optional context data (agent, step, etc.)
 
         Returns:
-            Updated project or None if not found
-        """
-        # Get project
-        result = await db.execute(select(Project).where(Project.id == project_id))
-        project = result.scalar_one_or_none()
+            New status or None if project not found
 
-        if not project:
+        Raises:
+            InvalidStatusTransition: If the project cannot move to ``new_status``
+        """
+        transitioned = await status_store.transition(db, project_id, new_status, message, context)
+        if transitioned is None:
             logger.error(f"Project {project_id} not found for status transition")
             return None
+        old_status, entry = transitioned
 
-        old_status = project.status
-
-        # Update status
-        project.status = new_status
-        await db.commit()
-        await db.refresh(project)
-
-        logger.info(f"Project {project.name} status: {old_status} → {new_status}")
+        STATUS_TRANSITIONS.labels(new_status.value).inc()
+        logger.info(f"Project {project_id} status: {old_status} → {new_status}")
 
-        # Note: SSE broadcasting for status updates will be added when we implement
-        # project-level SSE connections. For now, status updates happen on next API call.
-        # TODO: Implement broadcast_to_project in ConnectionManager
+        # Dashboards following the project (coalesced: only the latest status is pending)
+        project_events.publish(
+            project_id,
+            "status",
+            SSEEventType.STATUS_UPDATE,
+            {"status": entry.status.value, "status_message": entry.message, "status_context": entry.context},
+        )
 
-        return project
+        return entry.status
 
     @staticmethod
     async def get_project_status(db: AsyncSession, project_id: str) -> ProjectStatus | None:
         """Get current project status.
 
         Args:
-            db: Database session
+            db: Database session (only read when the project is not cached)
             project_id: Project ID
 
         Returns:
             Current status or None if project not found
         """
-        result = await db.execute(select(Project).where(Project.id == project_id))
-        project = result.scalar_one_or_none()
-        return project.status if project else None
+        entry = await status_store.get(db, project_id)
+        return entry.status if entry else None
 
     @staticmethod
     async def set_planning(
         db: AsyncSession, project_id: str, message: str = "Analyzing your request..."
-    ) -> Project | None:
+    ) -> ProjectStatus | None:
         """Set project status to PLANNING.
 
         Args:
@@ -84,7 +350,7 @@ class StatusService:
             message: Planning status message
 
         Returns:
-            Updated project
+            New status, or None if the project was not found
         """
         return await StatusService.transition_to(
             db, project_id, ProjectStatus.PLANNING, message, {"agent": "planner"}
@@ -93,7 +359,7 @@ class StatusService:
     @staticmethod
     async def set_working(
         db: AsyncSession, project_id: str, message: str = "Creating deliverables..."
-    ) -> Project | None:
+    ) -> ProjectStatus | None:
         """Set project status to WORKING.
 
         Args:
@@ -102,7 +368,7 @@ class StatusService:
             message: Working status message
 
         Returns:
-            Updated project
+            New status, or None if the project was not found
         """
         return await StatusService.transition_to(
             db, project_id, ProjectStatus.WORKING, message, {"agent": "executor"}
@@ -111,7 +377,7 @@ class StatusService:
     @staticmethod
     async def set_needs_input(
         db: AsyncSession, project_id: str, message: str
-    ) -> Project | None:
+    ) -> ProjectStatus | None:
         """Set project status to NEEDS_INPUT.
 
         Args:
@@ -120,7 +386,7 @@ class StatusService:
             message: Question or clarification needed
 
         Returns:
-            Updated project
+            New status, or None if the project was not found
         """
         return await StatusService.transition_to(
             db, project_id, ProjectStatus.NEEDS_INPUT, message, {"agent": "planner"}
@@ -129,7 +395,7 @@ class StatusService:
     @staticmethod
     async def set_verifying(
         db: AsyncSession, project_id: str, message: str = "Checking quality..."
-    ) -> Project | None:
+    ) -> ProjectStatus | None:
         """Set project status to VERIFYING.
 
         Args:
@@ -138,7 +404,7 @@ class StatusService:
             message: Verification status message
 
         Returns:
-            Updated project
+            New status, or None if the project was not found
         """
         return await StatusService.transition_to(
             db, project_id, ProjectStatus.VERIFYING, message, {"agent": "verifier"}
@@ -147,7 +413,7 @@ class StatusService:
     @staticmethod
     async def set_complete(
         db: AsyncSession, project_id: str, message: str = "Ready for review"
-    ) -> Project | None:
+    ) -> ProjectStatus | None:
         """Set project status to COMPLETE.
 
         Args:
@@ -156,7 +422,7 @@ class StatusService:
             message: Completion message
 
         Returns:
-            Updated project
+            New status, or None if the project was not found
         """
         return await StatusService.transition_to(
             db, project_id, ProjectStatus.COMPLETE, message, {"agent": "verifier"}
@@ -165,7 +431,7 @@ class StatusService:
     @staticmethod
     async def set_idle(
         db: AsyncSession, project_id: str, message: str = "Waiting for task"
-    ) -> Project | None:
+    ) -> ProjectStatus | None:
         """Set project status to IDLE.
 
         Args:
@@ -174,7 +440,7 @@ class StatusService:
             message: Idle status message
 
         Returns:
-            Updated project
+            New status, or None if the project was not found
         """
         return await StatusService.transition_to(
             db, project_id, ProjectStatus.IDLE, message, {"agent": None}
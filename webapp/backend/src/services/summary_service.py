@@ -0,0 +1,61 @@
+"""Session summary service."""
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import SessionSummary
+
+
+class SummaryService:
+    """Service for managing rolling conversation summaries."""
+
+    @staticmethod
+    async def get_latest_summary(db: AsyncSession, session_id: str) -> SessionSummary | None:
+        """Get the most recent summary for a session.
+
+        Args:
+            db: Database session
+            session_id: Session ID
+
+        Returns:
+            Latest summary if one exists, None otherwise
+        """
+        result = await db.execute(
+            select(SessionSummary)
+            .where(SessionSummary.session_id == session_id)
+            .order_by(SessionSummary.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def save_summary(
+        db: AsyncSession,
+        session_id: str,
+        through_message_id: str,
+        content: str,
+    ) -> SessionSummary:
+        """Store a new summary, replacing older ones for the session.
+
+        Args:
+            db: Database session
+            session_id: Session ID
+            through_message_id: Last message covered by the summary
+            content: Summary text
+
+        Returns:
+            Created summary
+        """
+        result = await db.execute(select(SessionSummary).where(SessionSummary.session_id == session_id))
+        for old in result.scalars().all():
+            await db.delete(old)
+
+        summary = SessionSummary(
+            session_id=session_id,
+            through_message_id=through_message_id,
+            content=content,
+        )
+        db.add(summary)
+        await db.commit()
+        await db.refresh(summary)
+        return summary
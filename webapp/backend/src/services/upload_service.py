@@ -0,0 +1,366 @@
+"""Streaming uploads of user assets (sprites, sounds, reference images).
+
+A multipart request body is parsed as it arrives: each file part is
+written chunk by chunk to a temp file in the project directory and
+hashed on the way, so memory stays the same whatever the upload size.
+Completed parts are moved into place and registered as project files.
+Images are then normalized in the background (a declared type that
+doesn't match the data is fixed with ``image_utils``).
+
+Messages refer to an upload with an ``{"type": "upload", "file_id": ...}``
+content block; ``expand_upload_blocks`` turns it into an image block (or a
+note naming the file) before the message is sent to the model.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from python_multipart.multipart import MultipartParser
+from python_multipart.multipart import parse_options_header
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.connection import AsyncSessionLocal
+from ..database.models import File
+from ..database.models import FileVersion
+from ..observability.metrics import FILE_BYTES_WRITTEN
+from ..observability.metrics import UPLOAD_BYTES
+from ..utils.image_utils import validate_and_fix_image_mime
+from .file_service import FileService
+from .file_version_service import FileVersionService
+
+logger = logging.getLogger(__name__)
+
+MAX_NAME_LENGTH = 255
+# Raster images the model can see; other uploads are referred to by name
+MODEL_IMAGE_TYPES = ("image/png", "image/jpeg", "image/gif", "image/webp")
+
+# Background normalizations by file ID
+_normalizing: dict[str, asyncio.Task] = {}
+
+
+class InvalidUpload(ValueError):
+    """Raised when an upload request is malformed."""
+
+
+class UploadTooLarge(InvalidUpload):
+    """Raised when an uploaded file exceeds the size limit."""
+
+
+def clean_filename(filename: str) -> str:
+    """Reduce a client-supplied file name to a safe base name.
+
+    Raises:
+        InvalidUpload: If nothing usable is left (empty or hidden names)
+    """
+    name = Path(filename.replace("\\", "/")).name.strip()
+    if not name or name.startswith(".") or len(name) > MAX_NAME_LENGTH:
+        raise InvalidUpload(f"Invalid file name: {filename!r}")
+    return name
+
+
+@dataclass
+class _Part:
+    """A file part of the multipart body, written to disk as it arrives."""
+
+    filename: str
+    content_type: str
+    path: Path
+    digest: Any = field(default_factory=hashlib.sha256)
+    size: int = 0
+    handle: Any = None
+
+
+class _MultipartWriter:
+    """Feeds a multipart body to the parser, writing file parts straight to disk.
+
+    ``write`` does blocking file I/O; it is called from a worker thread.
+    """
+
+    def __init__(self, boundary: bytes, project_id: str, max_bytes: int):
+        self.project_id = project_id
+        self.max_bytes = max_bytes
+        self.parts: list[_Part] = []
+        self._current: _Part | None = None
+        self._headers: dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+        self._error: InvalidUpload | None = None
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    def write(self, chunk: bytes) -> None:
+        self._parser.write(chunk)
+        if self._error is not None:
+            raise self._error
+
+    def finalize(self) -> None:
+        self._parser.finalize()
+        if self._current is not None:
+            raise InvalidUpload("Upload body ended in the middle of a file")
+
+    def discard(self) -> None:
+        """Remove the temp files of all parts (on error, or after they were moved)."""
+        for part in self.parts:
+            if part.handle is not None:
+                part.handle.close()
+            part.path.unlink(missing_ok=True)
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field = b""
+        self._value = b""
+
+    def _on_headers_finished(self) -> None:
+        _disposition, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        if filename is None or self._error is not None:
+            # Form fields other than files are ignored
+            return
+        try:
+            name = clean_filename(filename.decode("utf-8", "replace"))
+        except InvalidUpload as e:
+            self._error = e
+            return
+        content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip()
+        path = FileService.get_partial_path(self.project_id, f"upload-{uuid4().hex}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._current = _Part(name, content_type, path)
+        self._current.handle = open(path, "wb")
+        self.parts.append(self._current)
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        part = self._current
+        if part is None or self._error is not None:
+            return
+        chunk = data[start:end]
+        part.size += len(chunk)
+        if part.size > self.max_bytes:
+            self._error = UploadTooLarge(f"{part.filename} is larger than {self.max_bytes} bytes")
+            return
+        part.digest.update(chunk)
+        part.handle.write(chunk)
+
+    def _on_part_end(self) -> None:
+        if self._current is not None:
+            self._current.handle.close()
+            self._current.handle = None
+            self._current = None
+
+
+def _guess_mime_type(part: _Part) -> str:
+    if part.content_type and part.content_type != "application/octet-stream":
+        return part.content_type.split(";")[0].strip()
+    guessed, _encoding = mimetypes.guess_type(part.filename)
+    return guessed or "application/octet-stream"
+
+
+class UploadService:
+    """Service for receiving uploaded user assets."""
+
+    @staticmethod
+    async def receive(
+        db: AsyncSession,
+        project_id: str,
+        session_id: str | None,
+        content_type: str,
+        body: AsyncIterator[bytes],
+        max_bytes: int,
+    ) -> list[File]:
+        """Store the files of a streamed multipart body as project files.
+
+        A name already used in the project gets a numbered suffix, so an
+        upload never overwrites an earlier file.
+
+        Args:
+            db: Database session
+            project_id: Project ID
+            session_id: Session the upload belongs to, if any
+            content_type: Content-Type header of the request
+            body: Request body chunks
+            max_bytes: Size limit per file
+
+        Returns:
+            The created files, in upload order
+
+        Raises:
+            InvalidUpload: If the body is not multipart, has no files or a bad file name
+            UploadTooLarge: If a file exceeds ``max_bytes``
+        """
+        mime_type, options = parse_options_header(content_type)
+        boundary = options.get(b"boundary")
+        if mime_type != b"multipart/form-data" or not boundary:
+            raise InvalidUpload("Expected a multipart/form-data body")
+
+        writer = _MultipartWriter(boundary, project_id, max_bytes)
+        try:
+            async for chunk in body:
+                await asyncio.to_thread(writer.write, chunk)
+            writer.finalize()
+            if not writer.parts:
+                raise InvalidUpload("The request contains no files")
+
+            project_dir = FileService._get_project_dir(project_id)
+            files = []
+            for part in writer.parts:
+                name = await UploadService._available_name(db, project_id, part.filename)
+                target = project_dir / name
+                os.replace(part.path, target)
+                file = File(
+                    project_id=project_id,
+                    session_id=session_id,
+                    name=name,
+                    path=str(target),
+                    mime_type=_guess_mime_type(part),
+                    size=part.size,
+                )
+                db.add(file)
+                await db.flush()
+                await FileVersionService.record_initial(db, file, part.size, part.digest.hexdigest(), session_id)
+                files.append(file)
+                FILE_BYTES_WRITTEN.inc(part.size)
+                UPLOAD_BYTES.inc(part.size)
+            await db.commit()
+            for file in files:
+                await db.refresh(file)
+                FileService.publish_written(file, created=True)
+        finally:
+            writer.discard()
+
+        for file in files:
+            if file.mime_type.startswith("image/") and file.mime_type != "image/svg+xml":
+                task = asyncio.create_task(_normalize_image(file.id))
+                _normalizing[file.id] = task
+                task.add_done_callback(lambda _task, file_id=file.id: _normalizing.pop(file_id, None))
+        return files
+
+    @staticmethod
+    async def _available_name(db: AsyncSession, project_id: str, filename: str) -> str:
+        """First of ``name``, ``name-2``, ``name-3``… not used in the project."""
+        stem, suffix = os.path.splitext(filename)
+        result = await db.execute(
+            select(File.name).where(File.project_id == project_id, File.name.startswith(stem, autoescape=True))
+        )
+        taken = set(result.scalars().all())
+        name, n = filename, 1
+        while name in taken:
+            n += 1
+            name = f"{stem}-{n}{suffix}"
+        return name
+
+    @staticmethod
+    def normalizing(file_id: str) -> asyncio.Task | None:
+        """The background normalization of an uploaded image, while it runs."""
+        return _normalizing.get(file_id)
+
+
+async def _normalize_image(file_id: str) -> None:
+    """Fix an uploaded image whose declared type doesn't match its data."""
+    try:
+        async with AsyncSessionLocal() as db:
+            file = await FileService.get_file(db, file_id)
+            if file is None or await FileVersionService.latest_version(db, file_id) > 1:
+                # Gone, or written again since the upload: the content is no longer the uploaded image
+                return
+            path = Path(file.path)
+            data = await asyncio.to_thread(path.read_bytes)
+            fixed, mime_type = await asyncio.to_thread(validate_and_fix_image_mime, data, file.mime_type, file.name)
+            if fixed == data and mime_type == file.mime_type:
+                return
+            if fixed != data:
+                partial = FileService.get_partial_path(file.project_id, f"normalize-{file_id}")
+                await asyncio.to_thread(partial.write_bytes, fixed)
+                os.replace(partial, path)
+                await db.execute(
+                    update(FileVersion)
+                    .where(FileVersion.file_id == file_id, FileVersion.version == 1)
+                    .values(size=len(fixed), sha256=hashlib.sha256(fixed).hexdigest())
+                )
+            file.size = len(fixed)
+            file.mime_type = mime_type
+            await db.commit()
+            logger.info(f"Normalized uploaded image {file.name}: {mime_type}, {len(data)} -> {len(fixed)} bytes")
+    except Exception as e:
+        logger.error(f"Failed to normalize uploaded image {file_id}: {e}")
+
+
+async def _upload_block(db: AsyncSession, file_id: str, project_id: str) -> dict[str, Any]:
+    file = await FileService.get_file(db, file_id)
+    if file is None or file.project_id != project_id:
+        return {"type": "text", "text": f"[Uploaded file {file_id} is no longer available]"}
+    if file.mime_type in MODEL_IMAGE_TYPES:
+        try:
+            data = await asyncio.to_thread(Path(file.path).read_bytes)
+        except OSError as e:
+            logger.warning(f"Cannot read uploaded image {file.name}: {e}")
+        else:
+            return {
+                "type": "image",
+                "source": {"type": "base64", "media_type": file.mime_type, "data": base64.b64encode(data).decode()},
+            }
+    return {
+        "type": "text",
+        "text": f"[Uploaded file: {file.name} ({file.mime_type}, {file.size} bytes), saved in the project as {file.name}]",
+    }
+
+
+async def expand_upload_blocks(db: AsyncSession, content: Any, project_id: str) -> Any:
+    """Replace upload references in message content with what the model should see.
+
+    Args:
+        db: Database session
+        content: Message content (string, list of content blocks, or dict)
+        project_id: Project the message belongs to (uploads of other projects are not resolved)
+
+    Returns:
+        The content, with each ``upload`` block replaced by an image block
+        (images) or a text note naming the file; unchanged if it has none
+    """
+    if isinstance(content, str):
+        # Cheap check before parsing: plain text is the common case
+        if '"upload"' not in content:
+            return content
+        try:
+            content = json.loads(content)
+        except json.JSONDecodeError:
+            return content
+    blocks = content if isinstance(content, list) else [content]
+    if not any(isinstance(b, dict) and b.get("type") == "upload" for b in blocks):
+        return content
+    return [
+        await _upload_block(db, str(block.get("file_id")), project_id)
+        if isinstance(block, dict) and block.get("type") == "upload"
+        else block
+        for block in blocks
+    ]
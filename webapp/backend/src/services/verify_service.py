@@ -5,11 +5,16 @@ from pathlib import Path
 import tempfile
 import logging
 import re
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 
+from ..ai.events import SSEEventType
 from ..database.models import File as FileModel
+from ..observability.metrics import VERIFICATION_DURATION
+from ..observability.tracing import span
+from ..observability.tracing import traced
+from .project_events import project_events
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +31,7 @@ class VerificationResult:
 class GameVerificationService:
     """Verify games work using Playwright headless browser"""
 
+    @traced("verify.project_game")
     async def verify_project_game(self, db: AsyncSession, project_id: str) -> VerificationResult:
         """
         Verify a game project by bundling files and running verification.
@@ -133,6 +139,24 @@ class GameVerificationService:
         Returns:
             VerificationResult with pass/fail
         """
+        start = time.perf_counter()
+        with span("verify.browser", html_bytes=len(game_html)) as browser_span:
+            result = await self._run_browser_checks(game_html)
+            browser_span.set(passed=result.passed, errors=len(result.errors))
+        VERIFICATION_DURATION.labels("passed" if result.passed else "failed").observe(time.perf_counter() - start)
+        project_events.publish(
+            project_id,
+            "verification",
+            SSEEventType.VERIFICATION,
+            {"passed": result.passed, "errors": result.errors[:5], "error_count": len(result.errors)},
+        )
+        return result
+
+    async def _run_browser_checks(self, game_html: str) -> VerificationResult:
+        """Load the game in headless Chromium and collect errors."""
+        # Playwright is only needed once a game is verified
+        from playwright.async_api import async_playwright
+
         errors: list[str] = []
         console_logs: list[str] = []
 
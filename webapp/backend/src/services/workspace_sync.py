@@ -0,0 +1,316 @@
+"""Sync the Agent SDK working directory into project storage.
+
+The agent edits files in a scratch workspace. After each turn only files
+whose content actually changed are copied into project storage, under their
+path relative to the workspace, and recorded with one batched upsert.
+
+Changes are picked up from filesystem notifications (``watchfiles``, inotify
+on Linux) while a turn runs. Without ``watchfiles``, and on the first sync of
+a workspace, the tree is scanned and compared by size and mtime instead.
+Every synced change is recorded as a file version.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import File
+from ..observability.metrics import FILE_BYTES_WRITTEN
+from ..observability.metrics import WORKSPACE_SYNC_FILES
+from ..observability.tracing import span
+from .file_service import FileService
+from .file_version_service import FileVersionService
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - polling fallback
+    watchfiles = None
+
+logger = logging.getLogger(__name__)
+
+# Let notifications for the last writes of a turn arrive before the watcher stops
+WATCH_DEBOUNCE_MS = 50
+# Projects whose sync state is kept; the least recently used is dropped (and fully scanned if it comes back)
+MAX_TRACKED_WORKSPACES = 256
+
+MIME_TYPES = {
+    ".html": "text/html",
+    ".css": "text/css",
+    ".js": "application/javascript",
+    ".json": "application/json",
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".py": "text/x-python",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+
+def guess_mime_type(filename: str) -> str:
+    """Guess MIME type from filename extension"""
+    return MIME_TYPES.get(Path(filename).suffix.lower(), "text/plain")
+
+
+@dataclass
+class _Entry:
+    """Last synced state of a workspace file."""
+
+    size: int
+    mtime_ns: int
+    digest: str
+
+
+@dataclass
+class _Change:
+    """A workspace file whose content differs from the last sync."""
+
+    name: str
+    path: Path
+    previous: bytes | None
+    data: bytes
+
+
+class WorkspaceSync:
+    """Tracks one project's agent workspace and syncs it into project storage."""
+
+    def __init__(self, project_id: str, workspace: Path, storage_dir: Path | None = None):
+        """Initialize the sync engine.
+
+        Args:
+            project_id: Project ID
+            workspace: Directory the agent works in
+            storage_dir: Project file storage (defaults to the project's files directory)
+        """
+        self.project_id = project_id
+        self.workspace = workspace.resolve()
+        self.storage_dir = storage_dir or FileService._get_project_dir(project_id)
+        self._entries: dict[str, _Entry] = {}
+        self._pending: set[str] = set()
+        self._scanned = False
+        self._lock = asyncio.Lock()
+
+    def _relative(self, path: str | Path) -> str | None:
+        """Return a workspace path as a relative POSIX name, or None if it must not be synced.
+
+        Paths that resolve outside the workspace (``..``, absolute paths,
+        symlinks pointing elsewhere) and hidden files or directories are
+        rejected.
+        """
+        candidate = Path(path)
+        if not candidate.is_absolute():
+            candidate = self.workspace / candidate
+        try:
+            relative = candidate.resolve().relative_to(self.workspace)
+        except ValueError:
+            logger.warning(f"Ignoring path outside workspace {self.workspace}: {path}")
+            WORKSPACE_SYNC_FILES.labels("rejected").inc()
+            return None
+        if not relative.parts or any(part.startswith(".") for part in relative.parts):
+            return None
+        return relative.as_posix()
+
+    def mark(self, path: str | Path) -> None:
+        """Record a path the agent reported writing, so it is checked on the next sync.
+
+        Args:
+            path: Absolute or workspace-relative file path
+        """
+        name = self._relative(path)
+        if name is not None:
+            self._pending.add(name)
+
+    @asynccontextmanager
+    async def watch(self) -> AsyncIterator[None]:
+        """Collect filesystem notifications for the workspace while the block runs."""
+        self.workspace.mkdir(parents=True, exist_ok=True)
+        if watchfiles is None or not self._scanned:
+            # A full scan runs on sync anyway
+            yield
+            return
+
+        stop = asyncio.Event()
+
+        async def collect() -> None:
+            async for changes in watchfiles.awatch(
+                self.workspace,
+                stop_event=stop,
+                debounce=WATCH_DEBOUNCE_MS,
+                step=10,
+                recursive=True,
+            ):
+                for _change, path in changes:
+                    self.mark(path)
+
+        watcher = asyncio.create_task(collect())
+        try:
+            yield
+        finally:
+            await asyncio.sleep(WATCH_DEBOUNCE_MS / 1000)
+            stop.set()
+            try:
+                await watcher
+            except Exception as e:
+                # Missed notifications are caught by a full scan next time
+                logger.warning(f"Workspace watcher for {self.workspace} failed: {e}")
+                self._scanned = False
+
+    def _walk(self, directory: Path) -> set[str]:
+        """Names of all non-hidden files below a directory."""
+        names: set[str] = set()
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for filename in files:
+                name = self._relative(Path(root) / filename)
+                if name is not None:
+                    names.add(name)
+        return names
+
+    def _candidates(self) -> set[str]:
+        """Names to check on this sync."""
+        pending, self._pending = self._pending, set()
+        if watchfiles is None or not self._scanned:
+            self._scanned = True
+            return pending | self._walk(self.workspace)
+
+        candidates: set[str] = set()
+        for name in pending:
+            path = self.workspace / name
+            if path.is_dir():
+                # Files created right after their directory can beat the new watch
+                candidates |= self._walk(path)
+            else:
+                candidates.add(name)
+        return candidates
+
+    def _stored_content(self, name: str) -> bytes | None:
+        """Content of the copy already in project storage, kept as the previous version."""
+        try:
+            return (self.storage_dir / name).read_bytes()
+        except OSError:
+            return None
+
+    def _collect_changes(self) -> list[_Change]:
+        """Hash candidate files and copy changed ones into project storage.
+
+        Runs in a worker thread.
+        """
+        changes: list[_Change] = []
+        for name in sorted(self._candidates()):
+            path = self.workspace / name
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Deleted in the workspace; the stored copy is kept
+                self._entries.pop(name, None)
+                continue
+            if not path.is_file():
+                continue
+
+            entry = self._entries.get(name)
+            if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                WORKSPACE_SYNC_FILES.labels("unchanged").inc()
+                continue
+
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            self._entries[name] = _Entry(size=len(data), mtime_ns=stat.st_mtime_ns, digest=digest)
+            if entry is not None and digest == entry.digest:
+                WORKSPACE_SYNC_FILES.labels("unchanged").inc()
+                continue
+            previous = self._stored_content(name)
+            if previous is not None and hashlib.sha256(previous).hexdigest() == digest:
+                WORKSPACE_SYNC_FILES.labels("unchanged").inc()
+                continue
+
+            target = self.storage_dir / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=target.parent, prefix=".sync.")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, target)
+            except BaseException:
+                Path(temp_path).unlink(missing_ok=True)
+                raise
+            FILE_BYTES_WRITTEN.inc(len(data))
+            WORKSPACE_SYNC_FILES.labels("synced").inc()
+            changes.append(_Change(name=name, path=target, previous=previous, data=data))
+        return changes
+
+    async def sync(self, db: AsyncSession, session_id: str | None = None) -> list[File]:
+        """Copy changed workspace files into project storage and upsert their rows.
+
+        Args:
+            db: Database session
+            session_id: Session that produced the changes
+
+        Returns:
+            File rows that were created or updated
+        """
+        # Sessions of one project share the workspace
+        async with self._lock:
+            with span("workspace.sync") as sync_span:
+                changes = await asyncio.to_thread(self._collect_changes)
+                sync_span.set(files=len(changes))
+            if not changes:
+                return []
+
+            result = await db.execute(
+                select(File).where(File.project_id == self.project_id, File.name.in_([c.name for c in changes]))
+            )
+            existing = {file.name: file for file in result.scalars()}
+
+            files: list[File] = []
+            for change in changes:
+                file = existing.get(change.name)
+                if file is None:
+                    file = File(project_id=self.project_id, name=change.name)
+                    db.add(file)
+                file.session_id = session_id
+                file.path = str(change.path)
+                file.mime_type = guess_mime_type(change.name)
+                file.size = len(change.data)
+                files.append(file)
+            await db.flush()
+
+            for file, change in zip(files, changes):
+                await FileVersionService.record(db, file, change.previous, change.data, session_id)
+            await db.commit()
+            return files
+
+
+# Project ID -> sync state, kept across turns so unchanged files are never re-read
+_workspaces: OrderedDict[str, WorkspaceSync] = OrderedDict()
+
+
+def get_workspace_sync(project_id: str, workspace: Path) -> WorkspaceSync:
+    """Get the sync engine for a project's workspace.
+
+    Args:
+        project_id: Project ID
+        workspace: Directory the agent works in
+
+    Returns:
+        The project's WorkspaceSync
+    """
+    sync = _workspaces.get(project_id)
+    if sync is None or sync.workspace != workspace.resolve():
+        sync = _workspaces[project_id] = WorkspaceSync(project_id, workspace)
+    _workspaces.move_to_end(project_id)
+    while len(_workspaces) > MAX_TRACKED_WORKSPACES:
+        _workspaces.popitem(last=False)
+    return sync
@@ -0,0 +1,118 @@
+"""Compact encoding of one file revision relative to another.
+
+``encode_version(base, target)`` produces a payload that rebuilds ``target``
+from ``base``: a line-level delta (copy line ranges of ``base``, insert new
+lines) or, when that is not smaller, the whole of ``target``. Either way the
+payload is compressed with zstd when ``zstandard`` is installed and zlib
+otherwise.
+
+Payload layout: one byte codec (``z`` zlib, ``s`` zstd), one byte kind
+(``D`` delta, ``F`` full), then the compressed body.
+"""
+
+import difflib
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zlib fallback
+    zstandard = None
+
+_ZLIB = b"z"
+_ZSTD = b"s"
+_DELTA = b"D"
+_FULL = b"F"
+
+# Bytes map 1:1 onto latin-1 code points, so inserted lines survive JSON
+_TEXT_ENCODING = "latin-1"
+
+
+def _compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return _ZSTD + zstandard.ZstdCompressor(level=19).compress(data)
+    return _ZLIB + zlib.compress(data, 9)
+
+
+def _decompress(codec: bytes, data: bytes) -> bytes:
+    if codec == _ZSTD:
+        if zstandard is None:
+            raise ValueError("Version payload is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == _ZLIB:
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown version payload codec {codec!r}")
+
+
+def _line_delta(base: bytes, target: bytes) -> bytes:
+    """Serialize the operations that turn ``base`` into ``target``.
+
+    Operations are ``[start, end]`` (copy base lines) and ``"text"``
+    (insert), as JSON.
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+
+    ops: list = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append(b"".join(target_lines[j1:j2]).decode(_TEXT_ENCODING))
+    return json.dumps(ops, separators=(",", ":")).encode()
+
+
+def _apply_line_delta(base: bytes, delta: bytes) -> bytes:
+    base_lines = base.splitlines(keepends=True)
+    parts: list[bytes] = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op.encode(_TEXT_ENCODING))
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return b"".join(parts)
+
+
+def encode_version(base: bytes, target: bytes) -> bytes:
+    """Encode ``target`` relative to ``base``.
+
+    Args:
+        base: Content the payload will be applied to
+        target: Content the payload rebuilds
+
+    Returns:
+        Compressed delta, or compressed full copy if that is smaller
+    """
+    full = _compress(target)
+    delta = _compress(_line_delta(base, target))
+    if len(delta) < len(full):
+        return delta[:1] + _DELTA + delta[1:]
+    return full[:1] + _FULL + full[1:]
+
+
+def decode_version(base: bytes, payload: bytes) -> bytes:
+    """Rebuild the content encoded by ``encode_version``.
+
+    Args:
+        base: Same base content that was passed to ``encode_version``
+        payload: Encoded payload
+
+    Returns:
+        The target content
+
+    Raises:
+        ValueError: If the payload is malformed
+    """
+    codec, kind, body = payload[:1], payload[1:2], payload[2:]
+    data = _decompress(codec, body)
+    if kind == _FULL:
+        return data
+    if kind == _DELTA:
+        return _apply_line_delta(base, data)
+    raise ValueError(f"Unknown version payload kind {kind!r}")
+
+
+def is_full_copy(payload: bytes) -> bool:
+    """Whether a payload stores its content in full (no base needed)."""
+    return payload[1:2] == _FULL
@@ -5,8 +5,6 @@ import logging
 from io import BytesIO
 from pathlib import Path
 
-from PIL import Image
-
 logger = logging.getLogger(__name__)
 
 
@@ -19,6 +17,8 @@ def detect_image_type(data: bytes) -> str | None:
     Returns:
         Image format string (e.g., 'jpeg', 'png') or None if not an image
     """
+    from PIL import Image
+
     try:
         img = Image.open(BytesIO(data))
         # PIL format to lowercase standard format names
@@ -51,6 +51,8 @@ def normalize_image_format(data: bytes, target_format: str = "jpeg") -> tuple[by
     Raises:
         ValueError: If image cannot be processed
     """
+    from PIL import Image
+
     try:
         img = Image.open(BytesIO(data))
 
@@ -176,3 +178,105 @@ def validate_base64_image(b64_data: str, declared_mime: str) -> tuple[str, str]
     except Exception as e:
         logger.error(f"Failed to validate base64 image: {e}")
         return None
+
+
+def make_thumbnail(data: bytes, max_size: int) -> bytes:
+    """Shrink an image to fit in a square, as a JPEG.
+
+    Args:
+        data: Image bytes
+        max_size: Maximum width and height in pixels
+
+    Returns:
+        JPEG bytes (the image is not enlarged)
+
+    Raises:
+        ValueError: If the image cannot be processed
+    """
+    from PIL import Image
+
+    try:
+        img = Image.open(BytesIO(data))
+        img.thumbnail((max_size, max_size))
+        if img.mode != "RGB":
+            # Transparent areas become white, as in normalize_image_format
+            rgb_img = Image.new("RGB", img.size, (255, 255, 255))
+            rgba = img.convert("RGBA")
+            rgb_img.paste(rgba, mask=rgba.split()[-1])
+            img = rgb_img
+        output = BytesIO()
+        img.save(output, format="JPEG", quality=80)
+        return output.getvalue()
+    except Exception as e:
+        raise ValueError(f"Failed to make thumbnail: {e}") from e
+
+
+def fit_within(width: int, height: int, max_edge: int, max_pixels: int) -> tuple[int, int]:
+    """Largest size with the same aspect ratio within an edge and pixel limit.
+
+    Args:
+        width: Image width
+        height: Image height
+        max_edge: Maximum width and height (0 = no limit)
+        max_pixels: Maximum width * height (0 = no limit)
+
+    Returns:
+        Tuple of (width, height); the input size if it already fits
+    """
+    scale = 1.0
+    if max_edge and max(width, height) > max_edge:
+        scale = max_edge / max(width, height)
+    if max_pixels and width * height * scale * scale > max_pixels:
+        scale = (max_pixels / (width * height)) ** 0.5
+    if scale >= 1.0:
+        return width, height
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def downscale_image(
+    data: bytes, max_edge: int, max_pixels: int, jpeg_quality: int = 85
+) -> tuple[bytes, str, tuple[int, int], tuple[int, int]] | None:
+    """Shrink an image to the given limits and re-encode it compactly.
+
+    Opaque images become JPEG, images with transparency PNG. Animated
+    images are left alone.
+
+    Args:
+        data: Image bytes
+        max_edge: Maximum width and height (0 = no limit)
+        max_pixels: Maximum width * height (0 = no limit)
+        jpeg_quality: JPEG quality for opaque images
+
+    Returns:
+        Tuple of (bytes, mime_type, original_size, new_size), or None if the
+        image already fits and re-encoding would not make it smaller
+
+    Raises:
+        ValueError: If the image cannot be processed
+    """
+    from PIL import Image
+
+    try:
+        img = Image.open(BytesIO(data))
+        original_size = img.size
+        if getattr(img, "n_frames", 1) > 1:
+            return None
+        size = fit_within(*original_size, max_edge, max_pixels)
+        if size != original_size:
+            img = img.resize(size, Image.Resampling.LANCZOS)
+
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        output = BytesIO()
+        if has_alpha:
+            img.save(output, format="PNG", optimize=True)
+            mime_type = "image/png"
+        else:
+            img.convert("RGB").save(output, format="JPEG", quality=jpeg_quality, optimize=True)
+            mime_type = "image/jpeg"
+        encoded = output.getvalue()
+    except Exception as e:
+        raise ValueError(f"Failed to downscale image: {e}") from e
+
+    if size == original_size and len(encoded) >= len(data):
+        return None
+    return encoded, mime_type, original_size, size
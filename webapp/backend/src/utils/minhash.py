@@ -0,0 +1,135 @@
+"""MinHash signatures for near-duplicate prompt matching.
+
+``normalize_prompt`` reduces a request to its content words (lowercase,
+punctuation and request phrasing dropped, digits spelled as digits), so
+"Can you make me a Snake game?" and "make a snake game" normalize to the
+same key. ``signature`` hashes the character n-grams of the normalized
+text under ``NUM_PERM`` independent permutations and keeps the minimum of
+each; the fraction of equal positions in two signatures estimates the
+Jaccard similarity of their n-gram sets.
+
+MinHash scores stay high when a single word changes ("3 day" vs "7 day",
+"red snake" vs "blue snake"), so ``same_request`` checks a near match word
+by word: numbers must be equal, and every other word must appear in the
+other prompt, up to one edit (plurals, typos).
+
+Everything is local: n-grams are hashed with BLAKE2b and the permutations
+are fixed affine maps, so signatures are stable across processes and can be
+stored.
+"""
+
+import hashlib
+import random
+import re
+from array import array
+
+NUM_PERM = 128
+# Character n-gram length; short prompts still get enough n-grams
+NGRAM = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+# Shorter words (and words with digits) must match exactly in ``same_request``
+MIN_FUZZY_LENGTH = 4
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Words that don't change what is being asked for
+_FILLER = frozenset(
+    "a an the please pls can could would will you me us i i'd id want like to make create build "
+    "generate write give do for my some simple quick just hi hello hey thanks thank".split()
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Content words of a request, lowercased and space-separated.
+
+    Args:
+        prompt: User request
+
+    Returns:
+        Normalized prompt (empty if nothing but filler)
+    """
+    return " ".join(word for word in _WORD.findall(prompt.lower()) if word not in _FILLER)
+
+
+def _one_edit(first: str, second: str) -> bool:
+    """Whether two different words are one insertion, deletion or substitution apart."""
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    for i, (x, y) in enumerate(zip(first, second)):
+        if x != y:
+            skip = 1 if len(first) == len(second) else 0
+            return first[i + skip :] == second[i + 1 :]
+    return True
+
+
+def _has_variant(word: str, words: set[str]) -> bool:
+    if word in words:
+        return True
+    if len(word) < MIN_FUZZY_LENGTH or any(c.isdigit() for c in word):
+        return False
+    return any(_one_edit(word, other) for other in words)
+
+
+def same_request(first: str, second: str) -> bool:
+    """Whether two normalized prompts ask for the same thing.
+
+    Args:
+        first: Output of ``normalize_prompt``
+        second: Output of ``normalize_prompt``
+
+    Returns:
+        True if every word of each prompt is in the other, exactly for
+        numbers and short words, otherwise up to one edit
+    """
+    first_words, second_words = set(first.split()), set(second.split())
+    return all(_has_variant(w, second_words) for w in first_words - second_words) and all(
+        _has_variant(w, first_words) for w in second_words - first_words
+    )
+
+
+def _ngrams(text: str) -> set[str]:
+    padded = f" {text} "
+    if len(padded) <= NGRAM:
+        return {padded}
+    return {padded[i : i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+def signature(normalized: str) -> array:
+    """MinHash signature of a normalized prompt.
+
+    Args:
+        normalized: Output of ``normalize_prompt``
+
+    Returns:
+        ``NUM_PERM`` unsigned 32-bit minimums
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "little") for gram in _ngrams(normalized)
+    ]
+    return array(
+        "I",
+        (min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS),
+    )
+
+
+def similarity(first: array, second: array) -> float:
+    """Estimated Jaccard similarity of two signatures (0.0 to 1.0)."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+def to_bytes(sig: array) -> bytes:
+    """Serialize a signature for storage."""
+    return sig.tobytes()
+
+
+def from_bytes(data: bytes) -> array:
+    """Load a signature written by ``to_bytes``."""
+    sig = array("I")
+    sig.frombytes(data)
+    return sig
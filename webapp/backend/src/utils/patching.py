@@ -0,0 +1,150 @@
+"""Apply targeted edits to text files.
+
+Two formats are supported, both all-or-nothing:
+
+- search/replace edits: each ``old_text`` must occur exactly once;
+- unified diffs: each hunk's context and removed lines must match the file,
+  at the stated line or anywhere after the previous hunk.
+
+Anything that does not match raises ``PatchConflictError`` with a message
+meant for the model, so it can re-read the file and try again.
+"""
+
+import re
+from dataclasses import dataclass
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchConflictError(ValueError):
+    """Raised when an edit or patch does not match the current file content."""
+
+
+def apply_replacements(content: str, edits: list[dict[str, str]]) -> str:
+    """Apply search/replace edits in order.
+
+    Args:
+        content: Current file content
+        edits: Dicts with ``old_text`` and ``new_text``
+
+    Returns:
+        The edited content
+
+    Raises:
+        PatchConflictError: If an ``old_text`` is empty, missing or ambiguous
+    """
+    if not edits:
+        raise PatchConflictError("No edits given")
+
+    for number, edit in enumerate(edits, start=1):
+        old_text = edit.get("old_text") or ""
+        new_text = edit.get("new_text") or ""
+        if not old_text:
+            raise PatchConflictError(f"Edit {number}: old_text is empty")
+
+        count = content.count(old_text)
+        if count == 0:
+            raise PatchConflictError(
+                f"Edit {number}: old_text was not found in the file. "
+                "Read the file again and copy the text exactly, including whitespace."
+            )
+        if count > 1:
+            raise PatchConflictError(
+                f"Edit {number}: old_text matches {count} places. Include more surrounding lines to make it unique."
+            )
+        content = content.replace(old_text, new_text, 1)
+
+    return content
+
+
+@dataclass
+class _Hunk:
+    """One ``@@`` section of a unified diff."""
+
+    old_start: int
+    old_lines: list[str]
+    new_lines: list[str]
+
+
+def _parse_unified_diff(patch: str) -> list[_Hunk]:
+    hunks: list[_Hunk] = []
+    current: _Hunk | None = None
+
+    for line in patch.rstrip("\n").splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            current = _Hunk(old_start=int(header.group(1)), old_lines=[], new_lines=[])
+            hunks.append(current)
+        elif current is None:
+            # File headers (diff, index, ---, +++) before the first hunk
+            continue
+        elif line.startswith("\\"):
+            # "\ No newline at end of file"
+            continue
+        elif line.startswith("-"):
+            current.old_lines.append(line[1:])
+        elif line.startswith("+"):
+            current.new_lines.append(line[1:])
+        else:
+            # Context; editors and models often drop the space of blank context lines
+            text = line[1:] if line.startswith(" ") else line
+            current.old_lines.append(text)
+            current.new_lines.append(text)
+
+    if not hunks:
+        raise PatchConflictError("Patch contains no @@ hunks")
+    return hunks
+
+
+def _find(lines: list[str], needle: list[str], start: int, expected: int) -> int | None:
+    """Index of ``needle`` in ``lines[start:]`` closest to ``expected``.
+
+    Exact matches win; otherwise lines are compared without trailing whitespace.
+    """
+    candidates = range(start, len(lines) - len(needle) + 1)
+    for normalize in (lambda s: s, str.rstrip):
+        target = [normalize(s) for s in needle]
+        matches = [i for i in candidates if [normalize(s) for s in lines[i:i + len(needle)]] == target]
+        if matches:
+            return min(matches, key=lambda i: abs(i - expected))
+    return None
+
+
+def apply_unified_diff(content: str, patch: str) -> str:
+    """Apply a unified diff to one file's content.
+
+    Line numbers in hunk headers are treated as hints: a hunk applies where
+    its context matches, closest to the stated line.
+
+    Args:
+        content: Current file content
+        patch: Unified diff (``@@ -a,b +c,d @@`` hunks; file headers optional)
+
+    Returns:
+        The patched content
+
+    Raises:
+        PatchConflictError: If the patch has no hunks or a hunk does not match
+    """
+    lines = content.split("\n")
+    position = 0
+    # Lines added minus lines removed by earlier hunks
+    offset = 0
+
+    for number, hunk in enumerate(_parse_unified_diff(patch), start=1):
+        expected = max(hunk.old_start - 1 + offset, position)
+        if not hunk.old_lines:
+            # Pure insertion after line old_start
+            index = min(max(hunk.old_start + offset, position), len(lines))
+        else:
+            index = _find(lines, hunk.old_lines, position, expected)
+            if index is None:
+                raise PatchConflictError(
+                    f"Hunk {number} (at line {hunk.old_start}) does not match the file. "
+                    "Read the file again and rebuild the patch from its current content."
+                )
+        lines[index:index + len(hunk.old_lines)] = hunk.new_lines
+        position = index + len(hunk.new_lines)
+        offset += len(hunk.new_lines) - len(hunk.old_lines)
+
+    return "\n".join(lines)
@@ -0,0 +1,52 @@
+"""Shared test fixtures: test databases"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.config import settings
+from src.database.models import Base
+
+
+async def _create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path, monkeypatch):
+    """Create an in-memory database for testing (project files are stored under tmp_path)"""
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    engine = await _create_engine("sqlite+aiosqlite:///:memory:")
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session_maker(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def db_session(session_maker):
+    async with session_maker() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def file_session_maker(tmp_path, monkeypatch):
+    """Create a file database for testing, for code that writes on its own connections"""
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    engine = await _create_engine(f"sqlite+aiosqlite:///{tmp_path}/test.sqlite")
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
@@ -0,0 +1,258 @@
+"""Tests for cancelling a streaming turn"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+from uuid import UUID
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from src.ai import cancellation
+from src.ai import streaming
+from src.ai.cancellation import TurnRegistry
+from src.ai.cancellation import estimate_savings
+from src.ai.cancellation import record_completed_turn
+from src.ai.cancellation import turn_registry
+from src.ai.events import SSEEventType
+from src.ai.events import format_sse_event
+from src.ai.rate_limiter import RateLimiter
+from src.api import streaming as streaming_api
+from src.config import settings
+from src.database.models import Message
+from src.database.models import MessageStatus
+from src.database.models import Project
+from src.database.models import ProjectStatus
+from src.database.models import ProjectType
+from src.database.models import Session
+from src.observability.metrics import LLM_TURNS_CANCELLED
+from src.services import status_service
+from src.services.status_service import StatusStore
+from tools.mock_anthropic import MockAsyncAnthropic
+from tools.mock_anthropic import MockConfig
+
+# Two seconds of output
+SLOW = MockConfig(ttft_seconds=0.01, tokens_per_second=400.0, response_tokens=800)
+
+
+class RecordingStream:
+    """Message stream that records when it is closed."""
+
+    def __init__(self, stream, client: "RecordingClient"):
+        self._stream = stream
+        self._client = client
+
+    async def __aenter__(self):
+        return await self._stream.__aenter__()
+
+    async def __aexit__(self, *exc_info) -> bool:
+        self._client.closed += 1
+        return await self._stream.__aexit__(*exc_info)
+
+
+class RecordingClient(MockAsyncAnthropic):
+    """Mock client whose streams record when they are closed."""
+
+    def __init__(self, config: MockConfig):
+        super().__init__(config)
+        self.closed = 0
+        stream = self.messages.stream
+        self.messages.stream = lambda **request: RecordingStream(stream(**request), self)
+
+
+@pytest_asyncio.fixture
+async def session_maker(file_session_maker, monkeypatch):
+    """A file database (cancelled turns are saved on their own connection)"""
+    monkeypatch.setattr(settings, "project_naming_enabled", False)
+    monkeypatch.setattr(cancellation, "AsyncSessionLocal", file_session_maker)
+    monkeypatch.setattr(streaming, "AsyncSessionLocal", file_session_maker)
+    store = StatusStore(flush_delay=0, session_factory=file_session_maker)
+    monkeypatch.setattr(status_service, "status_store", store)
+    yield file_session_maker
+    await store.close()
+
+
+@pytest_asyncio.fixture
+async def session_id(session_maker):
+    async with session_maker() as db:
+        project = Project(name="Trip", type=ProjectType.TRIP)
+        db.add(project)
+        await db.commit()
+        session = Session(project_id=project.id, name="Main")
+        db.add(session)
+        await db.commit()
+        return session.id
+
+
+@pytest.fixture
+def client(monkeypatch) -> RecordingClient:
+    client = RecordingClient(SLOW)
+    monkeypatch.setattr(streaming, "create_anthropic_client", lambda api_key=None: client)
+    # The mock stream has no usage snapshot, so reservations of cut-off streams aren't settled
+    monkeypatch.setattr(streaming, "rate_limiter", RateLimiter())
+    return client
+
+
+async def reply(session_maker, session_id: str) -> Message:
+    async with session_maker() as db:
+        result = await db.execute(select(Message).where(Message.session_id == session_id, Message.role == "assistant"))
+        return result.scalar_one()
+
+
+class TestCancelTurn:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("while_waiting", [False, True])
+    async def test_cancel_stops_upstream_and_saves_partial_reply(
+        self, session_maker, session_id, client, while_waiting
+    ):
+        registry = TurnRegistry()
+        turn = registry.start(session_id)
+        events = []
+        async with session_maker() as db:
+            async for raw in turn.stream(
+                streaming.stream_claude_response(UUID(session_id), "Plan a week in Lisbon", db, "key", turn=turn)
+            ):
+                events.append(json.loads(raw.removeprefix("data: ")))
+                if len([e for e in events if e["type"] == "message_delta"]) == 3:
+                    if while_waiting:
+                        # Cancelled from another request while the turn waits on the upstream stream
+                        asyncio.get_running_loop().call_later(0.05, registry.cancel, session_id)
+                    else:
+                        registry.cancel(session_id)
+        registry.finish(turn)
+
+        cancelled = events[-1]
+        assert cancelled["type"] == "cancelled"
+        assert cancelled["reason"] == "user"
+        # Stopped within a few chunks of the cancel, not after the whole reply
+        assert len([e for e in events if e["type"] == "message_delta"]) < 20
+        assert client.closed == 1
+        assert asyncio.current_task().cancelling() == 0
+
+        saved = await reply(session_maker, session_id)
+        assert saved.id == cancelled["message_id"]
+        assert saved.status == MessageStatus.CANCELLED
+        streamed = "".join(e["content"] for e in events if e["type"] == "message_delta")
+        assert saved.content == streamed == cancelled["content"]
+        async with session_maker() as db:
+            session = await db.get(Session, session_id)
+            assert await status_service.StatusService.get_project_status(db, session.project_id) == ProjectStatus.IDLE
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect_saves_partial_reply_and_propagates(self, session_maker, session_id, client):
+        disconnects = LLM_TURNS_CANCELLED.labels("api", "disconnect").value
+        started = asyncio.Event()
+
+        async def consume():
+            async with session_maker() as db:
+                async for raw in streaming.stream_claude_response(UUID(session_id), "Plan a week in Lisbon", db, "key"):
+                    if '"message_delta"' in raw:
+                        started.set()
+
+        task = asyncio.create_task(consume())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert client.closed == 1
+        assert LLM_TURNS_CANCELLED.labels("api", "disconnect").value == disconnects + 1
+        saved = await reply(session_maker, session_id)
+        assert saved.status == MessageStatus.CANCELLED
+        assert saved.content
+
+    @pytest.mark.asyncio
+    async def test_cancel_in_one_session_lets_the_other_complete(self, session_maker, session_id, client):
+        async with session_maker() as db:
+            project_id = (await db.get(Session, session_id)).project_id
+            other = Session(project_id=project_id, name="Other")
+            db.add(other)
+            await db.commit()
+            other_id = other.id
+
+        registry = TurnRegistry()
+
+        async def run(sid: str, cancel_after: int | None) -> list[str]:
+            turn = registry.start(sid)
+            types = []
+            async with session_maker() as db:
+                async for raw in turn.stream(
+                    streaming.stream_claude_response(UUID(sid), "Plan a week in Lisbon", db, "key", turn=turn)
+                ):
+                    types.append(json.loads(raw.removeprefix("data: "))["type"])
+                    if types.count("message_delta") == cancel_after:
+                        registry.cancel(sid)
+            registry.finish(turn)
+            return types
+
+        completed, cancelled = await asyncio.gather(run(other_id, None), run(session_id, 3))
+
+        assert cancelled[-1] == "cancelled"
+        assert completed[-1] == "message_complete"
+        assert "error" not in completed
+        async with session_maker() as db:
+            assert await status_service.StatusService.get_project_status(db, project_id) == ProjectStatus.COMPLETE
+
+    @pytest.mark.asyncio
+    async def test_cancel_without_running_turn(self):
+        registry = TurnRegistry()
+        assert registry.cancel("s1") is None
+
+        turn = registry.start("s1")
+        assert registry.cancel("s1") is turn
+        assert registry.cancel("s1") is None
+        registry.finish(turn)
+        assert registry.get("s1") is None
+
+    @pytest.mark.asyncio
+    async def test_cancel_reaches_running_turn_not_the_one_queued_behind_it(self, session_maker, session_id):
+        async def turn(session_id, user_message, db, api_key, turn=None):
+            try:
+                yield format_sse_event(SSEEventType.MESSAGE_DELTA, {"content": user_message})
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                yield format_sse_event(SSEEventType.CANCELLED, {"reason": turn.reason})
+
+        async def next_type(events) -> str:
+            return json.loads((await asyncio.wait_for(anext(events), 2)).removeprefix("data: "))["type"]
+
+        async with session_maker() as db:
+            project_id = (await db.get(Session, session_id)).project_id
+            first = await streaming_api.open_turn_stream(db, UUID(session_id), project_id, "one", streamer=turn)
+            assert await next_type(first) == "message_delta"
+            # The session runs one turn at a time: the second message waits
+            second = await streaming_api.open_turn_stream(db, UUID(session_id), project_id, "two", streamer=turn)
+            assert await next_type(second) == "queue_position"
+
+            assert turn_registry.cancel(session_id) is turn_registry.get(session_id)
+            assert await next_type(first) == "cancelled"
+            assert await anext(first, None) is None
+
+            # The queued turn now runs, and can be cancelled in turn
+            while (kind := await next_type(second)) == "queue_position":
+                pass
+            assert kind == "message_delta"
+            assert turn_registry.cancel(session_id) is not None
+            assert await next_type(second) == "cancelled"
+            assert await anext(second, None) is None
+        assert turn_registry.get(session_id) is None
+
+
+class TestSavings:
+    def test_savings_are_measured_against_the_average_turn(self, monkeypatch):
+        monkeypatch.setattr(cancellation, "_typical_turns", {})
+        assert estimate_savings("api", 1.0, 10) == (None, None)
+
+        record_completed_turn("api", 10.0, 1000)
+        record_completed_turn("api", 20.0, 2000)
+
+        seconds, tokens = estimate_savings("api", 4.0, 200)
+        assert seconds == pytest.approx(8.0)
+        assert tokens == 1000
+        assert estimate_savings("api", 60.0, 5000) == (0.0, 0)
@@ -0,0 +1,150 @@
+"""Tests for context budgeting, tool payload compaction and rolling summaries"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.ai.context import IMAGE_TOKENS
+from src.ai.context import SUMMARY_HEADER
+from src.ai.context import ContextBudget
+from src.ai.context import FileRef
+from src.ai.context import HistoryEntry
+from src.ai.context import compact_tool_payloads
+from src.ai.context import estimate_tokens
+from src.database.models import Message
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.database.models import Session
+from src.database.models import SessionSummary
+from src.services.summary_service import SummaryService
+
+
+def _history(turns: int, chars: int = 400) -> list[HistoryEntry]:
+    entries = []
+    for turn in range(turns):
+        for role in ("user", "assistant"):
+            content = f"{role} turn {turn} " + "x" * chars
+            entries.append(HistoryEntry(f"{role[0]}{turn}", role, content, estimate_tokens(content)))
+    return entries
+
+
+class TestEstimateTokens:
+    def test_text_and_images(self):
+        assert estimate_tokens("a" * 400) == 101
+        content = [
+            {"type": "text", "text": "a" * 40},
+            {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "A" * 100000}},
+        ]
+        assert estimate_tokens(content) == 11 + IMAGE_TOKENS
+
+
+class TestContextBudget:
+    def test_history_within_budget_is_sent_verbatim(self):
+        entries = _history(4)
+        plan = ContextBudget(max_tokens=10000, recent_turns=2).plan(entries, None)
+
+        assert [m["content"] for m in plan.messages] == [e.content for e in entries]
+        assert plan.pending_summary == []
+
+    def test_over_budget_drops_oldest_turns_at_turn_boundary(self):
+        entries = _history(20)  # ~102 tokens per message, ~4000 total
+        plan = ContextBudget(max_tokens=3000, recent_turns=4).plan(entries, None)
+
+        assert plan.estimated_tokens <= 3000
+        assert plan.pending_summary
+        assert plan.pending_summary[-1].role == "assistant"
+        # Interim digest is folded into the first kept user message
+        first = plan.messages[0]
+        assert first["role"] == "user"
+        assert first["content"][0]["text"].startswith(SUMMARY_HEADER)
+        assert plan.messages[-1]["content"] == entries[-1].content
+        assert len(plan.messages) == len(entries) - len(plan.pending_summary)
+
+    def test_recent_turns_are_never_dropped(self):
+        entries = _history(3, chars=4000)
+        plan = ContextBudget(max_tokens=1000, recent_turns=3).plan(entries, None)
+
+        assert plan.pending_summary == []
+        assert len(plan.messages) == len(entries)
+
+    def test_stored_summary_replaces_covered_messages(self):
+        entries = _history(10)
+        summary = SessionSummary(session_id="s", through_message_id="a5", content="User planned a trip.")
+        plan = ContextBudget(max_tokens=100000, recent_turns=4).plan(entries, summary)
+
+        assert plan.pending_summary == []
+        assert len(plan.messages) == 8
+        assert plan.messages[0]["content"][0]["text"] == f"{SUMMARY_HEADER}\nUser planned a trip."
+        assert plan.messages[0]["content"][1]["text"] == entries[12].content
+
+    def test_boundary_is_stable_once_summarized(self):
+        budget = ContextBudget(max_tokens=3000, recent_turns=4)
+        entries = _history(20)
+        first = budget.plan(entries, None)
+        summary = SessionSummary(
+            session_id="s", through_message_id=first.pending_summary[-1].message_id, content="Earlier turns."
+        )
+
+        # One more turn later the prefix is unchanged
+        later = budget.plan(_history(21), summary)
+        again = budget.plan(_history(22), summary)
+
+        assert later.pending_summary == [] and again.pending_summary == []
+        assert later.messages[0] == again.messages[0]
+
+
+class TestCompactToolPayloads:
+    def test_replaces_earlier_payloads_but_keeps_latest(self):
+        big = "<html>" + "x" * 5000 + "</html>"
+
+        def assistant(tool_id):
+            return {
+                "role": "assistant",
+                "content": [
+                    {"type": "tool_use", "id": tool_id, "name": "create_file",
+                     "input": {"filename": "index.html", "content": big}},
+                ],
+            }
+
+        def result(tool_id):
+            return {"role": "user", "content": [{"type": "tool_result", "tool_use_id": tool_id, "content": "ok"}]}
+
+        messages = [
+            {"role": "user", "content": "Make a game"},
+            assistant("t1"), result("t1"),
+            assistant("t2"), result("t2"),
+        ]
+        refs = {"t1": FileRef("file-1", "index.html", len(big))}
+
+        compacted = compact_tool_payloads(messages, start=1, file_refs=refs)
+
+        reference = compacted[1]["content"][0]["input"]["content"]
+        assert reference == f"[{len(big)} characters omitted; stored as project file 'index.html' (files.id=file-1)]"
+        assert compacted[3]["content"][0]["input"]["content"] == big
+        # Input messages are not modified
+        assert messages[1]["content"][0]["input"]["content"] == big
+
+
+class TestSummaryService:
+    @pytest.mark.asyncio
+    async def test_save_replaces_previous_summary(self, db_session):
+        project = Project(name="Trip", type=ProjectType.TRIP)
+        db_session.add(project)
+        await db_session.commit()
+        session = Session(project_id=project.id, name="Main")
+        db_session.add(session)
+        await db_session.commit()
+        messages = [Message(session_id=session.id, role="user", content="hi") for _ in range(2)]
+        db_session.add_all(messages)
+        await db_session.commit()
+
+        await SummaryService.save_summary(db_session, session.id, messages[0].id, "first")
+        await SummaryService.save_summary(db_session, session.id, messages[1].id, "second")
+
+        latest = await SummaryService.get_latest_summary(db_session, session.id)
+        assert latest.content == "second"
+        assert latest.through_message_id == messages[1].id
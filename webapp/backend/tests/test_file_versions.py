@@ -0,0 +1,156 @@
+"""Tests for delta-compressed file version history"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func
+from sqlalchemy import select
+
+from src.config import settings
+from src.database.models import File
+from src.database.models import FileVersion
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.services.file_service import FileService
+from src.services.file_version_service import FileVersionService
+from src.services.workspace_sync import WorkspaceSync
+from src.utils.deltas import decode_version
+from src.utils.deltas import encode_version
+from src.utils.deltas import is_full_copy
+
+
+def make_game(speed: int, lines: int = 400) -> str:
+    body = [f"const enemy{i} = spawnEnemy({i % 17}, {i % 23});" for i in range(lines)]
+    return "\n".join([f"const PLAYER_SPEED = {speed};", *body]) + "\n"
+
+
+class TestDeltas:
+    def test_small_change_is_stored_as_delta(self):
+        base, target = make_game(5).encode(), make_game(4).encode()
+        payload = encode_version(base, target)
+
+        assert not is_full_copy(payload)
+        assert len(payload) < 100
+        assert decode_version(base, payload) == target
+
+    def test_unrelated_content_is_stored_in_full(self):
+        target = bytes(range(256)) * 4
+        payload = encode_version(b"<html></html>\n", target)
+
+        assert is_full_copy(payload)
+        assert decode_version(b"", payload) == target
+
+    def test_round_trips_binary_and_missing_newline(self):
+        base = b"\x00\xff\r\nline\nno newline"
+        target = b"\x00\xfe\r\nline\nno newline at end"
+        assert decode_version(base, encode_version(base, target)) == target
+
+
+@pytest_asyncio.fixture
+async def project(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    project = Project(name="Game", type=ProjectType.GAME)
+    db_session.add(project)
+    await db_session.commit()
+    return project
+
+
+class TestFileVersions:
+    @pytest.mark.asyncio
+    async def test_rewrites_keep_one_file_and_every_version(self, db_session, project):
+        for speed in range(1, 6):
+            file = await FileService.create_file(
+                db_session, project.id, None, "game.js", make_game(speed), "application/javascript"
+            )
+
+        assert (await db_session.execute(select(func.count()).select_from(File))).scalar_one() == 1
+        versions = await FileVersionService.list_versions(db_session, file.id)
+        assert [v.version for v in versions] == [5, 4, 3, 2, 1]
+        assert versions[0].payload is None
+        for speed in range(1, 6):
+            content = await FileVersionService.get_version_content(db_session, file, speed)
+            assert content.decode() == make_game(speed)
+
+    @pytest.mark.asyncio
+    async def test_unchanged_write_adds_no_version(self, db_session, project):
+        await FileService.create_file(db_session, project.id, None, "game.js", make_game(1))
+        file = await FileService.create_file(db_session, project.id, None, "game.js", make_game(1))
+
+        assert await FileVersionService.latest_version(db_session, file.id) == 1
+
+    @pytest.mark.asyncio
+    async def test_history_grows_with_change_size(self, db_session, project):
+        file = await FileService.create_file(db_session, project.id, None, "game.js", make_game(0))
+        for speed in range(1, 101):
+            file = await FileService.update_file_content(db_session, file, make_game(speed))
+
+        payloads = (await db_session.execute(select(FileVersion.payload).where(FileVersion.payload.is_not(None)))).all()
+        stored = sum(len(payload) for (payload,) in payloads)
+        assert len(payloads) == 100
+        # 100 full copies would be ~100x the file size
+        assert stored < file.size * 2
+        assert (await FileVersionService.get_version_content(db_session, file, 1)).decode() == make_game(0)
+
+    @pytest.mark.asyncio
+    async def test_diff_and_restore(self, db_session, project):
+        await FileService.create_file(db_session, project.id, None, "game.js", make_game(1))
+        file = await FileService.create_file(db_session, project.id, None, "game.js", make_game(2))
+
+        diff = await FileVersionService.diff(db_session, file, 1, 2)
+        assert "-const PLAYER_SPEED = 1;\n+const PLAYER_SPEED = 2;" in diff
+        assert await FileVersionService.diff(db_session, file, 1, 9) is None
+
+        file = await FileService.restore_version(db_session, file, 1)
+        assert Path(file.path).read_text() == make_game(1)
+        assert await FileVersionService.latest_version(db_session, file.id) == 3
+        assert (await FileVersionService.get_version_content(db_session, file, 2)).decode() == make_game(2)
+
+    @pytest.mark.asyncio
+    async def test_restore_when_the_current_file_is_gone(self, db_session, project):
+        await FileService.create_file(db_session, project.id, None, "notes.md", "# Day 1\n")
+        # Unrelated content, so version 1 is stored in full
+        file = await FileService.create_file(db_session, project.id, None, "notes.md", bytes(range(256)) * 4)
+        Path(file.path).unlink()
+
+        file = await FileService.restore_version(db_session, file, 1)
+
+        assert Path(file.path).read_text() == "# Day 1\n"
+        assert await FileVersionService.latest_version(db_session, file.id) == 3
+
+    @pytest.mark.asyncio
+    async def test_binary_files_cannot_be_diffed(self, db_session, project):
+        await FileService.create_file(db_session, project.id, None, "sprite.bin", b"\xff\x00", "application/octet-stream")
+        file = await FileService.create_file(
+            db_session, project.id, None, "sprite.bin", b"\xfe\x00", "application/octet-stream"
+        )
+
+        with pytest.raises(ValueError, match="not a text file"):
+            await FileVersionService.diff(db_session, file, 1, 2)
+
+    @pytest.mark.asyncio
+    async def test_workspace_sync_records_versions(self, db_session, project, tmp_path):
+        workspace = tmp_path / "workspace"
+        workspace.mkdir()
+        sync = WorkspaceSync(project.id, workspace)
+
+        (workspace / "game.js").write_text(make_game(1))
+        [file] = await sync.sync(db_session)
+        (workspace / "game.js").write_text(make_game(2))
+        sync.mark("game.js")
+        await sync.sync(db_session)
+
+        assert await FileVersionService.latest_version(db_session, file.id) == 2
+        assert (await FileVersionService.get_version_content(db_session, file, 1)).decode() == make_game(1)
+
+    @pytest.mark.asyncio
+    async def test_delete_removes_history(self, db_session, project):
+        await FileService.create_file(db_session, project.id, None, "game.js", make_game(1))
+        file = await FileService.create_file(db_session, project.id, None, "game.js", make_game(2))
+
+        assert await FileService.delete_file(db_session, file.id)
+        assert (await db_session.execute(select(func.count()).select_from(FileVersion))).scalar_one() == 0
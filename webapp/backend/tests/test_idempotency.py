@@ -0,0 +1,208 @@
+"""Tests for Idempotency-Key support on message submission"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+from uuid import UUID
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.ai.events import SSEEventType
+from src.ai.events import format_sse_event
+from src.api import messages
+from src.api import streaming
+from src.database.connection import get_db
+from src.database.models import Message
+from src.database.models import MessageRole
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.database.models import Session
+from src.services.idempotency import IdempotencyConflict
+from src.services.idempotency import IdempotencyService
+from src.services.idempotency import request_fingerprint
+from src.services.message_service import MessageService
+
+FINGERPRINT = request_fingerprint("stream", "Make a snake game")
+
+
+@pytest_asyncio.fixture
+async def session_maker(file_session_maker):
+    """A file database (results are stored on their own connection)"""
+    return file_session_maker
+
+
+@pytest_asyncio.fixture
+async def session_id(session_maker):
+    async with session_maker() as db:
+        project = Project(name="Snake", type=ProjectType.GAME)
+        db.add(project)
+        await db.commit()
+        session = Session(project_id=project.id, name="Main")
+        db.add(session)
+        await db.commit()
+        return session.id
+
+
+def delta(text: str) -> str:
+    return format_sse_event(SSEEventType.MESSAGE_DELTA, {"content": text})
+
+
+async def generation(gate: asyncio.Event | None = None, fail: bool = False):
+    yield delta("Hello")
+    if gate is not None:
+        await gate.wait()
+    if fail:
+        yield format_sse_event(SSEEventType.ERROR, {"error": "overloaded"})
+        return
+    yield delta(" world")
+
+
+class TestIdempotencyService:
+    @pytest.mark.asyncio
+    async def test_repeat_attaches_to_running_stream_then_replays_stored_one(self, session_maker):
+        service = IdempotencyService(session_factory=session_maker)
+        gate = asyncio.Event()
+        async with session_maker() as db:
+            recording, owner = await service.claim(db, "s1", "key-1", FINGERPRINT)
+            assert owner
+            recording.start(generation(gate))
+            first = asyncio.create_task(_collect(recording.follow()))
+
+            attached, owner = await service.claim(db, "s1", "key-1", FINGERPRINT)
+            assert attached is recording and not owner
+            second = asyncio.create_task(_collect(attached.follow()))
+            await asyncio.sleep(0.01)
+            gate.set()
+            assert await first == await second == [delta("Hello"), delta(" world")]
+            # Followers end as soon as the stream does; the result is stored right after
+            await recording._task
+
+        # Another process (or after a restart): served from the table
+        restarted = IdempotencyService(session_factory=session_maker)
+        async with session_maker() as db:
+            replayed, owner = await restarted.claim(db, "s1", "key-1", FINGERPRINT)
+        assert not owner
+        assert await _collect(replayed.follow()) == [delta("Hello"), delta(" world")]
+
+    @pytest.mark.asyncio
+    async def test_key_reused_for_another_message_is_rejected(self, session_maker):
+        service = IdempotencyService(session_factory=session_maker)
+        async with session_maker() as db:
+            recording, _owner = await service.claim(db, "s1", "key-1", FINGERPRINT)
+            await recording.finish({"ok": True})
+            with pytest.raises(IdempotencyConflict):
+                await service.claim(db, "s1", "key-1", request_fingerprint("stream", "Make a tetris game"))
+            # Keys are scoped to the session
+            _recording, owner = await service.claim(db, "s2", "key-1", FINGERPRINT)
+            assert owner
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_is_forgotten(self, session_maker):
+        service = IdempotencyService(session_factory=session_maker)
+        async with session_maker() as db:
+            recording, _owner = await service.claim(db, "s1", "key-1", FINGERPRINT)
+            recording.start(generation(fail=True))
+            await _collect(recording.follow())
+
+            _retry, owner = await service.claim(db, "s1", "key-1", FINGERPRINT)
+            assert recording.failed and owner
+
+    @pytest.mark.asyncio
+    async def test_unfollowed_stream_is_cancelled_after_grace(self, session_maker):
+        service = IdempotencyService(detach_grace=0.05, session_factory=session_maker)
+        async with session_maker() as db:
+            recording, _owner = await service.claim(db, "s1", "key-1", FINGERPRINT)
+        recording.start(generation(asyncio.Event()))
+
+        await asyncio.sleep(0.2)
+        assert recording.done and recording.failed
+
+
+async def _collect(events) -> list[str]:
+    return [event async for event in events]
+
+
+class TestIdempotentEndpoints:
+    @pytest.mark.asyncio
+    async def test_retried_message_runs_once(self, session_maker, session_id, monkeypatch):
+        from src.main import app
+
+        calls = []
+
+        async def fake_send(db, session_id, content):
+            calls.append(content)
+            await asyncio.sleep(0.05)
+            user = Message(session_id=session_id, role=MessageRole.USER, content=content)
+            reply = Message(session_id=session_id, role=MessageRole.ASSISTANT, content="Here is your game")
+            db.add_all([user, reply])
+            await db.commit()
+            return user, reply
+
+        async def override_get_db():
+            async with session_maker() as session:
+                yield session
+
+        monkeypatch.setattr(MessageService, "send_user_message", staticmethod(fake_send))
+        monkeypatch.setattr(messages, "idempotency_service", IdempotencyService(session_factory=session_maker))
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                url = f"/api/sessions/{session_id}/messages"
+                headers = {"Idempotency-Key": "retry-1"}
+                first, concurrent = await asyncio.gather(
+                    client.post(url, json={"content": "Make a snake game"}, headers=headers),
+                    client.post(url, json={"content": "Make a snake game"}, headers=headers),
+                )
+                later = await client.post(url, json={"content": "Make a snake game"}, headers=headers)
+                conflict = await client.post(url, json={"content": "Make a tetris game"}, headers=headers)
+        finally:
+            app.dependency_overrides.clear()
+
+        assert calls == ["Make a snake game"]
+        assert first.status_code == concurrent.status_code == later.status_code == 201
+        assert first.json() == concurrent.json() == later.json()
+        assert conflict.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_dropped_keyed_stream_finishes_for_its_retry(self, session_maker, session_id, monkeypatch):
+        gate = asyncio.Event()
+        used: list[AsyncSession] = []
+
+        async def turn(session_id, user_message, db, api_key, turn=None):
+            used.append(db)
+            yield delta("Hello")
+            await gate.wait()
+            db.add(Message(session_id=str(session_id), role=MessageRole.ASSISTANT, content="Hello world"))
+            await db.commit()
+            yield delta(" world")
+
+        monkeypatch.setattr(streaming, "idempotency_service", IdempotencyService(session_factory=session_maker))
+        monkeypatch.setattr(streaming, "AsyncSessionLocal", session_maker)
+        async with session_maker() as request_db:
+            project_id = (await request_db.get(Session, session_id)).project_id
+            events = await streaming.open_turn_stream(
+                request_db, UUID(session_id), project_id, "Make a snake game", "drop-1", turn
+            )
+            assert await anext(events) == delta("Hello")
+            # The client drops; its request's session closes with it
+            await events.aclose()
+
+        async with session_maker() as retry_db:
+            retry = await streaming.open_turn_stream(
+                retry_db, UUID(session_id), project_id, "Make a snake game", "drop-1", turn
+            )
+            gate.set()
+            assert await _collect(retry) == [delta("Hello"), delta(" world")]
+            stored = await retry_db.execute(select(Message).where(Message.session_id == session_id))
+
+        assert len(used) == 1 and used[0] is not request_db
+        assert [m.content for m in stored.scalars()] == ["Hello world"]
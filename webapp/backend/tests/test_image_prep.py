@@ -0,0 +1,112 @@
+"""Tests for preparing images before they are sent to the model"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import base64
+import json
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from src.ai import images
+from src.ai import streaming
+from src.ai.images import ImagePreparer
+from src.ai.images import image_tokens
+
+
+def encode(img: Image.Image, fmt: str = "PNG") -> str:
+    output = BytesIO()
+    img.save(output, format=fmt)
+    return base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def retina_screenshot() -> str:
+    # Gradient rather than a flat color, so the PNG is realistically large
+    img = Image.linear_gradient("L").resize((2880, 1800)).convert("RGB")
+    return encode(img)
+
+
+def decoded_size(prepared) -> tuple[int, int]:
+    return Image.open(BytesIO(base64.b64decode(prepared.data))).size
+
+
+class TestImagePreparer:
+    @pytest.mark.asyncio
+    async def test_large_screenshot_is_downscaled_once(self, monkeypatch):
+        calls = []
+        prepare = images._prepare
+        monkeypatch.setattr(images, "_prepare", lambda *args: calls.append(1) or prepare(*args))
+        preparer = ImagePreparer(max_edge=1024, max_pixels=500_000)
+        data = retina_screenshot()
+
+        first = await preparer.prepare(data, "image/png", "s1")
+        second = await preparer.prepare(data, "image/png", "s1")
+
+        assert second is first
+        assert len(calls) == 1
+        width, height = decoded_size(first)
+        assert max(width, height) <= 1024 and width * height <= 500_000
+        assert first.media_type == "image/jpeg"
+        assert first.prepared_bytes < first.original_bytes
+        assert first.prepared_tokens < first.original_tokens == image_tokens(2880, 1800)
+
+        savings = preparer.savings("s1")
+        assert savings.images == 2
+        assert savings.bytes_saved == 2 * (first.original_bytes - first.prepared_bytes)
+        assert savings.tokens_saved == 2 * (first.original_tokens - first.prepared_tokens)
+        assert preparer.savings("s2").images == 0
+
+    @pytest.mark.asyncio
+    async def test_savings_are_kept_for_recent_sessions_only(self, monkeypatch):
+        monkeypatch.setattr(images, "MAX_TRACKED_SESSIONS", 2)
+        preparer = ImagePreparer()
+        data = encode(Image.new("RGB", (64, 48), (0, 0, 255)))
+
+        for session_id in ("s1", "s2", "s1", "s3"):
+            await preparer.prepare(data, "image/png", session_id)
+
+        assert list(preparer._savings) == ["s1", "s3"]
+        assert preparer.savings("s1").images == 2
+        assert preparer.savings("s2").images == 0
+
+    @pytest.mark.asyncio
+    async def test_small_transparent_image_keeps_its_size(self):
+        data = encode(Image.new("RGBA", (64, 48), (0, 0, 255, 100)))
+
+        prepared = await ImagePreparer().prepare(data, "image/png")
+
+        assert prepared.media_type == "image/png"
+        assert decoded_size(prepared) == (64, 48)
+        assert prepared.prepared_tokens == prepared.original_tokens
+
+    @pytest.mark.asyncio
+    async def test_invalid_image_is_dropped(self):
+        assert await ImagePreparer().prepare(base64.b64encode(b"not an image").decode(), "image/png") is None
+
+    @pytest.mark.asyncio
+    async def test_message_blocks_are_sent_prepared(self, monkeypatch):
+        monkeypatch.setattr(streaming, "image_preparer", ImagePreparer(max_edge=800))
+        content = json.dumps(
+            [
+                {"type": "text", "text": "Like this"},
+                {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": retina_screenshot()}},
+            ]
+        )
+
+        text, image = await streaming._validate_message_content(content, "s1")
+
+        assert text == {"type": "text", "text": "Like this"}
+        assert image["source"]["media_type"] == "image/jpeg"
+        assert max(Image.open(BytesIO(base64.b64decode(image["source"]["data"]))).size) == 800
+        assert streaming.image_preparer.savings("s1").images == 1
+
+
+def test_image_tokens_follow_the_api_downscaling():
+    assert image_tokens(750, 100) == 100
+    # Larger images are billed as if resized to the API's limits
+    assert image_tokens(6000, 4000) == image_tokens(1313, 875)
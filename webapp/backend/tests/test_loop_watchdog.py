@@ -0,0 +1,98 @@
+"""Tests for the event-loop lag watchdog"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.observability import REGISTRY
+from src.observability.loop import LoopWatchdog
+from src.observability.loop import capture_stack
+from src.observability.loop import monitor_event_loop_lag
+
+
+def block_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def run_monitored(watchdog: LoopWatchdog, body) -> None:
+    watchdog.start()
+    monitor = asyncio.create_task(monitor_event_loop_lag(interval=0.02, watchdog=watchdog))
+    try:
+        await asyncio.sleep(0.05)
+        await body()
+        # Let the probe wake up and record the stall
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.cancel()
+        watchdog.stop()
+
+
+class TestLoopWatchdog:
+    @pytest.mark.asyncio
+    async def test_blocking_call_is_sampled_with_its_stack(self):
+        watchdog = LoopWatchdog(threshold=0.05, sample_interval=0.005)
+
+        async def blocking_handler():
+            block_loop(0.3)
+
+        await run_monitored(watchdog, blocking_handler)
+        report = watchdog.report()
+
+        assert report["stalls"] == 1
+        [stall] = report["recent"]
+        assert stall["lag_ms"] >= 250
+        assert stall["site"].endswith("test_loop_watchdog.py:block_loop")
+        top = report["stacks"][0]
+        assert top["samples"] >= 10
+        assert any("in blocking_handler" in frame for frame in top["frames"])
+        assert 'outcomist_event_loop_stall_samples_total{site="' in REGISTRY.render()
+
+    @pytest.mark.asyncio
+    async def test_awaiting_does_not_count_as_a_stall(self):
+        watchdog = LoopWatchdog(threshold=0.05, sample_interval=0.005)
+
+        async def idle_handler():
+            await asyncio.sleep(0.3)
+
+        await run_monitored(watchdog, idle_handler)
+
+        assert watchdog.report()["stalls"] == 0
+        assert watchdog.report()["stacks"] == []
+
+    def test_capture_stack_of_another_thread(self):
+        started = threading.Event()
+        done = threading.Event()
+
+        def worker():
+            started.set()
+            done.wait(1)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        started.wait(1)
+        try:
+            site, frames = capture_stack(thread.ident)
+        finally:
+            done.set()
+            thread.join()
+
+        assert any("in worker" in frame for frame in frames)
+        assert site.endswith(":wait")
+        assert capture_stack(thread.ident) is None
+
+
+def test_debug_endpoint_reports_stalls():
+    from src.main import app
+
+    response = TestClient(app).get("/debug/loop-stalls?limit=5")
+
+    assert response.status_code == 200
+    assert {"stalls", "threshold_ms", "stacks", "recent"} <= response.json().keys()
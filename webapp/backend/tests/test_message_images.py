@@ -0,0 +1,118 @@
+"""Tests for compact message listings with image references"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import base64
+import json
+from io import BytesIO
+
+import httpx
+import pytest
+from PIL import Image
+
+from src.database.connection import get_db
+from src.database.models import Message
+from src.database.models import MessageRole
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.database.models import Session
+from src.services.message_images import ImageStore
+from src.services.message_images import compact_content
+
+
+def screenshot(width: int = 400, height: int = 300) -> str:
+    output = BytesIO()
+    Image.new("RGBA", (width, height), (200, 30, 30, 128)).save(output, format="PNG")
+    return base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def blocks_content(b64: str) -> str:
+    return json.dumps(
+        [
+            {"type": "text", "text": "Make it look like this"},
+            {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": b64}},
+        ]
+    )
+
+
+class TestCompactContent:
+    @pytest.mark.asyncio
+    async def test_images_are_replaced_by_urls(self, tmp_path):
+        store = ImageStore(tmp_path / "images")
+        b64 = screenshot()
+
+        content, blocks = await compact_content(blocks_content(b64), store)
+
+        assert b64 not in content
+        image = json.loads(content)[1]
+        assert image["source"] == {"type": "url", "media_type": "image/png", "url": blocks[1]["url"]}
+        assert blocks[0] == {"type": "text", "chars": len("Make it look like this")}
+        digest = blocks[1]["url"].rsplit("/", 1)[1]
+        path, media_type = store.path(digest)
+        assert media_type == "image/png"
+        assert path.read_bytes() == base64.b64decode(b64)
+        assert blocks[1]["thumbnail_url"] == f"/api/images/{digest}/thumbnail"
+
+        # Same image, same URL; stored once
+        again, _blocks = await compact_content(blocks_content(b64), store)
+        assert again == content
+        assert len(list((tmp_path / "images").glob("*.png"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_plain_text_is_untouched(self, tmp_path):
+        store = ImageStore(tmp_path / "images")
+        for text in ("Make a snake game", "[1, 2, 3] are numbers", '{"not": "blocks"} list'):
+            assert await compact_content(text, store) == (text, None)
+
+
+class TestImageEndpoints:
+    @pytest.mark.asyncio
+    async def test_compact_listing_and_cacheable_images(self, session_maker):
+        from src.main import app
+
+        b64 = screenshot()
+        async with session_maker() as db:
+            project = Project(name="Game", type=ProjectType.GAME)
+            db.add(project)
+            await db.commit()
+            session = Session(project_id=project.id, name="Main")
+            db.add(session)
+            await db.commit()
+            db.add(Message(session_id=session.id, role=MessageRole.USER, content=blocks_content(b64)))
+            db.add(Message(session_id=session.id, role=MessageRole.ASSISTANT, content="Done"))
+            await db.commit()
+            session_id = session.id
+
+        async def override_get_db():
+            async with session_maker() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                inline = await client.get(f"/api/sessions/{session_id}/messages")
+                compact = await client.get(f"/api/sessions/{session_id}/messages", params={"images": "ref"})
+                user, assistant = compact.json()
+                image = await client.get(user["blocks"][1]["url"])
+                thumbnail = await client.get(user["blocks"][1]["thumbnail_url"], params={"size": 64})
+                missing = await client.get("/api/images/" + "0" * 64)
+        finally:
+            app.dependency_overrides.clear()
+
+        assert b64 in inline.text
+        assert inline.json()[0]["blocks"] is None
+        assert b64 not in compact.text
+        assert assistant["content"] == "Done" and assistant["blocks"] is None
+        assert user["blocks"][1]["media_type"] == "image/png"
+
+        assert image.status_code == 200
+        assert image.content == base64.b64decode(b64)
+        assert "immutable" in image.headers["cache-control"]
+        assert thumbnail.headers["content-type"] == "image/jpeg"
+        assert max(Image.open(BytesIO(thumbnail.content)).size) == 64
+        assert missing.status_code == 404
@@ -0,0 +1,98 @@
+"""Tests for the metrics registry and /metrics exposition"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.observability.metrics import MetricsRegistry
+from src.observability.metrics import timed
+
+
+class TestMetricsRegistry:
+    def test_counter_and_gauge_exposition(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("app_requests", "Requests served.", ("route",))
+        active = registry.gauge("app_active", "Active things.")
+        connections = registry.gauge("app_connections", "Computed at scrape time.")
+
+        requests.labels("/a").inc()
+        requests.labels("/a").inc(2)
+        requests.labels('say "hi"').inc()
+        active.set(3)
+        connections.set_function(lambda: 7)
+
+        text = registry.render()
+
+        assert "# TYPE app_requests counter" in text
+        assert 'app_requests_total{route="/a"} 3' in text
+        assert 'app_requests_total{route="say \\"hi\\""} 1' in text
+        assert "app_active 3" in text
+        assert "app_connections 7" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("app_latency_seconds", "Latency.", ("op",), buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.labels("read").observe(value)
+
+        lines = registry.render().splitlines()
+
+        assert 'app_latency_seconds_bucket{op="read",le="0.1"} 2' in lines
+        assert 'app_latency_seconds_bucket{op="read",le="1"} 3' in lines
+        assert 'app_latency_seconds_bucket{op="read",le="+Inf"} 4' in lines
+        assert 'app_latency_seconds_count{op="read"} 4' in lines
+        assert 'app_latency_seconds_sum{op="read"} 3.65' in lines
+
+    def test_label_count_is_checked(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("app_events", "Events.", ("kind",))
+
+        with pytest.raises(ValueError):
+            counter.inc()
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+    @pytest.mark.asyncio
+    async def test_timed_decorator_observes_failures_too(self):
+        registry = MetricsRegistry()
+        duration = registry.histogram("app_op_seconds", "Op duration.", ("op",))
+
+        @timed(duration, "work")
+        async def work(fail: bool):
+            if fail:
+                raise RuntimeError("boom")
+            return 42
+
+        assert await work(False) == 42
+        with pytest.raises(RuntimeError):
+            await work(True)
+
+        assert 'app_op_seconds_count{op="work"} 2' in registry.render()
+
+
+class TestMetricsEndpoint:
+    def test_metrics_endpoint_exposes_hot_path_metrics(self):
+        from src.main import app
+
+        with TestClient(app) as client:
+            client.get("/health")
+            response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        for name in (
+            "process_resident_memory_bytes",
+            "outcomist_sse_active_connections",
+            "outcomist_llm_time_to_first_token_seconds",
+            "outcomist_db_query_duration_seconds",
+        ):
+            assert f"# TYPE {name}" in body
+        # Startup runs create_all, so some statements were timed
+        assert 'outcomist_db_query_duration_seconds_count{operation=' in body
@@ -0,0 +1,113 @@
+"""Tests for the mock Messages API server and load-test reporting helpers"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import socket
+from contextlib import asynccontextmanager
+
+import anthropic
+import pytest
+import uvicorn
+
+from tools.load_test import histogram_quantile
+from tools.load_test import parse_metrics
+from tools.mock_anthropic import MockConfig
+from tools.mock_anthropic import create_app
+
+FAST = dict(ttft_seconds=0, prefill_seconds_per_1k_tokens=0, tokens_per_second=0, response_tokens=20)
+TOOLS = [{"name": "create_file", "description": "Create a file", "input_schema": {"type": "object"}}]
+
+
+@asynccontextmanager
+async def mock_client(config: MockConfig):
+    """Serve the mock API on a free local port and yield a client for it."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield anthropic.AsyncAnthropic(api_key="mock", base_url=f"http://127.0.0.1:{port}", max_retries=0)
+    finally:
+        server.should_exit = True
+        await task
+
+
+class TestMockServer:
+    @pytest.mark.asyncio
+    async def test_streams_tool_use_then_text_after_tool_result(self):
+        async with mock_client(MockConfig(**FAST, tool_use_rate=1.0, tool_content_tokens=50, seed=1)) as client:
+            messages = [{"role": "user", "content": "Make a page"}]
+            async with client.messages.stream(model="mock", max_tokens=100, messages=messages, tools=TOOLS) as stream:
+                deltas = [event async for event in stream if event.type == "content_block_delta"]
+                first = await stream.get_final_message()
+
+            tool_use = first.content[1]
+            messages += [
+                {"role": "assistant", "content": first.content},
+                {"role": "user", "content": [{"type": "tool_result", "tool_use_id": tool_use.id, "content": "ok"}]},
+            ]
+            async with client.messages.stream(model="mock", max_tokens=100, messages=messages, tools=TOOLS) as stream:
+                second = await stream.get_final_message()
+
+        assert deltas
+        assert first.stop_reason == "tool_use"
+        assert tool_use.name == "create_file" and tool_use.input["content"].startswith("<html>")
+        assert second.stop_reason == "end_turn"
+        assert [block.type for block in second.content] == ["text"]
+
+    @pytest.mark.asyncio
+    async def test_injected_errors(self):
+        async with mock_client(MockConfig(**FAST, error_rate=1.0, error_status=529)) as client:
+            with pytest.raises(anthropic.APIStatusError) as exc_info:
+                await client.messages.create(model="mock", max_tokens=10, messages=[{"role": "user", "content": "hi"}])
+        assert exc_info.value.status_code == 529
+
+        async with mock_client(MockConfig(**FAST, midstream_error_rate=1.0)) as client:
+            with pytest.raises(anthropic.APIStatusError):
+                async with client.messages.stream(
+                    model="mock", max_tokens=10, messages=[{"role": "user", "content": "hi"}]
+                ) as stream:
+                    async for _event in stream:
+                        pass
+
+    @pytest.mark.asyncio
+    async def test_non_streaming_create_reports_usage(self):
+        async with mock_client(MockConfig(**FAST)) as client:
+            message = await client.messages.create(
+                model="mock", max_tokens=10, messages=[{"role": "user", "content": "summarize"}]
+            )
+
+        assert message.content[0].type == "text"
+        assert message.usage.output_tokens > 0
+
+
+class TestLoadTestReporting:
+    def test_parses_metrics_and_estimates_quantiles(self):
+        text = "\n".join(
+            [
+                "process_resident_memory_bytes 1.5e+08",
+                "outcomist_sse_active_connections 12",
+                'outcomist_event_loop_lag_seconds_bucket{le="0.001"} 50',
+                'outcomist_event_loop_lag_seconds_bucket{le="0.01"} 90',
+                'outcomist_event_loop_lag_seconds_bucket{le="0.1"} 100',
+                'outcomist_event_loop_lag_seconds_bucket{le="+Inf"} 100',
+                "outcomist_event_loop_lag_seconds_count 100",
+            ]
+        )
+
+        sample = parse_metrics(text)
+
+        assert sample.rss_bytes == 150_000_000
+        assert sample.active_streams == 12
+        assert sample.lag_count == 100
+        assert histogram_quantile(0.5, sample.lag_buckets) == pytest.approx(0.001)
+        assert histogram_quantile(0.95, sample.lag_buckets) == pytest.approx(0.055)
@@ -0,0 +1,132 @@
+"""Tests for search/replace and unified-diff file edits"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func
+from sqlalchemy import select
+
+from src.ai.file_tools import execute_file_tool
+from src.config import settings
+from src.database.models import File
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.services.file_service import FileService
+from src.utils.patching import PatchConflictError
+from src.utils.patching import apply_replacements
+from src.utils.patching import apply_unified_diff
+
+GAME = "\n".join(f"line {i}" for i in range(1, 21)) + "\n"
+
+
+class TestApplyReplacements:
+    def test_edits_apply_in_order(self):
+        content = apply_replacements(
+            GAME,
+            [
+                {"old_text": "line 3\n", "new_text": "line three\n"},
+                {"old_text": "line three\nline 4", "new_text": "line 3-4"},
+            ],
+        )
+        assert content.startswith("line 1\nline 2\nline 3-4\nline 5\n")
+
+    def test_missing_text_is_a_conflict(self):
+        with pytest.raises(PatchConflictError, match="not found"):
+            apply_replacements(GAME, [{"old_text": "line 99", "new_text": "x"}])
+
+    def test_ambiguous_text_is_a_conflict(self):
+        # "line 1" also matches line 10-19
+        with pytest.raises(PatchConflictError, match="matches 11 places"):
+            apply_replacements(GAME, [{"old_text": "line 1", "new_text": "x"}])
+
+    def test_failed_edit_applies_nothing(self):
+        edits = [{"old_text": "line 2\n", "new_text": "changed\n"}, {"old_text": "missing", "new_text": ""}]
+        with pytest.raises(PatchConflictError):
+            apply_replacements(GAME, edits)
+
+
+class TestApplyUnifiedDiff:
+    def test_applies_hunks_with_file_headers(self):
+        patch = (
+            "--- a/game.js\n+++ b/game.js\n"
+            "@@ -2,3 +2,3 @@\n line 2\n-line 3\n+line three\n line 4\n"
+            "@@ -15,2 +15,3 @@\n line 15\n+inserted\n line 16\n"
+        )
+        lines = apply_unified_diff(GAME, patch).split("\n")
+
+        assert lines[2] == "line three"
+        assert lines[14:17] == ["line 15", "inserted", "line 16"]
+        assert len(lines) == len(GAME.split("\n")) + 1
+
+    def test_stale_line_numbers_are_located_by_context(self):
+        patch = "@@ -1,3 +1,3 @@\n line 11\n-line 12\n+line twelve\n line 13\n"
+        assert "line 11\nline twelve\nline 13\n" in apply_unified_diff(GAME, patch)
+
+    def test_pure_insertion_accounts_for_earlier_hunks(self):
+        patch = "@@ -1,2 +1,3 @@\n line 1\n+new 1\n line 2\n@@ -5,0 +6,1 @@\n+after 5\n"
+        lines = apply_unified_diff(GAME, patch).split("\n")
+        assert lines[:7] == ["line 1", "new 1", "line 2", "line 3", "line 4", "line 5", "after 5"]
+
+    def test_mismatched_context_is_a_conflict(self):
+        patch = "@@ -2,2 +2,2 @@\n line 2\n-line 4\n+line four\n"
+        with pytest.raises(PatchConflictError, match="Hunk 1"):
+            apply_unified_diff(GAME, patch)
+
+    def test_patch_without_hunks_is_rejected(self):
+        with pytest.raises(PatchConflictError, match="no @@ hunks"):
+            apply_unified_diff(GAME, "-line 1\n+x\n")
+
+
+@pytest_asyncio.fixture
+async def project_file(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    project = Project(name="Game", type=ProjectType.GAME)
+    db_session.add(project)
+    await db_session.commit()
+    return await FileService.create_file(db_session, project.id, None, "game.js", GAME, "application/javascript")
+
+
+class TestExecuteFileTool:
+    @pytest.mark.asyncio
+    async def test_edit_updates_file_in_place(self, db_session, project_file):
+        outcome = await execute_file_tool(
+            db_session,
+            project_file.project_id,
+            None,
+            "edit_file",
+            {"filename": "game.js", "edits": [{"old_text": "line 7\n", "new_text": "line seven\n"}]},
+        )
+
+        assert not outcome.is_error
+        assert "line seven" in Path(project_file.path).read_text()
+        assert outcome.file.size == len(GAME) + 4
+        assert (await db_session.execute(select(func.count()).select_from(File))).scalar_one() == 1
+
+    @pytest.mark.asyncio
+    async def test_conflict_is_reported_and_file_is_untouched(self, db_session, project_file):
+        outcome = await execute_file_tool(
+            db_session,
+            project_file.project_id,
+            None,
+            "apply_patch",
+            {"filename": "game.js", "patch": "@@ -1,1 +1,1 @@\n-line 0\n+x\n"},
+        )
+
+        assert outcome.is_error
+        assert outcome.as_tool_result("toolu_1")["is_error"] is True
+        assert Path(project_file.path).read_text() == GAME
+
+    @pytest.mark.asyncio
+    async def test_read_and_missing_file(self, db_session, project_file):
+        read = await execute_file_tool(db_session, project_file.project_id, None, "read_file", {"filename": "game.js"})
+        missing = await execute_file_tool(
+            db_session, project_file.project_id, None, "read_file", {"filename": "other.js"}
+        )
+
+        assert read.content == GAME
+        assert missing.is_error and "create_file" in missing.content
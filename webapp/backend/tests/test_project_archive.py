@@ -0,0 +1,188 @@
+"""Tests for streaming project ZIP export and import"""
+
+import io
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from src.config import settings
+from src.database.connection import get_db
+from src.database.models import File
+from src.database.models import Message
+from src.database.models import MessageRole
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.database.models import Session
+from src.database.models import SessionSummary
+from src.services import project_archive
+from src.services.file_service import FileService
+from src.services.file_version_service import FileVersionService
+from src.services.project_archive import ArchiveTooLarge
+from src.services.project_archive import InvalidArchiveError
+from src.services.project_archive import export_project
+from src.services.project_archive import import_project
+
+
+@pytest_asyncio.fixture
+async def project(db_session):
+    project = Project(name="Space Game", description="Dodge rocks", type=ProjectType.GAME)
+    db_session.add(project)
+    await db_session.commit()
+    session = Session(project_id=project.id, name="First")
+    db_session.add(session)
+    await db_session.commit()
+
+    messages = [
+        Message(session_id=session.id, role=MessageRole.USER, content="Make a game"),
+        Message(session_id=session.id, role=MessageRole.ASSISTANT, content="Done ✓"),
+    ]
+    db_session.add_all(messages)
+    await db_session.commit()
+    db_session.add(SessionSummary(session_id=session.id, through_message_id=messages[0].id, content="Asked"))
+    await db_session.commit()
+
+    await FileService.create_file(db_session, project.id, session.id, "index.html", "<canvas></canvas>\n", "text/html")
+    await FileService.create_file(db_session, project.id, session.id, "game.js", "let x = 1;\n" * 5000)
+    await FileService.create_file(db_session, project.id, session.id, "sprite.png", bytes(range(256)) * 64, "image/png")
+    return project
+
+
+async def collect(db, project) -> list[bytes]:
+    return [chunk async for chunk in export_project(db, project)]
+
+
+class TestExport:
+    @pytest.mark.asyncio
+    async def test_archive_holds_files_and_records(self, db_session, project, monkeypatch):
+        monkeypatch.setattr(project_archive, "CHUNK_SIZE", 4096)
+        chunks = await collect(db_session, project)
+
+        # Streamed in pieces, not built up in one buffer
+        assert len(chunks) > 3
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+            assert zf.testzip() is None
+            assert zf.read("files/game.js") == b"let x = 1;\n" * 5000
+            records = [json.loads(line) for line in zf.read("data.ndjson").splitlines()]
+            manifest = json.loads(zf.read("manifest.json"))
+
+        assert manifest["project"]["name"] == "Space Game"
+        assert [r["type"] for r in records] == ["session", "message", "message", "session_summary"] + ["file"] * 3
+        assert all("path" not in r for r in records)
+
+
+class TestImport:
+    @pytest.mark.asyncio
+    async def test_round_trip_under_new_ids(self, db_session, project):
+        archive = io.BytesIO(b"".join(await collect(db_session, project)))
+        imported = await import_project(db_session, archive)
+
+        assert imported.id != project.id
+        assert (imported.name, imported.type) == ("Space Game", ProjectType.GAME)
+
+        [session] = (await db_session.execute(select(Session).where(Session.project_id == imported.id))).scalars()
+        messages = (
+            await db_session.execute(select(Message).where(Message.session_id == session.id).order_by(Message.role))
+        ).scalars().all()
+        assert [m.content for m in messages] == ["Done ✓", "Make a game"]
+        summary = (await db_session.execute(select(SessionSummary).where(SessionSummary.session_id == session.id))).scalar_one()
+        assert summary.through_message_id in {m.id for m in messages}
+
+        files = {f.name: f for f in await FileService.get_project_files(db_session, imported.id)}
+        assert set(files) == {"index.html", "game.js", "sprite.png"}
+        assert Path(files["sprite.png"].path).read_bytes() == bytes(range(256)) * 64
+        assert files["game.js"].session_id == session.id
+        assert await FileVersionService.latest_version(db_session, files["index.html"].id) == 1
+
+    @pytest.mark.asyncio
+    async def test_upload_blocks_follow_their_files(self, db_session, project):
+        [session] = (await db_session.execute(select(Session).where(Session.project_id == project.id))).scalars()
+        sprite = await FileService.get_file_by_name(db_session, project.id, "sprite.png")
+        content = [{"type": "text", "text": "Use this sprite"}, {"type": "upload", "file_id": sprite.id}]
+        db_session.add(Message(session_id=session.id, role=MessageRole.USER, content=json.dumps(content)))
+        await db_session.commit()
+
+        archive = io.BytesIO(b"".join(await collect(db_session, project)))
+        imported = await import_project(db_session, archive)
+
+        [session] = (await db_session.execute(select(Session).where(Session.project_id == imported.id))).scalars()
+        contents = (await db_session.execute(select(Message.content).where(Message.session_id == session.id))).scalars()
+        [upload] = [json.loads(c) for c in contents if '"upload"' in c]
+        imported_sprite = await FileService.get_file_by_name(db_session, imported.id, "sprite.png")
+        assert upload[1] == {"type": "upload", "file_id": imported_sprite.id}
+
+    @pytest.mark.asyncio
+    async def test_unsafe_file_name_is_rejected_and_nothing_kept(self, db_session, tmp_path):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            manifest = {"format": "outcomist-project", "version": 1, "project": {"name": "Evil", "type": "game"}}
+            zf.writestr("manifest.json", json.dumps(manifest))
+            zf.writestr("files/../../escape.txt", "x")
+            record = {"type": "file", "id": "f1", "name": "../../escape.txt", "mime_type": "text/plain", "size": 1}
+            zf.writestr("data.ndjson", json.dumps(record) + "\n")
+        buffer.seek(0)
+
+        with pytest.raises(InvalidArchiveError, match="unsafe"):
+            await import_project(db_session, buffer)
+
+        assert not (tmp_path / "escape.txt").exists()
+        assert (await db_session.execute(select(Project))).scalars().all() == []
+        assert list((tmp_path / "projects").iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_archive_unpacking_past_the_limit_is_rejected_before_extracting(self, db_session, project, tmp_path):
+        archive = io.BytesIO(b"".join(await collect(db_session, project)))
+        before = set(tmp_path.rglob("*"))
+
+        # game.js alone unpacks to 55 kB from well under 1 kB
+        with pytest.raises(ArchiveTooLarge, match="more than the 50000 byte limit"):
+            await import_project(db_session, archive, max_unpacked_bytes=50_000)
+
+        assert (await db_session.execute(select(Project.id))).scalars().all() == [project.id]
+        assert set(tmp_path.rglob("*")) == before
+
+    @pytest.mark.asyncio
+    async def test_not_an_archive(self, db_session):
+        with pytest.raises(InvalidArchiveError):
+            await import_project(db_session, io.BytesIO(b"not a zip"))
+
+
+class TestArchiveEndpoints:
+    @pytest.mark.asyncio
+    async def test_export_then_import_over_http(self, session_maker, project, monkeypatch):
+        from src.main import app
+
+        async def override_get_db():
+            async with session_maker() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                export = await client.get(f"/api/projects/{project.id}/export")
+                imported = await client.post("/api/projects/import", content=export.content)
+                rejected = await client.post("/api/projects/import", content=b"junk")
+                monkeypatch.setattr(settings, "import_max_bytes", len(export.content) - 1)
+                too_large = await client.post("/api/projects/import", content=export.content)
+        finally:
+            app.dependency_overrides.clear()
+
+        assert export.status_code == 200
+        assert export.headers["content-disposition"] == 'attachment; filename="Space-Game.zip"'
+        assert imported.status_code == 201
+        assert imported.json()["name"] == "Space Game"
+        assert rejected.status_code == 400
+        assert too_large.status_code == 413
+
+        async with session_maker() as db:
+            files = (await db.execute(select(File).where(File.project_id == imported.json()["id"]))).scalars().all()
+        assert len(files) == 3
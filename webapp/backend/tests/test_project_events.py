@@ -0,0 +1,145 @@
+"""Tests for the multiplexed project event stream"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+
+from src.ai.events import SSEEventType
+from src.api import projects
+from src.api.projects import ProjectEventsUpdate
+from src.database.models import Project
+from src.database.models import ProjectStatus
+from src.database.models import ProjectType
+from src.services import file_service
+from src.services import project_events as project_events_module
+from src.services import status_service
+from src.services import verify_service
+from src.services.file_service import FileService
+from src.services.project_events import ProjectEventHub
+from src.services.status_service import StatusService
+from src.services.status_service import StatusStore
+
+
+async def take(events, count: int, timeout: float = 2.0) -> list[dict]:
+    return [await asyncio.wait_for(anext(events), timeout) for _ in range(count)]
+
+
+def status_event(status: str) -> dict:
+    return {"status": status}
+
+
+class TestProjectEventHub:
+    @pytest.mark.asyncio
+    async def test_events_are_tagged_and_coalesced_per_project(self):
+        hub = ProjectEventHub(coalesce_window=0.01)
+        subscription = hub.subscribe(["a", "b"])
+        events = subscription.events()
+
+        for status in ("planning", "working", "complete"):
+            hub.publish("a", "status", SSEEventType.STATUS_UPDATE, status_event(status))
+        hub.publish("a", "file:1", SSEEventType.FILE_CREATED, {"file": {"id": "1"}})
+        hub.publish("b", "status", SSEEventType.STATUS_UPDATE, status_event("working"))
+        hub.publish("c", "status", SSEEventType.STATUS_UPDATE, status_event("working"))
+
+        received = await take(events, 3)
+        assert [(e["type"], e["project_id"]) for e in received] == [
+            ("status_update", "a"),
+            ("file_created", "a"),
+            ("status_update", "b"),
+        ]
+        # Only the latest status of the burst is sent
+        assert received[0]["status"] == "complete"
+
+        hub.unsubscribe(subscription)
+        assert await anext(events, None) is None
+        assert hub.subscription_count() == 0
+        assert not hub._by_project
+
+    @pytest.mark.asyncio
+    async def test_changing_projects_and_overflow(self):
+        hub = ProjectEventHub(coalesce_window=0, max_pending=2)
+        subscription = hub.subscribe(["a"])
+        events = subscription.events()
+
+        assert hub.update(subscription, ["b", "c", "d"]) == {"b", "c", "d"}
+        hub.publish("a", "status", SSEEventType.STATUS_UPDATE, status_event("working"))
+        for project_id in ("b", "c", "d"):
+            hub.publish(project_id, "status", SSEEventType.STATUS_UPDATE, status_event("working"))
+
+        resync, first, second = await take(events, 3)
+        assert resync == {"type": "resync"}
+        assert [first["project_id"], second["project_id"]] == ["c", "d"]
+        hub.unsubscribe(subscription)
+
+
+@pytest_asyncio.fixture
+async def session_maker(session_maker, monkeypatch):
+    """The shared test database, with status and project events routed to fresh instances"""
+    store = StatusStore(flush_delay=0, session_factory=session_maker)
+    monkeypatch.setattr(status_service, "status_store", store)
+    monkeypatch.setattr(projects, "status_store", store)
+    hub = ProjectEventHub(coalesce_window=0)
+    for module in (projects, status_service, file_service, verify_service, project_events_module):
+        monkeypatch.setattr(module, "project_events", hub)
+    yield session_maker
+    await store.close()
+
+
+class TestProjectEventStream:
+    @pytest.mark.asyncio
+    async def test_one_stream_follows_many_projects(self, session_maker, tmp_path, monkeypatch):
+        monkeypatch.setattr(file_service.settings, "data_dir", tmp_path)
+        async with session_maker() as db:
+            game, trip, other = (
+                Project(name="Game", type=ProjectType.GAME),
+                Project(name="Trip", type=ProjectType.TRIP),
+                Project(name="Other", type=ProjectType.TRIP),
+            )
+            db.add_all([game, trip, other])
+            await db.commit()
+
+            response = await projects.stream_project_events(project_id=[game.id, trip.id, "gone"], db=db)
+            events = (json.loads(raw.removeprefix("data: ")) async for raw in response.body_iterator)
+
+            subscribed, *snapshots = await take(events, 3)
+            assert subscribed["type"] == "subscribed"
+            assert subscribed["missing"] == ["gone"]
+            assert {(e["project_id"], e["status"], e["snapshot"]) for e in snapshots} == {
+                (game.id, "idle", True),
+                (trip.id, "idle", True),
+            }
+
+            await StatusService.transition_to(db, game.id, ProjectStatus.WORKING, "Building")
+            await StatusService.transition_to(db, other.id, ProjectStatus.WORKING, "Elsewhere")
+            await FileService.create_file(db, trip.id, None, "plan.md", "# Day 1")
+            status, created = await take(events, 2)
+            assert (status["project_id"], status["status"], status["status_message"]) == (
+                game.id,
+                "working",
+                "Building",
+            )
+            assert (created["type"], created["project_id"], created["file"]["name"]) == (
+                "file_created",
+                trip.id,
+                "plan.md",
+            )
+
+            # Follow another project on the same connection
+            changed = await projects.update_project_events(
+                subscribed["subscription_id"], ProjectEventsUpdate(project_ids=[other.id]), db=db
+            )
+            assert changed["project_ids"] == [other.id]
+            (snapshot,) = await take(events, 1)
+            assert (snapshot["project_id"], snapshot["status"]) == (other.id, "working")
+
+            await events.aclose()
+            await response.body_iterator.aclose()
+        assert projects.project_events.subscription_count() == 0
@@ -0,0 +1,124 @@
+"""Tests for background project naming"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+from uuid import UUID
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+
+from src.ai import naming
+from src.ai.naming import heuristic_name
+from src.ai.naming import schedule_project_naming
+from src.database.models import Message
+from src.database.models import MessageRole
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.database.models import Session
+from src.services.connection_manager import connection_manager
+from src.services.project_service import ProjectService
+
+
+@pytest_asyncio.fixture
+async def session_maker(file_session_maker, monkeypatch):
+    """A file database (naming writes on its own connection)"""
+    monkeypatch.setattr(naming, "AsyncSessionLocal", file_session_maker)
+    return file_session_maker
+
+
+@pytest_asyncio.fixture
+async def project_session(session_maker):
+    async with session_maker() as db:
+        project = Project(name="Project 3", type=ProjectType.GAME)
+        db.add(project)
+        await db.commit()
+        session = Session(project_id=project.id, name="Main")
+        db.add(session)
+        await db.commit()
+        return project, session
+
+
+def suggest(name: str | None, gate: asyncio.Event | None = None):
+    async def fake_generate(client, model, text):
+        if gate is not None:
+            await gate.wait()
+        if name is None:
+            raise RuntimeError("overloaded")
+        return name
+
+    return fake_generate
+
+
+async def project_name(session_maker, project_id: str) -> str:
+    async with session_maker() as db:
+        return (await db.get(Project, project_id)).name
+
+
+class TestHeuristicName:
+    @pytest.mark.parametrize(
+        ("message", "expected"),
+        [
+            ("Can you make me a tetris game with levels? Thanks!", "Tetris Game with Levels"),
+            ("plan a 3 day trip to Vegas for my birthday", "3 Day Trip to Vegas"),
+            ("Hi! I want you to build an HTML5 space shooter", "HTML5 Space Shooter"),
+            ("???", ""),
+        ],
+    )
+    def test_names_the_request(self, message, expected):
+        assert heuristic_name(message) == expected
+
+
+class TestBackgroundNaming:
+    @pytest.mark.asyncio
+    async def test_first_message_names_project_and_notifies_session(self, session_maker, project_session, monkeypatch):
+        monkeypatch.setattr(naming, "generate_project_name", suggest("Asteroid Dodger"))
+        project, session = project_session
+        queue = await connection_manager.connect(UUID(session.id))
+        try:
+            task = schedule_project_naming(project, session.id, "Make an asteroid game", "key")
+            assert await task == "Asteroid Dodger"
+            assert connection_manager.pending(queue) == [
+                {"type": "project_renamed", "project_id": project.id, "name": "Asteroid Dodger"}
+            ]
+        finally:
+            await connection_manager.disconnect(UUID(session.id), queue)
+
+        assert await project_name(session_maker, project.id) == "Asteroid Dodger"
+
+    @pytest.mark.asyncio
+    async def test_only_projects_without_messages_are_new(self, session_maker, project_session):
+        project, session = project_session
+        async with session_maker() as db:
+            assert not await ProjectService.has_messages(db, project.id)
+            db.add(Message(session_id=session.id, role=MessageRole.USER, content="Make a game"))
+            await db.commit()
+            assert await ProjectService.has_messages(db, project.id)
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_heuristic_when_model_fails(self, session_maker, project_session, monkeypatch):
+        monkeypatch.setattr(naming, "generate_project_name", suggest(None))
+        project, session = project_session
+        task = schedule_project_naming(project, session.id, "create a snake game", "key")
+
+        assert await task == "Snake Game"
+        assert await project_name(session_maker, project.id) == "Snake Game"
+
+    @pytest.mark.asyncio
+    async def test_keeps_a_rename_made_meanwhile(self, session_maker, project_session, monkeypatch):
+        gate = asyncio.Event()
+        monkeypatch.setattr(naming, "generate_project_name", suggest("Asteroid Dodger", gate))
+        project, session = project_session
+        task = schedule_project_naming(project, session.id, "Make an asteroid game", "key")
+        async with session_maker() as db:
+            await db.execute(update(Project).where(Project.id == project.id).values(name="Rocks!"))
+            await db.commit()
+        gate.set()
+
+        assert await task is None
+        assert await project_name(session_maker, project.id) == "Rocks!"
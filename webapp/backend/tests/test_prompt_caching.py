@@ -0,0 +1,104 @@
+"""Tests for prompt cache breakpoint placement against the mock API's cache semantics"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from anthropic.types import TextBlock
+
+from src.ai.caching import TurnUsage, apply_history_breakpoints, cached_system_prompt, cached_tools
+from src.ai.tools import TOOLS
+from tools.mock_anthropic import MockConfig, PromptCache
+
+SYSTEM_PROMPT = "You are a helpful travel planner. " * 200
+
+
+def _count_breakpoints(request: dict) -> int:
+    count = sum("cache_control" in tool for tool in request["tools"])
+    count += sum("cache_control" in block for block in request["system"])
+    for message in request["messages"]:
+        if isinstance(message["content"], list):
+            count += sum(isinstance(b, dict) and "cache_control" in b for b in message["content"])
+    return count
+
+
+def _request(messages: list[dict], stable_prefix_len: int) -> dict:
+    return {
+        "system": cached_system_prompt(SYSTEM_PROMPT),
+        "tools": cached_tools(TOOLS),
+        "messages": apply_history_breakpoints(messages, stable_prefix_len),
+    }
+
+
+class TestBreakpointPlacement:
+    """Breakpoints go on tools, system and the rolling history prefix"""
+
+    def test_uses_at_most_four_breakpoints_and_does_not_mutate_history(self):
+        messages = [
+            {"role": "user", "content": "Plan a trip"},
+            {"role": "assistant", "content": [TextBlock(type="text", text="Sure")]},
+            {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "ok"}]},
+        ]
+
+        request = _request(messages, stable_prefix_len=1)
+
+        assert _count_breakpoints(request) == 4
+        assert messages[0]["content"] == "Plan a trip"
+        assert "cache_control" not in messages[2]["content"][0]
+        assert request["messages"][0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+        # SDK content blocks are converted to plain dicts only where needed
+        assert isinstance(request["messages"][1]["content"][0], TextBlock)
+        assert "cache_control" not in TOOLS[-1]
+
+
+class TestCacheSemantics:
+    """A multi-turn session reads its previous prefix from the cache"""
+
+    def test_later_turns_read_previous_prefix(self):
+        cache = PromptCache(MockConfig())
+        history: list[dict] = []
+        usages = []
+
+        for turn in range(5):
+            history.append({"role": "user", "content": f"Change day {turn} of the itinerary please"})
+            usages.append(cache.process(_request(history, stable_prefix_len=len(history)), now=turn))
+            history.append({"role": "assistant", "content": f"Updated day {turn}. " * 40})
+
+        assert usages[0].cache_read_input_tokens == 0
+        assert usages[0].cache_creation_input_tokens > 0
+        for usage in usages[1:]:
+            # Everything up to the previous user message comes from the cache
+            assert usage.cache_read_input_tokens >= usages[0].cache_creation_input_tokens
+            assert usage.input_tokens == 0
+
+    def test_expired_entries_are_not_read(self):
+        config = MockConfig(cache_ttl_seconds=300)
+        cache = PromptCache(config)
+        request = _request([{"role": "user", "content": "hello"}], stable_prefix_len=1)
+
+        cache.process(request, now=0)
+        usage = cache.process(request, now=301)
+
+        assert usage.cache_read_input_tokens == 0
+
+
+class TestTurnUsage:
+    def test_accumulates_usage_across_tool_rounds(self):
+        class Usage:
+            def __init__(self, **kw):
+                self.__dict__.update(kw)
+
+        usage = TurnUsage()
+        usage.add(Usage(input_tokens=10, output_tokens=5, cache_read_input_tokens=100, cache_creation_input_tokens=None))
+        usage.add(Usage(input_tokens=3, output_tokens=7, cache_read_input_tokens=110, cache_creation_input_tokens=20))
+
+        assert usage.as_dict() == {
+            "input_tokens": 13,
+            "output_tokens": 12,
+            "cache_creation_input_tokens": 20,
+            "cache_read_input_tokens": 210,
+            "requests": 2,
+        }
+        assert usage.total_input_tokens == 243
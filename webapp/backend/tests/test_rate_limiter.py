@@ -0,0 +1,193 @@
+"""Tests for the shared upstream rate limiter"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import socket
+import time
+from contextlib import asynccontextmanager
+
+import anthropic
+import httpx
+import pytest
+import uvicorn
+
+from src.ai.rate_limiter import RateLimiter
+from src.ai.rate_limiter import TokenBucket
+from tools.mock_anthropic import MockConfig
+from tools.mock_anthropic import create_app
+
+FAST = dict(ttft_seconds=0, prefill_seconds_per_1k_tokens=0, tokens_per_second=0, response_tokens=20)
+REQUEST = dict(model="mock", max_tokens=100, messages=[{"role": "user", "content": "hi"}])
+
+
+@asynccontextmanager
+async def mock_server(config: MockConfig):
+    """Serve the mock API on a free local port and yield (client, base_url)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        yield anthropic.AsyncAnthropic(api_key="mock", base_url=base_url, max_retries=0), base_url
+    finally:
+        server.should_exit = True
+        await task
+
+
+async def mock_stats(base_url: str) -> dict:
+    async with httpx.AsyncClient() as http:
+        return (await http.get(f"{base_url}/stats")).json()
+
+
+class TestTokenBucket:
+    def test_wait_time_follows_refill_rate(self):
+        bucket = TokenBucket(10, period=1.0)
+        now = time.monotonic()
+
+        assert bucket.wait_time(10, now) == 0
+        bucket.take(10, now)
+
+        assert bucket.wait_time(5, now) == pytest.approx(0.5, abs=0.01)
+        assert bucket.wait_time(5, now + 0.5) == 0
+
+    def test_oversized_request_waits_for_full_bucket(self):
+        bucket = TokenBucket(10, period=1.0)
+        now = time.monotonic()
+
+        assert bucket.wait_time(50, now) == 0
+        bucket.take(50, now)
+
+        # Balance is -40: a full bucket again takes 5 periods
+        assert bucket.wait_time(50, now) == pytest.approx(5.0, abs=0.01)
+
+    def test_sync_adopts_reported_quota(self):
+        bucket = TokenBucket(50, period=60.0)
+        now = time.monotonic()
+
+        bucket.sync(4000, 3990, now)
+        assert bucket.limit == 4000
+        assert bucket.tokens == 3990
+
+        # Same limit: remaining only ever lowers the local balance
+        bucket.sync(4000, 3995, now)
+        assert bucket.tokens == 3990
+        bucket.sync(4000, 100, now)
+        assert bucket.tokens == 100
+
+    def test_unlimited_bucket_never_waits(self):
+        bucket = TokenBucket(0)
+        now = time.monotonic()
+        bucket.take(10**9, now)
+        assert bucket.wait_time(10**9, now) == 0
+
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_acquire_paces_requests(self):
+        limiter = RateLimiter(requests_per_minute=5, period=1.0)
+
+        start = time.monotonic()
+        for _ in range(10):
+            await limiter.acquire(0, 0)
+
+        # 5 from the full bucket, then 5 more at 5 per second
+        assert time.monotonic() - start == pytest.approx(1.0, abs=0.25)
+
+    @pytest.mark.asyncio
+    async def test_settle_refunds_unused_output_reservation(self):
+        limiter = RateLimiter(output_tokens_per_minute=1000)
+
+        reservation = await limiter.acquire(0, 800)
+        assert limiter.buckets["output_tokens"].tokens == pytest.approx(200, abs=1)
+
+        limiter.settle(reservation, 0, 50)
+        assert limiter.buckets["output_tokens"].tokens == pytest.approx(950, abs=1)
+
+        # Settling twice has no effect
+        limiter.settle(reservation, 0, 0)
+        assert limiter.buckets["output_tokens"].tokens == pytest.approx(950, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_burst_stays_within_quota(self):
+        config = MockConfig(**FAST, requests_per_minute=10, rate_limit_period=1.0)
+        # Starts far above the real quota and has to learn it from headers
+        limiter = RateLimiter(requests_per_minute=1000, base_delay=0.05, period=1.0)
+
+        async with mock_server(config) as (client, base_url):
+            start = time.monotonic()
+            results = await asyncio.gather(
+                *(limiter.create(client, input_tokens=10, **REQUEST) for _ in range(30)),
+                return_exceptions=True,
+            )
+            elapsed = time.monotonic() - start
+            stats = await mock_stats(base_url)
+
+        assert all(not isinstance(r, Exception) for r in results)
+        assert limiter.buckets["requests"].limit == 10
+        # Only the opening burst runs into the quota; afterwards requests are paced
+        assert stats["rate_limited"] < 30
+        # 10 from the full quota, 20 more at 10 per second
+        assert elapsed >= 1.5
+
+    @pytest.mark.asyncio
+    async def test_stream_settles_with_actual_usage(self):
+        config = MockConfig(**FAST, requests_per_minute=100, rate_limit_period=1.0)
+        # A long period, so the bucket doesn't visibly refill while the stream runs
+        limiter = RateLimiter(output_tokens_per_minute=1000, period=3600.0)
+
+        async with mock_server(config) as (client, _base_url):
+            async with limiter.stream(client, input_tokens=10, **REQUEST) as stream:
+                message = await stream.get_final_message()
+
+        assert message.usage.output_tokens < 100
+        # max_tokens was reserved, the unused part refunded
+        assert limiter.buckets["output_tokens"].tokens == pytest.approx(1000 - message.usage.output_tokens, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_stream_failing_before_usage_releases_its_reservation(self):
+        config = MockConfig(**FAST, requests_per_minute=100, rate_limit_period=1.0)
+        # A long period, so the bucket doesn't visibly refill while the stream runs
+        limiter = RateLimiter(output_tokens_per_minute=1000, period=3600.0)
+
+        async with mock_server(config) as (client, _base_url):
+            with pytest.raises(RuntimeError):
+                async with limiter.stream(client, input_tokens=10, **REQUEST):
+                    # No event read yet, so there is no usage to settle with
+                    raise RuntimeError("client went away")
+
+        assert limiter.buckets["output_tokens"].tokens == pytest.approx(1000, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_overloaded_requests_are_retried_then_raised(self):
+        config = MockConfig(**FAST, error_rate=1.0, error_status=529)
+        limiter = RateLimiter(max_retries=2, base_delay=0.01)
+
+        async with mock_server(config) as (client, base_url):
+            with pytest.raises(anthropic.APIStatusError) as exc_info:
+                await limiter.create(client, input_tokens=10, **REQUEST)
+            stats = await mock_stats(base_url)
+
+        assert exc_info.value.status_code == 529
+        assert stats["requests"] == 3
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        config = MockConfig(**FAST, error_rate=1.0, error_status=400)
+        limiter = RateLimiter(max_retries=3, base_delay=0.01)
+
+        async with mock_server(config) as (client, base_url):
+            with pytest.raises(anthropic.BadRequestError):
+                await limiter.create(client, input_tokens=10, **REQUEST)
+            stats = await mock_stats(base_url)
+
+        assert stats["requests"] == 1
@@ -0,0 +1,210 @@
+"""Tests for the session-affine Agent SDK client pool"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+import pytest
+from claude_agent_sdk import AssistantMessage
+from claude_agent_sdk import ClaudeAgentOptions
+from claude_agent_sdk import ResultMessage
+
+from src.ai.sdk_pool import SDKClientCrashed
+from src.ai.sdk_pool import SDKClientPool
+from src.ai.sdk_pool import stream_single_turn
+from tools.mock_agent_sdk import FakeSDKClientFactory
+from tools.mock_agent_sdk import FakeSDKConfig
+
+FAST = dict(startup_seconds=0.01, shutdown_seconds=0, response_seconds=0)
+
+
+def options(tmp_path: Path, **overrides) -> ClaudeAgentOptions:
+    return ClaudeAgentOptions(cwd=str(tmp_path), system_prompt="You build things.", **overrides)
+
+
+async def run_turn(pool: SDKClientPool, session_id: str, opts: ClaudeAgentOptions, prompt: str) -> list:
+    return [message async for message in pool.stream_turn(session_id, opts, prompt)]
+
+
+def reply_text(messages: list) -> str:
+    return next(m for m in messages if isinstance(m, AssistantMessage)).content[0].text
+
+
+class TestSDKClientPool:
+    @pytest.mark.asyncio
+    async def test_reuses_client_across_turns(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST))
+        pool = SDKClientPool(client_factory=factory)
+        opts = options(tmp_path)
+
+        first = await run_turn(pool, "s1", opts, "make a game")
+        second = await run_turn(pool, "s1", opts, "add sound")
+
+        assert isinstance(first[-1], ResultMessage)
+        assert factory.spawned == 1
+        # Warm client: the conversation carried over
+        assert reply_text(second).endswith("(message 2)")
+        await pool.close()
+        assert factory.live == 0
+
+    @pytest.mark.asyncio
+    async def test_turns_from_different_tasks_share_the_client(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST))
+        pool = SDKClientPool(client_factory=factory)
+        opts = options(tmp_path)
+
+        # Each request runs on its own task; the fake rejects use outside the connecting task
+        for prompt in ("one", "two", "three"):
+            await asyncio.create_task(run_turn(pool, "s1", opts, prompt))
+
+        assert factory.spawned == 1
+        assert pool.get("s1").turns == 3
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_idle_clients_are_reaped(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST))
+        pool = SDKClientPool(idle_timeout=0.05, client_factory=factory)
+
+        await run_turn(pool, "s1", options(tmp_path), "hi")
+        await pool.reap()
+        assert len(pool) == 1
+
+        await asyncio.sleep(0.1)
+        await pool.reap()
+        assert len(pool) == 0
+        assert factory.live == 0
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_cap_evicts_least_recently_used(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST))
+        pool = SDKClientPool(max_clients=2, client_factory=factory)
+        opts = options(tmp_path)
+
+        await run_turn(pool, "a", opts, "hi")
+        await run_turn(pool, "b", opts, "hi")
+        await run_turn(pool, "a", opts, "again")
+        await run_turn(pool, "c", opts, "hi")
+
+        assert pool.get("a") is not None
+        assert pool.get("b") is None
+        assert pool.get("c") is not None
+        assert factory.live == 2
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_cap_waits_when_every_client_is_busy(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(startup_seconds=0.01, shutdown_seconds=0, response_seconds=0.1))
+        pool = SDKClientPool(max_clients=1, client_factory=factory)
+        opts = options(tmp_path)
+
+        busy = asyncio.create_task(run_turn(pool, "a", opts, "slow"))
+        await asyncio.sleep(0.03)
+        waiting = asyncio.create_task(run_turn(pool, "b", opts, "hi"))
+        await asyncio.sleep(0.03)
+
+        assert not waiting.done()
+        await busy
+        await waiting
+        assert factory.spawned == 2
+        assert len(pool) == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_dead_client_is_respawned_and_resumes_conversation(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST))
+        pool = SDKClientPool(client_factory=factory)
+        opts = options(tmp_path)
+
+        await run_turn(pool, "s1", opts, "make a game")
+        factory.clients[0].crash()
+
+        messages = await run_turn(pool, "s1", opts, "add sound")
+
+        assert factory.spawned == 2
+        assert factory.clients[1].options.resume == factory.clients[0].session_id
+        assert reply_text(messages).endswith("(message 2)")
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_crash_before_output_is_retried_once(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST, crash_after_turns=2))
+        pool = SDKClientPool(client_factory=factory)
+        opts = options(tmp_path)
+
+        await run_turn(pool, "s1", opts, "first")
+        messages = await run_turn(pool, "s1", opts, "second")
+
+        assert isinstance(messages[-1], ResultMessage)
+        assert factory.spawned == 2
+
+    @pytest.mark.asyncio
+    async def test_repeated_crash_is_raised(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST, crash_after_turns=1))
+        pool = SDKClientPool(client_factory=factory)
+
+        with pytest.raises(SDKClientCrashed):
+            await run_turn(pool, "s1", options(tmp_path), "hi")
+
+        assert factory.spawned == 2
+        assert len(pool) == 0
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_changed_options_replace_client(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST))
+        pool = SDKClientPool(client_factory=factory)
+
+        await run_turn(pool, "s1", options(tmp_path), "hi")
+        await run_turn(pool, "s1", options(tmp_path, model="other-model"), "hi")
+
+        assert factory.spawned == 2
+        assert factory.live == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_abandoned_turn_interrupts_and_client_stays_usable(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(startup_seconds=0.01, shutdown_seconds=0, response_seconds=0.05))
+        pool = SDKClientPool(client_factory=factory)
+        opts = options(tmp_path)
+
+        turn = pool.stream_turn("s1", opts, "long task")
+        await turn.__anext__()
+        await turn.aclose()
+
+        messages = await run_turn(pool, "s1", opts, "next")
+
+        assert factory.clients[0].interrupts == 1
+        assert isinstance(messages[-1], ResultMessage)
+        assert factory.spawned == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_abandoned_turn_is_interrupted_before_its_next_message(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(startup_seconds=0.01, shutdown_seconds=0, response_seconds=0.5))
+        pool = SDKClientPool(client_factory=factory)
+
+        turn = pool.stream_turn("s1", options(tmp_path), "long task")
+        await turn.__anext__()
+        await turn.aclose()
+        await asyncio.sleep(0.05)
+
+        assert factory.clients[0].interrupts == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_single_turn_spawns_every_time(self, tmp_path):
+        factory = FakeSDKClientFactory(FakeSDKConfig(**FAST))
+        opts = options(tmp_path)
+
+        for _ in range(3):
+            messages = [m async for m in stream_single_turn(opts, "hi", client_factory=factory)]
+            assert isinstance(messages[-1], ResultMessage)
+
+        assert factory.spawned == 3
+        assert factory.live == 0
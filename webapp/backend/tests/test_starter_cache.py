@@ -0,0 +1,182 @@
+"""Tests for the MinHash starter cache"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from src.ai.starter import stream_cached_starter
+from src.database.models import Message
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.database.models import Session
+from src.database.models import StarterCacheEntry
+from src.observability.metrics import STARTER_CACHE_LOOKUPS
+from src.services import status_service
+from src.services.file_service import FileService
+from src.services.starter_cache import StarterCache
+from src.services.status_service import StatusStore
+from src.utils.minhash import from_bytes
+from src.utils.minhash import normalize_prompt
+from src.utils.minhash import same_request
+from src.utils.minhash import signature
+from src.utils.minhash import similarity
+from src.utils.minhash import to_bytes
+
+VEGAS = "plan a {} day Vegas trip for a family with two kids on a budget"
+SNAKE = "snake game where the snake is {} and the board has walls and a high score table"
+
+
+def sig(prompt: str):
+    return signature(normalize_prompt(prompt))
+
+
+class TestMinHash:
+    def test_request_phrasing_normalizes_away(self):
+        assert normalize_prompt("Can you make me a Snake game?") == normalize_prompt("make a snake game") == "snake game"
+
+    def test_similarity_tracks_overlap(self):
+        assert similarity(sig("make a tetris game with levels"), sig("tetris game with level")) > 0.85
+        assert similarity(sig("snake game"), sig("snake game with levels")) < 0.6
+        assert similarity(sig("plan a 3 day vegas trip"), sig("plan a 4 day vegas trip")) < 0.8
+
+    def test_near_prompts_asking_for_something_else_are_not_the_same_request(self):
+        for template, first, second in ((VEGAS, "3", "7"), (SNAKE, "red", "blue")):
+            a, b = normalize_prompt(template.format(first)), normalize_prompt(template.format(second))
+            # Close enough on similarity alone
+            assert similarity(signature(a), signature(b)) >= 0.8
+            assert not same_request(a, b)
+        assert same_request(normalize_prompt("make a tetris game with levels"), normalize_prompt("tetris game with level"))
+
+    def test_signature_round_trips(self):
+        assert from_bytes(to_bytes(sig("snake game"))) == sig("snake game")
+
+
+@pytest_asyncio.fixture
+async def db_session(session_maker, monkeypatch):
+    """Database session, with project status stored in the test database"""
+    monkeypatch.setattr(status_service, "status_store", StatusStore(session_factory=session_maker))
+    async with session_maker() as session:
+        yield session
+
+
+async def new_project(db, project_type: ProjectType = ProjectType.GAME) -> tuple[Project, Session]:
+    project = Project(name="Starter", type=project_type)
+    db.add(project)
+    await db.commit()
+    session = Session(project_id=project.id, name="Main")
+    db.add(session)
+    await db.commit()
+    return project, session
+
+
+async def cache_snake(db, cache: StarterCache, prompt: str = "Make a snake game with levels") -> StarterCacheEntry:
+    project, session = await new_project(db)
+    await FileService.create_file(db, project.id, session.id, "index.html", "<canvas id=snake></canvas>", "text/html")
+    await FileService.create_file(db, project.id, session.id, "game.js", "let snake = [];\n")
+    files = await FileService.get_project_files(db, project.id)
+    return await cache.store(db, ProjectType.GAME, prompt, "✓ index.html  ✓ game.js  Ready!", files)
+
+
+def lookups(result: str) -> float:
+    return STARTER_CACHE_LOOKUPS.labels(ProjectType.GAME.value, result).value
+
+
+class TestStarterCache:
+    @pytest.mark.asyncio
+    async def test_exact_and_near_prompts_hit(self, db_session):
+        cache = StarterCache(threshold=0.8)
+        await cache_snake(db_session, cache)
+        hits, misses = lookups("hit"), lookups("miss")
+
+        exact = await cache.lookup(db_session, ProjectType.GAME, "can you create a SNAKE game with levels?")
+        near = await cache.lookup(db_session, ProjectType.GAME, "snake game with level")
+        other_type = await cache.lookup(db_session, ProjectType.CONTENT, "snake game with levels")
+        different = await cache.lookup(db_session, ProjectType.GAME, "snake game")
+
+        assert exact.similarity == 1.0
+        assert 0.8 <= near.similarity < 1.0
+        assert other_type is None and different is None
+        # The content-type lookup is counted under its own label
+        assert (lookups("hit") - hits, lookups("miss") - misses) == (2, 1)
+
+    @pytest.mark.asyncio
+    async def test_near_prompts_with_other_numbers_or_words_miss(self, db_session):
+        cache = StarterCache(threshold=0.8)
+        await cache_snake(db_session, cache, VEGAS.format("3"))
+        await cache_snake(db_session, cache, SNAKE.format("red"))
+
+        assert await cache.lookup(db_session, ProjectType.GAME, VEGAS.format("7")) is None
+        assert await cache.lookup(db_session, ProjectType.GAME, SNAKE.format("blue")) is None
+        assert await cache.lookup(db_session, ProjectType.GAME, SNAKE.format("red")) is not None
+
+    @pytest.mark.asyncio
+    async def test_index_is_rebuilt_from_database(self, db_session):
+        await cache_snake(db_session, StarterCache())
+
+        restarted = StarterCache()
+        assert await restarted.lookup(db_session, ProjectType.GAME, "snake game with levels") is not None
+        assert restarted.size() == 1
+
+    @pytest.mark.asyncio
+    async def test_replay_copies_files_into_project(self, db_session):
+        cache = StarterCache()
+        await cache_snake(db_session, cache)
+        project, session = await new_project(db_session)
+
+        match = await cache.lookup(db_session, ProjectType.GAME, "snake game with levels")
+        replayed = await cache.replay(db_session, match, project.id, session.id)
+
+        assert replayed.content.endswith("Ready!")
+        files = {f.name: f for f in await FileService.get_project_files(db_session, project.id)}
+        assert Path(files["game.js"].path).read_text() == "let snake = [];\n"
+        assert (await db_session.get(StarterCacheEntry, match.entry_id)).hits == 1
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_entries_are_evicted(self, db_session):
+        cache = StarterCache(max_entries=2)
+        first = await cache_snake(db_session, cache, "snake game")
+        second = await cache_snake(db_session, cache, "tetris game")
+        # Using the first entry makes the second the least recently used
+        project, session = await new_project(db_session)
+        await cache.replay(db_session, await cache.lookup(db_session, ProjectType.GAME, "snake game"), project.id, session.id)
+        await cache_snake(db_session, cache, "pong game")
+
+        ids = set((await db_session.execute(select(StarterCacheEntry.id))).scalars())
+        assert first.id in ids and second.id not in ids
+        assert cache.size() == 2
+
+    @pytest.mark.asyncio
+    async def test_turns_without_files_are_not_cached(self, db_session):
+        assert await StarterCache().store(db_session, ProjectType.GAME, "snake game", "Sorry", []) is None
+
+
+class TestReplayStream:
+    @pytest.mark.asyncio
+    async def test_streams_a_complete_turn(self, db_session, tmp_path):
+        cache = StarterCache()
+        await cache_snake(db_session, cache)
+        project, session = await new_project(db_session)
+        workspace = tmp_path / "workspace"
+        workspace.mkdir()
+
+        match = await cache.lookup(db_session, ProjectType.GAME, "snake game with levels")
+        replayed = await cache.replay(db_session, match, project.id, session.id)
+        events = [
+            json.loads(event.removeprefix("data: "))
+            async for event in stream_cached_starter(db_session, project.id, session.id, match, replayed, workspace)
+        ]
+
+        assert [e["filename"] for e in events if e["type"] == "file_progress"] == ["index.html", "game.js"]
+        complete = events[-1]
+        assert complete["type"] == "message_complete"
+        assert complete["starter_cache"]["similarity"] == 1.0
+        saved = await db_session.get(Message, complete["message_id"])
+        assert saved.content == replayed.content
+        assert (workspace / "game.js").read_text() == "let snake = [];\n"
@@ -0,0 +1,28 @@
+"""Startup import budget: heavy subsystems must load lazily"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.profile_imports import profile
+
+# Generous enough for slow CI machines; a regression that eagerly imports
+# anthropic or claude_agent_sdk again costs well over a second on its own
+STARTUP_BUDGET_MS = 1500
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    result = profile(runs=3)
+
+    assert result.lazy_loaded == [], f"{result.lazy_loaded} imported by src.main; import them on first use"
+    assert result.total_us / 1000 < STARTUP_BUDGET_MS
+
+
+def test_lazy_modules_load_on_first_use():
+    from src.ai.agent import agent
+    from src.ai.client import create_anthropic_client
+
+    assert agent.client is agent.client
+    assert type(create_anthropic_client("key")).__name__ == "AsyncAnthropic"
@@ -0,0 +1,118 @@
+"""Tests for the in-memory project status store and its write-behind flusher"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy import select
+
+from src.database.models import Project
+from src.database.models import ProjectStatus
+from src.database.models import ProjectType
+from src.services import status_service
+from src.services.status_service import InvalidStatusTransition
+from src.services.status_service import StatusService
+from src.services.status_service import StatusStore
+
+
+@pytest_asyncio.fixture
+async def store(session_maker, monkeypatch):
+    # Long delay so tests decide when the flush happens
+    store = StatusStore(flush_delay=60, session_factory=session_maker)
+    monkeypatch.setattr(status_service, "status_store", store)
+    yield store
+    await store.close()
+
+
+@pytest_asyncio.fixture
+async def project(session_maker):
+    async with session_maker() as db:
+        project = Project(name="Status", type=ProjectType.GAME, status=ProjectStatus.IDLE)
+        db.add(project)
+        await db.commit()
+        return project
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements executed against the test database."""
+    executed: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+async def stored_status(session_maker, project_id: str) -> ProjectStatus:
+    async with session_maker() as db:
+        return (await db.execute(select(Project.status).where(Project.id == project_id))).scalar_one()
+
+
+class TestStatusStore:
+    @pytest.mark.asyncio
+    async def test_turn_transitions_collapse_into_one_update(self, store, session_maker, project, statements):
+        async with session_maker() as db:
+            await StatusService.set_planning(db, project.id)
+            await StatusService.set_working(db, project.id)
+            assert await StatusService.set_complete(db, project.id) == ProjectStatus.COMPLETE
+            assert await StatusService.get_project_status(db, project.id) == ProjectStatus.COMPLETE
+
+        # One SELECT to load the entry, nothing written yet
+        assert statements == ["SELECT"]
+        assert await stored_status(session_maker, project.id) == ProjectStatus.IDLE
+
+        assert await store.flush() == 1
+        assert statements.count("UPDATE") == 1
+        assert await stored_status(session_maker, project.id) == ProjectStatus.COMPLETE
+
+    @pytest.mark.asyncio
+    async def test_returning_to_stored_status_writes_nothing(self, store, session_maker, project, statements):
+        async with session_maker() as db:
+            await StatusService.set_planning(db, project.id)
+            await StatusService.set_idle(db, project.id)
+
+        assert await store.flush() == 0
+        assert "UPDATE" not in statements
+
+    @pytest.mark.asyncio
+    async def test_flusher_writes_after_delay(self, store, session_maker, project):
+        store.flush_delay = 0.01
+        async with session_maker() as db:
+            await StatusService.set_working(db, project.id)
+
+        await store._flush_task
+        assert await stored_status(session_maker, project.id) == ProjectStatus.WORKING
+
+    @pytest.mark.asyncio
+    async def test_invalid_transition_is_rejected(self, store, session_maker, project):
+        async with session_maker() as db:
+            with pytest.raises(InvalidStatusTransition, match="idle to verifying"):
+                await StatusService.set_verifying(db, project.id)
+            assert await StatusService.get_project_status(db, project.id) == ProjectStatus.IDLE
+
+    @pytest.mark.asyncio
+    async def test_unknown_project(self, store, session_maker):
+        async with session_maker() as db:
+            assert await StatusService.set_planning(db, "missing") is None
+            assert await StatusService.get_project_status(db, "missing") is None
+
+    @pytest.mark.asyncio
+    async def test_recover_resets_projects_left_mid_turn(self, store, session_maker, project):
+        async with session_maker() as db:
+            await StatusService.set_working(db, project.id)
+            await store.flush()
+
+            # Restart: a fresh store reconciles from the database
+            restarted = StatusStore(session_factory=session_maker)
+            assert await restarted.recover(db) == 1
+            entry = await restarted.get(db, project.id)
+
+        assert entry.status == entry.persisted == ProjectStatus.IDLE
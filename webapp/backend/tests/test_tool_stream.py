@@ -0,0 +1,102 @@
+"""Tests for incremental create_file tool input streaming"""
+
+import json
+import random
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ai.tool_stream import IncrementalJSONObjectParser, ToolInputStream
+
+
+def _split_randomly(text: str, seed: int) -> list[str]:
+    """Split text into random fragments like input_json deltas."""
+    rng = random.Random(seed)
+    pieces = []
+    i = 0
+    while i < len(text):
+        step = rng.randint(1, 7)
+        pieces.append(text[i:i + step])
+        i += step
+    return pieces
+
+
+def _parse_in_fragments(document: str, seed: int) -> tuple[str, dict[str, str]]:
+    """Feed a document fragment by fragment, returning streamed content and buffered values."""
+    parser = IncrementalJSONObjectParser(stream_fields={"content"})
+    streamed = []
+    for fragment in _split_randomly(document, seed):
+        streamed.extend(text for _field, text in parser.feed(fragment))
+    assert parser.done
+    return "".join(streamed), parser.values
+
+
+class TestIncrementalJSONObjectParser:
+    """Streamed tool input decodes to the same values as json.loads"""
+
+    def test_matches_json_loads_for_random_fragmentation(self):
+        """Content with escapes, unicode and surrogate pairs survives any split"""
+        tool_input = {
+            "filename": "game.html",
+            "content": '<html>\n\t<script>alert("hi \\\\ there");</script>\n  é ✓ 🎮 \u0001</html>',
+            "mime_type": "text/html",
+        }
+        document = json.dumps(tool_input)  # ensure_ascii escapes non-ASCII as \uXXXX
+
+        for seed in range(50):
+            content, values = _parse_in_fragments(document, seed)
+            assert content == tool_input["content"]
+            assert values["filename"] == "game.html"
+            assert values["mime_type"] == "text/html"
+
+    def test_content_before_filename_and_non_string_values(self):
+        """Key order and skipped non-string values do not confuse the parser"""
+        document = json.dumps(
+            {
+                "content": "body { color: red; }",
+                "extra": {"nested": ["a", "}", 1]},
+                "count": 3,
+                "filename": "style.css",
+            },
+            ensure_ascii=False,
+        )
+
+        content, values = _parse_in_fragments(document, seed=7)
+
+        assert content == "body { color: red; }"
+        assert values["filename"] == "style.css"
+        assert "extra" not in values
+
+
+class TestToolInputStream:
+    """create_file content is appended to the temp file as it arrives"""
+
+    def test_writes_content_incrementally(self, tmp_path):
+        partial_path = tmp_path / ".toolu_1.partial"
+        tool_stream = ToolInputStream("toolu_1", partial_path)
+        content = "x" * 10000
+
+        document = json.dumps({"filename": "big.js", "content": content})
+        head, tail = document[:5000], document[5000:]
+
+        tool_stream.feed(head)
+        assert tool_stream.filename == "big.js"
+        assert 0 < partial_path.stat().st_size < len(content)
+        assert tool_stream.should_report_progress()
+
+        tool_stream.feed(tail)
+        tool_stream.close()
+
+        assert partial_path.read_text() == content
+        assert tool_stream.bytes_written == len(content)
+
+    def test_discard_removes_temp_file(self, tmp_path):
+        partial_path = tmp_path / ".toolu_2.partial"
+        tool_stream = ToolInputStream("toolu_2", partial_path)
+        tool_stream.feed('{"filename": "a.txt", "content": "partial')
+
+        tool_stream.discard()
+
+        assert not partial_path.exists()
@@ -0,0 +1,112 @@
+"""Tests for request tracing, trace export and /debug/traces"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.observability.tracing import TraceStore
+from src.observability.tracing import span
+from src.observability.tracing import start_trace
+from src.observability.tracing import trace_store
+from src.observability.tracing import traced
+
+
+class TestSpans:
+    def test_span_outside_trace_is_noop(self):
+        with span("db.query") as s:
+            s.set(rows=1)
+
+    @pytest.mark.asyncio
+    async def test_nested_spans_form_waterfall(self):
+        @traced("file.write")
+        async def write_file():
+            await asyncio.sleep(0)
+
+        with start_trace("turn") as trace:
+            with span("db.load_history", messages=3):
+                pass
+            with span("llm.request", round=0) as request_span:
+                await write_file()
+                request_span.set(output_tokens=42)
+
+        data = trace.to_dict()
+        names = [(s["name"], s["depth"]) for s in data["spans"]]
+        assert names == [("db.load_history", 0), ("llm.request", 0), ("file.write", 1)]
+        assert data["spans"][1]["attributes"] == {"round": 0, "output_tokens": 42}
+        assert data["spans"][2]["parent_id"] == data["spans"][1]["span_id"]
+        assert all(s["offset_ms"] >= 0 and s["duration_ms"] >= 0 for s in data["spans"])
+
+    @pytest.mark.asyncio
+    async def test_span_stays_open_across_generator_yields(self):
+        async def stream():
+            with span("llm.request"):
+                for i in range(3):
+                    yield i
+                    await asyncio.sleep(0)
+
+        with start_trace("turn") as trace:
+            assert [i async for i in stream()] == [0, 1, 2]
+            with span("db.save"):
+                pass
+
+        spans = trace.to_dict()["spans"]
+        assert [(s["name"], s["depth"], s["status"]) for s in spans] == [
+            ("llm.request", 0, "ok"),
+            ("db.save", 0, "ok"),
+        ]
+
+    def test_errors_are_recorded(self):
+        with pytest.raises(ValueError):
+            with start_trace("turn") as trace:
+                with span("verify.browser"):
+                    raise ValueError("page crashed")
+
+        data = trace.to_dict()
+        assert data["status"] == "error"
+        assert data["spans"][0]["status"] == "error"
+        assert data["spans"][0]["attributes"]["error"] == "ValueError: page crashed"
+
+
+class TestTraceStore:
+    def test_keeps_slowest_and_writes_jsonl(self, tmp_path):
+        store = TraceStore(retain=2)
+        store.open_file(tmp_path / "traces.jsonl", max_bytes=1024 * 1024, backup_count=1)
+
+        class FakeTrace:
+            def __init__(self, name, duration):
+                self.name, self.duration = name, duration
+
+            def to_dict(self):
+                return {"name": self.name, "duration_ms": self.duration * 1000}
+
+        for name, duration in [("a", 0.1), ("b", 0.5), ("c", 0.2), ("d", 0.05)]:
+            store.add(FakeTrace(name, duration))
+        store.close()
+
+        assert [t["name"] for t in store.slowest(10)] == ["b", "c"]
+        lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+        assert [json.loads(line)["name"] for line in lines] == ["a", "b", "c", "d"]
+
+
+class TestTracingMiddleware:
+    def test_requests_are_traced_and_listed(self):
+        from src.main import app
+
+        trace_store.clear()
+        with TestClient(app) as client:
+            response = client.get("/api/projects")
+            traces = client.get("/debug/traces", params={"limit": 5}).json()["traces"]
+
+        trace_id = response.headers["x-trace-id"]
+        trace = next(t for t in traces if t["trace_id"] == trace_id)
+        assert trace["name"] == "GET /api/projects"
+        assert trace["attributes"]["status_code"] == 200
+        # /debug/traces itself is not traced
+        assert all(t["name"] != "GET /debug/traces" for t in traces)
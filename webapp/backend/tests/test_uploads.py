@@ -0,0 +1,200 @@
+"""Tests for the streaming upload endpoint"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import base64
+import hashlib
+import tracemalloc
+from io import BytesIO
+
+import httpx
+import pytest
+import pytest_asyncio
+from PIL import Image
+
+from src.config import settings
+from src.database.connection import get_db
+from src.database.models import File
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.services import upload_service
+from src.services.file_service import FileService
+from src.services.file_version_service import FileVersionService
+from src.services.upload_service import UploadService
+from src.services.upload_service import expand_upload_blocks
+
+BOUNDARY = "upload-boundary"
+
+
+@pytest_asyncio.fixture
+async def session_maker(file_session_maker, monkeypatch):
+    """A file database (images are normalized on their own connection)"""
+    monkeypatch.setattr(upload_service, "AsyncSessionLocal", file_session_maker)
+    return file_session_maker
+
+
+@pytest_asyncio.fixture
+async def project_id(session_maker):
+    async with session_maker() as db:
+        project = Project(name="Game", type=ProjectType.GAME)
+        db.add(project)
+        await db.commit()
+        return project.id
+
+
+@pytest_asyncio.fixture
+async def client(session_maker):
+    from src.main import app
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+def png_bytes() -> bytes:
+    output = BytesIO()
+    Image.new("RGB", (32, 32), (0, 200, 0)).save(output, format="PNG")
+    return output.getvalue()
+
+
+class TestUploadEndpoint:
+    @pytest.mark.asyncio
+    async def test_files_are_stored_and_images_normalized(self, client, session_maker, project_id):
+        sprite = png_bytes()
+        sound = bytes(range(256)) * 100
+        files = [
+            # Declared as JPEG: normalized in the background
+            ("file", ("sprite.jpg", sprite, "image/jpeg")),
+            ("file", ("jump.wav", sound, "application/octet-stream")),
+        ]
+
+        response = await client.post(f"/api/projects/{project_id}/uploads", files=files)
+        again = await client.post(f"/api/projects/{project_id}/uploads", files=files[1:])
+
+        assert response.status_code == 201
+        image, audio = response.json()
+        assert image["normalizing"] and not audio["normalizing"]
+        assert audio["name"] == "jump.wav"
+        assert audio["mime_type"] in ("audio/wav", "audio/x-wav")
+        assert again.json()[0]["name"] == "jump-2.wav"
+
+        task = UploadService.normalizing(image["id"])
+        if task is not None:
+            await task
+        async with session_maker() as db:
+            stored = await db.get(File, image["id"])
+            assert stored.mime_type == "image/jpeg"
+            content = Path(stored.path).read_bytes()
+            assert Image.open(BytesIO(content)).format == "JPEG"
+            (version,) = await FileVersionService.list_versions(db, stored.id)
+            assert version.sha256 == hashlib.sha256(content).hexdigest()
+            assert version.size == stored.size == len(content)
+
+            stored = await db.get(File, audio["id"])
+            assert Path(stored.path).read_bytes() == sound
+            (version,) = await FileVersionService.list_versions(db, stored.id)
+            assert version.sha256 == hashlib.sha256(sound).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_normalizing_skips_images_written_again(self, session_maker, project_id):
+        edited = png_bytes() + b"edited"
+        async with session_maker() as db:
+            # Stored as-is, then declared as JPEG like an upload waiting to be normalized
+            unchecked = "application/octet-stream"
+            file = await FileService.create_file(db, project_id, None, "sprite.jpg", png_bytes(), unchecked)
+            await FileService.create_file(db, project_id, None, "sprite.jpg", edited, unchecked)
+            file.mime_type = "image/jpeg"
+            await db.commit()
+
+        await upload_service._normalize_image(file.id)
+
+        async with session_maker() as db:
+            stored = await db.get(File, file.id)
+            assert Path(stored.path).read_bytes() == edited
+            versions = await FileVersionService.list_versions(db, file.id)
+            assert [(v.version, v.sha256) for v in versions] == [
+                (2, hashlib.sha256(edited).hexdigest()),
+                (1, hashlib.sha256(png_bytes()).hexdigest()),
+            ]
+
+    @pytest.mark.asyncio
+    async def test_rejected_uploads_leave_nothing_behind(self, client, project_id, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "upload_max_bytes", 1000)
+        url = f"/api/projects/{project_id}/uploads"
+
+        too_large = await client.post(url, files=[("file", ("big.bin", b"x" * 5000, "application/octet-stream"))])
+        hidden = await client.post(url, files=[("file", (".env", b"SECRET=1", "text/plain"))])
+        not_multipart = await client.post(url, content=b"raw", headers={"Content-Type": "application/octet-stream"})
+        missing = await client.post("/api/projects/nope/uploads", files=[("file", ("a.txt", b"a", "text/plain"))])
+
+        assert too_large.status_code == 413
+        assert hidden.status_code == 400
+        assert not_multipart.status_code == 400
+        assert missing.status_code == 404
+        assert [p for p in tmp_path.rglob("*") if p.is_file() and p.parent.name == "files"] == []
+
+
+class TestStreaming:
+    @pytest.mark.asyncio
+    async def test_memory_stays_flat_for_large_uploads(self, session_maker, project_id):
+        chunk = b"\xab" * (64 * 1024)
+        chunks = 256  # 16 MB
+
+        async def body():
+            yield f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="level.bin"\r\n\r\n'.encode()
+            for _ in range(chunks):
+                yield chunk
+            yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+        tracemalloc.start()
+        try:
+            async with session_maker() as db:
+                (file,) = await UploadService.receive(
+                    db, project_id, None, f"multipart/form-data; boundary={BOUNDARY}", body(), 64 * 1024 * 1024
+                )
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert file.size == len(chunk) * chunks
+        assert peak < 4 * 1024 * 1024
+
+
+class TestUploadReferences:
+    @pytest.mark.asyncio
+    async def test_upload_blocks_are_expanded_for_the_model(self, session_maker, project_id):
+        async with session_maker() as db:
+            sprite, sound = [
+                File(project_id=project_id, name=name, path=str(settings.data_dir / name), mime_type=mime, size=len(data))
+                for name, mime, data in (("s.png", "image/png", png_bytes()), ("a.wav", "audio/wav", b"RIFF"))
+            ]
+            Path(sprite.path).write_bytes(png_bytes())
+            db.add_all([sprite, sound])
+            await db.commit()
+
+            content = (
+                '[{"type": "text", "text": "Use these"}, '
+                f'{{"type": "upload", "file_id": "{sprite.id}"}}, {{"type": "upload", "file_id": "{sound.id}"}}]'
+            )
+            text, image, note = await expand_upload_blocks(db, content, project_id)
+            (other_project,) = await expand_upload_blocks(db, [{"type": "upload", "file_id": sprite.id}], "other")
+
+            assert await expand_upload_blocks(db, "Just text", project_id) == "Just text"
+
+        assert text == {"type": "text", "text": "Use these"}
+        assert image["source"]["media_type"] == "image/png"
+        assert base64.b64decode(image["source"]["data"]) == png_bytes()
+        assert "a.wav" in note["text"]
+        assert "no longer available" in other_project["text"]
@@ -0,0 +1,192 @@
+"""Tests for the streaming WebSocket transport"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import json
+from typing import Any
+
+import pytest
+import pytest_asyncio
+
+from src.ai import cancellation
+from src.ai import streaming
+from src.ai.rate_limiter import RateLimiter
+from src.api import streaming as streaming_api
+from src.api import websocket
+from src.api.websocket import decode_frame
+from src.config import settings
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.database.models import Session
+from src.services import status_service
+from src.services.status_service import StatusStore
+from tools.mock_anthropic import MockAsyncAnthropic
+from tools.mock_anthropic import MockConfig
+
+
+class SocketClient:
+    """Talks to the app's WebSocket endpoint over plain ASGI messages."""
+
+    def __init__(self, app, path: str = "/api/ws"):
+        self.app = app
+        self.path = path
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.last_seq = 0
+
+    async def __aenter__(self) -> "SocketClient":
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "server": ("test", 80),
+            "client": ("test", 1234),
+            "subprotocols": [],
+        }
+        self.inbox.put_nowait({"type": "websocket.connect"})
+        self.task = asyncio.create_task(self.app(scope, self.inbox.get, self.outbox.put))
+        accepted = await asyncio.wait_for(self.outbox.get(), 2)
+        assert accepted["type"] == "websocket.accept"
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, 5)
+
+    def send(self, op: dict[str, Any]) -> None:
+        self.inbox.put_nowait({"type": "websocket.receive", "text": json.dumps(op)})
+
+    async def receive(self, timeout: float = 5.0) -> tuple[int, dict[str, Any]]:
+        message = await asyncio.wait_for(self.outbox.get(), timeout)
+        channel, seq, event = decode_frame(message["bytes"])
+        assert seq == self.last_seq + 1
+        self.last_seq = seq
+        return channel, event
+
+
+@pytest_asyncio.fixture
+async def session_maker(file_session_maker, monkeypatch):
+    """A file database (each channel streams on its own connection)"""
+    monkeypatch.setattr(settings, "project_naming_enabled", False)
+    for module in (websocket, streaming, cancellation):
+        monkeypatch.setattr(module, "AsyncSessionLocal", file_session_maker)
+    store = StatusStore(flush_delay=0, session_factory=file_session_maker)
+    monkeypatch.setattr(status_service, "status_store", store)
+    yield file_session_maker
+    await store.close()
+
+
+@pytest_asyncio.fixture
+async def session_ids(session_maker) -> list[str]:
+    async with session_maker() as db:
+        project = Project(name="Trip", type=ProjectType.TRIP)
+        db.add(project)
+        await db.commit()
+        sessions = [Session(project_id=project.id, name=name) for name in ("Plan", "Budget")]
+        db.add_all(sessions)
+        await db.commit()
+        return [session.id for session in sessions]
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The app, with turns run against the mock Messages API"""
+    config = MockConfig(ttft_seconds=0.01, tokens_per_second=2000.0, response_tokens=200)
+    monkeypatch.setattr(streaming, "create_anthropic_client", lambda api_key=None: MockAsyncAnthropic(config))
+    monkeypatch.setattr(streaming, "rate_limiter", RateLimiter())
+    monkeypatch.setattr(streaming_api, "stream_claude_response_sdk", streaming.stream_claude_response)
+    from src.main import app
+
+    return app
+
+
+class TestStreamSocket:
+    @pytest.mark.asyncio
+    async def test_two_sessions_stream_on_one_socket(self, app, session_ids):
+        events: dict[int, list[dict]] = {}
+        channels: dict[int, str] = {}
+        async with SocketClient(app) as client:
+            for ref, session_id in enumerate(session_ids):
+                client.send({"op": "start", "ref": ref, "session_id": session_id, "message": "Plan three days"})
+            client.send({"op": "start", "ref": 9, "session_id": "not-a-session", "message": "Hi"})
+
+            ended: set[int] = set()
+            errors = []
+            while len(ended) < 2:
+                channel, event = await client.receive()
+                client.send({"op": "ack", "seq": client.last_seq})
+                if channel:
+                    events.setdefault(channel, []).append(event)
+                elif event["type"] == "started":
+                    channels[event["channel"]] = event["session_id"]
+                elif event["type"] == "ended":
+                    ended.add(event["channel"])
+                elif event["type"] == "error":
+                    errors.append(event)
+
+        assert sorted(channels.values()) == sorted(session_ids)
+        assert [(e["ref"], e["status"]) for e in errors] == [(9, 422)]
+        for channel in channels:
+            types = [e["type"] for e in events[channel]]
+            assert types[0] == "message_start"
+            assert "message_delta" in types
+            assert types[-1] == "message_complete"
+
+    @pytest.mark.asyncio
+    async def test_sending_waits_for_acks_and_cancel_is_in_band(self, app, session_ids, monkeypatch):
+        monkeypatch.setattr(settings, "ws_window_frames", 4)
+        async with SocketClient(app) as client:
+            client.send({"op": "start", "ref": 1, "session_id": session_ids[0], "message": "Plan three days"})
+            received = [await client.receive() for _ in range(4)]
+            # The window is full: nothing more until an ack
+            with pytest.raises(asyncio.TimeoutError):
+                await client.receive(timeout=0.3)
+
+            (channel,) = {event["channel"] for ch, event in received if ch == 0 and event["type"] == "started"}
+            client.send({"op": "cancel", "channel": channel})
+            client.send({"op": "ack", "seq": client.last_seq})
+            types = []
+            while True:
+                ch, event = await client.receive()
+                client.send({"op": "ack", "seq": client.last_seq})
+                if ch == 0 and event["type"] == "ended":
+                    break
+                types.append(event["type"])
+
+            client.send({"op": "cancel", "channel": channel})
+            _ch, missing = await client.receive()
+
+        assert types[-1] == "cancelled"
+        assert "message_complete" not in types
+        assert (missing["type"], missing["status"]) == ("error", 404)
+
+    @pytest.mark.asyncio
+    async def test_client_acking_at_half_the_announced_window_never_stalls(self, app, session_ids, monkeypatch):
+        monkeypatch.setattr(settings, "ws_window_frames", 3)
+        async with SocketClient(app) as client:
+            _ch, hello = await client.receive()
+            assert hello == {"type": "hello", "window": 3}
+            ack_every = max(1, hello["window"] // 2)
+
+            client.send({"op": "start", "ref": 1, "session_id": session_ids[0], "message": "Plan three days"})
+            types = []
+            unacked = 1  # The hello
+            while not types or types[-1] != "ended":
+                ch, event = await client.receive(timeout=2)
+                types.append(event["type"])
+                unacked += 1
+                if unacked >= ack_every:
+                    unacked = 0
+                    client.send({"op": "ack", "seq": client.last_seq})
+
+        assert "message_complete" in types
@@ -0,0 +1,151 @@
+"""Tests for syncing the Agent SDK workspace into project storage"""
+
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import os
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import File
+from src.database.models import Project
+from src.database.models import ProjectType
+from src.services import workspace_sync
+from src.services.workspace_sync import WorkspaceSync
+
+
+@pytest_asyncio.fixture
+async def project_id(db_session):
+    project = Project(name="Game", type=ProjectType.GAME)
+    db_session.add(project)
+    await db_session.commit()
+    return project.id
+
+
+def make_sync(tmp_path: Path, project_id: str) -> WorkspaceSync:
+    workspace = tmp_path / "workspace"
+    workspace.mkdir(exist_ok=True)
+    return WorkspaceSync(project_id, workspace, storage_dir=tmp_path / "storage")
+
+
+async def file_rows(db: AsyncSession) -> int:
+    return (await db.execute(select(func.count()).select_from(File))).scalar_one()
+
+
+class TestWorkspaceSync:
+    @pytest.mark.asyncio
+    async def test_syncs_nested_files_with_relative_paths(self, tmp_path, db_session, project_id):
+        sync = make_sync(tmp_path, project_id)
+        (sync.workspace / "js").mkdir()
+        (sync.workspace / "index.html").write_text("<html></html>")
+        (sync.workspace / "js" / "game.js").write_text("let x = 1;")
+
+        files = await sync.sync(db_session, None)
+
+        assert sorted(f.name for f in files) == ["index.html", "js/game.js"]
+        assert (tmp_path / "storage" / "js" / "game.js").read_text() == "let x = 1;"
+        assert {f.name: f.mime_type for f in files}["js/game.js"] == "application/javascript"
+
+    @pytest.mark.asyncio
+    async def test_unchanged_files_are_skipped(self, tmp_path, db_session, project_id):
+        sync = make_sync(tmp_path, project_id)
+        game = sync.workspace / "game.js"
+        game.write_text("let x = 1;")
+        await sync.sync(db_session, None)
+        stored = tmp_path / "storage" / "game.js"
+        stored_mtime = stored.stat().st_mtime_ns
+
+        # Rewritten with identical content: the hash matches
+        game.write_text("let x = 1;")
+        os.utime(game, ns=(game.stat().st_atime_ns, game.stat().st_mtime_ns + 10**9))
+        sync.mark(game)
+
+        assert await sync.sync(db_session, None) == []
+        assert stored.stat().st_mtime_ns == stored_mtime
+
+    @pytest.mark.asyncio
+    async def test_changed_file_updates_its_row(self, tmp_path, db_session, project_id):
+        sync = make_sync(tmp_path, project_id)
+        game = sync.workspace / "game.js"
+        game.write_text("let x = 1;")
+        await sync.sync(db_session, None)
+
+        game.write_text("let x = 2; // more")
+        sync.mark(str(game))
+        files = await sync.sync(db_session, None)
+
+        assert [f.name for f in files] == ["game.js"]
+        assert files[0].size == len("let x = 2; // more")
+        assert await file_rows(db_session) == 1
+        assert (tmp_path / "storage" / "game.js").read_text() == "let x = 2; // more"
+
+    @pytest.mark.asyncio
+    async def test_paths_outside_workspace_are_rejected(self, tmp_path, db_session, project_id):
+        sync = make_sync(tmp_path, project_id)
+        secret = tmp_path / "secret.txt"
+        secret.write_text("token")
+        (sync.workspace / "link.txt").symlink_to(secret)
+        (sync.workspace / ".claude").mkdir()
+        (sync.workspace / ".claude" / "settings.json").write_text("{}")
+        sync.mark("../secret.txt")
+        sync.mark(secret)
+
+        files = await sync.sync(db_session, None)
+
+        assert files == []
+        assert not (tmp_path / "storage").exists()
+
+    @pytest.mark.asyncio
+    async def test_restart_does_not_rewrite_stored_copies(self, tmp_path, db_session, project_id):
+        sync = make_sync(tmp_path, project_id)
+        (sync.workspace / "index.html").write_text("<html></html>")
+        await sync.sync(db_session, None)
+
+        # A new process has no sync state; it compares against storage
+        restarted = make_sync(tmp_path, project_id)
+        assert await restarted.sync(db_session, None) == []
+
+    @pytest.mark.asyncio
+    async def test_polling_fallback_finds_unreported_changes(self, tmp_path, db_session, project_id, monkeypatch):
+        monkeypatch.setattr(workspace_sync, "watchfiles", None)
+        sync = make_sync(tmp_path, project_id)
+        await sync.sync(db_session, None)
+
+        async with sync.watch():
+            (sync.workspace / "style.css").write_text("body {}")
+
+        assert [f.name for f in await sync.sync(db_session, None)] == ["style.css"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(workspace_sync.watchfiles is None, reason="watchfiles not installed")
+    async def test_watcher_finds_unreported_changes(self, tmp_path, db_session, project_id):
+        sync = make_sync(tmp_path, project_id)
+        (sync.workspace / "index.html").write_text("<html></html>")
+        await sync.sync(db_session, None)
+
+        async with sync.watch():
+            await asyncio.sleep(0.2)
+            (sync.workspace / "assets").mkdir()
+            (sync.workspace / "assets" / "level.json").write_text("{}")
+            await asyncio.sleep(0.2)
+
+        assert [f.name for f in await sync.sync(db_session, None)] == ["assets/level.json"]
+
+    def test_tracked_workspaces_are_capped(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(workspace_sync, "MAX_TRACKED_WORKSPACES", 2)
+        monkeypatch.setattr(workspace_sync, "_workspaces", workspace_sync.OrderedDict())
+        first = workspace_sync.get_workspace_sync("a", tmp_path / "a")
+        workspace_sync.get_workspace_sync("b", tmp_path / "b")
+        assert workspace_sync.get_workspace_sync("a", tmp_path / "a") is first
+
+        workspace_sync.get_workspace_sync("c", tmp_path / "c")
+
+        assert list(workspace_sync._workspaces) == ["a", "c"]
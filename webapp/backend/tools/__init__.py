@@ -0,0 +1 @@
+"""Developer tooling: mock upstream APIs, benchmarks and profiling scripts."""
@@ -0,0 +1,186 @@
+"""Benchmark "small tweak" turns: full-file rewrites vs targeted edits.
+
+A session holds a generated game file of ``--lines`` lines. Each turn asks
+for a one-line change and is answered by the mock Messages API either the
+old way (``create_file`` with the whole file) or the new way (``read_file``,
+then ``edit_file`` with one replacement). Both run through
+``stream_claude_response`` and report output tokens, rounds and wall time.
+
+Usage:
+    python -m tools.bench_file_edit [--lines 1500] [--turns 2] [--tokens-per-second 80]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench_file_edit_")
+os.environ.setdefault("ANTHROPIC_API_KEY", "mock-key")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp_dir}/bench.sqlite"
+# The mock has no quotas; don't pace requests as if it were the real API
+for _quota in ("REQUESTS", "INPUT_TOKENS", "OUTPUT_TOKENS"):
+    os.environ[f"ANTHROPIC_{_quota}_PER_MINUTE"] = "0"
+
+from src.ai import streaming  # noqa: E402
+from src.database.connection import AsyncSessionLocal  # noqa: E402
+from src.database.connection import init_db  # noqa: E402
+from src.database.models import Project  # noqa: E402
+from src.database.models import ProjectType  # noqa: E402
+from src.database.models import Session  # noqa: E402
+from src.services.file_service import FileService  # noqa: E402
+from tools.mock_anthropic import MockAsyncAnthropic  # noqa: E402
+from tools.mock_anthropic import MockConfig  # noqa: E402
+from tools.mock_anthropic import PromptCache  # noqa: E402
+
+FILENAME = "game.html"
+USER_MESSAGE = "Make the player speed {speed} instead."
+SPEED_LINE = re.compile(r"^    const PLAYER_SPEED = \d+;$", re.MULTILINE)
+
+
+def make_game(lines: int) -> str:
+    body = [f"    const enemy{i} = spawnEnemy({i % 17}, {i % 23}, 'sprite_{i % 5}.png');" for i in range(lines - 4)]
+    return "\n".join(["<script>", "    const PLAYER_SPEED = 4;", *body, "</script>"]) + "\n"
+
+
+def _last_tool_result(request: dict[str, Any]) -> dict[str, Any] | None:
+    content = request["messages"][-1]["content"]
+    if isinstance(content, list):
+        return next((b for b in content if isinstance(b, dict) and b.get("type") == "tool_result"), None)
+    return None
+
+
+def _requested_speed(request: dict[str, Any]) -> str:
+    """Speed asked for in the latest user text (plain or as cache-marked text blocks)."""
+    for message in reversed(request["messages"]):
+        content = message["content"]
+        blocks = [{"type": "text", "text": content}] if isinstance(content, str) else content
+        for block in blocks:
+            if isinstance(block, dict) and block.get("type") == "text":
+                match = re.search(r"speed (\d+)", block["text"])
+                if match:
+                    return match.group(1)
+    raise ValueError("No speed in request")
+
+
+class TweakResponder:
+    """Mock model that applies the requested speed change to the stored file."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.path: Path | None = None
+
+    def __call__(self, request: dict[str, Any]) -> list[dict[str, Any]]:
+        result = _last_tool_result(request)
+        new_line = f"    const PLAYER_SPEED = {_requested_speed(request)};"
+
+        if self.mode == "rewrite":
+            if result is not None:
+                return [{"type": "text", "text": "Ready!"}]
+            # Regenerate the whole file
+            content = SPEED_LINE.sub(new_line, self.path.read_text(), count=1)
+            return [{"type": "tool_use", "name": "create_file", "input": {"filename": FILENAME, "content": content}}]
+
+        if result is None:
+            return [{"type": "tool_use", "name": "read_file", "input": {"filename": FILENAME}}]
+        if "updated" in result["content"]:
+            return [{"type": "text", "text": "Ready!"}]
+        old_line = SPEED_LINE.search(result["content"]).group(0)
+        edit = {"old_text": old_line, "new_text": new_line}
+        return [{"type": "tool_use", "name": "edit_file", "input": {"filename": FILENAME, "edits": [edit]}}]
+
+
+async def run_session(mode: str, lines: int, turns: int, config: MockConfig) -> dict:
+    """Run one session of tweak turns and collect usage and wall time."""
+    responder = TweakResponder(mode)
+    cache = PromptCache(config)
+    client = MockAsyncAnthropic(config=config, cache=cache, responder=responder)
+    streaming.create_anthropic_client = lambda api_key=None: client
+
+    async with AsyncSessionLocal() as db:
+        project = Project(name="Bench", type=ProjectType.CONTENT)
+        db.add(project)
+        await db.commit()
+        session = Session(project_id=project.id, name="Bench")
+        db.add(session)
+        await db.commit()
+        file = await FileService.create_file(db, project.id, session.id, FILENAME, make_game(lines), "text/html")
+        session_id, project_id = session.id, project.id
+        responder.path = Path(file.path)
+
+    durations: list[float] = []
+    output_tokens = 0
+    for turn in range(turns):
+        speed = 5 + turn
+        requests_before = len(client.requests)
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            async for raw in streaming.stream_claude_response(
+                UUID(session_id), USER_MESSAGE.format(speed=speed), db, "mock-key"
+            ):
+                event = json.loads(raw[len("data: "):])
+                if event["type"] == "message_complete":
+                    output_tokens += event["usage"]["output_tokens"]
+                elif event["type"] == "error":
+                    raise RuntimeError(event["error"])
+        durations.append(time.perf_counter() - start)
+        rounds = len(client.requests) - requests_before
+
+    async with AsyncSessionLocal() as db:
+        file = await FileService.get_file_by_name(db, project_id, FILENAME)
+    assert f"PLAYER_SPEED = {speed};" in Path(file.path).read_text(), "last tweak was not applied"
+
+    return {
+        "output_tokens_per_turn": output_tokens / turns,
+        "rounds_per_turn": rounds,
+        "wall_p50_s": statistics.median(durations),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1500)
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--ttft", type=float, default=0.5)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        ttft_seconds=args.ttft,
+        prefill_seconds_per_1k_tokens=0.01,
+        tokens_per_second=args.tokens_per_second,
+        chunk_tokens=16,
+    )
+    await init_db()
+
+    results = {
+        "rewrite": await run_session("rewrite", args.lines, args.turns, config),
+        "edit": await run_session("edit", args.lines, args.turns, config),
+    }
+
+    print(f"{args.turns} one-line tweaks to a {args.lines}-line file (mock API, {args.tokens_per_second:g} tok/s)")
+    print(f"{'':10}{'output tokens':>15}{'rounds':>8}{'wall p50':>11}")
+    for name, r in results.items():
+        print(f"{name:10}{r['output_tokens_per_turn']:>15,.0f}{r['rounds_per_turn']:>8}{r['wall_p50_s']:>10.2f}s")
+
+    before, after = results["rewrite"], results["edit"]
+    print(
+        f"Output tokens per tweak reduced by "
+        f"{100 * (1 - after['output_tokens_per_turn'] / before['output_tokens_per_turn']):.1f}%, "
+        f"wall time by {100 * (1 - after['wall_p50_s'] / before['wall_p50_s']):.1f}%"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
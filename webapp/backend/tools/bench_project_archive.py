@@ -0,0 +1,151 @@
+"""Benchmark project ZIP export and import throughput.
+
+Builds a project with ``--files`` files (text of varying size plus some
+incompressible binaries) and ``--sessions`` sessions of ``--messages``
+messages, then times ``export_project`` end to end and imports the result
+with one and with ``IMPORT_WRITE_CONCURRENCY`` blob writers. Export peak
+memory is measured in a separate tracemalloc pass so tracing does not skew
+the timings.
+
+Usage:
+    python -m tools.bench_project_archive [--files 1000] [--file-kb 32] [--sessions 20] [--messages 50]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench_project_archive_")
+os.environ.setdefault("ANTHROPIC_API_KEY", "mock-key")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp_dir}/bench.sqlite"
+
+from sqlalchemy import insert  # noqa: E402
+
+from src.database.connection import AsyncSessionLocal  # noqa: E402
+from src.database.connection import init_db  # noqa: E402
+from src.database.models import File  # noqa: E402
+from src.database.models import Message  # noqa: E402
+from src.database.models import MessageRole  # noqa: E402
+from src.database.models import Project  # noqa: E402
+from src.database.models import ProjectType  # noqa: E402
+from src.database.models import Session  # noqa: E402
+from src.services import project_archive  # noqa: E402
+from src.services.file_service import FileService  # noqa: E402
+
+
+async def build_project(files: int, file_kb: int, sessions: int, messages: int) -> Project:
+    """Create the benchmark project directly on disk and in the database."""
+    rng = random.Random(0)
+    async with AsyncSessionLocal() as db:
+        project = Project(name="Bench", type=ProjectType.CONTENT)
+        db.add(project)
+        await db.flush()
+        session_ids = [str(i) + "-" + project.id for i in range(sessions)]
+        await db.execute(insert(Session), [{"id": s, "project_id": project.id, "name": s} for s in session_ids])
+        await db.execute(
+            insert(Message),
+            [
+                {"session_id": s, "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT, "content": "x" * 400}
+                for s in session_ids
+                for i in range(messages)
+            ],
+        )
+
+        project_dir = FileService._get_project_dir(project.id)
+        project_dir.mkdir(parents=True)
+        rows = []
+        for i in range(files):
+            size = rng.randint(file_kb * 256, file_kb * 1792)
+            if i % 10 == 0:
+                data = rng.randbytes(size)
+            else:
+                line = f"const item{i} = {{x: {i}, label: 'item {i}'}};\n".encode()
+                data = (line * (size // len(line) + 1))[:size]
+            path = project_dir / f"file_{i:04d}.js"
+            path.write_bytes(data)
+            rows.append(
+                {
+                    "project_id": project.id,
+                    "session_id": session_ids[i % sessions],
+                    "name": path.name,
+                    "path": str(path),
+                    "mime_type": "application/javascript",
+                    "size": size,
+                }
+            )
+        await db.execute(insert(File), rows)
+        await db.commit()
+        return project
+
+
+async def export(project: Project) -> tuple[bytes, float]:
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    async with AsyncSessionLocal() as db:
+        async for chunk in project_archive.export_project(db, project):
+            buffer.write(chunk)
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+async def export_peak_memory(project: Project) -> int:
+    """Peak traced allocation while streaming an export to nowhere."""
+    tracemalloc.start()
+    async with AsyncSessionLocal() as db:
+        async for _chunk in project_archive.export_project(db, project):
+            pass
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+async def import_archive(archive: bytes, concurrency: int) -> float:
+    project_archive.IMPORT_WRITE_CONCURRENCY = concurrency
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await project_archive.import_project(db, io.BytesIO(archive))
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--file-kb", type=int, default=32, help="Mean file size in KiB")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=50, help="Messages per session")
+    args = parser.parse_args()
+
+    await init_db()
+    project = await build_project(args.files, args.file_kb, args.sessions, args.messages)
+    raw_bytes = sum(p.stat().st_size for p in FileService._get_project_dir(project.id).iterdir())
+    default_concurrency = project_archive.IMPORT_WRITE_CONCURRENCY
+
+    archive, export_seconds = await export(project)
+    peak = await export_peak_memory(project)
+    sequential = await import_archive(archive, 1)
+    parallel = await import_archive(archive, default_concurrency)
+
+    mib = 1024 * 1024
+    print(
+        f"{args.files} files ({raw_bytes / mib:.1f} MiB), "
+        f"{args.sessions * args.messages} messages -> {len(archive) / mib:.1f} MiB archive"
+    )
+    print(
+        f"export: {export_seconds:.2f}s  {raw_bytes / mib / export_seconds:.1f} MiB/s  "
+        f"{args.files / export_seconds:,.0f} files/s  peak traced memory {peak / mib:.1f} MiB"
+    )
+    for label, seconds in (("import, 1 writer", sequential), (f"import, {default_concurrency} writers", parallel)):
+        print(f"{label + ':':22}{seconds:.2f}s  {raw_bytes / mib / seconds:.1f} MiB/s  {args.files / seconds:,.0f} files/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""Benchmark prompt caching on a long session against the mock Messages API.
+
+Runs the same N-turn session through ``stream_claude_response`` with prompt
+caching enabled and disabled, and reports prompt tokens processed without
+cache and time to first token.
+
+Usage:
+    python -m tools.bench_prompt_cache [--turns 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench_prompt_cache_")
+os.environ.setdefault("ANTHROPIC_API_KEY", "mock-key")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp_dir}/bench.sqlite"
+# The mock has no quotas; don't pace requests as if it were the real API
+for _quota in ("REQUESTS", "INPUT_TOKENS", "OUTPUT_TOKENS"):
+    os.environ[f"ANTHROPIC_{_quota}_PER_MINUTE"] = "0"
+
+from src.ai import streaming  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.database.connection import AsyncSessionLocal  # noqa: E402
+from src.database.connection import init_db  # noqa: E402
+from src.database.models import Project  # noqa: E402
+from src.database.models import ProjectType  # noqa: E402
+from src.database.models import Session  # noqa: E402
+from tools.mock_anthropic import MockAsyncAnthropic  # noqa: E402
+from tools.mock_anthropic import MockConfig  # noqa: E402
+from tools.mock_anthropic import PromptCache  # noqa: E402
+
+USER_MESSAGE = (
+    "Adjust the itinerary for day {turn}: swap the afternoon museum visit for something outdoors, "
+    "keep dinner reservations near the hotel and note the walking distance between stops."
+)
+
+
+async def run_session(turns: int, caching: bool, config: MockConfig) -> dict:
+    """Run one session and collect per-turn usage and TTFT."""
+    settings.claude_prompt_caching = caching
+    cache = PromptCache(config)
+    streaming.create_anthropic_client = lambda api_key=None: MockAsyncAnthropic(config=config, cache=cache)
+
+    async with AsyncSessionLocal() as db:
+        project = Project(name="Bench", type=ProjectType.TRIP)
+        db.add(project)
+        await db.commit()
+        session = Session(project_id=project.id, name="Bench")
+        db.add(session)
+        await db.commit()
+        session_id = session.id
+
+    ttfts: list[float] = []
+    totals = {"input_tokens": 0, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+
+    for turn in range(turns):
+        start = time.perf_counter()
+        first_token: float | None = None
+        async with AsyncSessionLocal() as db:
+            async for raw in streaming.stream_claude_response(
+                UUID(session_id), USER_MESSAGE.format(turn=turn), db, "mock-key"
+            ):
+                event = json.loads(raw[len("data: "):])
+                if event["type"] == "message_delta" and first_token is None:
+                    first_token = time.perf_counter() - start
+                elif event["type"] == "message_complete":
+                    for key in totals:
+                        totals[key] += event["usage"][key]
+        ttfts.append(first_token or 0.0)
+
+    return {
+        **totals,
+        "ttft_p50_ms": statistics.median(ttfts) * 1000,
+        "ttft_last10_ms": statistics.mean(ttfts[-10:]) * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--response-tokens", type=int, default=300)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        ttft_seconds=0.02,
+        prefill_seconds_per_1k_tokens=0.01,
+        tokens_per_second=100000,
+        response_tokens=args.response_tokens,
+    )
+    await init_db()
+
+    results = {
+        "uncached": await run_session(args.turns, caching=False, config=config),
+        "cached": await run_session(args.turns, caching=True, config=config),
+    }
+
+    print(f"{args.turns}-turn session (mock API, {args.response_tokens}-token replies)")
+    print(f"{'':10}{'uncached in':>14}{'cache write':>14}{'cache read':>14}{'TTFT p50':>12}{'TTFT last10':>13}")
+    for name, r in results.items():
+        print(
+            f"{name:10}{r['input_tokens']:>14,}{r['cache_creation_input_tokens']:>14,}"
+            f"{r['cache_read_input_tokens']:>14,}{r['ttft_p50_ms']:>10.1f}ms{r['ttft_last10_ms']:>11.1f}ms"
+        )
+
+    before, after = results["uncached"]["input_tokens"], results["cached"]["input_tokens"]
+    print(f"Uncached prompt tokens reduced by {100 * (before - after) / before:.1f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
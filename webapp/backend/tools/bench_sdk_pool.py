@@ -0,0 +1,119 @@
+"""Benchmark per-turn Agent SDK client overhead: spawn-per-turn vs the pool.
+
+Runs the same sessions through ``stream_single_turn`` (a fresh CLI process for
+every turn) and through ``SDKClientPool`` using fake clients whose connect and
+disconnect cost what the real CLI costs, and reports time to first message and
+the number of processes spawned.
+
+``--measure-cli`` times real ``ClaudeSDKClient`` connect/disconnect on this
+machine (needs the ``claude`` CLI; no API call is made) and uses the medians.
+
+Usage:
+    python -m tools.bench_sdk_pool [--sessions 4] [--turns 10] [--startup 0.3] [--measure-cli]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from claude_agent_sdk import ClaudeAgentOptions  # noqa: E402
+from claude_agent_sdk import ClaudeSDKClient  # noqa: E402
+
+from src.ai.sdk_pool import SDKClientPool  # noqa: E402
+from src.ai.sdk_pool import stream_single_turn  # noqa: E402
+from tools.mock_agent_sdk import FakeSDKClientFactory  # noqa: E402
+from tools.mock_agent_sdk import FakeSDKConfig  # noqa: E402
+
+
+async def measure_cli(samples: int) -> tuple[float, float]:
+    """Median connect and disconnect time of the real Claude CLI."""
+    connects: list[float] = []
+    disconnects: list[float] = []
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(samples):
+            client = ClaudeSDKClient(options=ClaudeAgentOptions(cwd=cwd))
+            start = time.perf_counter()
+            await client.connect()
+            connects.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            await client.disconnect()
+            disconnects.append(time.perf_counter() - start)
+    return statistics.median(connects), statistics.median(disconnects)
+
+
+async def run_session(stream, session_id: str, turns: int, cwd: str) -> list[float]:
+    """Run one session's turns back to back and return time to first message per turn."""
+    options = ClaudeAgentOptions(cwd=cwd)
+    latencies: list[float] = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        first: float | None = None
+        async for _message in stream(session_id, options, f"turn {turn}"):
+            if first is None:
+                first = time.perf_counter() - start
+        latencies.append(first or 0.0)
+    return latencies
+
+
+async def run(mode: str, sessions: int, turns: int, config: FakeSDKConfig) -> dict:
+    factory = FakeSDKClientFactory(config)
+    pool = SDKClientPool(client_factory=factory)
+
+    def single(session_id, options, prompt):
+        return stream_single_turn(options, prompt, client_factory=factory)
+
+    stream = pool.stream_turn if mode == "pool" else single
+    with tempfile.TemporaryDirectory() as cwd:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_session(stream, f"s{i}", turns, cwd) for i in range(sessions)))
+        elapsed = time.perf_counter() - start
+        await pool.close()
+
+    latencies = sorted(x for r in results for x in r)
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "total_s": elapsed,
+        "spawned": factory.spawned,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--startup", type=float, default=0.3, help="CLI connect cost in seconds")
+    parser.add_argument("--shutdown", type=float, default=0.1, help="CLI disconnect cost in seconds")
+    parser.add_argument("--response", type=float, default=0.05, help="Delay before each reply message")
+    parser.add_argument("--measure-cli", action="store_true", help="Time the real CLI instead of --startup/--shutdown")
+    args = parser.parse_args()
+
+    if args.measure_cli:
+        args.startup, args.shutdown = await measure_cli(samples=5)
+        print(f"Measured CLI: connect {args.startup * 1000:.0f}ms, disconnect {args.shutdown * 1000:.0f}ms")
+
+    config = FakeSDKConfig(
+        startup_seconds=args.startup, shutdown_seconds=args.shutdown, response_seconds=args.response
+    )
+    results = {
+        "per-turn": await run("single", args.sessions, args.turns, config),
+        "pool": await run("pool", args.sessions, args.turns, config),
+    }
+
+    print(f"{args.sessions} sessions x {args.turns} turns (connect {args.startup * 1000:.0f}ms)")
+    print(f"{'':10}{'first msg p50':>15}{'first msg p99':>15}{'total':>10}{'spawned':>9}")
+    for name, r in results.items():
+        print(f"{name:10}{r['p50_ms']:>13.1f}ms{r['p99_ms']:>13.1f}ms{r['total_s']:>9.2f}s{r['spawned']:>9}")
+
+    saved = results["per-turn"]["p50_ms"] - results["pool"]["p50_ms"]
+    print(f"Per-turn startup overhead removed: {saved:.1f}ms at p50")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
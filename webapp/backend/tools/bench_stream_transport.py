@@ -0,0 +1,142 @@
+"""Benchmark bytes on the wire and CPU per event: SSE versus the WebSocket transport.
+
+Runs real turns through ``stream_claude_response`` against the mock
+Messages API to get a representative event stream, then encodes every
+event the way each transport sends it:
+
+- SSE: ``EventSourceResponse``'s own encoding of the yielded string, sent
+  as one HTTP/1.1 chunk (hex length line and trailing CRLF);
+- WebSocket: ``encode_frame`` (channel and seq header plus the event JSON)
+  inside an unmasked RFC 6455 binary frame, plus the client's masked ack
+  text frames at one ack per ``--ack-every`` events.
+
+CPU is the time to turn the event string the turn yields into wire bytes,
+best of ``--repeat`` passes; the turn itself costs the same on both paths.
+
+Usage:
+    python -m tools.bench_stream_transport [--turns 5] [--response-tokens 400] [--ack-every 64]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench_stream_transport_")
+os.environ.setdefault("ANTHROPIC_API_KEY", "mock-key")
+os.environ["DATA_DIR"] = _tmp_dir
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp_dir}/bench.sqlite"
+os.environ["PROJECT_NAMING_ENABLED"] = "false"
+for _quota in ("REQUESTS", "INPUT_TOKENS", "OUTPUT_TOKENS"):
+    os.environ[f"ANTHROPIC_{_quota}_PER_MINUTE"] = "0"
+
+from sse_starlette.sse import ensure_bytes  # noqa: E402
+
+from src.ai import streaming  # noqa: E402
+from src.ai.events import sse_data  # noqa: E402
+from src.api.websocket import encode_frame  # noqa: E402
+from src.database.connection import AsyncSessionLocal  # noqa: E402
+from src.database.connection import init_db  # noqa: E402
+from src.database.models import Project  # noqa: E402
+from src.database.models import ProjectType  # noqa: E402
+from src.database.models import Session  # noqa: E402
+from tools.mock_anthropic import MockAsyncAnthropic  # noqa: E402
+from tools.mock_anthropic import MockConfig  # noqa: E402
+
+# EventSourceResponse's default line separator
+SSE_SEP = "\r\n"
+
+
+def ws_frame_header(length: int, masked: bool = False) -> int:
+    """Size of an RFC 6455 frame header for a payload of ``length`` bytes."""
+    size = 2 if length < 126 else 4 if length < 65536 else 10
+    return size + (4 if masked else 0)
+
+
+def sse_wire(event: str) -> bytes:
+    data = ensure_bytes(event, SSE_SEP)
+    return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+
+def ws_wire(event: str, seq: int) -> bytes | None:
+    payload = sse_data(event)
+    if payload is None:
+        return None
+    return encode_frame(1, seq, payload)
+
+
+async def collect_events(turns: int, response_tokens: int) -> list[str]:
+    """Events of ``turns`` turns of one session, as the turns yield them."""
+    config = MockConfig(ttft_seconds=0.0, tokens_per_second=1_000_000, response_tokens=response_tokens)
+    streaming.create_anthropic_client = lambda api_key=None: MockAsyncAnthropic(config=config)
+    async with AsyncSessionLocal() as db:
+        project = Project(name="Bench", type=ProjectType.TRIP)
+        db.add(project)
+        await db.commit()
+        session = Session(project_id=project.id, name="Bench")
+        db.add(session)
+        await db.commit()
+        session_id = session.id
+
+    events = []
+    for turn in range(turns):
+        async with AsyncSessionLocal() as db:
+            async for raw in streaming.stream_claude_response(
+                UUID(session_id), f"Plan day {turn} of the trip", db, "mock-key"
+            ):
+                events.append(raw)
+    return events
+
+
+def best_ns_per_event(encode, events: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for seq, event in enumerate(events, 1):
+            encode(event, seq)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / len(events)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--response-tokens", type=int, default=400)
+    parser.add_argument("--ack-every", type=int, default=64, help="Events per client ack on the WebSocket")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    await init_db()
+    events = await collect_events(args.turns, args.response_tokens)
+    count = len(events)
+
+    json_bytes = sum(len((sse_data(e) or "").encode()) for e in events)
+    sse_bytes = sum(len(sse_wire(e)) for e in events)
+    ws_frames = [ws_wire(e, seq) for seq, e in enumerate(events, 1)]
+    ws_bytes = sum(len(f) + ws_frame_header(len(f)) for f in ws_frames if f is not None)
+    ack = json.dumps({"op": "ack", "seq": count}).encode()
+    ack_bytes = (count // args.ack_every) * (len(ack) + ws_frame_header(len(ack), masked=True))
+
+    sse_ns = best_ns_per_event(lambda e, _seq: sse_wire(e), events, args.repeat)
+    ws_ns = best_ns_per_event(ws_wire, events, args.repeat)
+
+    print(f"{count} events from {args.turns} turns ({json_bytes:,} bytes of event JSON)")
+    print(f"{'':12}{'bytes':>10}{'per event':>11}{'overhead':>10}{'CPU/event':>11}")
+    for label, total, ns in (("SSE", sse_bytes, sse_ns), ("WebSocket", ws_bytes + ack_bytes, ws_ns)):
+        overhead = (total - json_bytes) / count
+        print(f"{label:12}{total:>10,}{total / count:>11.1f}{overhead:>9.1f}B{ns / 1000:>9.2f}us")
+    print(
+        f"WebSocket sends {100 * (sse_bytes - ws_bytes - ack_bytes) / sse_bytes:.1f}% fewer bytes "
+        f"and spends {sse_ns / ws_ns:.1f}x less CPU framing each event"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,382 @@
+"""End-to-end SSE load test against the backend and the mock Messages API.
+
+Opens N concurrent SSE streams, each on its own session, and reports stream
+throughput, time to first token (p50/p99), server event-loop lag (from the
+``/metrics`` histogram) and resident memory per open stream.
+
+By default the mock API and the backend are started as subprocesses on free
+ports with a throwaway database; pass ``--base-url`` to target a running
+backend instead (it must be pointed at a mock or real API itself).
+
+Usage:
+    python -m tools.load_test --concurrency 50 --streams 200
+    python -m tools.load_test --endpoint messages --tool-use-rate 0.3 --error-rate 0.02
+    python -m tools.load_test --base-url http://127.0.0.1:8000 --concurrency 20
+
+Endpoints:
+    stream    GET  /api/sessions/{id}/stream?message=...   (Agent SDK path)
+    messages  POST /api/sessions/{id}/messages?stream=true  (Messages API path)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+USER_MESSAGE = "Plan a three day trip to Lisbon with a daily budget and one museum per day."
+
+_SAMPLE_RE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)$')
+
+
+@dataclass
+class StreamResult:
+    """Outcome of one SSE stream."""
+
+    ttft: float | None = None
+    duration: float = 0.0
+    events: int = 0
+    content_chars: int = 0
+    error: str | None = None
+
+
+@dataclass
+class MetricsSample:
+    """Server metrics scraped from /metrics."""
+
+    rss_bytes: float = 0.0
+    active_streams: float = 0.0
+    lag_buckets: dict[float, float] = field(default_factory=dict)
+    lag_sum: float = 0.0
+    lag_count: float = 0.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_metrics(text: str) -> MetricsSample:
+    """Extract the values the load test reports from Prometheus text."""
+    sample = MetricsSample()
+    for line in text.splitlines():
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name, labels, value = match["name"], match["labels"] or "", float(match["value"])
+        if name == "process_resident_memory_bytes":
+            sample.rss_bytes = value
+        elif name == "outcomist_sse_active_connections":
+            sample.active_streams = value
+        elif name == "outcomist_event_loop_lag_seconds_bucket":
+            bound = labels.split('le="')[1].rstrip('"')
+            sample.lag_buckets[float("inf") if bound == "+Inf" else float(bound)] = value
+        elif name == "outcomist_event_loop_lag_seconds_sum":
+            sample.lag_sum = value
+        elif name == "outcomist_event_loop_lag_seconds_count":
+            sample.lag_count = value
+    return sample
+
+
+def histogram_quantile(q: float, buckets: dict[float, float]) -> float:
+    """Estimate a quantile from cumulative buckets (as Prometheus does)."""
+    bounds = sorted(buckets)
+    if not bounds or buckets[bounds[-1]] == 0:
+        return 0.0
+    rank = q * buckets[bounds[-1]]
+    prev_bound, prev_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float("inf"):
+                return prev_bound
+            if count == prev_count:
+                return bound
+            return prev_bound + (bound - prev_bound) * (rank - prev_count) / (count - prev_count)
+        prev_bound, prev_count = bound, count
+    return bounds[-1]
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def _parse_sse_data(line: str) -> dict | None:
+    # The backend's events are pre-formatted SSE strings that sse-starlette
+    # wraps again, so a line may carry more than one "data: " prefix
+    if not line.startswith("data:"):
+        return None
+    while line.startswith("data:"):
+        line = line[5:].lstrip()
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+async def run_stream(client: httpx.AsyncClient, endpoint: str, session_id: str, message: str) -> StreamResult:
+    """Open one SSE stream and read it to completion."""
+    result = StreamResult()
+    start = time.perf_counter()
+
+    if endpoint == "stream":
+        request = client.build_request("GET", f"/api/sessions/{session_id}/stream", params={"message": message})
+    else:
+        request = client.build_request(
+            "POST", f"/api/sessions/{session_id}/messages", params={"stream": "true"}, json={"content": message}
+        )
+
+    try:
+        response = await client.send(request, stream=True)
+        try:
+            if response.status_code != 200:
+                result.error = f"HTTP {response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                event = _parse_sse_data(line)
+                if event is None:
+                    continue
+                result.events += 1
+                event_type = event.get("type")
+                if event_type == "message_delta":
+                    if result.ttft is None:
+                        result.ttft = time.perf_counter() - start
+                    result.content_chars += len(event.get("content", ""))
+                elif event_type == "error":
+                    result.error = str(event.get("error"))[:200]
+        finally:
+            await response.aclose()
+    except httpx.HTTPError as e:
+        result.error = f"{type(e).__name__}: {e}"
+
+    result.duration = time.perf_counter() - start
+    return result
+
+
+async def create_sessions(client: httpx.AsyncClient, count: int) -> list[str]:
+    """Create one project and ``count`` sessions."""
+    response = await client.post("/api/projects", json={"name": "Load test", "type": "trip"})
+    response.raise_for_status()
+    project_id = response.json()["id"]
+    session_ids = []
+    for i in range(count):
+        response = await client.post(f"/api/projects/{project_id}/sessions", json={"name": f"Load {i}"})
+        response.raise_for_status()
+        session_ids.append(response.json()["id"])
+    return session_ids
+
+
+async def sample_metrics(client: httpx.AsyncClient, samples: list[MetricsSample], stop: asyncio.Event) -> None:
+    """Scrape /metrics periodically until stopped."""
+    while not stop.is_set():
+        try:
+            response = await client.get("/metrics")
+            samples.append(parse_metrics(response.text))
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.25)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready in {timeout}s")
+
+
+@asynccontextmanager
+async def local_stack(args: argparse.Namespace):
+    """Start the mock API and the backend as subprocesses; yield the backend URL."""
+    workdir = Path(tempfile.mkdtemp(prefix="outcomist_load_"))
+    mock_port, backend_port = _free_port(), _free_port()
+
+    mock_cmd = [
+        sys.executable, "-m", "tools.mock_anthropic",
+        "--port", str(mock_port),
+        "--ttft", str(args.ttft),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--response-tokens", str(args.response_tokens),
+        "--tool-use-rate", str(args.tool_use_rate),
+        "--error-rate", str(args.error_rate),
+        "--midstream-error-rate", str(args.midstream_error_rate),
+    ]
+    env = {
+        **os.environ,
+        "ANTHROPIC_API_KEY": "mock-key",
+        "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{mock_port}",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir}/load.sqlite",
+        "DATA_DIR": str(workdir / "projects"),
+        "TRACE_FILE": str(workdir / "traces.jsonl"),
+    }
+    backend_cmd = [
+        sys.executable, "-m", "uvicorn", "src.main:app",
+        "--port", str(backend_port), "--log-level", "warning", "--no-access-log",
+    ]
+
+    processes = [subprocess.Popen(mock_cmd, cwd=BACKEND_DIR)]
+    try:
+        await _wait_ready(f"http://127.0.0.1:{mock_port}/stats", processes[0])
+        processes.append(subprocess.Popen(backend_cmd, cwd=BACKEND_DIR, env=env))
+        await _wait_ready(f"http://127.0.0.1:{backend_port}/health", processes[1])
+        print(f"Mock API :{mock_port}, backend :{backend_port}, data in {workdir}")
+        yield f"http://127.0.0.1:{backend_port}"
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def run_load(base_url: str, args: argparse.Namespace) -> dict:
+    """Run the load test against a backend and return the report."""
+    limits = httpx.Limits(max_connections=args.concurrency + 10, max_keepalive_connections=args.concurrency + 10)
+    timeout = httpx.Timeout(args.timeout, connect=10.0)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        session_ids = await create_sessions(client, args.streams)
+        baseline = parse_metrics((await client.get("/metrics")).text)
+
+        samples: list[MetricsSample] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_metrics(client, samples, stop))
+
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        for session_id in session_ids:
+            queue.put_nowait(session_id)
+        results: list[StreamResult] = []
+
+        async def worker():
+            while not queue.empty():
+                session_id = queue.get_nowait()
+                results.append(await run_stream(client, args.endpoint, session_id, USER_MESSAGE))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await sampler
+        final = parse_metrics((await client.get("/metrics")).text)
+
+    ok = [r for r in results if r.error is None]
+    ttfts = [r.ttft for r in ok if r.ttft is not None]
+    lag_buckets = {b: final.lag_buckets.get(b, 0) - baseline.lag_buckets.get(b, 0) for b in final.lag_buckets}
+    lag_count = final.lag_count - baseline.lag_count
+
+    peak = max(samples, key=lambda s: s.rss_bytes, default=final)
+    peak_active = max((s.active_streams for s in samples), default=0)
+    rss_growth = max(0.0, peak.rss_bytes - baseline.rss_bytes)
+
+    errors: dict[str, int] = {}
+    for r in results:
+        if r.error is not None:
+            errors[r.error] = errors.get(r.error, 0) + 1
+
+    return {
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "streams": len(results),
+        "succeeded": len(ok),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "streams_per_s": len(ok) / elapsed if elapsed else 0.0,
+        "content_chars_per_s": sum(r.content_chars for r in ok) / elapsed if elapsed else 0.0,
+        "ttft_p50_ms": percentile(ttfts, 0.50) * 1000 if ttfts else None,
+        "ttft_p99_ms": percentile(ttfts, 0.99) * 1000 if ttfts else None,
+        "duration_p50_ms": statistics.median([r.duration for r in ok]) * 1000 if ok else 0.0,
+        "loop_lag_p50_ms": histogram_quantile(0.50, lag_buckets) * 1000,
+        "loop_lag_p99_ms": histogram_quantile(0.99, lag_buckets) * 1000,
+        "loop_lag_mean_ms": (final.lag_sum - baseline.lag_sum) / lag_count * 1000 if lag_count else 0.0,
+        "rss_baseline_mb": baseline.rss_bytes / 1e6,
+        "rss_peak_mb": peak.rss_bytes / 1e6,
+        "peak_active_streams": peak_active,
+        "rss_per_stream_kb": rss_growth / peak_active / 1e3 if peak_active else 0.0,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"\n{report['streams']} streams via '{report['endpoint']}' at concurrency {report['concurrency']}: "
+        f"{report['succeeded']} ok in {report['elapsed_s']:.1f}s"
+    )
+    print(f"  throughput     {report['streams_per_s']:.2f} streams/s, {report['content_chars_per_s']:,.0f} chars/s")
+    if report["ttft_p50_ms"] is None:
+        print("  TTFT           n/a (no message_delta events received)")
+    else:
+        print(f"  TTFT           p50 {report['ttft_p50_ms']:.0f} ms, p99 {report['ttft_p99_ms']:.0f} ms")
+    print(f"  stream time    p50 {report['duration_p50_ms']:.0f} ms")
+    print(
+        f"  loop lag       p50 {report['loop_lag_p50_ms']:.1f} ms, p99 {report['loop_lag_p99_ms']:.1f} ms, "
+        f"mean {report['loop_lag_mean_ms']:.1f} ms"
+    )
+    print(
+        f"  memory         {report['rss_baseline_mb']:.0f} MB -> {report['rss_peak_mb']:.0f} MB peak, "
+        f"~{report['rss_per_stream_kb']:.0f} KB per stream ({report['peak_active_streams']:.0f} open at peak)"
+    )
+    for error, count in report["errors"].items():
+        print(f"  error x{count}: {error}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Target a running backend instead of starting one")
+    parser.add_argument("--endpoint", choices=("stream", "messages"), default="stream")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--streams", type=int, help="Total streams (default: concurrency)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-stream read timeout")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    mock = parser.add_argument_group("mock API (when starting the stack)")
+    mock.add_argument("--ttft", type=float, default=0.4)
+    mock.add_argument("--tokens-per-second", type=float, default=80.0)
+    mock.add_argument("--response-tokens", type=int, default=200)
+    mock.add_argument("--tool-use-rate", type=float, default=0.0)
+    mock.add_argument("--error-rate", type=float, default=0.0)
+    mock.add_argument("--midstream-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    args.streams = args.streams or args.concurrency
+
+    if args.base_url:
+        report = await run_load(args.base_url, args)
+    else:
+        async with local_stack(args) as base_url:
+            report = await run_load(base_url, args)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+"""In-process stand-in for ``claude_agent_sdk.ClaudeSDKClient``.
+
+Models what matters for client lifecycle work without spawning the Claude
+CLI or calling the API:
+
+- ``connect()`` costs ``startup_seconds`` (the CLI subprocess spawn) and
+  ``disconnect()`` costs ``shutdown_seconds``;
+- a client must be used from the task that connected it, like the real one;
+- each client keeps its conversation, and ``resume`` restores a session's
+  conversation from the factory (the CLI's on-disk session store);
+- replies are real SDK message types (``AssistantMessage`` with text and an
+  optional ``Write`` tool use, then ``ResultMessage``);
+- ``crash()`` or ``crash_after_turns`` simulate the subprocess dying.
+
+    factory = FakeSDKClientFactory(FakeSDKConfig(startup_seconds=0.3))
+    pool = SDKClientPool(client_factory=factory)
+"""
+
+import asyncio
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from claude_agent_sdk import AssistantMessage
+from claude_agent_sdk import ClaudeAgentOptions
+from claude_agent_sdk import CLIConnectionError
+from claude_agent_sdk import ResultMessage
+from claude_agent_sdk import TextBlock
+from claude_agent_sdk import ToolUseBlock
+
+
+@dataclass
+class FakeSDKConfig:
+    """Timing and behaviour of fake SDK clients."""
+
+    startup_seconds: float = 0.3
+    shutdown_seconds: float = 0.05
+    # Delay before each reply message
+    response_seconds: float = 0.01
+    response_text: str = "Done."
+    # Emit a Write tool use creating this file in the client's cwd
+    write_filename: str | None = None
+    # The subprocess dies while answering this turn (1-based, per client)
+    crash_after_turns: int | None = None
+
+
+class FakeSDKClient:
+    """Fake ``ClaudeSDKClient`` (see module docstring)."""
+
+    def __init__(
+        self,
+        options: ClaudeAgentOptions | None = None,
+        config: FakeSDKConfig | None = None,
+        factory: "FakeSDKClientFactory | None" = None,
+    ):
+        self.options = options or ClaudeAgentOptions()
+        self.config = config or FakeSDKConfig()
+        self.factory = factory
+        self.session_id = self.options.resume or str(uuid4())
+        self.history: list[str] = []
+        if self.options.resume and factory is not None:
+            self.history = list(factory.sessions.get(self.options.resume, []))
+        self.connected = False
+        self.alive = False
+        self.interrupted = False
+        self.interrupts = 0
+        self.turns = 0
+        self._owner: asyncio.Task | None = None
+        self._prompt: str | None = None
+
+    def _check_task(self) -> None:
+        if asyncio.current_task() is not self._owner:
+            raise RuntimeError("ClaudeSDKClient used outside the task that connected it")
+
+    async def connect(self, prompt: Any = None) -> None:
+        await asyncio.sleep(self.config.startup_seconds)
+        self._owner = asyncio.current_task()
+        self.connected = True
+        self.alive = True
+        if self.factory is not None:
+            self.factory.spawned += 1
+            self.factory.live += 1
+
+    async def query(self, prompt: str, session_id: str = "default") -> None:
+        self._check_task()
+        if not self.alive:
+            raise CLIConnectionError("Claude CLI process is not running")
+        self._prompt = prompt
+        self.interrupted = False
+
+    async def receive_response(self):
+        self._check_task()
+        if self._prompt is None:
+            raise CLIConnectionError("No query in progress")
+        prompt, self._prompt = self._prompt, None
+        self.turns += 1
+
+        await asyncio.sleep(self.config.response_seconds)
+        if self.config.crash_after_turns is not None and self.turns >= self.config.crash_after_turns:
+            self.crash()
+            raise CLIConnectionError("Claude CLI process exited unexpectedly")
+
+        self.history.append(prompt)
+        if self.factory is not None:
+            self.factory.sessions[self.session_id] = list(self.history)
+
+        content: list[Any] = [TextBlock(f"{self.config.response_text} (message {len(self.history)})")]
+        if self.config.write_filename and not self.interrupted:
+            file_path = Path(self.options.cwd or ".") / self.config.write_filename
+            file_path.write_text(f"<!-- {prompt} -->\n")
+            content.append(
+                ToolUseBlock(
+                    id=f"toolu_fake_{uuid4().hex[:12]}",
+                    name="Write",
+                    input={"file_path": str(file_path), "content": file_path.read_text()},
+                )
+            )
+        yield AssistantMessage(content=content, model="fake")
+
+        await asyncio.sleep(self.config.response_seconds)
+        yield ResultMessage(
+            subtype="success",
+            duration_ms=int(self.config.response_seconds * 1000),
+            duration_api_ms=int(self.config.response_seconds * 1000),
+            is_error=False,
+            num_turns=len(self.history),
+            session_id=self.session_id,
+            usage={"input_tokens": 10 * len(self.history), "output_tokens": 20},
+            terminal_reason="aborted_streaming" if self.interrupted else "completed",
+        )
+
+    async def interrupt(self) -> None:
+        self.interrupted = True
+        self.interrupts += 1
+
+    def crash(self) -> None:
+        """Simulate the CLI subprocess dying."""
+        if self.alive and self.factory is not None:
+            self.factory.live -= 1
+        self.alive = False
+
+    async def disconnect(self) -> None:
+        if not self.connected:
+            return
+        await asyncio.sleep(self.config.shutdown_seconds)
+        self.connected = False
+        self.crash()
+
+    async def __aenter__(self) -> "FakeSDKClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> bool:
+        await self.disconnect()
+        return False
+
+
+class FakeSDKClientFactory:
+    """Creates fake clients (``ClaudeSDKClient(options=...)`` signature) and counts them."""
+
+    def __init__(self, config: FakeSDKConfig | None = None):
+        self.config = config or FakeSDKConfig()
+        self.spawned = 0
+        self.live = 0
+        self.clients: list[FakeSDKClient] = []
+        # CLI session ID -> prompts, as the CLI persists conversations
+        self.sessions: dict[str, list[str]] = {}
+
+    def __call__(self, options: ClaudeAgentOptions | None = None) -> FakeSDKClient:
+        client = FakeSDKClient(options=options, config=self.config, factory=self)
+        self.clients.append(client)
+        return client
@@ -0,0 +1,579 @@
+"""Local mock of the Anthropic Messages API.
+
+Streams scripted responses with configurable latency, tool use and error
+injection, and enforces prompt cache semantics, so caching, streaming and
+capacity changes can be measured without calling the real API.
+
+Use it in-process (``MockAsyncAnthropic``) or as an HTTP server that the
+backend is pointed at with ``ANTHROPIC_BASE_URL``:
+
+    python -m tools.mock_anthropic --port 8100 --tokens-per-second 80 --ttft 0.4 --tool-use-rate 0.3
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8100 uvicorn src.main:app
+
+Cache semantics follow the public documentation:
+
+- the prompt is the sequence tools -> system -> messages, split into blocks;
+- a ``cache_control`` block is a breakpoint; a prefix ending at a breakpoint is
+  written to the cache if it is at least ``min_cacheable_tokens`` long;
+- a read checks each breakpoint and up to ``lookback_blocks`` earlier block
+  boundaries for a cached prefix;
+- entries expire ``cache_ttl_seconds`` after their last use.
+
+Usage reported per request mirrors the API: ``input_tokens`` only counts
+tokens after the last cache read/write position.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+from uuid import uuid4
+
+# A responder turns a request body into the content blocks of the reply
+Responder = Callable[[dict[str, Any]], list[dict[str, Any]]]
+
+
+@dataclass
+class MockConfig:
+    """Latency, cache and failure model of the mock API."""
+
+    ttft_seconds: float = 0.05
+    prefill_seconds_per_1k_tokens: float = 0.02
+    tokens_per_second: float = 400.0
+    chunk_tokens: int = 4
+    response_tokens: int = 60
+    cache_ttl_seconds: float = 300.0
+    min_cacheable_tokens: int = 1024
+    lookback_blocks: int = 20
+    # Fraction of first-round requests answered with a create_file tool_use block
+    tool_use_rate: float = 0.0
+    tool_content_tokens: int = 500
+    # Fraction of requests rejected with error_status before streaming starts
+    error_rate: float = 0.0
+    error_status: int = 529
+    # Fraction of streams that emit an error event part-way through
+    midstream_error_rate: float = 0.0
+    seed: int | None = None
+    # Quotas enforced like the API, replenished continuously over
+    # rate_limit_period seconds (0 = unlimited)
+    requests_per_minute: int = 0
+    input_tokens_per_minute: int = 0
+    rate_limit_period: float = 60.0
+
+
+@dataclass
+class CacheUsage:
+    """Token accounting for one request."""
+
+    input_tokens: int
+    cache_creation_input_tokens: int
+    cache_read_input_tokens: int
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count of a JSON-serializable value (about 4 chars per token)."""
+    if isinstance(value, str):
+        return max(1, len(value) // 4)
+    return max(1, len(json.dumps(value, sort_keys=True, default=str)) // 4)
+
+
+def _strip_cache_control(block: Any) -> Any:
+    if isinstance(block, dict) and "cache_control" in block:
+        return {k: v for k, v in block.items() if k != "cache_control"}
+    return block
+
+
+def _prompt_blocks(request: dict[str, Any]) -> list[tuple[Any, bool]]:
+    """Flatten a request into (block, is_breakpoint) in cache prefix order."""
+    blocks: list[tuple[Any, bool]] = []
+
+    for tool in request.get("tools") or []:
+        blocks.append(({"tool": _strip_cache_control(tool)}, "cache_control" in tool))
+
+    system = request.get("system")
+    if isinstance(system, str):
+        blocks.append(({"system": system}, False))
+    elif system:
+        for block in system:
+            blocks.append(({"system": _strip_cache_control(block)}, "cache_control" in block))
+
+    for message in request.get("messages", []):
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        for block in content:
+            is_breakpoint = isinstance(block, dict) and "cache_control" in block
+            blocks.append(({"role": message["role"], "block": _strip_cache_control(block)}, is_breakpoint))
+
+    return blocks
+
+
+@dataclass
+class PromptCache:
+    """In-memory prompt cache keyed by prefix hash."""
+
+    config: MockConfig = field(default_factory=MockConfig)
+    _entries: dict[str, float] = field(default_factory=dict)
+
+    def process(self, request: dict[str, Any], now: float | None = None) -> CacheUsage:
+        """Apply cache reads and writes for a request and return its usage.
+
+        Args:
+            request: Messages API request body
+            now: Current time (defaults to time.monotonic())
+
+        Returns:
+            Usage split into uncached, cache-write and cache-read tokens
+        """
+        now = time.monotonic() if now is None else now
+        blocks = _prompt_blocks(request)
+
+        # Cumulative prefix hashes and token counts at each block boundary
+        hashes: list[str] = []
+        cumulative: list[int] = []
+        digest = hashlib.sha256()
+        total = 0
+        for block, _is_breakpoint in blocks:
+            digest.update(json.dumps(block, sort_keys=True, default=str).encode())
+            hashes.append(digest.copy().hexdigest())
+            total += estimate_tokens(block)
+            cumulative.append(total)
+
+        breakpoints = [i for i, (_block, is_breakpoint) in enumerate(blocks) if is_breakpoint]
+
+        # Longest cached prefix reachable from any breakpoint within the lookback window
+        read_end = -1
+        for bp in breakpoints:
+            for i in range(bp, max(-1, bp - self.config.lookback_blocks), -1):
+                expires = self._entries.get(hashes[i])
+                if expires is not None and expires > now:
+                    read_end = max(read_end, i)
+                    break
+
+        if read_end >= 0:
+            self._entries[hashes[read_end]] = now + self.config.cache_ttl_seconds
+        read_tokens = cumulative[read_end] if read_end >= 0 else 0
+
+        # Write every breakpoint prefix past the read position that is long enough
+        write_end = read_end
+        for bp in breakpoints:
+            if bp > read_end and cumulative[bp] >= self.config.min_cacheable_tokens:
+                self._entries[hashes[bp]] = now + self.config.cache_ttl_seconds
+                write_end = max(write_end, bp)
+        write_tokens = cumulative[write_end] - read_tokens if write_end > read_end else 0
+
+        return CacheUsage(
+            input_tokens=total - read_tokens - write_tokens,
+            cache_creation_input_tokens=write_tokens,
+            cache_read_input_tokens=read_tokens,
+        )
+
+
+def _filler(tokens: int) -> str:
+    return " ".join(f"word{i}" for i in range(tokens))
+
+
+def default_responder(config: MockConfig) -> Responder:
+    """Reply with filler text of ``config.response_tokens`` tokens."""
+
+    def respond(request: dict[str, Any]) -> list[dict[str, Any]]:
+        return [{"type": "text", "text": _filler(config.response_tokens)}]
+
+    return respond
+
+
+def _is_tool_result_turn(request: dict[str, Any]) -> bool:
+    messages = request.get("messages") or []
+    if not messages or isinstance(messages[-1]["content"], str):
+        return False
+    return any(isinstance(b, dict) and b.get("type") == "tool_result" for b in messages[-1]["content"])
+
+
+def scripted_responder(config: MockConfig) -> Responder:
+    """Reply with text, and with ``tool_use_rate`` probability a create_file call.
+
+    Requests that carry a tool_result always get a text-only reply, so a
+    tool loop ends after one round.
+    """
+    rng = random.Random(config.seed)
+
+    def respond(request: dict[str, Any]) -> list[dict[str, Any]]:
+        if _is_tool_result_turn(request) or rng.random() >= config.tool_use_rate:
+            return [{"type": "text", "text": _filler(config.response_tokens)}]
+        body = _filler(config.tool_content_tokens)
+        return [
+            {"type": "text", "text": "Creating the file now."},
+            {
+                "type": "tool_use",
+                "name": "create_file",
+                "input": {"filename": f"mock_{uuid4().hex[:8]}.html", "content": f"<html><body>{body}</body></html>"},
+            },
+        ]
+
+    return respond
+
+
+class _Quota:
+    """Continuously replenished quota reported in ``anthropic-ratelimit-*`` headers."""
+
+    def __init__(self, name: str, limit: int, period: float):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.remaining = float(limit)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.remaining = min(self.limit, self.remaining + (now - self.updated) * self.limit / self.period)
+        self.updated = now
+
+    def wait_time(self, amount: int) -> float:
+        self._refill()
+        needed = min(amount, self.limit)
+        return max(0.0, (needed - self.remaining) * self.period / self.limit)
+
+    def take(self, amount: int) -> None:
+        self.remaining -= amount
+
+    def headers(self) -> dict[str, str]:
+        self._refill()
+        full_at = time.time() + (self.limit - self.remaining) * self.period / self.limit
+        return {
+            f"anthropic-ratelimit-{self.name}-limit": str(self.limit),
+            f"anthropic-ratelimit-{self.name}-remaining": str(max(0, int(self.remaining))),
+            f"anthropic-ratelimit-{self.name}-reset": datetime.fromtimestamp(full_at, tz=timezone.utc).isoformat(),
+        }
+
+
+def _error_body(status: int) -> dict[str, Any]:
+    error_type = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+    return {"type": "error", "error": {"type": error_type, "message": f"Mock {error_type}"}}
+
+
+def build_message(
+    request: dict[str, Any],
+    content: list[dict[str, Any]],
+    usage: CacheUsage,
+) -> dict[str, Any]:
+    """Build a complete (non-streaming) Messages API response body."""
+    for block in content:
+        if block["type"] == "tool_use":
+            block.setdefault("id", f"toolu_mock_{uuid4().hex[:16]}")
+    return {
+        "id": f"msg_mock_{uuid4().hex[:16]}",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "mock"),
+        "content": content,
+        "stop_reason": "tool_use" if any(b["type"] == "tool_use" for b in content) else "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": sum(estimate_tokens(b.get("text") or b.get("input") or "") for b in content),
+            "cache_creation_input_tokens": usage.cache_creation_input_tokens,
+            "cache_read_input_tokens": usage.cache_read_input_tokens,
+        },
+    }
+
+
+async def stream_events(
+    request: dict[str, Any],
+    config: MockConfig,
+    cache: PromptCache,
+    responder: Responder,
+    fail_midstream: bool = False,
+) -> AsyncIterator[dict[str, Any]]:
+    """Produce Messages API streaming events (wire format dicts) for a request.
+
+    Time to first token is ``ttft_seconds`` plus prefill time for every prompt
+    token that was not read from the cache. With ``fail_midstream`` an
+    ``overloaded_error`` event replaces the rest of the first content block.
+    """
+    usage = cache.process(request)
+    content = responder(request)
+    output_tokens = sum(estimate_tokens(block.get("text") or block.get("input") or "") for block in content)
+
+    message = {
+        "id": f"msg_mock_{uuid4().hex[:16]}",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "mock"),
+        "content": [],
+        "stop_reason": None,
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": 0,
+            "cache_creation_input_tokens": usage.cache_creation_input_tokens,
+            "cache_read_input_tokens": usage.cache_read_input_tokens,
+        },
+    }
+    yield {"type": "message_start", "message": message}
+
+    uncached = usage.input_tokens + usage.cache_creation_input_tokens
+    await asyncio.sleep(config.ttft_seconds + config.prefill_seconds_per_1k_tokens * uncached / 1000)
+
+    chunk_chars = max(1, config.chunk_tokens * 4)
+    chunk_delay = config.chunk_tokens / config.tokens_per_second if config.tokens_per_second > 0 else 0
+
+    for index, block in enumerate(content):
+        if block["type"] == "text":
+            yield {"type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""}}
+            text = block["text"]
+            for start in range(0, len(text), chunk_chars):
+                if fail_midstream and start >= len(text) // 2:
+                    yield _error_body(529)
+                    return
+                yield {
+                    "type": "content_block_delta",
+                    "index": index,
+                    "delta": {"type": "text_delta", "text": text[start:start + chunk_chars]},
+                }
+                await asyncio.sleep(chunk_delay)
+        elif block["type"] == "tool_use":
+            tool_id = block.get("id") or f"toolu_mock_{uuid4().hex[:16]}"
+            block["id"] = tool_id
+            yield {
+                "type": "content_block_start",
+                "index": index,
+                "content_block": {"type": "tool_use", "id": tool_id, "name": block["name"], "input": {}},
+            }
+            document = json.dumps(block["input"])
+            for start in range(0, len(document), chunk_chars):
+                yield {
+                    "type": "content_block_delta",
+                    "index": index,
+                    "delta": {"type": "input_json_delta", "partial_json": document[start:start + chunk_chars]},
+                }
+                await asyncio.sleep(chunk_delay)
+        yield {"type": "content_block_stop", "index": index}
+
+    stop_reason = "tool_use" if any(block["type"] == "tool_use" for block in content) else "end_turn"
+    yield {
+        "type": "message_delta",
+        "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+        "usage": {"output_tokens": output_tokens},
+    }
+    yield {"type": "message_stop"}
+
+
+class _MockMessageStream:
+    """Async context manager mimicking ``AsyncMessageStreamManager``/``AsyncMessageStream``."""
+
+    def __init__(self, client: "MockAsyncAnthropic", request: dict[str, Any]):
+        self._client = client
+        self._request = request
+        self._message: dict[str, Any] | None = None
+        self._consumed = False
+
+    async def __aenter__(self) -> "_MockMessageStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> bool:
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        from anthropic.types import RawMessageStreamEvent
+        from pydantic import TypeAdapter
+
+        adapter = TypeAdapter(RawMessageStreamEvent)
+        blocks: dict[int, dict[str, Any]] = {}
+        json_buffers: dict[int, str] = {}
+
+        async for event in stream_events(self._request, self._client.config, self._client.cache, self._client.responder):
+            kind = event["type"]
+            if kind == "message_start":
+                self._message = dict(event["message"])
+            elif kind == "content_block_start":
+                blocks[event["index"]] = dict(event["content_block"])
+            elif kind == "content_block_delta":
+                delta = event["delta"]
+                if delta["type"] == "text_delta":
+                    blocks[event["index"]]["text"] += delta["text"]
+                else:
+                    json_buffers[event["index"]] = json_buffers.get(event["index"], "") + delta["partial_json"]
+            elif kind == "content_block_stop" and event["index"] in json_buffers:
+                blocks[event["index"]]["input"] = json.loads(json_buffers[event["index"]])
+            elif kind == "error":
+                raise RuntimeError(f"Mock stream error: {event['error']['message']}")
+            elif kind == "message_delta":
+                self._message["stop_reason"] = event["delta"]["stop_reason"]
+                self._message["usage"]["output_tokens"] = event["usage"]["output_tokens"]
+            yield adapter.validate_python(event)
+
+        self._message["content"] = [blocks[i] for i in sorted(blocks)]
+        self._consumed = True
+
+    async def get_final_message(self):
+        """Return the accumulated message (consuming the stream if needed)."""
+        from anthropic.types import Message
+
+        if not self._consumed:
+            async for _event in self:
+                pass
+        return Message.model_validate(self._message)
+
+
+class _MockMessages:
+    def __init__(self, client: "MockAsyncAnthropic"):
+        self._client = client
+
+    def stream(self, **request: Any) -> _MockMessageStream:
+        self._client.requests.append(request)
+        return _MockMessageStream(self._client, request)
+
+
+class MockAsyncAnthropic:
+    """In-process stand-in for ``anthropic.AsyncAnthropic`` backed by the mock API."""
+
+    def __init__(
+        self,
+        config: MockConfig | None = None,
+        cache: PromptCache | None = None,
+        responder: Responder | None = None,
+        **_client_kwargs: Any,
+    ):
+        self.config = config or MockConfig()
+        self.cache = cache or PromptCache(self.config)
+        self.responder = responder or default_responder(self.config)
+        self.requests: list[dict[str, Any]] = []
+        self.messages = _MockMessages(self)
+
+
+def create_app(config: MockConfig | None = None, responder: Responder | None = None):
+    """Create the mock API as an ASGI app.
+
+    Serves ``POST /v1/messages`` (streaming and non-streaming) and
+    ``POST /v1/messages/count_tokens``. With quotas configured, every
+    response carries ``anthropic-ratelimit-*`` headers and requests over
+    quota get a 429 with ``retry-after``.
+
+    Args:
+        config: Latency, tool use and failure model
+        responder: Reply generator (defaults to ``scripted_responder``)
+
+    Returns:
+        Starlette application
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+
+    config = config or MockConfig()
+    cache = PromptCache(config)
+    responder = responder or scripted_responder(config)
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "errors_injected": 0, "streams": 0, "rate_limited": 0}
+    quotas = [
+        _Quota(name, limit, config.rate_limit_period)
+        for name, limit in (("requests", config.requests_per_minute), ("input-tokens", config.input_tokens_per_minute))
+        if limit > 0
+    ]
+
+    async def messages(request):
+        body = await request.json()
+        stats["requests"] += 1
+
+        headers: dict[str, str] = {}
+        if quotas:
+            input_tokens = sum(estimate_tokens(b) for b, _bp in _prompt_blocks(body))
+            amounts = {"requests": 1, "input-tokens": input_tokens}
+            wait = max(quota.wait_time(amounts[quota.name]) for quota in quotas)
+            if wait > 0:
+                stats["rate_limited"] += 1
+                for quota in quotas:
+                    headers.update(quota.headers())
+                headers["retry-after"] = str(math.ceil(wait))
+                return JSONResponse(_error_body(429), status_code=429, headers=headers)
+            for quota in quotas:
+                quota.take(amounts[quota.name])
+                headers.update(quota.headers())
+
+        if rng.random() < config.error_rate:
+            stats["errors_injected"] += 1
+            return JSONResponse(_error_body(config.error_status), status_code=config.error_status, headers=headers)
+
+        if not body.get("stream"):
+            usage = cache.process(body)
+            message = build_message(body, responder(body), usage)
+            generation = message["usage"]["output_tokens"] / config.tokens_per_second if config.tokens_per_second > 0 else 0
+            await asyncio.sleep(config.ttft_seconds + generation)
+            return JSONResponse(message, headers=headers)
+
+        stats["streams"] += 1
+        fail_midstream = rng.random() < config.midstream_error_rate
+
+        async def sse():
+            async for event in stream_events(body, config, cache, responder, fail_midstream=fail_midstream):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream", headers=headers)
+
+    async def count_tokens(request):
+        body = await request.json()
+        return JSONResponse({"input_tokens": sum(estimate_tokens(b) for b, _bp in _prompt_blocks(body))})
+
+    async def get_stats(request):
+        return JSONResponse(stats)
+
+    return Starlette(
+        routes=[
+            Route("/v1/messages", messages, methods=["POST"]),
+            Route("/v1/messages/count_tokens", count_tokens, methods=["POST"]),
+            Route("/stats", get_stats, methods=["GET"]),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock Anthropic Messages API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft", type=float, default=0.4, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--tool-use-rate", type=float, default=0.0)
+    parser.add_argument("--tool-content-tokens", type=int, default=500)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=529)
+    parser.add_argument("--midstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute quota (0 = unlimited)")
+    parser.add_argument("--itpm", type=int, default=0, help="Input tokens per minute quota (0 = unlimited)")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = MockConfig(
+        ttft_seconds=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        tool_use_rate=args.tool_use_rate,
+        tool_content_tokens=args.tool_content_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        midstream_error_rate=args.midstream_error_rate,
+        seed=args.seed,
+        requests_per_minute=args.rpm,
+        input_tokens_per_minute=args.itpm,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
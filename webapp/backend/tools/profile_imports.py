@@ -0,0 +1,104 @@
+"""Profile backend import time and enforce a startup budget.
+
+Imports ``src.main`` in fresh interpreters with ``-X importtime`` and
+reports the best total of ``--runs`` runs, the packages that cost the most,
+and whether any of the subsystems that must load lazily (``LAZY_MODULES``)
+were imported at startup. Exits non-zero when the budget is exceeded or a
+lazy module was imported, so it can gate CI.
+
+Usage:
+    python -m tools.profile_imports [--runs 5] [--top 15] [--budget-ms 1500]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Heavy dependencies that are only imported on first use
+LAZY_MODULES = ("anthropic", "claude_agent_sdk", "playwright", "PIL")
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass
+class ImportProfile:
+    """One ``-X importtime`` run of ``import src.main``."""
+
+    total_us: int
+    # Top-level package -> self time in microseconds
+    packages: dict[str, int]
+    lazy_loaded: list[str]
+
+
+def _run(target: str) -> ImportProfile:
+    env = {**os.environ, "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY", "profile-key")}
+    check = f"import sys, {target}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total_us = 0
+    packages: dict[str, int] = defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _indent, module = match.groups()
+        packages[module.split(".")[0]] += int(self_us)
+        if module == target:
+            total_us = int(cumulative_us)
+    lazy_loaded = [m for m in result.stdout.strip().split(",") if m]
+    return ImportProfile(total_us=total_us, packages=dict(packages), lazy_loaded=lazy_loaded)
+
+
+def profile(runs: int = 5, target: str = "src.main") -> ImportProfile:
+    """Import ``target`` ``runs`` times in fresh interpreters and keep the fastest run.
+
+    Args:
+        runs: Number of interpreters to start
+        target: Module to import
+
+    Returns:
+        Profile of the fastest run
+    """
+    return min((_run(target) for _ in range(runs)), key=lambda p: p.total_us)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Fail if importing src.main takes longer")
+    parser.add_argument("--target", default="src.main")
+    args = parser.parse_args()
+
+    result = profile(args.runs, args.target)
+    print(f"import {args.target}: {result.total_us / 1000:.0f} ms (best of {args.runs}, budget {args.budget_ms:g} ms)")
+    print(f"{'package':30}{'self ms':>10}")
+    for package, self_us in sorted(result.packages.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{package:30}{self_us / 1000:>10.1f}")
+
+    failed = False
+    if result.lazy_loaded:
+        print(f"FAIL: imported at startup but should load lazily: {', '.join(result.lazy_loaded)}")
+        failed = True
+    if result.total_us / 1000 > args.budget_ms:
+        print(f"FAIL: startup import exceeds budget by {result.total_us / 1000 - args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-import { Project, Session, Message, ProjectType } from '../types';
+import { Project, Session, Message, ProjectType, File as ProjectFile } from '../types';
 
 const API_BASE = '/api';
 
@@ -70,7 +70,8 @@ export const api = {
 
   // Messages
   getMessages: async (sessionId: string): Promise<Message[]> => {
-    const response = await fetch(`${API_BASE}/sessions/${sessionId}/messages`);
+    // Images come back as cacheable URLs instead of inline base64
+    const response = await fetch(`${API_BASE}/sessions/${sessionId}/messages?images=ref`);
     if (!response.ok) throw new Error('Failed to fetch messages');
     const data = await response.json();
     // Transform backend created_at to frontend timestamp
@@ -96,6 +97,32 @@ export const api = {
     if (!response.ok) throw new Error('Failed to send message');
     return response;
   },
+
+  // Upload assets (streamed to disk by the server); refer to them in a message
+  // with a {"type": "upload", "file_id": ...} content block
+  uploadFiles: async (
+    projectId: string,
+    files: globalThis.File[],
+    sessionId?: string
+  ): Promise<(ProjectFile & { normalizing: boolean })[]> => {
+    const form = new FormData();
+    files.forEach((file) => form.append('file', file, file.name));
+    const query = sessionId ? `?session_id=${encodeURIComponent(sessionId)}` : '';
+    const response = await fetch(`${API_BASE}/projects/${projectId}/uploads${query}`, {
+      method: 'POST',
+      body: form,
+    });
+    if (!response.ok) throw new Error('Failed to upload files');
+    return response.json();
+  },
+
+  // Stop the session's running turn; its stream ends with a 'cancelled' event
+  cancelTurn: async (sessionId: string): Promise<void> => {
+    const response = await fetch(`${API_BASE}/sessions/${sessionId}/cancel`, {
+      method: 'POST',
+    });
+    if (!response.ok && response.status !== 409) throw new Error('Failed to cancel turn');
+  },
 };
 
 // Default export for compatibility
@@ -0,0 +1,120 @@
+import { SSEEvent } from '../types';
+
+// Server frames: uint16 channel | uint32 seq (big endian) | event JSON
+const HEADER_BYTES = 6;
+
+interface SocketEvent {
+  type: 'hello' | 'started' | 'ended' | 'error';
+  // Frames the server sends ahead of acks (hello only)
+  window?: number;
+  ref?: number;
+  channel?: number;
+  session_id?: string;
+  status?: number;
+  error?: string;
+}
+
+interface Turn {
+  onEvent: (event: SSEEvent) => void;
+  resolve: (channel: number) => void;
+  reject: (error: Error) => void;
+  channel?: number;
+}
+
+/**
+ * Streams turns of several sessions over one WebSocket (see `WS /api/ws`).
+ *
+ * Each turn delivers the same events as the SSE stream; `cancel` stops it in band.
+ */
+export class StreamSocket {
+  private socket: WebSocket;
+  private opened: Promise<void>;
+  private nextRef = 1;
+  private turns = new Map<number, Turn>();
+  private channels = new Map<number, Turn>();
+  private unacked = 0;
+  // Frames between acks: half the window the server announces in its hello
+  private ackEvery = 1;
+  private lastSeq = 0;
+  private decoder = new TextDecoder();
+
+  constructor(url = `${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.host}/api/ws`) {
+    this.socket = new WebSocket(url);
+    this.socket.binaryType = 'arraybuffer';
+    this.opened = new Promise((resolve, reject) => {
+      this.socket.onopen = () => resolve();
+      this.socket.onerror = () => reject(new Error('WebSocket connection failed'));
+    });
+    this.socket.onmessage = (message) => this.receive(message.data as ArrayBuffer);
+    this.socket.onclose = () => {
+      for (const turn of [...this.turns.values(), ...this.channels.values()]) {
+        turn.reject(new Error('WebSocket closed'));
+        turn.onEvent({ type: 'error', error: 'Connection closed' });
+      }
+      this.turns.clear();
+      this.channels.clear();
+    };
+  }
+
+  /** Start a turn; resolves with its channel once the server has accepted it. */
+  async start(
+    sessionId: string,
+    message: string,
+    onEvent: (event: SSEEvent) => void,
+    idempotencyKey?: string
+  ): Promise<number> {
+    await this.opened;
+    const ref = this.nextRef++;
+    return new Promise((resolve, reject) => {
+      this.turns.set(ref, { onEvent, resolve, reject });
+      this.socket.send(
+        JSON.stringify({ op: 'start', ref, session_id: sessionId, message, idempotency_key: idempotencyKey })
+      );
+    });
+  }
+
+  cancel(channel: number) {
+    this.socket.send(JSON.stringify({ op: 'cancel', channel }));
+  }
+
+  close() {
+    this.socket.close();
+  }
+
+  private receive(data: ArrayBuffer) {
+    const view = new DataView(data);
+    const channel = view.getUint16(0);
+    this.lastSeq = view.getUint32(2);
+    const event = JSON.parse(this.decoder.decode(new Uint8Array(data, HEADER_BYTES)));
+
+    if (channel === 0) {
+      this.control(event as SocketEvent);
+    } else {
+      this.channels.get(channel)?.onEvent(event as SSEEvent);
+    }
+
+    if (++this.unacked >= this.ackEvery) {
+      this.unacked = 0;
+      this.socket.send(JSON.stringify({ op: 'ack', seq: this.lastSeq }));
+    }
+  }
+
+  private control(event: SocketEvent) {
+    if (event.type === 'hello' && event.window !== undefined) {
+      this.ackEvery = Math.max(1, Math.floor(event.window / 2));
+      return;
+    }
+    const turn = event.ref !== undefined ? this.turns.get(event.ref) : undefined;
+    if (event.type === 'started' && turn && event.channel !== undefined) {
+      this.turns.delete(event.ref!);
+      turn.channel = event.channel;
+      this.channels.set(event.channel, turn);
+      turn.resolve(event.channel);
+    } else if (event.type === 'ended' && event.channel !== undefined) {
+      this.channels.delete(event.channel);
+    } else if (event.type === 'error' && turn) {
+      this.turns.delete(event.ref!);
+      turn.reject(new Error(event.error ?? `Request failed (${event.status})`));
+    }
+  }
+}
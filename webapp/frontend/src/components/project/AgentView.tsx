@@ -6,6 +6,41 @@ interface AgentViewProps {
   messages: Message[];
 }
 
+function MessageContent({ message }: { message: Message }) {
+  if (!message.blocks) {
+    return <>{message.content}</>;
+  }
+  // Content blocks: text parts, and images as thumbnails linking to the full image
+  let parsed: unknown;
+  try {
+    parsed = JSON.parse(message.content);
+  } catch {
+    return <>{message.content}</>;
+  }
+  const blocks = Array.isArray(parsed) ? parsed : [parsed];
+  return (
+    <>
+      {blocks.map((block: any, index: number) => {
+        const info = message.blocks?.[index];
+        if (typeof block === 'string') {
+          return <span key={index}>{block}</span>;
+        }
+        if (block?.type === 'text') {
+          return <span key={index}>{block.text}</span>;
+        }
+        if (block?.type === 'image' && info?.thumbnail_url && info.url) {
+          return (
+            <a key={index} href={info.url} target="_blank" rel="noreferrer" className="block my-1">
+              <img src={info.thumbnail_url} alt="" loading="lazy" className="max-w-[256px] rounded" />
+            </a>
+          );
+        }
+        return null;
+      })}
+    </>
+  );
+}
+
 export function AgentView({ messages }: AgentViewProps) {
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
@@ -55,7 +90,7 @@ export function AgentView({ messages }: AgentViewProps) {
               </span>
             </div>
             <div className="text-sm leading-relaxed whitespace-pre-wrap break-words">
-              {message.content}
+              <MessageContent message={message} />
             </div>
 
             {/* Show progress indicator when message has progress data */}
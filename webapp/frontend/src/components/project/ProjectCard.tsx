@@ -37,6 +37,12 @@ export function ProjectCard({ project, onDelete, className, viewMode = 'grid' }:
   const [activityBarCollapsed, setActivityBarCollapsed] = useState(true);
   const [prevStatus, setPrevStatus] = useState(project.status);
   const [currentStatus, setCurrentStatus] = useState<ProjectStatus>(project.status);
+  // Named in the background from the first message; the rename arrives on the stream
+  const [projectName, setProjectName] = useState(project.name);
+
+  useEffect(() => {
+    setProjectName(project.name);
+  }, [project.name]);
 
   // Track if we're creating a session to prevent race conditions
   const creatingSessionRef = useRef(false);
@@ -210,6 +216,15 @@ export function ProjectCard({ project, onDelete, className, viewMode = 'grid' }:
                   content: accumulatedContent,
                   status: 'streaming',
                 });
+              } else if (parsed.type === 'project_renamed' && parsed.name) {
+                setProjectName(parsed.name);
+              } else if (parsed.type === 'cancelled') {
+                setCurrentStatus('idle');
+                updateMessage(assistantMessageId, {
+                  content: accumulatedContent || 'Stopped.',
+                  status: 'complete',
+                  progress: undefined,
+                });
               } else if (parsed.type === 'message_complete') {
                 setCurrentStatus('complete');
                 completeAllTasks(); // Mark all tasks as complete
@@ -267,7 +282,7 @@ export function ProjectCard({ project, onDelete, className, viewMode = 'grid' }:
 
   const handleDelete = async () => {
     const confirmed = window.confirm(
-      `Are you sure you want to delete "${project.name}"?\n\nThis will:\n• Remove the project from your workspace\n• Delete all files\n• Preserve conversation history for learning`
+      `Are you sure you want to delete "${projectName}"?\n\nThis will:\n• Remove the project from your workspace\n• Delete all files\n• Preserve conversation history for learning`
     );
 
     if (!confirmed) return;
@@ -318,7 +333,7 @@ export function ProjectCard({ project, onDelete, className, viewMode = 'grid' }:
       >
         <div className="text-base">{projectIcons[project.type] || '📁'}</div>
         <div className="flex-1 text-[13px] font-semibold text-[#e0e0e0]">
-          {project.name || 'Untitled Project'}
+          {projectName || 'Untitled Project'}
         </div>
         <StatusBadge status={currentStatus} />
         <button
@@ -0,0 +1,72 @@
+import { useEffect, useRef, useState } from 'react';
+import { SSEEvent } from '../types';
+
+function updateSubscription(subscriptionId: string, projectIds: string[]) {
+  fetch(`/api/projects/events/${subscriptionId}`, {
+    method: 'PUT',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ project_ids: projectIds }),
+  }).catch((err) => console.error('Failed to update project subscription:', err));
+}
+
+/**
+ * Follow many projects over one SSE connection (dashboards).
+ *
+ * The connection is opened once; when the list of projects changes the open
+ * subscription is updated in place instead of reconnecting.
+ */
+export function useProjectEvents(projectIds: string[], onEvent: (event: SSEEvent) => void) {
+  const [connected, setConnected] = useState(false);
+  const subscriptionId = useRef<string | null>(null);
+  const handler = useRef(onEvent);
+  handler.current = onEvent;
+  const key = [...projectIds].sort().join(',');
+  const currentIds = useRef(projectIds);
+  currentIds.current = projectIds;
+
+  useEffect(() => {
+    const initialKey = [...currentIds.current].sort().join(',');
+    const query = currentIds.current.map((id) => `project_id=${encodeURIComponent(id)}`).join('&');
+    const es = new EventSource(`/api/projects/events?${query}`);
+
+    es.onopen = () => setConnected(true);
+
+    es.onmessage = (event) => {
+      try {
+        const data: SSEEvent = JSON.parse(event.data);
+        if (data.type === 'subscribed') {
+          subscriptionId.current = data.subscription_id ?? null;
+          // A reconnect reuses the first URL; catch up with later changes
+          const latestKey = [...currentIds.current].sort().join(',');
+          if (subscriptionId.current && latestKey !== initialKey) {
+            updateSubscription(subscriptionId.current, currentIds.current);
+          }
+        }
+        handler.current(data);
+      } catch (err) {
+        console.error('Failed to parse project event:', err);
+      }
+    };
+
+    es.onerror = () => {
+      // EventSource reconnects by itself and gets a new subscription
+      setConnected(false);
+      subscriptionId.current = null;
+    };
+
+    return () => {
+      es.close();
+      setConnected(false);
+      subscriptionId.current = null;
+    };
+    // Connect once; project changes are sent to the open subscription below
+  }, []);
+
+  useEffect(() => {
+    const id = subscriptionId.current;
+    if (!id) return;
+    updateSubscription(id, key ? key.split(',') : []);
+  }, [key]);
+
+  return { connected };
+}
@@ -36,6 +36,15 @@ export interface Session {
   updated_at: string;
 }
 
+export interface ContentBlockInfo {
+  type: string;
+  chars?: number | null;
+  media_type?: string | null;
+  bytes?: number | null;
+  url?: string | null;
+  thumbnail_url?: string | null;
+}
+
 export interface Message {
   id: string;
   session_id: string;
@@ -44,6 +53,8 @@ export interface Message {
   timestamp: string;
   status: MessageStatus;
   progress?: ProgressData;
+  // Present for messages made of content blocks (text and images)
+  blocks?: ContentBlockInfo[] | null;
 }
 
 export interface File {
@@ -57,9 +68,31 @@ export interface File {
 }
 
 export interface SSEEvent {
-  type: 'message_start' | 'message_delta' | 'message_complete' | 'status_update' | 'error';
+  type:
+    | 'message_start'
+    | 'message_delta'
+    | 'message_complete'
+    | 'status_update'
+    | 'project_renamed'
+    | 'cancelled'
+    | 'error'
+    // Multiplexed project stream (GET /api/projects/events)
+    | 'subscribed'
+    | 'file_created'
+    | 'verification'
+    | 'resync';
   session_id?: string;
+  subscription_id?: string;
+  project_ids?: string[];
+  missing?: string[];
+  snapshot?: boolean;
+  file?: Pick<File, 'id' | 'name' | 'mime_type' | 'size'>;
+  created?: boolean;
+  passed?: boolean;
+  errors?: string[];
+  error_count?: number;
   project_id?: string;
+  name?: string;
   content?: string;
   message?: Message;
   status?: ProjectStatus;